@@ -0,0 +1,339 @@
+# -*- coding: utf-8 -*-
+"""
+按颜色批量绘制可调节船体：
+DrawMap中同一颜色的所有可调节船体打包为一个交错的顶点缓冲区（位置，法向量）和一个三角形索引缓冲区，
+每帧每种颜色只需要一次glDrawElements，通过shader_program中的着色器绘制（着色器不可用时使用固定管线的顶点数组）。
+记录每个零件在缓冲区中的区间，单个零件修改后，顶点数不变时直接原位更新缓冲区中的这一段；
+拾取（GL_SELECT）时按零件区间逐个绘制，并加载零件的名称。
+零件按位置的Morton码排序后打包，并按零件的包围盒建立层次包围盒（hull_bvh.PartBVH），
+绘制时只提交与视锥相交的零件所在的几段索引（glMultiDrawElements）。
+"""
+import ctypes
+import weakref
+from functools import lru_cache
+
+import numpy as np
+from OpenGL import GL
+from OpenGL.GL.shaders import compileProgram, compileShader
+
+from ship_reader.NA_design_reader import AdjustableHull
+from ship_reader.hull_geometry import get_face_normals
+from shader_program import shader_program
+from .hull_bvh import PartBVH, get_part_bounds, morton_order
+
+VERTEX_STRIDE = 6 * 4  # 每个顶点：位置和法向量，6个float32
+NORMAL_OFFSET = ctypes.c_void_p(3 * 4)
+REBUILD_RATE = 0.25  # 需要更新的零件超过这个比例时重新打包整个颜色
+
+
+@lru_cache(maxsize=None)
+def get_triangle_template(draw_method, n):
+    """
+    :param draw_method: 面的绘制方法（"GL_QUADS"等）
+    :param n: 面的点数
+    :return: 把这个面分解为三角形的局部索引，形状为(三角形数, 3)，保持原来的环绕方向
+    """
+    if draw_method == "GL_QUAD_STRIP":
+        triangles = []
+        for k in range(n // 2 - 1):
+            triangles += [(2 * k, 2 * k + 1, 2 * k + 3), (2 * k, 2 * k + 3, 2 * k + 2)]
+    else:  # GL_QUADS, GL_TRIANGLES, GL_POLYGON：扇形分解
+        triangles = [(0, i, i + 1) for i in range(1, n - 1)]
+    return np.array(triangles, dtype=np.uint32).reshape(-1, 3)
+
+
+def build_mesh(parts):
+    """
+    把零件的绘图面打包为三角形网格，每个零件的顶点和索引连续存放；
+    已经有法向量（批量计算或解包得到）的零件直接复制plot_normals，其余零件的面按组一起向量化计算
+    :param parts: 可调节船体列表
+    :return: 顶点数组（(顶点数, 6) float32），索引数组（uint32），
+        {零件: (顶点起点, 顶点数, 索引起点, 索引数, 面的结构)}
+    """
+    # 先访问plot_faces（从打包的数组中解包时同时得到法向量）；逐个零件计算法向量的开销太大，没有法向量时留到按组计算
+    return build_face_mesh((part, part.plot_faces, part._plot_normals) for part in parts)
+
+
+def build_face_mesh(face_sets):
+    """
+    把若干组面打包为三角形网格，每组的顶点和索引连续存放
+    :param face_sets: (键, plot_faces, plot_normals) 的序列，plot_normals为None时按组一起计算
+    :return: 顶点数组（(顶点数, 6) float32），索引数组（uint32），
+        {键: (顶点起点, 顶点数, 索引起点, 索引数, 面的结构)}
+    """
+    groups = {}  # (绘制方法, 点数): [面, 法向量, 顶点起点, 索引起点, 每个面的索引数]
+    slices = {}
+    v_num = i_num = 0
+    for owner, plot_faces, plot_normals in face_sets:
+        v_start, i_start = v_num, i_num
+        signature = []
+        for draw_method, faces in plot_faces.items():
+            normals = plot_normals[draw_method].tolist() if plot_normals is not None else [None] * len(faces)
+            for face, normal in zip(faces, normals):
+                n = len(face)
+                if n < 3 or 4 < n <= 12:  # 与显示列表相同，无法确定法向量的面不绘制
+                    continue
+                key = draw_method, n
+                group = groups.get(key)
+                if group is None:
+                    group = groups[key] = [[], [], [], [], get_triangle_template(draw_method, n).size]
+                group[0].append(face)
+                group[1].append(normal)
+                group[2].append(v_num)
+                group[3].append(i_num)
+                signature.append(key)
+                v_num += n
+                i_num += group[4]
+        slices[owner] = (v_start, v_num - v_start, i_start, i_num - i_start, tuple(signature))
+    vertices = np.empty((v_num, 6), dtype=np.float32)
+    indices = np.empty(i_num, dtype=np.uint32)
+    for (draw_method, n), (faces, normals, v_starts, i_starts, tri_size) in groups.items():
+        v_starts = np.asarray(v_starts, dtype=np.uint32)[:, None]
+        v_index = v_starts + np.arange(n, dtype=np.uint32)
+        faces = np.asarray(faces, dtype=np.float32)
+        missing = [i for i, normal in enumerate(normals) if normal is None]
+        if len(missing) == len(normals):
+            normals = get_face_normals(faces)
+        else:
+            for i, normal in zip(missing, get_face_normals(faces[missing]).tolist()):
+                normals[i] = normal
+            normals = np.asarray(normals, dtype=np.float32)
+        vertices[v_index, :3] = faces
+        vertices[v_index, 3:] = normals[:, None, :]
+        i_index = np.asarray(i_starts, dtype=np.uint32)[:, None] + np.arange(tri_size, dtype=np.uint32)
+        indices[i_index] = v_starts + get_triangle_template(draw_method, n).ravel()
+    return vertices, indices, slices
+
+
+def get_hull_program():
+    """
+    编译shader_program中的着色器
+    :return: 着色器程序，当前环境不支持时为None（使用固定管线绘制）
+    """
+    try:
+        return compileProgram(compileShader(shader_program.VS, GL.GL_VERTEX_SHADER),
+                              compileShader(shader_program.FS, GL.GL_FRAGMENT_SHADER))
+    except (RuntimeError, GL.GLError):
+        return None
+
+
+def bind_hull_program(program, light_pos, view_pos, light_color=(1., 1., 1.), projection=None, view=None):
+    """
+    启用着色器
+    :param program: get_hull_program的返回值
+    :param light_pos: 光源位置（QVector3D）
+    :param view_pos: 摄像机位置（QVector3D）
+    :param light_color: 光源颜色
+    :param projection: 投影矩阵（4x4，按列存放），None表示取自固定管线当前的矩阵（由gluPerspective设置）
+    :param view: 视图矩阵，None表示取自固定管线当前的模型视图矩阵（由gluLookAt设置）；核心模式下没有固定管线，需要直接传入
+    """
+    if projection is None:
+        projection = GL.glGetFloatv(GL.GL_PROJECTION_MATRIX)
+    if view is None:
+        view = GL.glGetFloatv(GL.GL_MODELVIEW_MATRIX)
+    GL.glUseProgram(program)
+    GL.glUniformMatrix4fv(GL.glGetUniformLocation(program, "projection"), 1, GL.GL_FALSE, projection)
+    GL.glUniformMatrix4fv(GL.glGetUniformLocation(program, "view"), 1, GL.GL_FALSE, view)
+    GL.glUniformMatrix4fv(GL.glGetUniformLocation(program, "model"), 1, GL.GL_FALSE,
+                          np.identity(4, dtype=np.float32))
+    GL.glUniform3f(GL.glGetUniformLocation(program, "lightPos"), light_pos.x(), light_pos.y(), light_pos.z())
+    GL.glUniform3f(GL.glGetUniformLocation(program, "viewPos"), view_pos.x(), view_pos.y(), view_pos.z())
+    GL.glUniform3f(GL.glGetUniformLocation(program, "lightColor"), *light_color[:3])
+
+
+class ColorBatch:
+    all_batches = weakref.WeakSet()
+
+    def __init__(self):
+        self.parts = []  # 打包时该颜色的零件列表的副本，用于判断零件是否增删
+        self.slices = {}  # 零件: (顶点起点, 顶点数, 索引起点, 索引数, 面的结构)
+        self.index_num = 0
+        self.vbo = None
+        self.ibo = None
+        self.dirty_parts = set()  # 绘图数据改变，需要更新缓冲区的零件
+        self.bvh = None  # 零件包围盒的层次包围盒，零件的序号即在缓冲区中的顺序
+        self.part_index = {}  # 零件: 在bvh中的序号
+        self.index_starts = np.zeros(0, dtype=np.intp)  # 每个零件的索引起点
+        self.index_ends = np.zeros(0, dtype=np.intp)  # 每个零件的索引终点
+        self.visible_num = 0  # 上一次绘制时与视锥相交的零件数
+        ColorBatch.all_batches.add(self)
+
+    @staticmethod
+    def dispatch_changed_parts():
+        """
+        把绘图数据被清除的零件（AdjustableHull.changed_parts）分给包含它们的颜色批次
+        """
+        changed = AdjustableHull.changed_parts
+        if not changed:
+            return
+        for batch in ColorBatch.all_batches:
+            batch.dirty_parts.update(part for part in changed if part in batch.slices)
+        changed.clear()
+
+    def sync(self, part_set, glWin=None):
+        """
+        零件增删后重新打包，零件修改后更新缓冲区
+        :param part_set: DrawMap中该颜色的零件列表
+        :param glWin: 绘制的窗口，绑定到零件上
+        """
+        if self.vbo is None or self.parts != part_set:
+            self.build(part_set, glWin)
+        elif self.dirty_parts:
+            if len(self.dirty_parts) > len(self.slices) * REBUILD_RATE or not self.update_parts():
+                self.build(part_set, glWin)
+            self.dirty_parts.clear()
+
+    def build(self, part_set, glWin=None):
+        """
+        重新打包该颜色的所有可调节船体，并上传到缓冲区
+        """
+        self.parts = list(part_set)
+        hulls = [part for part in self.parts if isinstance(part, AdjustableHull)]
+        # 按位置排序，空间上相邻的零件在缓冲区中也相邻，剔除后可见的零件是连续的几段
+        hulls = [hulls[i] for i in morton_order([part.Pos for part in hulls])]
+        AdjustableHull.prepare_plot_data(hulls)
+        for part in hulls:
+            part.glWin = glWin
+        vertices, indices, self.slices = build_mesh(hulls)
+        self.index_num = len(indices)
+        self.dirty_parts.clear()
+        self.build_bvh(vertices)
+        if self.vbo is None:
+            self.vbo, self.ibo = GL.glGenBuffers(2)
+        GL.glBindBuffer(GL.GL_ARRAY_BUFFER, self.vbo)
+        GL.glBufferData(GL.GL_ARRAY_BUFFER, vertices.nbytes, vertices, GL.GL_DYNAMIC_DRAW)
+        GL.glBindBuffer(GL.GL_ARRAY_BUFFER, 0)
+        GL.glBindBuffer(GL.GL_ELEMENT_ARRAY_BUFFER, self.ibo)
+        GL.glBufferData(GL.GL_ELEMENT_ARRAY_BUFFER, indices.nbytes, indices, GL.GL_STATIC_DRAW)
+        GL.glBindBuffer(GL.GL_ELEMENT_ARRAY_BUFFER, 0)
+
+    def build_bvh(self, vertices):
+        """
+        按每个零件在顶点缓冲区中的区间计算包围盒，建立层次包围盒
+        """
+        self.part_index = {part: i for i, part in enumerate(self.slices)}
+        ranges = np.array([slice_[:4] for slice_ in self.slices.values()], dtype=np.intp).reshape(-1, 4)
+        self.index_starts = ranges[:, 2]
+        self.index_ends = ranges[:, 2] + ranges[:, 3]
+        self.visible_num = len(ranges)
+        self.bvh = PartBVH(*get_part_bounds(vertices[:, :3], ranges[:, 0], ranges[:, 1])) if len(ranges) else None
+
+    def update_parts(self) -> bool:
+        """
+        原位更新修改过的零件在顶点缓冲区中的区间
+        :return: 是否成功；零件的面的结构（顶点数，索引）改变时返回False，需要重新打包
+        """
+        vertices, _indices, slices = build_mesh(list(self.dirty_parts))
+        updates = []
+        for part, (start, num, _i_start, _i_num, signature) in slices.items():
+            old_start, old_num, _old_i_start, _old_i_num, old_signature = self.slices[part]
+            if signature != old_signature:
+                return False
+            updates.append((old_start, vertices[start:start + num]))
+        GL.glBindBuffer(GL.GL_ARRAY_BUFFER, self.vbo)
+        for start, part_vertices in updates:
+            GL.glBufferSubData(GL.GL_ARRAY_BUFFER, start * VERTEX_STRIDE, part_vertices.nbytes, part_vertices)
+        GL.glBindBuffer(GL.GL_ARRAY_BUFFER, 0)
+        # 重新拟合修改过的零件所在的叶节点
+        ranges = np.array([slice_[:2] for slice_ in slices.values()], dtype=np.intp).reshape(-1, 2)
+        self.bvh.update([self.part_index[part] for part in slices],
+                        *get_part_bounds(vertices[:, :3], ranges[:, 0], ranges[:, 1]))
+        return True
+
+    def get_visible_ranges(self, planes):
+        """
+        :param planes: 视锥的六个平面（hull_bvh.get_frustum_planes），None表示不剔除
+        :return: 可见零件的索引区间（起点数组，索引数数组），相邻的可见零件合并为一段；全部可见时为None
+        """
+        if planes is None or self.bvh is None:
+            self.visible_num = len(self.slices)
+            return None
+        visible = self.bvh.query(planes)
+        self.visible_num = int(np.count_nonzero(visible))
+        if self.visible_num == len(visible):
+            return None
+        edges = np.diff(np.concatenate([[False], visible, [False]]).astype(np.int8))
+        run_starts, run_ends = np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+        starts = self.index_starts[run_starts]
+        return starts, self.index_ends[run_ends - 1] - starts
+
+    def _draw_ranges(self, ranges):
+        if ranges is None:
+            GL.glDrawElements(GL.GL_TRIANGLES, self.index_num, GL.GL_UNSIGNED_INT, ctypes.c_void_p(0))
+            return
+        starts, counts = ranges
+        offsets = (starts * 4).astype(np.intp)
+        GL.glMultiDrawElements(GL.GL_TRIANGLES, counts.astype(np.int32), GL.GL_UNSIGNED_INT,
+                               offsets.ctypes.data_as(ctypes.POINTER(ctypes.c_void_p)), len(offsets))
+
+    def _bind_fixed_arrays(self):
+        GL.glBindBuffer(GL.GL_ARRAY_BUFFER, self.vbo)
+        GL.glBindBuffer(GL.GL_ELEMENT_ARRAY_BUFFER, self.ibo)
+        GL.glEnableClientState(GL.GL_VERTEX_ARRAY)
+        GL.glEnableClientState(GL.GL_NORMAL_ARRAY)
+        GL.glVertexPointer(3, GL.GL_FLOAT, VERTEX_STRIDE, ctypes.c_void_p(0))
+        GL.glNormalPointer(GL.GL_FLOAT, VERTEX_STRIDE, NORMAL_OFFSET)
+
+    @staticmethod
+    def _unbind_fixed_arrays():
+        GL.glDisableClientState(GL.GL_NORMAL_ARRAY)
+        GL.glDisableClientState(GL.GL_VERTEX_ARRAY)
+        GL.glBindBuffer(GL.GL_ELEMENT_ARRAY_BUFFER, 0)
+        GL.glBindBuffer(GL.GL_ARRAY_BUFFER, 0)
+
+    def draw(self, color, program=None, planes=None):
+        """
+        一次绘制该颜色的所有零件
+        :param color: RGBA
+        :param program: 已经由bind_hull_program启用的着色器，None表示使用固定管线（颜色由glColor设置）
+        :param planes: 视锥的六个平面，只绘制与视锥相交的零件；None表示不剔除
+        """
+        ranges = self.get_visible_ranges(planes)
+        if not self.index_num or ranges is not None and not len(ranges[0]):
+            return
+        if program is None:
+            GL.glColor4f(*color)
+            self._bind_fixed_arrays()
+            self._draw_ranges(ranges)
+            self._unbind_fixed_arrays()
+            return
+        GL.glUniform3f(GL.glGetUniformLocation(program, "objectColor"), *color[:3])
+        GL.glUniform1f(GL.glGetUniformLocation(program, "alpha"), color[3])
+        GL.glBindBuffer(GL.GL_ARRAY_BUFFER, self.vbo)
+        GL.glBindBuffer(GL.GL_ELEMENT_ARRAY_BUFFER, self.ibo)
+        GL.glEnableVertexAttribArray(0)
+        GL.glEnableVertexAttribArray(1)
+        GL.glVertexAttribPointer(0, 3, GL.GL_FLOAT, GL.GL_FALSE, VERTEX_STRIDE, ctypes.c_void_p(0))
+        GL.glVertexAttribPointer(1, 3, GL.GL_FLOAT, GL.GL_FALSE, VERTEX_STRIDE, NORMAL_OFFSET)
+        self._draw_ranges(ranges)
+        GL.glDisableVertexAttribArray(1)
+        GL.glDisableVertexAttribArray(0)
+        GL.glBindBuffer(GL.GL_ELEMENT_ARRAY_BUFFER, 0)
+        GL.glBindBuffer(GL.GL_ARRAY_BUFFER, 0)
+
+    def draw_names(self, gl, planes=None):
+        """
+        拾取模式（GL_SELECT）：按零件区间逐个绘制，每个零件加载自己的名称
+        :param planes: 拾取区域的视锥平面，只绘制与其相交的零件；None表示不剔除
+        """
+        visible = self.bvh.query(planes) if planes is not None and self.bvh is not None else None
+        self._bind_fixed_arrays()
+        for i, (part, (_start, _num, i_start, i_num, _signature)) in enumerate(self.slices.items()):
+            if visible is not None and not visible[i]:
+                continue
+            gl.glLoadName(id(part) % 4294967296)
+            GL.glDrawElements(GL.GL_TRIANGLES, i_num, GL.GL_UNSIGNED_INT, ctypes.c_void_p(i_start * 4))
+        self._unbind_fixed_arrays()
+
+    def release(self):
+        """
+        删除缓冲区（需要在所属的OpenGL上下文中调用）
+        """
+        if self.vbo is not None:
+            GL.glDeleteBuffers(2, [self.vbo, self.ibo])
+            self.vbo = self.ibo = None
+        self.parts = []
+        self.slices = {}
+        self.index_num = 0
+        self.bvh = None
+        self.part_index = {}
@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+"""
+视锥剔除：
+按零件的轴对齐包围盒建立层次包围盒（BVH）。零件按位置的Morton码排序后打包（见hull_batch），每LEAF_SIZE个相邻零件为一个叶节点，
+叶节点之上是按数组存放的完全二叉树（节点i的子节点为2i和2i+1），建立和重新拟合都只是逐层向量化的min/max；
+零件修改后只重新拟合它所在的叶节点和这些叶节点的祖先节点。
+每帧用当前的投影矩阵和模型视图矩阵得到视锥的六个平面，逐层查询：完全在视锥内的子树不再向下测试，
+与视锥相交的叶节点再逐个测试其中的零件；因为零件按空间位置排序，可见的零件在缓冲区中大多是连续的几段。
+"""
+import numpy as np
+
+LEAF_SIZE = 32  # 每个叶节点的零件数
+MORTON_BITS = 10  # Morton码每个轴的位数
+
+
+def get_frustum_planes(projection, view):
+    """
+    从投影矩阵和模型视图矩阵中提取视锥的六个平面（左，右，下，上，近，远），法向量指向视锥内
+    :param projection: 4x4，按列存放（glGetFloatv的返回值）
+    :param view: 4x4，按列存放
+    :return: (6, 4) 数组，每行为 (a, b, c, d)，点p在平面内侧时 a*x + b*y + c*z + d >= 0
+    """
+    clip = np.asarray(projection, dtype=np.float64).reshape(4, 4).T @ np.asarray(view, dtype=np.float64).reshape(4, 4).T
+    planes = np.array([clip[3] + clip[0], clip[3] - clip[0], clip[3] + clip[1], clip[3] - clip[1],
+                       clip[3] + clip[2], clip[3] - clip[2]])
+    return planes / np.linalg.norm(planes[:, :3], axis=1)[:, None]
+
+
+def classify_boxes(planes, mins, maxs):
+    """
+    :param planes: get_frustum_planes的返回值
+    :param mins: (N, 3) 包围盒的最小点，空的包围盒为 (inf, inf, inf)
+    :param maxs: (N, 3) 包围盒的最大点，空的包围盒为 (-inf, -inf, -inf)
+    :return: (N,) 是否完全在视锥外，(N,) 是否完全在视锥内；空的包围盒在视锥外
+    """
+    empty = ~(mins <= maxs).all(axis=1)
+    with np.errstate(invalid="ignore"):
+        distance = (mins + maxs) / 2 @ planes[:, :3].T + planes[:, 3]
+        radius = (maxs - mins) / 2 @ np.abs(planes[:, :3]).T
+        outside = (distance + radius < 0).any(axis=1) | empty
+        inside = (distance - radius >= 0).all(axis=1) & ~empty
+    return outside, inside
+
+
+def get_part_bounds(points, starts, nums):
+    """
+    每个零件的顶点在points中连续存放，且所有顶点都属于某个零件
+    :param points: (顶点数, 3) 数组
+    :param starts: (N,) 每个零件的顶点起点
+    :param nums: (N,) 每个零件的顶点数
+    :return: (N, 3) 最小点，(N, 3) 最大点；没有顶点的零件为空的包围盒
+    """
+    mins = np.full((len(starts), 3), np.inf)
+    maxs = np.full((len(starts), 3), -np.inf)
+    filled = np.asarray(nums) > 0
+    if filled.any():
+        filled_starts = np.asarray(starts)[filled]
+        mins[filled] = np.minimum.reduceat(points, filled_starts, axis=0)
+        maxs[filled] = np.maximum.reduceat(points, filled_starts, axis=0)
+    return mins, maxs
+
+
+def morton_order(points):
+    """
+    :param points: (N, 3) 数组
+    :return: 按Morton码（z-order）排序的序号，空间上相邻的点在排序后大多也相邻
+    """
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+    if len(points) < 2:
+        return np.arange(len(points))
+    low = points.min(axis=0)
+    span = np.maximum(points.max(axis=0) - low, 1e-9)
+    cells = ((points - low) / span * ((1 << MORTON_BITS) - 1)).astype(np.uint64)
+    codes = np.zeros(len(points), dtype=np.uint64)
+    for bit in range(MORTON_BITS):
+        for axis in range(3):
+            codes |= ((cells[:, axis] >> np.uint64(bit)) & np.uint64(1)) << np.uint64(3 * bit + axis)
+    return np.argsort(codes, kind="stable")
+
+
+class PartBVH:
+    def __init__(self, mins, maxs, leaf_size: int = LEAF_SIZE):
+        """
+        :param mins: (N, 3) 每个零件包围盒的最小点，零件的顺序即缓冲区中的顺序
+        :param maxs: (N, 3) 最大点
+        :param leaf_size: 每个叶节点的零件数
+        """
+        self.part_num = len(mins)
+        self.leaf_size = leaf_size
+        self.leaf_num = max(-(-self.part_num // leaf_size), 1)
+        self.depth = int(np.ceil(np.log2(self.leaf_num)))  # 叶节点所在的层
+        self.size = 1 << self.depth  # 第一个叶节点的序号
+        padded = self.leaf_num * leaf_size
+        self.mins = np.full((padded, 3), np.inf)
+        self.maxs = np.full((padded, 3), -np.inf)
+        self.mins[:self.part_num] = mins
+        self.maxs[:self.part_num] = maxs
+        self.node_mins = np.full((2 * self.size, 3), np.inf)  # 序号0不使用
+        self.node_maxs = np.full((2 * self.size, 3), -np.inf)
+        self.refit()
+
+    def refit(self, indices=None):
+        """
+        重新计算包含这些零件的叶节点及其祖先节点的包围盒
+        :param indices: 零件的序号，None表示全部
+        """
+        if indices is None:
+            leaves = np.arange(self.leaf_num)
+        else:
+            leaves = np.unique(np.asarray(indices, dtype=np.intp) // self.leaf_size)
+        part_index = leaves[:, None] * self.leaf_size + np.arange(self.leaf_size)
+        nodes = leaves + self.size
+        self.node_mins[nodes] = self.mins[part_index].min(axis=1)
+        self.node_maxs[nodes] = self.maxs[part_index].max(axis=1)
+        while nodes[0] > 1:
+            nodes = np.unique(nodes // 2)
+            self.node_mins[nodes] = np.minimum(self.node_mins[2 * nodes], self.node_mins[2 * nodes + 1])
+            self.node_maxs[nodes] = np.maximum(self.node_maxs[2 * nodes], self.node_maxs[2 * nodes + 1])
+
+    def update(self, indices, mins, maxs):
+        """
+        零件修改后更新它们的包围盒，并重新拟合
+        :param indices: 零件的序号
+        :param mins: (len(indices), 3)
+        :param maxs: (len(indices), 3)
+        """
+        if not len(indices):
+            return
+        self.mins[indices] = mins
+        self.maxs[indices] = maxs
+        self.refit(indices)
+
+    def query(self, planes) -> np.ndarray:
+        """
+        :param planes: get_frustum_planes的返回值
+        :return: (N,) 布尔数组，零件的包围盒是否与视锥相交
+        """
+        marks = np.zeros(self.leaf_num * self.leaf_size + 1, dtype=np.int32)
+        nodes = np.ones(1, dtype=np.intp)
+        for level in range(self.depth + 1):
+            outside, inside = classify_boxes(planes, self.node_mins[nodes], self.node_maxs[nodes])
+            # 完全在视锥内的子树：子树中的叶节点是连续的，其中的零件全部可见
+            height = self.depth - level
+            inside_nodes = nodes[inside]
+            np.add.at(marks, ((inside_nodes << height) - self.size) * self.leaf_size, 1)
+            ends = np.minimum((((inside_nodes + 1) << height) - self.size) * self.leaf_size, len(marks) - 1)
+            np.add.at(marks, ends, -1)
+            nodes = nodes[~outside & ~inside]
+            if not len(nodes):
+                break
+            if level < self.depth:
+                nodes = np.stack([2 * nodes, 2 * nodes + 1], axis=1).ravel()
+        visible = np.cumsum(marks[:-1]) > 0
+        if len(nodes):  # 与视锥相交的叶节点，逐个测试其中的零件
+            part_index = ((nodes - self.size)[:, None] * self.leaf_size + np.arange(self.leaf_size)).ravel()
+            outside, _inside = classify_boxes(planes, self.mins[part_index], self.maxs[part_index])
+            visible[part_index[~outside]] = True
+        return visible[:self.part_num]
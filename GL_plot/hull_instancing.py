@@ -0,0 +1,299 @@
+# -*- coding: utf-8 -*-
+"""
+按外形实例化绘制可调节船体：
+船体中大量零件的十个外形参数（Len, Hei, FWid, BWid, FSpr, BSpr, UCur, DCur, HScl, HOff）完全相同，只有位置，旋转，缩放不同。
+按外形参数（浮点数值完全相同，与 hull_geometry.LocalGeometryCache 的键相同）分组，
+每组只上传一份局部坐标下的网格（与hull_batch相同的三角形分解），每个零件作为一个实例，
+模型矩阵，法向量矩阵和颜色作为逐实例的顶点属性（glVertexAttribDivisor），每组一次glDrawElementsInstanced。
+绘制只使用OpenGL 3.3核心模式的功能（顶点数组对象，实例化绘制，着色器），可以在Mesa的软件渲染上运行；
+拾取（GL_SELECT）时用固定管线按实例逐个绘制，并加载零件的名称。
+"""
+import ctypes
+import weakref
+
+import numpy as np
+from OpenGL import GL
+from OpenGL.GL.shaders import compileProgram, compileShader
+
+from ship_reader.NA_design_reader import AdjustableHull, PackedGeometry
+from ship_reader.hull_geometry import get_hulls_geometry, get_rotation_matrices
+from ship_reader.part_table import PartTable
+from shader_program import shader_program
+from .hull_batch import build_face_mesh, VERTEX_STRIDE, NORMAL_OFFSET
+
+INSTANCE_FLOATS = 16 + 9 + 3  # 每个实例：模型矩阵，法向量矩阵，颜色
+INSTANCE_STRIDE = INSTANCE_FLOATS * 4
+MODEL_LOCATION, NORMAL_MATRIX_LOCATION, COLOR_LOCATION = 2, 6, 9  # 与shader_program.INSTANCED_VS中的location相同
+REBUILD_RATE = 0.25  # 需要更新的零件超过这个比例时重新分组
+
+
+def get_instanced_program():
+    """
+    编译shader_program中的实例化着色器
+    :return: 着色器程序，当前环境不支持时为None（使用按颜色批量绘制）
+    """
+    try:
+        return compileProgram(compileShader(shader_program.INSTANCED_VS, GL.GL_VERTEX_SHADER),
+                              compileShader(shader_program.INSTANCED_FS, GL.GL_FRAGMENT_SHADER))
+    except (RuntimeError, GL.GLError):
+        return None
+
+
+def get_local_meshes(shapes):
+    """
+    批量计算外形的局部网格（位置为0，不旋转不缩放）
+    :param shapes: (M, 10) 数组，外形参数，顺序与 PartTable.SHAPE_COLUMNS 相同
+    :return: 每个外形的 (顶点数组, 索引数组)，格式与 hull_batch.build_mesh 相同
+    """
+    num = len(shapes)
+    packed = PackedGeometry(get_hulls_geometry(
+        shapes, np.zeros((num, 3)), np.zeros((num, 3)), np.ones((num, 3)), np.ones(num, dtype=bool)))
+    result = []
+    for i in range(num):
+        _vertex, _lines, plot_faces, plot_normals, _nodes, _dots = packed.unpack(i)
+        vertices, indices, _slices = build_face_mesh([(i, plot_faces, plot_normals)])
+        result.append((vertices, indices))
+    return result
+
+
+def get_instance_data(parts, colors):
+    """
+    零件的外形参数和逐实例的属性：世界坐标 = 旋转矩阵 @ (局部坐标 * 缩放) + 位置，
+    Rot为[0, 0, 0]的零件只平移（与 hull_geometry.transform_points 相同）；法向量矩阵为模型矩阵的逆转置
+    :param parts: 可调节船体列表
+    :param colors: (N, 3) 数组，每个零件的RGB颜色
+    :return: 外形参数（(N, 10) 数组），逐实例的属性（(N, INSTANCE_FLOATS) float32 数组，矩阵按列存放）
+    """
+    num = len(parts)
+    shape = np.empty((num, len(PartTable.SHAPE_COLUMNS)))
+    pos, rot, scl = np.empty((num, 3)), np.empty((num, 3)), np.empty((num, 3))
+    tables = {}
+    for i, part in enumerate(parts):
+        tables.setdefault(id(part._table), []).append(i)
+    for index in tables.values():
+        table = parts[index[0]]._table
+        rows = table.get_rows([parts[i] for i in index])
+        shape[index], pos[index], rot[index], scl[index] = table.shape[rows], table.pos[rows], table.rot[rows], table.scl[rows]
+    linear = np.tile(np.identity(3), (num, 1, 1))
+    normal_matrix = linear.copy()
+    rotate = ~(rot == 0).all(axis=1)
+    if rotate.any():
+        matrices = get_rotation_matrices(rot[rotate])
+        linear[rotate] = matrices * scl[rotate][:, None, :]
+        inverse_scl = np.divide(1, scl[rotate], out=np.zeros_like(scl[rotate]), where=scl[rotate] != 0)
+        normal_matrix[rotate] = matrices * inverse_scl[:, None, :]
+    model = np.zeros((num, 4, 4))  # model[i, 列, 行]
+    model[:, :3, :3] = linear.transpose(0, 2, 1)
+    model[:, 3, :3] = pos
+    model[:, 3, 3] = 1
+    data = np.empty((num, INSTANCE_FLOATS), dtype=np.float32)
+    data[:, :16] = model.reshape(num, 16)
+    data[:, 16:25] = normal_matrix.transpose(0, 2, 1).reshape(num, 9)
+    data[:, 25:] = colors
+    return shape, data
+
+
+class ShapeInstances:
+    def __init__(self, mesh):
+        """
+        外形参数相同的一组零件：一份局部网格和逐实例属性的缓冲区，绑定在一个顶点数组对象上
+        :param mesh: get_local_meshes返回的 (顶点数组, 索引数组)
+        """
+        vertices, indices = mesh
+        self.index_num = len(indices)
+        self.mesh_nbytes = vertices.nbytes + indices.nbytes
+        self.parts = []
+        self.instances = np.empty((0, INSTANCE_FLOATS), dtype=np.float32)  # 拾取时使用其中的模型矩阵
+        self.vao = GL.glGenVertexArrays(1)
+        self.vbo, self.ibo, self.instance_vbo = GL.glGenBuffers(3)
+        GL.glBindVertexArray(self.vao)
+        GL.glBindBuffer(GL.GL_ARRAY_BUFFER, self.vbo)
+        GL.glBufferData(GL.GL_ARRAY_BUFFER, vertices.nbytes, vertices, GL.GL_STATIC_DRAW)
+        GL.glEnableVertexAttribArray(0)
+        GL.glEnableVertexAttribArray(1)
+        GL.glVertexAttribPointer(0, 3, GL.GL_FLOAT, GL.GL_FALSE, VERTEX_STRIDE, ctypes.c_void_p(0))
+        GL.glVertexAttribPointer(1, 3, GL.GL_FLOAT, GL.GL_FALSE, VERTEX_STRIDE, NORMAL_OFFSET)
+        GL.glBindBuffer(GL.GL_ELEMENT_ARRAY_BUFFER, self.ibo)
+        GL.glBufferData(GL.GL_ELEMENT_ARRAY_BUFFER, indices.nbytes, indices, GL.GL_STATIC_DRAW)
+        GL.glBindBuffer(GL.GL_ARRAY_BUFFER, self.instance_vbo)
+        # 模型矩阵占4个属性（每列一个vec4），法向量矩阵占3个属性（每列一个vec3），每个实例前进一次
+        attributes = ([(MODEL_LOCATION + i, 4, i * 16) for i in range(4)]
+                      + [(NORMAL_MATRIX_LOCATION + i, 3, 64 + i * 12) for i in range(3)]
+                      + [(COLOR_LOCATION, 3, 100)])
+        for location, size, offset in attributes:
+            GL.glEnableVertexAttribArray(location)
+            GL.glVertexAttribPointer(location, size, GL.GL_FLOAT, GL.GL_FALSE, INSTANCE_STRIDE, ctypes.c_void_p(offset))
+            GL.glVertexAttribDivisor(location, 1)
+        GL.glBindVertexArray(0)  # 先解绑顶点数组对象，索引缓冲区的绑定保存在其中
+        GL.glBindBuffer(GL.GL_ARRAY_BUFFER, 0)
+        GL.glBindBuffer(GL.GL_ELEMENT_ARRAY_BUFFER, 0)
+
+    def set_instances(self, parts, instances):
+        self.parts = parts
+        self.instances = instances
+        GL.glBindBuffer(GL.GL_ARRAY_BUFFER, self.instance_vbo)
+        GL.glBufferData(GL.GL_ARRAY_BUFFER, instances.nbytes, instances, GL.GL_DYNAMIC_DRAW)
+        GL.glBindBuffer(GL.GL_ARRAY_BUFFER, 0)
+
+    def update_instance(self, instance_i, instance):
+        self.instances[instance_i] = instance
+        GL.glBindBuffer(GL.GL_ARRAY_BUFFER, self.instance_vbo)
+        GL.glBufferSubData(GL.GL_ARRAY_BUFFER, instance_i * INSTANCE_STRIDE, instance.nbytes, instance)
+        GL.glBindBuffer(GL.GL_ARRAY_BUFFER, 0)
+
+    def draw(self):
+        if not self.parts or not self.index_num:
+            return
+        GL.glBindVertexArray(self.vao)
+        GL.glDrawElementsInstanced(GL.GL_TRIANGLES, self.index_num, GL.GL_UNSIGNED_INT, ctypes.c_void_p(0),
+                                   len(self.parts))
+        GL.glBindVertexArray(0)
+
+    def draw_names(self, gl):
+        """
+        拾取模式（GL_SELECT）：用固定管线逐个实例乘上模型矩阵绘制，每个零件加载自己的名称
+        """
+        GL.glBindBuffer(GL.GL_ARRAY_BUFFER, self.vbo)
+        GL.glBindBuffer(GL.GL_ELEMENT_ARRAY_BUFFER, self.ibo)
+        GL.glEnableClientState(GL.GL_VERTEX_ARRAY)
+        GL.glVertexPointer(3, GL.GL_FLOAT, VERTEX_STRIDE, ctypes.c_void_p(0))
+        for part, model in zip(self.parts, self.instances[:, :16]):
+            gl.glLoadName(id(part) % 4294967296)
+            GL.glPushMatrix()
+            GL.glMultMatrixf(model)
+            GL.glDrawElements(GL.GL_TRIANGLES, self.index_num, GL.GL_UNSIGNED_INT, ctypes.c_void_p(0))
+            GL.glPopMatrix()
+        GL.glDisableClientState(GL.GL_VERTEX_ARRAY)
+        GL.glBindBuffer(GL.GL_ELEMENT_ARRAY_BUFFER, 0)
+        GL.glBindBuffer(GL.GL_ARRAY_BUFFER, 0)
+
+    def release(self):
+        GL.glDeleteVertexArrays(1, [self.vao])
+        GL.glDeleteBuffers(3, [self.vbo, self.ibo, self.instance_vbo])
+        self.parts = []
+
+
+class HullInstances:
+    all_instances = weakref.WeakSet()
+
+    def __init__(self):
+        self.draw_map = {}  # 分组时DrawMap的副本（颜色: 零件列表），用于判断零件是否增删
+        self.groups = {}  # 外形参数: ShapeInstances
+        self.slots = {}  # 零件: (外形参数, 实例序号)
+        self.dirty_parts = set()  # 属性改变，需要更新实例属性的零件
+        HullInstances.all_instances.add(self)
+
+    @property
+    def instance_num(self):
+        return len(self.slots)
+
+    @property
+    def nbytes(self):
+        """
+        显存中网格和实例属性的总字节数
+        """
+        return sum(group.mesh_nbytes + group.instances.nbytes for group in self.groups.values())
+
+    @staticmethod
+    def dispatch_changed_parts():
+        """
+        把绘图数据被清除的零件（AdjustableHull.changed_parts）分给包含它们的实例组
+        """
+        changed = AdjustableHull.changed_parts
+        if not changed:
+            return
+        for instances in HullInstances.all_instances:
+            instances.dirty_parts.update(part for part in changed if part in instances.slots)
+        changed.clear()
+
+    def sync(self, draw_map, glWin=None):
+        """
+        零件增删或换色后重新分组，零件修改后更新实例属性
+        :param draw_map: NAHull.DrawMap，颜色: 零件列表
+        :param glWin: 绘制的窗口，绑定到零件上
+        """
+        if len(draw_map) != len(self.draw_map) or any(
+                self.draw_map.get(color) != part_set for color, part_set in draw_map.items()):
+            self.build(draw_map, glWin)
+        elif self.dirty_parts:
+            if len(self.dirty_parts) > len(self.slots) * REBUILD_RATE or not self.update_parts():
+                self.build(draw_map, glWin)
+            self.dirty_parts.clear()
+
+    def build(self, draw_map, glWin=None):
+        """
+        按外形参数重新分组，已有外形的局部网格继续使用，只计算新外形的网格
+        """
+        self.draw_map = {color: list(part_set) for color, part_set in draw_map.items()}
+        parts, colors = [], []
+        for color, part_set in self.draw_map.items():
+            rgb = int(color[1:3], 16) / 255, int(color[3:5], 16) / 255, int(color[5:7], 16) / 255
+            for part in part_set:
+                if isinstance(part, AdjustableHull):
+                    part.glWin = glWin
+                    parts.append(part)
+                    colors.append(rgb)
+        shapes, instances = get_instance_data(parts, np.array(colors).reshape(-1, 3))
+        shapes += 0.  # -0.0 与 0.0 为同一个外形
+        unique, inverse = np.unique(shapes, axis=0, return_inverse=True)
+        inverse = inverse.reshape(-1)
+        order = np.argsort(inverse, kind="stable")
+        ends = np.cumsum(np.bincount(inverse, minlength=len(unique))).tolist()
+        keys = [tuple(shape) for shape in unique.tolist()]
+        new_keys = [i for i, key in enumerate(keys) if key not in self.groups]
+        meshes = dict(zip(new_keys, get_local_meshes(unique[new_keys]))) if new_keys else {}
+        groups = {}
+        self.slots = {}
+        start = 0
+        for i, key in enumerate(keys):
+            index = order[start:ends[i]]
+            start = ends[i]
+            group = self.groups.pop(key) if i not in meshes else ShapeInstances(meshes[i])
+            group.set_instances([parts[j] for j in index.tolist()], instances[index])
+            groups[key] = group
+            for instance_i, part in enumerate(group.parts):
+                self.slots[part] = (key, instance_i)
+        for group in self.groups.values():  # 不再使用的外形
+            group.release()
+        self.groups = groups
+        self.dirty_parts.clear()
+
+    def update_parts(self) -> bool:
+        """
+        原位更新修改过的零件的实例属性
+        :return: 是否成功；零件的外形参数改变时返回False，需要重新分组
+        """
+        parts = list(self.dirty_parts)
+        slots = [self.slots[part] for part in parts]
+        colors = np.array([self.groups[key].instances[instance_i, 25:] for key, instance_i in slots]).reshape(-1, 3)
+        shapes, instances = get_instance_data(parts, colors)
+        if any(tuple(shape) != key for shape, (key, _instance_i) in zip((shapes + 0.).tolist(), slots)):
+            return False
+        for (key, instance_i), instance in zip(slots, instances):
+            self.groups[key].update_instance(instance_i, instance)
+        return True
+
+    def draw(self, program, alpha=1.):
+        """
+        每种外形一次实例化绘制
+        :param program: 已经由bind_hull_program启用的实例化着色器
+        :param alpha: 不透明度
+        """
+        GL.glUniform1f(GL.glGetUniformLocation(program, "alpha"), alpha)
+        for group in self.groups.values():
+            group.draw()
+
+    def draw_names(self, gl):
+        for group in self.groups.values():
+            group.draw_names(gl)
+
+    def release(self):
+        """
+        删除所有缓冲区（需要在所属的OpenGL上下文中调用）
+        """
+        for group in self.groups.values():
+            group.release()
+        self.draw_map = {}
+        self.groups = {}
+        self.slots = {}
+        self.dirty_parts.clear()
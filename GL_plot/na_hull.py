@@ -5,24 +5,34 @@
 import math
 
 import numpy as np
+from OpenGL import GL
 
-from ship_reader.NA_design_reader import (
-    ReadNA, AdjustableHull, NAPart, NAPartNode,
-    rotate_quaternion0, rotate_quaternion1, rotate_quaternion2)
-from .basic import SolidObject, DotNode, get_normal, TempObj
+from ship_reader.NA_design_reader import ReadNA, AdjustableHull, NAPart, NAPartNode
+from ship_reader.coord_keys import coord_keys, key_coord, pos_key
+from ship_reader.hull_geometry import (
+    get_curve_face_dots, get_local_geometry, get_part_plot_lines, get_part_plot_faces, get_plot_normals)
+from ship_reader.part_table import PartTable
+from .basic import SolidObject, DotNode, TempObj
+from .hull_batch import ColorBatch, get_hull_program, bind_hull_program
+from .hull_bvh import get_frustum_planes
+from .hull_instancing import HullInstances, get_instanced_program
 
 
 class NAHull(ReadNA, SolidObject):
     current_in_design_tab = None
     current_in_preview_tab = None
+    instancing = False  # 是否按外形参数实例化绘制可调节船体（见hull_instancing），着色器不可用时仍按颜色批量绘制
+    frustum_culling = True  # 按颜色批量绘制时，是否只绘制与视锥相交的零件（见hull_bvh）
 
-    def __init__(self, path=False, data=None, show_statu_func=None, glWin=None, design_tab=False):
+    def __init__(self, path=False, data=None, show_statu_func=None, glWin=None, design_tab=False,
+                 relation_index=None):
         """
         NAHull一定要在用户选完颜色之后调用，因为需要根据颜色来初始化DrawMap。
         注意，self.DrawMap不会在ReadNA和SolidObject中初始化，会在其他地方初始化。
         在初始化后会调用get_ys_and_zs()和get_layers()方法，而不是在self.__init__()中调用
         :param path:
         :param data:
+        :param relation_index: 工程文件中保存的零件关系索引
         """
         ReadNA.is_reading = True
         # 判断show_statu_func是函数还是qsignal，
@@ -40,14 +50,21 @@ class NAHull(ReadNA, SolidObject):
             NAXZLayerNode.id_map = {}
             NAXYLayerNode.id_map = {}
             NALeftViewNode.id_map = {}
-            NAPartNode.all_dots = []
+            NAPartNode.node_index = {}
+            PartTable.reset_default()
         ReadNA.__init__(self, path, data, self.show_statu_func, glWin,
-                        design_tab)  # 注意，DrawMap不会在ReadNA或SolidObject中初始化
+                        design_tab, relation_index)  # 注意，DrawMap不会在ReadNA或SolidObject中初始化
         SolidObject.__init__(self, None)
         self.DrawMap = self.ColorPartsMap.copy()
         self.xzLayers = []  # 所有xz截面
         self.xyLayers = []  # 所有xy截面
         self.leftViews = []  # 中间yz截面
+        self.color_batches = {}  # 颜色: ColorBatch，每种颜色的零件打包为一个顶点缓冲区
+        self.hull_program = None  # 绘制船体的着色器，编译失败时为False
+        self.hull_instances = None  # 实例化绘制时，按外形参数分组的所有可调节船体
+        self.instanced_program = None  # 实例化绘制的着色器，编译失败时为False
+        self.visible_num = 0  # 上一帧绘制的可调节船体数
+        self.culled_num = 0  # 上一帧被视锥剔除的可调节船体数
         # 更新current静态变量
         if design_tab:
             NAHull.current_in_design_tab = self
@@ -100,93 +117,128 @@ class NAHull(ReadNA, SolidObject):
 
     @staticmethod
     def toJson(data):
-        # 将ColorPartMap转换为字典形式，以便于json序列化
+        # 将ColorPartMap转换为字典形式，以便于json序列化；零件属性从零件表中按列批量读取
         result = {}
         for color, part_set in data.items():
-            result[color] = [part.to_dict() for part in part_set]
+            tables = {id(part._table): part._table for part in part_set}
+            if len(tables) == 1:
+                result[color] = tables.popitem()[1].to_dicts(part_set)
+            else:
+                result[color] = [part.to_dict() for part in part_set]
         return result
 
-    def draw_color(self, gl, color, part_set, transparent):
-        # else:
+    def draw_color(self, gl, color, part_set, transparent, program=None, selecting=False, planes=None):
+        """
+        绘制一种颜色的所有可调节船体：该颜色的零件打包在一个顶点缓冲区中，一次绘制
+        :param program: 已经启用的着色器，None表示使用固定管线
+        :param selecting: 是否为拾取模式（GL_SELECT），拾取时逐个零件加载名称
+        :param planes: 视锥的六个平面，None表示不剔除
+        """
         alpha = 1 if not transparent else 0.3
         # 16进制颜色转换为RGBA
         _rate = 255
         color_ = int(color[1:3], 16) / _rate, int(color[3:5], 16) / _rate, int(color[5:7], 16) / _rate, alpha
-        gl.glColor4f(*color_)
-        for part in part_set:
-            if not isinstance(part, AdjustableHull):
-                continue
-            if not part.updateList and part.genList:
-                gl.glCallList(part.genList)
-                continue
-            elif not part.update_transparentList and part.transparent_genList:
-                gl.glCallList(part.transparent_genList)
-                continue
-            if transparent:
-                part.transparent_genList = gl.glGenLists(1)
-                gl.glNewList(part.transparent_genList, gl.GL_COMPILE_AND_EXECUTE)
-            else:
-                part.genList = gl.glGenLists(1)
-                gl.glNewList(part.genList, gl.GL_COMPILE_AND_EXECUTE)
-            gl.glLoadName(id(part) % 4294967296)
-            part.glWin = self.glWin
-            if not isinstance(part, AdjustableHull):
-                continue
-            for draw_method, faces_dots in part.plot_faces.items():
-                # draw_method是字符串，需要转换为OpenGL的常量
-                for face in faces_dots:
-                    gl.glDrawArrays(eval(f"gl.{draw_method}"), 0, len(face))
-                    gl.glBegin(eval(f"gl.{draw_method}"))
-                    if len(face) == 3 or len(face) == 4:
-                        normal = get_normal(face[0], face[1], face[2])
-                    elif len(face) > 12:
-                        normal = get_normal(face[0], face[6], face[12])
-                    else:
-                        continue
-                    gl.glNormal3f(normal.x(), normal.y(), normal.z())
-                    for dot in face:
-                        gl.glVertex3f(dot[0], dot[1], dot[2])
-                    gl.glEnd()
-            gl.glEndList()
+        batch = self.color_batches.get(color)
+        if batch is None:
+            batch = self.color_batches[color] = ColorBatch()
+        batch.sync(part_set, self.glWin)
+        if selecting:
+            gl.glColor4f(*color_)
+            batch.draw_names(gl, planes)
+        else:
+            batch.draw(color_, program, planes)
+
+    def draw_instances(self, gl, theme_color=None, transparent=False):
+        """
+        按外形参数实例化绘制所有可调节船体
+        :return: 是否已绘制；没有窗口或着色器不可用时返回False，改为按颜色批量绘制
+        """
+        if self.glWin is None:
+            return False
+        if self.instanced_program is None:
+            self.instanced_program = get_instanced_program() or False
+        if not self.instanced_program:
+            return False
+        for batch in self.color_batches.values():
+            batch.release()
+        self.color_batches.clear()
+        HullInstances.dispatch_changed_parts()
+        if self.hull_instances is None:
+            self.hull_instances = HullInstances()
+        self.hull_instances.sync(self.DrawMap, self.glWin)
+        if GL.glGetIntegerv(GL.GL_RENDER_MODE) == GL.GL_SELECT:
+            self.hull_instances.draw_names(gl)
+            return True
+        light_color = theme_color["主光源"][1] if theme_color else (1., 1., 1.)
+        bind_hull_program(self.instanced_program, self.glWin.light_pos, self.glWin.camera.pos, light_color)
+        self.hull_instances.draw(self.instanced_program, 1 if not transparent else 0.3)
+        GL.glUseProgram(0)
+        self.visible_num, self.culled_num = self.hull_instances.instance_num, 0  # 实例化绘制时不剔除
+        return True
 
     def draw(self, gl, material="钢铁", theme_color=None, transparent=False):
         gl.glLoadName(id(self) % 4294967296)
-        # total_part_num = sum([len(part_set) for part_set in self.DrawMap.values()])
-        # if total_part_num > 100:  # 大于1000个零件时，多线程绘制（用QThread）
-        #     # 根据颜色分线程，所有线程结束后主线程再继续
-        #     threads = []
-        #     for color, part_set in self.DrawMap.items():
-        #         t = DrawThread(gl, self.glWin, theme_color, material, color, part_set, transparent)
-        #         threads.append(t)
-        #         t.start()
-        #     for t in threads:
-        #         t.wait()
-        # else:
+        if NAHull.instancing and self.draw_instances(gl, theme_color, transparent):
+            self.save_design_cache()
+            return
+        if self.hull_instances is not None:  # 从实例化绘制切换回按颜色批量绘制
+            self.hull_instances.release()
+            self.hull_instances = None
+        ColorBatch.dispatch_changed_parts()
+        for color in [color for color in self.color_batches if color not in self.DrawMap]:
+            self.color_batches.pop(color).release()
+        selecting = GL.glGetIntegerv(GL.GL_RENDER_MODE) == GL.GL_SELECT
+        # 当前的投影矩阵和模型视图矩阵即摄像机（拾取时为拾取区域）的视锥
+        projection = GL.glGetFloatv(GL.GL_PROJECTION_MATRIX)
+        view = GL.glGetFloatv(GL.GL_MODELVIEW_MATRIX)
+        planes = get_frustum_planes(projection, view) if NAHull.frustum_culling else None
+        program = None
+        if not selecting and self.glWin is not None:
+            if self.hull_program is None:
+                self.hull_program = get_hull_program() or False
+            if self.hull_program:
+                program = self.hull_program
+                light_color = theme_color["主光源"][1] if theme_color else (1., 1., 1.)
+                bind_hull_program(program, self.glWin.light_pos, self.glWin.camera.pos, light_color,
+                                  projection, view)
         # 绘制面
         for color, part_set in self.DrawMap.items():
-            # t = Thread(target=self.draw_color, args=(gl, theme_color, material, color, part_set))
-            # t.start()
-            self.draw_color(gl, color, part_set, transparent)
+            self.draw_color(gl, color, part_set, transparent, program, selecting, planes)
+        if program:
+            GL.glUseProgram(0)
+        if not selecting:
+            batches = self.color_batches.values()
+            self.visible_num = sum(batch.visible_num for batch in batches)
+            self.culled_num = sum(len(batch.slices) for batch in batches) - self.visible_num
+            self.save_design_cache()  # 第一次绘制后保存读取的设计
 
     # 整体缩放
     def scale(self, ratio):
+        # 按零件表一次性缩放DrawMap中零件的位置和缩放比例（已移除的零件不缩放），再重新计算可调节船体的绘图数据
+        tables = {}
         for part_set in self.DrawMap.values():
             for part in part_set:
-                part.scale(ratio)
+                tables.setdefault(id(part._table), []).append(part)
+        for parts in tables.values():
+            parts[0]._table.scale(parts, ratio)
+            for part in parts:
+                if isinstance(part, AdjustableHull):
+                    part.reset_plot_data()
 
 
 class NaHullXZLayer(SolidObject):
     id_map = {}
 
-    def __init__(self, na_hull, y, y_parts):
+    def __init__(self, na_hull, y_key, y_parts):
         """
         :param na_hull: 暂时没用
-        :param y:
+        :param y_key: 截面y坐标量化后的整数键（xzDotsLayerMap的键）
         :param y_parts:
         """
         SolidObject.__init__(self, None)
         self.na_hull = na_hull
-        self.y = y
+        self.y_key = y_key
+        self.y = key_coord(y_key)
         self.y_parts = y_parts
         self.PlotAvailable = True  # 当只含有一个零件时，不绘制
         # 在na_hull中找到所有y值为y的零件和点
@@ -200,19 +252,21 @@ class NaHullXZLayer(SolidObject):
 
     def get_partsDotsMap(self):
         result = {}
+        added_dots = {}  # 零件 -> 已加入的点的整数坐标，重合的点只加入一次
         for part in self.y_parts:
             if not isinstance(part, AdjustableHull):
                 continue
+            # 按量化后的整数键判断点是否在截面上，不受浮点误差影响
+            dot_keys = coord_keys([dot[1] for dot in part.plot_all_dots]).tolist()
             for i in range(len(part.plot_all_dots)):
-                dot = list(part.plot_all_dots[i])
-                # if -0.0005 < dot[1] - self.y < 0.0005:
-                if dot[1] == self.y:
+                if dot_keys[i] == self.y_key:
+                    dot = list(part.plot_all_dots[i])
                     if len(part.plot_all_dots) == 48:  # 为带曲面的零件
                         self.index.append(i) if i not in self.index else None
-                    if part not in result:
-                        result[part] = [dot]
-                    if dot not in result[part]:
-                        result[part].append(dot)
+                    dot_key = pos_key(dot)
+                    if dot_key not in added_dots.setdefault(part, set()):
+                        added_dots[part].add(dot_key)
+                        result.setdefault(part, []).append(dot)
         if len(result) <= 2:  # 如果只有一两个零件，就不绘制
             self.PlotAvailable = False
             return {}
@@ -258,15 +312,16 @@ class NaHullXZLayer(SolidObject):
 class NaHullXYLayer(SolidObject):
     id_map = {}
 
-    def __init__(self, na_hull, z, z_parts):
+    def __init__(self, na_hull, z_key, z_parts):
         """
         :param na_hull: 暂时没用
-        :param z:
+        :param z_key: 截面z坐标量化后的整数键（xyDotsLayerMap的键）
         :param z_parts:
         """
         SolidObject.__init__(self, None)
         self.na_hull = na_hull
-        self.z = z
+        self.z_key = z_key
+        self.z = key_coord(z_key)
         self.z_parts = z_parts
         self.PlotAvailable = True  # 当只含有一个零件时，不绘制
         # 在na_hull中找到所有z值为z的零件和点
@@ -280,19 +335,21 @@ class NaHullXYLayer(SolidObject):
 
     def get_partsDotsMap(self):
         result = {}
+        added_dots = {}  # 零件 -> 已加入的点的整数坐标，重合的点只加入一次
         for part in self.z_parts:
             if not isinstance(part, AdjustableHull):
                 continue
+            # 按量化后的整数键判断点是否在截面上，不受浮点误差影响
+            dot_keys = coord_keys([dot[2] for dot in part.plot_all_dots]).tolist()
             for i in range(len(part.plot_all_dots)):
-                dot = list(part.plot_all_dots[i])
-                # if -0.0005 < dot[1] - self.y < 0.0005:
-                if dot[2] == self.z:
+                if dot_keys[i] == self.z_key:
+                    dot = list(part.plot_all_dots[i])
                     if len(part.plot_all_dots) == 48:  # 为带曲面的零件
                         self.index.append(i) if i not in self.index else None
-                    if part not in result:
-                        result[part] = [dot]
-                    if dot not in result[part]:
-                        result[part].append(dot)
+                    dot_key = pos_key(dot)
+                    if dot_key not in added_dots.setdefault(part, set()):
+                        added_dots[part].add(dot_key)
+                        result.setdefault(part, []).append(dot)
         if len(result) <= 2:  # 如果只有一两个零件，就不绘制
             self.PlotAvailable = False
             return {}
@@ -427,7 +484,6 @@ class TempAdjustableHull(TempObj):
         self.DCur = downCurve
         self.HScl = heightScale  # 高度缩放
         self.HOff = heightOffset  # 高度偏移
-        AdjustableHull.All.append(self)
         self._y_limit = [-self.Hei / 2, self.Hei / 2]
         # ==============================================================================初始化零件的各个坐标
         self.front_z = self.Len / 2  # 零件前端的z坐标
@@ -456,162 +512,40 @@ class TempAdjustableHull(TempObj):
         self.vertex_coordinates = self.get_initial_vertex_coordinates()
         self.plot_lines = self.get_plot_lines()
         self.plot_faces = self.get_plot_faces()
+        self.plot_normals = get_plot_normals(self.plot_faces)
         self.glWin.paintGL()
         self.glWin.update()
 
     def __deepcopy__(self, memo):
         return self
 
+    def get_shape(self):
+        """
+        :return: 外形参数，顺序与 PartTable.SHAPE_COLUMNS 相同
+        """
+        return [getattr(self, name) for name in PartTable.SHAPE_COLUMNS]
+
+    def get_local_geometry(self):
+        """
+        :return: 缩放后、旋转平移前的局部坐标（只读，与外形和缩放相同的零件共用，见 hull_geometry.LocalGeometryCache）
+        """
+        return get_local_geometry(self.get_shape(), self.Scl, self.Rot == [0, 0, 0])
+
     def get_plot_faces(self):
         """
         :return: 绘制零件的方法，绘制零件需的三角形集
         """
-        result = {
-            "GL_QUADS": [],
-            "GL_TRIANGLES": [],
-            "GL_QUAD_STRIP": [],
-            "GL_POLYGON": [],
-        }
-        # 缩放并旋转
-        dots = rotate_quaternion1(self.vertex_coordinates, self.Scl, self.Rot)
-        for key in dots.keys():
-            dots[key] = dots[key].copy() + self.Pos  # 平移
-        faces = [
-            [dots["front_up_left"], dots["front_up_right"], dots["front_down_right"], dots["front_down_left"]],
-            [dots["back_up_left"], dots["back_down_left"], dots["back_down_right"], dots["back_up_right"]],
-            [dots["front_up_left"], dots["back_up_left"], dots["back_up_right"], dots["front_up_right"]],
-            [dots["front_down_left"], dots["front_down_right"], dots["back_down_right"], dots["back_down_left"]],
-            [dots["front_up_left"], dots["front_down_left"], dots["back_down_left"], dots["back_up_left"]],
-            [dots["front_up_right"], dots["back_up_right"], dots["back_down_right"], dots["front_down_right"]],
-        ]
-        self.operation_dot_nodes = [
-            dots["front_up_left"], dots["front_up_right"], dots["front_down_right"], dots["front_down_left"],
-            dots["back_up_left"], dots["back_down_left"], dots["back_down_right"], dots["back_up_right"]]
-        if self.UCur < 0.005 and self.DCur <= 0.005:
-            self.plot_all_dots = self.operation_dot_nodes
-            # 检查同一个面内的点是否重合，重合则添加到三角绘制方法中，否则添加到四边形绘制方法中
-            for face in faces:
-                use_triangles = False
-                added_face = None
-                for i in range(3):
-                    if np.array_equal(face[i], face[i + 1]):
-                        # 去除重复点
-                        added_face = face[:i] + face[i + 1:]
-                        use_triangles = True
-                        break
-                if use_triangles:
-                    result["GL_TRIANGLES"].append(added_face)
-                else:
-                    result["GL_QUADS"].append(face)
-        else:  # TODO: 有曲率的零件的绘制方法
-            front_part_curved_circle_dots, back_part_curved_circle_dots = self.get_initial_Curve_face_dots()
-            # 翻转顺序
-            reversed_b_up = back_part_curved_circle_dots["up"][::-1]
-            reversed_b_down = back_part_curved_circle_dots["down"][::-1]
-            # x值取反并存回原来的位置
-            symmetry_f_up = [dot * np.array([-1, 1, 1]) for dot in front_part_curved_circle_dots["up"]]
-            symmetry_f_down = [dot * np.array([-1, 1, 1]) for dot in front_part_curved_circle_dots["down"]]
-            symmetry_b_up = [dot * np.array([-1, 1, 1]) for dot in reversed_b_up]
-            symmetry_b_down = [dot * np.array([-1, 1, 1]) for dot in reversed_b_down]
-
-            # 绘制图形集合，截面（前后）用polygon，侧面用quad_strip
-            # 拼合点集
-            front_set = []
-            back_set = []
-            # 注意front和back的点集的顺序是相反的，为了渲染的时候能够正确显示
-            front_set.extend(symmetry_f_up[:-1])
-            front_set.extend(symmetry_f_down[:-1])
-            front_set.extend(front_part_curved_circle_dots["down"][::-1][:-1])
-            front_set.extend(front_part_curved_circle_dots["up"][::-1][:-1])
-            back_set.extend(back_part_curved_circle_dots["up"][:-1])
-            back_set.extend(back_part_curved_circle_dots["down"][:-1])
-            back_set.extend(symmetry_b_down[:-1])
-            back_set.extend(symmetry_b_up[:-1])
-            #   两个截面
-            result["GL_POLYGON"] = [front_set, back_set]
-            #   侧面
-            result["GL_QUADS"] = []
-            back_set = back_set[::-1]  # 翻转顺序
-            back_set = [back_set[(i - 1) % len(back_set)] for i in range(len(back_set))]  # 轮转一个单位
-            for i in range(23):
-                result["GL_QUADS"].append([front_set[i], back_set[i], back_set[i + 1], front_set[i + 1]])
-            result["GL_QUADS"].append([front_set[-1], back_set[-1], back_set[0], front_set[0]])
-            # 旋转
-            for method, face_set in result.items():
-                result[method] = rotate_quaternion0(face_set, self.Scl, self.Rot)
-                # 缩放和平移
-                for face in result[method]:
-                    for i in range(len(face)):
-                        face[i] = face[i].copy() + self.Pos
-            self.plot_all_dots = result["GL_POLYGON"][0] + result["GL_POLYGON"][1]
-        return result
+        plot_faces, self.operation_dot_nodes, self.plot_all_dots = get_part_plot_faces(
+            self.get_local_geometry(), self.Pos, self.Rot, self.Rot == [0, 0, 0])
+        return plot_faces
 
     def get_initial_Curve_face_dots(self):
         """
         获取扭曲后的零件圆形弧面的基础点集，从圆形（r=1）开始，然后进行高度缩放，底部缩放，顶部缩放，
-        底部到顶部的缩放变换是线性的，也就是梯形内接变形圆
-        :return:
+        底部到顶部的缩放变换是线性的，也就是梯形内接变形圆（由 hull_geometry 中预先计算的模板向量化得到）
+        :return: 前截面和后截面的点集
         """
-        # 单位圆的点集，12个左侧点，先忽略右侧点
-        # 当Curve为0时，就是square_dots，其与circle_dots做差，令circle_dots加上差值乘以Curve就是最终的点集
-        square_dots = {"up": [
-            np.array([0, 1]),
-            np.array([np.tan(np.deg2rad(15)), 1]),
-            np.array([np.tan(np.deg2rad(30)), 1]),
-            np.array([1, 1]),
-            np.array([1, np.tan(np.deg2rad(30))]),
-            np.array([1, np.tan(np.deg2rad(15))]),
-            np.array([1, 0]),
-        ], "down": [
-            np.array([1, 0]),
-            np.array([1, -np.tan(np.deg2rad(15))]),
-            np.array([1, -np.tan(np.deg2rad(30))]),
-            np.array([1, -1]),
-            np.array([np.tan(np.deg2rad(30)), -1]),
-            np.array([np.tan(np.deg2rad(15)), -1]),
-            np.array([0, -1]),
-        ]}
-        Front_part_curved_circle_dots = {"up": [], "down": []}
-        Back_part_curved_circle_dots = {"up": [], "down": []}
-        for i in range(7):  # 从上到下，一共7个点，也就是从(0, 1, self.front_z)到(1, 0, self.front_z)
-            angle = np.deg2rad(15 * i)
-            circle_up = np.array([np.sin(angle), np.cos(angle)])
-            circle_down = np.array([np.cos(angle), - np.sin(angle)])
-            Front_part_curved_circle_dots["up"].append(
-                np.append(circle_up + (square_dots["up"][i] - circle_up) * (1 - self.UCur), self.front_z))
-            Front_part_curved_circle_dots["down"].append(
-                np.append(circle_down + (square_dots["down"][i] - circle_down) * (1 - self.DCur), self.front_z))
-            Back_part_curved_circle_dots["up"].append(
-                np.append(circle_up + (square_dots["up"][i] - circle_up) * (1 - self.UCur), self.back_z))
-            Back_part_curved_circle_dots["down"].append(
-                np.append(circle_down + (square_dots["down"][i] - circle_down) * (1 - self.DCur), self.back_z))
-            # 进行横向缩放
-            Front_part_curved_circle_dots["up"][i][0] *= self.get_horizontal_scale(
-                Front_part_curved_circle_dots["up"][i][1], True)
-            Front_part_curved_circle_dots["down"][i][0] *= self.get_horizontal_scale(
-                Front_part_curved_circle_dots["down"][i][1], True)
-            Back_part_curved_circle_dots["up"][i][0] *= self.get_horizontal_scale(
-                Back_part_curved_circle_dots["up"][i][1], False)
-            Back_part_curved_circle_dots["down"][i][0] *= self.get_horizontal_scale(
-                Back_part_curved_circle_dots["down"][i][1], False)
-            # 进行y高度缩放
-            Front_part_curved_circle_dots["up"][i][1] *= self.half_height_scale
-            Front_part_curved_circle_dots["down"][i][1] *= self.half_height_scale
-            Back_part_curved_circle_dots["up"][i][1] *= self.Hei / 2
-            Back_part_curved_circle_dots["down"][i][1] *= self.Hei / 2
-            # 进行y高度偏移
-            Front_part_curved_circle_dots["up"][i][1] += self.center_height_offset
-            Front_part_curved_circle_dots["down"][i][1] += self.center_height_offset
-            # 进行y值限制
-            if Front_part_curved_circle_dots["up"][i][1] > self._y_limit[1]:
-                Front_part_curved_circle_dots["up"][i][1] = self._y_limit[1]
-            elif Front_part_curved_circle_dots["up"][i][1] < self._y_limit[0]:
-                Front_part_curved_circle_dots["up"][i][1] = self._y_limit[0]
-            if Front_part_curved_circle_dots["down"][i][1] > self._y_limit[1]:
-                Front_part_curved_circle_dots["down"][i][1] = self._y_limit[1]
-            elif Front_part_curved_circle_dots["down"][i][1] < self._y_limit[0]:
-                Front_part_curved_circle_dots["down"][i][1] = self._y_limit[0]
-        return Front_part_curved_circle_dots, Back_part_curved_circle_dots
+        return get_curve_face_dots(self.get_shape())
 
     def get_horizontal_scale(self, y, front=True):
         if front:
@@ -620,35 +554,10 @@ class TempAdjustableHull(TempObj):
             return ((self.back_up_x - self.back_down_x) * y + (self.back_up_x + self.back_down_x)) / 2
 
     def get_plot_lines(self):
-        result = {
-            "1": [self.vertex_coordinates["front_up_left"].copy(), self.vertex_coordinates["front_up_right"].copy(),
-                  self.vertex_coordinates["front_down_right"].copy(), self.vertex_coordinates["front_down_left"].copy(),
-                  self.vertex_coordinates["front_up_left"].copy(), self.vertex_coordinates["back_up_left"].copy(),
-                  self.vertex_coordinates["back_up_right"].copy(), self.vertex_coordinates["front_up_right"].copy()],
-            "2": [self.vertex_coordinates["front_down_left"].copy(), self.vertex_coordinates["back_down_left"].copy(),
-                  self.vertex_coordinates["back_down_right"].copy(), self.vertex_coordinates["front_down_right"].copy()],
-            "3": [self.vertex_coordinates["back_up_left"].copy(), self.vertex_coordinates["back_down_left"].copy()],
-            "4": [self.vertex_coordinates["back_up_right"].copy(), self.vertex_coordinates["back_down_right"].copy()]
-        }
-        # 进行旋转，平移，缩放
-        result = rotate_quaternion2(result, self.Scl, self.Rot)
-        for key in result.keys():
-            for i in range(len(result[key])):
-                result[key][i] += self.Pos
-
-        return result
+        return get_part_plot_lines(self.get_local_geometry(), self.Pos, self.Rot, self.Rot == [0, 0, 0])
 
     def get_initial_vertex_coordinates(self):
-        return {
-            "front_up_left": np.array([self.front_up_x, self.front_up_y, self.front_z]),
-            "front_up_right": np.array([-self.front_up_x, self.front_up_y, self.front_z]),
-            "front_down_left": np.array([self.front_down_x, self.front_down_y, self.front_z]),
-            "front_down_right": np.array([-self.front_down_x, self.front_down_y, self.front_z]),
-            "back_up_left": np.array([self.back_up_x, self.back_up_y, self.back_z]),
-            "back_up_right": np.array([-self.back_up_x, self.back_up_y, self.back_z]),
-            "back_down_left": np.array([self.back_down_x, self.back_down_y, self.back_z]),
-            "back_down_right": np.array([-self.back_down_x, self.back_down_y, self.back_z]),
-        }
+        return dict(zip(ReadNA.VERTEX_KEYS, self.get_local_geometry().vertex))
 
     def change_attrs_T(self, position=None, armor=None,
                        length=None, height=None, frontWidth=None, backWidth=None, frontSpread=None, backSpread=None,
@@ -722,6 +631,7 @@ class TempAdjustableHull(TempObj):
         self.vertex_coordinates = self.get_initial_vertex_coordinates()
         self.plot_lines = self.get_plot_lines()
         self.plot_faces = self.get_plot_faces()
+        self.plot_normals = get_plot_normals(self.plot_faces)
         if update:
             # 重绘
             self.glWin.paintGL()
@@ -736,7 +646,8 @@ class TempAdjustableHull(TempObj):
             _from_temp_data=True, _back_down_y=self.back_down_y, _back_up_y=self.back_up_y,
             _front_down_y=self.front_down_y, _front_up_y=self.front_up_y,
             _operation_dot_nodes=self.operation_dot_nodes, _plot_all_dots=self.plot_all_dots,
-            _vertex_coordinates=self.vertex_coordinates, _plot_lines=self.plot_lines, _plot_faces=self.plot_faces
+            _vertex_coordinates=self.vertex_coordinates, _plot_lines=self.plot_lines, _plot_faces=self.plot_faces,
+            _plot_normals=self.plot_normals
         )
         # 添加颜色
         _color = f"#{obj.Col}"
@@ -752,15 +663,12 @@ class TempAdjustableHull(TempObj):
         gl.glColor4f(*theme_color["被选中"][0][:3], 0.5)
         for draw_method, faces_dots in self.plot_faces.items():
             # draw_method是字符串，需要转换为OpenGL的常量
-            for face in faces_dots:
-                gl.glBegin(eval(f"gl.{draw_method}"))
-                if len(face) == 3 or len(face) == 4:
-                    normal = get_normal(face[0], face[1], face[2])
-                elif len(face) > 12:
-                    normal = get_normal(face[0], face[6], face[12])
-                else:
+            method = getattr(gl, draw_method)
+            for face, normal in zip(faces_dots, self.plot_normals[draw_method].tolist()):
+                if len(face) < 3 or 4 < len(face) <= 12:  # 无法确定法向量的面不绘制
                     continue
-                gl.glNormal3f(normal.x(), normal.y(), normal.z())
+                gl.glBegin(method)
+                gl.glNormal3f(*normal)
                 for dot in face:
                     gl.glVertex3f(dot[0], dot[1], dot[2])
                 gl.glEnd()
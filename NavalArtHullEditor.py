@@ -6,6 +6,7 @@ Author: @JasonLee
 Date: 2023-9-18
 """
 # 系统库
+import multiprocessing
 import ujson
 import os.path
 import sys
@@ -123,7 +124,8 @@ class ProjectHandler(PF):
     current = None
 
     def __init__(self, name, path, original_na_file_path,
-                 na_parts_data=None, na_hull=None, operations=None, mode=PF.EMPTY, code='', save_time=''):
+                 na_parts_data=None, na_hull=None, operations=None, mode=PF.EMPTY, code='', save_time='',
+                 relation_index=None):
         self.na_hull = na_hull
         if ProjectHandler.current:  # 保存上一个工程文件，清空当前所有被绘制的对象
             show_state(f"正在保存{ProjectHandler.current.Path}...", 'process')
@@ -135,7 +137,7 @@ class ProjectHandler(PF):
             Handler.hull_design_tab.clear_all_plot_obj()
             show_state(f"{ProjectHandler.current.Path}保存成功", 'success')
         PF.__init__(self, name, path, original_na_file_path,
-                    na_parts_data, operations, mode, code, save_time)
+                    na_parts_data, operations, mode, code, save_time, relation_index)
         """
         修改配置文件对象Config，格式为：
         {
@@ -150,8 +152,6 @@ class ProjectHandler(PF):
         Config.Projects[self.Name] = self.Path
         Config.ProjectsFolder = os.path.dirname(self.Path)
         Config.save_config()
-        # 重置NavalArt的Part的ShipsAllParts
-        NAPart.ShipsAllParts = []
         # 更新静态变量
         ProjectHandler.current = self
         self.stateHistory = StateHistory(show_state)
@@ -174,8 +174,6 @@ class ProjectHandler(PF):
                 pass
             finally:
                 return None
-        # 重置NavalArt的Part的ShipsAllParts
-        NAPart.ShipsAllParts = []
         return prj
 
     @staticmethod
@@ -197,7 +195,7 @@ class ProjectHandler(PF):
             project_file = ProjectHandler(
                 data['Name'], path, data['OriginalFilePath'], data['NAPartsData'], None, data['Operations'],
                 mode=PF.LOAD,
-                code=data['Code'], save_time=data['SaveTime'])
+                code=data['Code'], save_time=data['SaveTime'], relation_index=data.get('RelationIndex'))
         except KeyError:
             return None
         if project_file._succeed_init:
@@ -222,6 +220,8 @@ class ProjectHandler(PF):
             # 保存
             color_print("正在转化为json...", "yellow")
             self.NAPartsData = NAHull.toJson(self.na_hull.DrawMap)
+            self.RelationIndex = self.na_hull.partRelationMap.dump_index(
+                [part for parts in self.na_hull.DrawMap.values() for part in parts])
             color_print("转化为json成功！", "green")
             color_print("正在保存...", "yellow")
             super().save()
@@ -358,8 +358,10 @@ class ProjectOpeningThread(MyQThread):
             na_hull = NAHull(data=obj.NAPartsData,
                              show_statu_func=self.update_state,
                              glWin=Handler.hull_design_tab.ThreeDFrame,
-                             design_tab=True)
+                             design_tab=True,
+                             relation_index=obj.RelationIndex)  # 零件关系索引有效时直接加载，不重建零件关系图
             obj.na_hull = na_hull
+            obj.RelationIndex = None  # 保存时重新生成
             Handler.hull_design_tab.init_NaHull_partRelationMap_Layers(na_hull)  # 显示船体设计
             # 显示船体设计
             self.update_state.emit(f"{self.file_path}加载成功", 'success')  # 发射更新状态信息信号
@@ -2363,6 +2365,8 @@ def handle_exception(_exception):
 
 
 if __name__ == '__main__':
+    # 打包后的程序中，进程池的子进程会重新运行入口，需要在其他代码之前调用
+    multiprocessing.freeze_support()
     print("Naval Art Hull Editor")
     try:
         # 初始化路径
@@ -2371,6 +2375,10 @@ if __name__ == '__main__':
         ThumbnailPath = os.path.join(find_na_root_path(), "ProjectThumbnails")
         # 读取配置
         Config = ConfigFile()
+        # 已解析设计的磁盘缓存
+        ReadNA.design_cache = DesignCache(os.path.join(find_na_root_path(), "PluginCache", "Designs"))
+        # 读取大型设计时并行实例化零件的进程数，默认为1（串行读取），可在配置文件中修改
+        ReadNA.load_workers = Config.LoadWorkers
         # 初始化界面和事件处理器
         QApp = QApplication(sys.argv)
         # 设置图标
@@ -360,7 +360,18 @@ class OpenGLWin(QOpenGLWidget):
             # 关闭辅助光
             self.gl2_0.glDisable(GL_LIGHT1)
         if time.time() - st != 0:  # 刷新FPS
-            self.fps_label.setText(f"FPS: {round(1 / (time.time() - st), 1)}")
+            self.fps_label.setText(f"FPS: {round(1 / (time.time() - st), 1)}{self.get_culling_statu()}")
+
+    def get_culling_statu(self):
+        """
+        :return: FPS标签中显示的上一帧绘制和被视锥剔除的零件数，没有绘制船体时为空字符串
+        """
+        hulls = [obj for obj in self.all_3d_obj["钢铁"] if isinstance(obj, NAHull)]
+        if not hulls or self.show_3d_obj_mode[0] != OpenGLWin.ShowAll:
+            return ""
+        visible = sum(hull.visible_num for hull in hulls)
+        culled = sum(hull.culled_num for hull in hulls)
+        return f"    可见: {visible}    剔除: {culled}"
 
     def repaintGL(self):
         # 重新渲染
@@ -413,32 +424,17 @@ class OpenGLWin(QOpenGLWidget):
         self.gl2_0.glLoadName(0)
         # =========================================================================== 全视图部件模式
         if self.show_3d_obj_mode[0] == OpenGLWin.ShowAll:  # 如果有钢铁物体，就绘制钢铁物体
+            # 船体（NAHull）按颜色批量绘制其DrawMap中的零件，设计模式下DrawMap与hull_design_tab_id_map中的零件相同
             if self.show_3d_obj_mode == (OpenGLWin.ShowAll, OpenGLWin.ShowObj):  # 是部件模式
-                if self.using_various_mode:
-                    for part in NAPart.hull_design_tab_id_map.copy().values():
-                        part.glWin = self
-                        if not isinstance(part, AdjustableHull):
-                            continue
-                        part.draw(self.gl2_0)
-                else:
-                    for mt, objs in self.all_3d_obj.items():
-                        for obj in objs:
-                            obj.glWin = self
-                            obj.draw(self.gl2_0, material=mt, theme_color=self.theme_color)
+                for mt, objs in self.all_3d_obj.items():
+                    for obj in objs:
+                        obj.glWin = self
+                        obj.draw(self.gl2_0, material=mt, theme_color=self.theme_color)
             elif self.show_3d_obj_mode == (OpenGLWin.ShowAll, OpenGLWin.ShowDotNode):  # 是节点模式
-                if self.using_various_mode:
-                    for part in NAPart.hull_design_tab_id_map.copy().values():
-                        part.glWin = self
-                        if not isinstance(part, AdjustableHull):
-                            continue
-
-                        part.draw(self.gl2_0, transparent=True)
-
-                else:
-                    for mt, objs in self.all_3d_obj.items():
-                        for obj in objs:
-                            obj.glWin = self
-                            obj.draw(self.gl2_0, material=mt, theme_color=self.theme_color, transparent=True)
+                for mt, objs in self.all_3d_obj.items():
+                    for obj in objs:
+                        obj.glWin = self
+                        obj.draw(self.gl2_0, material=mt, theme_color=self.theme_color, transparent=True)
                 self.gl2_0.glEnable(self.gl2_0.GL_LIGHT1)  # 启用光源1
                 for node in NAPartNode.id_map.copy().values():
                     node.draw(self.gl2_0, theme_color=self.theme_color)
@@ -542,7 +538,7 @@ class OpenGLWin(QOpenGLWidget):
             self.update()
 
     def _init_fps_label(self):
-        self.fps_label.setGeometry(10, 10, 100, 20)
+        self.fps_label.setGeometry(10, 10, 300, 20)
         style = str(  # 透明背景
             f"color: {FG_COLOR0};"
             f"background-color: rgba(0, 0, 0, 0);"
@@ -24,3 +24,19 @@ class Operation:
     @abstractmethod
     def redo(self):
         self.execute()
+
+    def merge(self, other) -> bool:
+        """
+        连续操作的合并：时间窗口内紧接着自己执行的操作（如滚轮连续修改同一个零件的值）可以合并到自己中，
+        合并后自己保留原来的“修改前”状态，使用other的“修改后”状态，操作栈中只保存一项。
+        返回True的操作，其execute必须接受update参数（update=False时不刷新绘制），刷新推迟到refresh
+        :param other: 新的操作对象
+        :return: 是否已合并
+        """
+        return False
+
+    def refresh(self):
+        """
+        合并的连续操作结束后，刷新绘制
+        """
+        pass
@@ -29,8 +29,8 @@ class SinglePartOperation(Operation):
                          self.part.HOff]
         self.change_data = change_data
 
-    def execute(self):
-        self.part.change_attrs(*self.change_data, update=True)
+    def execute(self, update=True):
+        self.part.change_attrs(*self.change_data, update=update)
         self.right_widget.update_context(self.part)
         self.part.glWin.selected_gl_objects[self.part.glWin.show_3d_obj_mode] = [self.part]
 
@@ -42,6 +42,16 @@ class SinglePartOperation(Operation):
     def redo(self):
         self.execute()
 
+    def merge(self, other) -> bool:
+        # 同一个零件的连续编辑：保留最早的原始数据，使用最新的修改数据
+        if type(other) is not SinglePartOperation or other.part is not self.part:
+            return False
+        self.change_data = other.change_data
+        return True
+
+    def refresh(self):
+        self.part.redrawGL()
+
 
 class DeleteSinglePartOperation(Operation):
     """
@@ -29,6 +29,11 @@ class ConfigFile:
             self.Sensitivity = self.Config['Sensitivity']
             self.AutoSave = True if self.Config['AutoSave'] == 'True' else False
             self.Guided = True if self.Config['Guided'] == 'True' else False
+            # 旧版本的配置文件没有该项，或该项无效时，保持串行读取
+            try:
+                self.LoadWorkers = max(int(self.Config.setdefault('LoadWorkers', 1)), 1)
+            except (TypeError, ValueError):
+                self.LoadWorkers = 1
             self.Projects = data['Projects']
             self.ProjectsFolder = data['ProjectsFolder']
         except (FileNotFoundError, KeyError, AttributeError):
@@ -45,7 +50,9 @@ class ConfigFile:
                 'AutoSaveInterval': 5,
                 'Sensitivity': self.Sensitivity,
                 'Guided': False,
+                'LoadWorkers': 1,  # 读取大型设计时并行实例化零件的进程数，1为串行读取
             }
+            self.LoadWorkers = 1
             self.Projects = {}
             self.ProjectsFolder = ''
 
@@ -84,7 +91,7 @@ class ProjectFile:
     def __init__(
             self, name, path, original_na_file_path,
             na_parts_data=None, operations=None, mode=Literal["空白", "NA", "预设", "PTB", "自定义", "从文件加载"],  # 工程创建模式
-            code='', save_time=''
+            code='', save_time='', relation_index=None
     ):
         """
         工程文件类，用于处理工程文件的读写
@@ -94,11 +101,13 @@ class ProjectFile:
         3. 工程创建时间
         4. 用户在软件内对工程的配置
         5. 船体节点数据
+        6. 零件关系索引（可选）
         :param name: 工程名称
         :param path: 工程路径，包含文件名
         :param original_na_file_path: 原NA文件路径
         :param na_parts_data: 船体节点数据
         :param mode: 工程创建模式
+        :param relation_index: 零件关系索引（PartRelationMap.dump_index），可选，打开工程时用于跳过重建零件关系图
         """
         self._succeed_init = False
         # 工程文件的属性
@@ -121,6 +130,7 @@ class ProjectFile:
         self.Config = {'State': self.State, 'Camera': self.Camera}
         self.NAPartsData = na_parts_data
         self.Operations = operations if operations else {}
+        self.RelationIndex = relation_index
         self._json_data = {
             'Name': self.Name,
             'Code': self.Code,
@@ -155,7 +165,7 @@ class ProjectFile:
         try:
             project_file = ProjectFile(
                 data['Name'], path, data['OriginalFilePath'], data['NAPartsData'], data['Operations'], mode=ProjectFile.LOAD,
-                code=data['Code'], save_time=data['SaveTime'])
+                code=data['Code'], save_time=data['SaveTime'], relation_index=data.get('RelationIndex'))
         except KeyError:
             # QMessageBox(QMessageBox.Warning, '警告', '工程文件格式错误！').exec_()
             return None
@@ -207,6 +217,8 @@ class ProjectFile:
             'NAPartsData': self.NAPartsData,
             'Operations': self.Operations,
         }
+        if self.RelationIndex:  # 零件关系索引不计入安全码，由其中的哈希单独验证
+            self._json_data['RelationIndex'] = self.RelationIndex
         if not folder_path:
             _path = self.Path
         else:
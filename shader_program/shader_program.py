@@ -20,18 +20,22 @@ void main() {
 
 """
 
-FS = """
+# FS和INSTANCED_FS只在物体颜色的来源上不同，共用其余的输入声明和光照计算
+_FS_HEAD = """
 #version 330 core
 in vec3 FragPos;
 in vec3 Normal; // 法向量
 uniform vec3 lightPos; // 光源位置
 uniform vec3 viewPos; // 观察者位置
 uniform vec3 lightColor; // 光源颜色
-uniform vec3 objectColor; // 物体颜色
+"""
+
+_FS_BODY = """
 
 uniform float ambientStrength = 0.1; // 环境光强度
 uniform float specularStrength = 0.4; // 镜面光强度
 uniform int shininess = 16; // 镜面光高光大小
+uniform float alpha = 1.0; // 不透明度
 
 out vec4 FragColor;
 
@@ -101,7 +105,37 @@ void main() {
 
     // 最终颜色
     vec3 result = (ambient + diffuse + specular);
-    FragColor = vec4(result, 1);
+    FragColor = vec4(result, alpha);
     // FragColor = vec4(applyFXAA(FragColor, gl_FragCoord.xy, vec2(1920, 1080), 1.0, 0.0312), 1.0);
 }
 """
+
+FS = _FS_HEAD + "uniform vec3 objectColor; // 物体颜色" + _FS_BODY
+
+# 实例化绘制：同一外形的零件共用一份局部坐标网格，每个实例的模型矩阵，法向量矩阵和颜色作为逐实例的顶点属性
+INSTANCED_VS = """
+#version 330 core
+
+layout(location = 0) in vec3 inPosition; // 局部坐标下的顶点位置
+layout(location = 1) in vec3 inNormal;   // 局部坐标下的顶点法向量
+layout(location = 2) in mat4 instanceModel;  // 实例的模型矩阵（占用2~5）
+layout(location = 6) in mat3 instanceNormalMatrix;  // 实例的法向量矩阵（占用6~8）
+layout(location = 9) in vec3 instanceColor;  // 实例的颜色
+
+out vec3 FragPos;
+out vec3 Normal;
+out vec3 objectColor;
+
+uniform mat4 view;
+uniform mat4 projection;
+
+void main() {
+    FragPos = vec3(instanceModel * vec4(inPosition, 1.0));
+    Normal = normalize(instanceNormalMatrix * inNormal);
+    objectColor = instanceColor;
+    gl_Position = projection * view * vec4(FragPos, 1.0);
+}
+"""
+
+# 与FS相同，物体颜色来自顶点着色器
+INSTANCED_FS = _FS_HEAD + "in vec3 objectColor; // 物体颜色（每个实例的颜色）" + _FS_BODY
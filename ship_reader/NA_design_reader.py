@@ -2,13 +2,23 @@
 读取NA设计文件的模块
 """
 import copy
+import os
 import time
+import weakref
 import xml.etree.ElementTree as ET
-from typing import Union, List, Dict, Callable
+from concurrent.futures import ProcessPoolExecutor
+from typing import Union, List, Dict, Callable, Optional
 
 import numpy as np
-from quaternion import quaternion
-from util_funcs import CONST, VECTOR_RELATION_MAP, rotate_quaternion, get_normal, fit_bezier
+from util_funcs import (
+    CONST, VECTOR_RELATION_MAP, rotate_quaternion, fit_bezier, get_rotation_matrix, apply_rotation)
+from .axis_lines import BasicMapView, group_by_coord
+from .coord_keys import KEY_SCALE, coord_keys, key_coord, pos_key
+from .layer_index import LayerIndex
+from .hull_geometry import (
+    PLOT_LINE_SIZES, get_hulls_geometry, get_curve_face_dots, get_local_geometry, get_part_plot_lines,
+    get_part_plot_faces, get_plot_normals)
+from .part_table import PartTable, vec_column_property, shape_column_property
 
 """
 文件格式：
@@ -32,9 +42,6 @@ from util_funcs import CONST, VECTOR_RELATION_MAP, rotate_quaternion, get_normal
   </root>
 """
 
-RotateOrder = CONST.ROTATE_ORDER
-
-
 def get_rot_relation(rot: list, rot_: list) -> Union[str, None]:
     """
     求rot_关于rot的关系：
@@ -78,7 +85,7 @@ def get_rot_relation(rot: list, rot_: list) -> Union[str, None]:
 
 def rotate_quaternion2(dot_dict, scl, rot):
     """
-    对点集进行四元数旋转
+    对点集进行缩放和旋转（使用缓存的旋转矩阵，所有点一次计算）
 
     :param dot_dict: 字典，值是零件的各个点的坐标，格式为 {'pointset1': [[x1, y1, z1], [x2, y2, z2], ...], 'pointset2': [[x1, y1, z1], [x2, y2, z2], ...], ...}
     :param scl: 缩放比例，三个值分别为x,y,z轴的缩放比例
@@ -87,54 +94,20 @@ def rotate_quaternion2(dot_dict, scl, rot):
     """
     if rot == [0, 0, 0]:
         return dot_dict
-    # 转换为弧度
-    rot = np.radians(rot)
-    # 计算旋转的四元数
-    q_x = np.array([np.cos(rot[0] / 2), np.sin(rot[0] / 2), 0, 0])
-    q_y = np.array([np.cos(rot[1] / 2), 0, np.sin(rot[1] / 2), 0])
-    q_z = np.array([np.cos(rot[2] / 2), 0, 0, np.sin(rot[2] / 2)])
-
-    # 合并三个旋转四元数
-    q = quaternion(1, 0, 0, 0)
-    if RotateOrder == "XYZ":
-        q = q * quaternion(*q_x) * quaternion(*q_y) * quaternion(*q_z)
-    elif RotateOrder == "XZY":
-        q = q * quaternion(*q_x) * quaternion(*q_z) * quaternion(*q_y)
-    elif RotateOrder == "YXZ":
-        q = q * quaternion(*q_y) * quaternion(*q_x) * quaternion(*q_z)
-    elif RotateOrder == "YZX":
-        q = q * quaternion(*q_y) * quaternion(*q_z) * quaternion(*q_x)
-    elif RotateOrder == "ZXY":
-        q = q * quaternion(*q_z) * quaternion(*q_x) * quaternion(*q_y)
-    elif RotateOrder == "ZYX":
-        q = q * quaternion(*q_z) * quaternion(*q_y) * quaternion(*q_x)
-    else:
-        raise ValueError("Invalid RotateOrder!")
-
-    # 遍历点集进行旋转
+    sizes = [len(pointset) for pointset in dot_dict.values()]
+    points = np.array([point for pointset in dot_dict.values() for point in pointset], dtype=np.float64) * scl
+    rotated = list(apply_rotation(points, get_rotation_matrix(rot)))
     rotated_dot_dict = {}
-    for key, pointset in dot_dict.items():
-        for i, point in enumerate(pointset):
-            # 进行缩放
-            point = np.array(point) * scl
-            # 将点坐标转换为四元数
-            point_quat = np.quaternion(0, *point)
-            # 进行四元数旋转
-            rotated_point_quat = q * point_quat * np.conj(q)
-            # 提取旋转后的点坐标
-            rotated_point = np.array([rotated_point_quat.x, rotated_point_quat.y, rotated_point_quat.z])
-            # 将结果保存到字典中
-            if i == 0:
-                rotated_dot_dict[key] = [rotated_point]
-            else:
-                rotated_dot_dict[key].append(rotated_point)
-
+    start = 0
+    for key, size in zip(dot_dict.keys(), sizes):
+        rotated_dot_dict[key] = rotated[start:start + size]
+        start += size
     return rotated_dot_dict
 
 
 def rotate_quaternion0(face_list, scl, rot):
     """
-    对点集进行四元数旋转
+    对点集进行缩放和旋转（使用缓存的旋转矩阵，所有点一次计算）
     :param face_list: 列表，元素是含有多个点的列表，格式为 [[array([x1, y1, z1]), array([x2, y2, z2]), ...], [...], ...]
     :param scl:
     :param rot:
@@ -142,51 +115,19 @@ def rotate_quaternion0(face_list, scl, rot):
     """
     if rot == [0, 0, 0]:
         return face_list
-    # 转换为弧度
-    rot = np.radians(rot)
-    # 计算旋转的四元数
-    q_x = np.array([np.cos(rot[0] / 2), np.sin(rot[0] / 2), 0, 0])
-    q_y = np.array([np.cos(rot[1] / 2), 0, np.sin(rot[1] / 2), 0])
-    q_z = np.array([np.cos(rot[2] / 2), 0, 0, np.sin(rot[2] / 2)])
-
-    # 合并三个旋转四元数
-    q = quaternion(1, 0, 0, 0)
-    if RotateOrder == "XYZ":
-        q = q * quaternion(*q_x) * quaternion(*q_y) * quaternion(*q_z)
-    elif RotateOrder == "XZY":
-        q = q * quaternion(*q_x) * quaternion(*q_z) * quaternion(*q_y)
-    elif RotateOrder == "YXZ":
-        q = q * quaternion(*q_y) * quaternion(*q_x) * quaternion(*q_z)
-    elif RotateOrder == "YZX":
-        q = q * quaternion(*q_y) * quaternion(*q_z) * quaternion(*q_x)
-    elif RotateOrder == "ZXY":
-        q = q * quaternion(*q_z) * quaternion(*q_x) * quaternion(*q_y)
-    elif RotateOrder == "ZYX":
-        q = q * quaternion(*q_z) * quaternion(*q_y) * quaternion(*q_x)
-    else:
-        raise ValueError("Invalid RotateOrder!")
-    # 遍历点集进行旋转
+    points = np.array([point for face in face_list for point in face], dtype=np.float64).reshape(-1, 3) * scl
+    rotated = list(apply_rotation(points, get_rotation_matrix(rot)))
     rotated_face_list = []
+    start = 0
     for face in face_list:
-        rotated_face = []
-        for point in face:
-            # 进行缩放
-            point = np.array(point) * scl
-            # 将点坐标转换为四元数
-            point_quat = np.quaternion(0, *point)
-            # 进行四元数旋转
-            rotated_point_quat = q * point_quat * np.conj(q)
-            # 提取旋转后的点坐标
-            rotated_point = np.array([rotated_point_quat.x, rotated_point_quat.y, rotated_point_quat.z])
-            # 将结果保存到列表中
-            rotated_face.append(rotated_point)
-        rotated_face_list.append(rotated_face)
+        rotated_face_list.append(rotated[start:start + len(face)])
+        start += len(face)
     return rotated_face_list
 
 
 def rotate_quaternion1(dot_dict, scl, rot):
     """
-    对点集进行缩放，四元数旋转
+    对点集进行缩放和旋转（使用缓存的旋转矩阵，所有点一次计算）
 
     :param dot_dict: 字典，值是零件的各个点的坐标，格式为 {'point1': [x1, y1, z1], 'point2': [x2, y2, z2], ...}
     :param scl: 缩放比例，三个值分别为x,y,z轴的缩放比例
@@ -194,49 +135,10 @@ def rotate_quaternion1(dot_dict, scl, rot):
     :return: 旋转后的点集，格式与输入点集相同，但值为np.array类型
     """
     if rot == [0, 0, 0]:
-        # 仅转换为np.array类型
-        for key, point in dot_dict.items():
-            dot_dict[key] = np.array(point)
-        return dot_dict
-    # 将角度转换为弧度
-    rot = np.radians(rot)
-    # 计算旋转的四元数
-    q_x = np.array([np.cos(rot[0] / 2), np.sin(rot[0] / 2), 0, 0])
-    q_y = np.array([np.cos(rot[1] / 2), 0, np.sin(rot[1] / 2), 0])
-    q_z = np.array([np.cos(rot[2] / 2), 0, 0, np.sin(rot[2] / 2)])
-
-    # 合并三个旋转四元数
-    q = quaternion(1, 0, 0, 0)
-    if RotateOrder == "XYZ":
-        q = q * quaternion(*q_x) * quaternion(*q_y) * quaternion(*q_z)
-    elif RotateOrder == "XZY":
-        q = q * quaternion(*q_x) * quaternion(*q_z) * quaternion(*q_y)
-    elif RotateOrder == "YXZ":
-        q = q * quaternion(*q_y) * quaternion(*q_x) * quaternion(*q_z)
-    elif RotateOrder == "YZX":
-        q = q * quaternion(*q_y) * quaternion(*q_z) * quaternion(*q_x)
-    elif RotateOrder == "ZXY":
-        q = q * quaternion(*q_z) * quaternion(*q_x) * quaternion(*q_y)
-    elif RotateOrder == "ZYX":
-        q = q * quaternion(*q_z) * quaternion(*q_y) * quaternion(*q_x)
-    else:
-        raise ValueError("Invalid RotateOrder!")
-
-    # 遍历点集进行缩放，旋转
-    rotated_dot_dict = {}
-    for key, point in dot_dict.items():
-        # 进行缩放
-        point = np.array(point) * scl
-        # 将点坐标转换为四元数
-        point_quat = np.quaternion(0, *point)
-        # 进行四元数旋转
-        rotated_point_quat = q * point_quat * np.conj(q)
-        # 提取旋转后的点坐标
-        rotated_point = np.array([rotated_point_quat.x, rotated_point_quat.y, rotated_point_quat.z])
-        # 将结果保存到字典中
-        rotated_dot_dict[key] = rotated_point
-
-    return rotated_dot_dict
+        # 仅转换为np.array类型（返回新的字典，不修改传入的点集）
+        return {key: np.array(point) for key, point in dot_dict.items()}
+    points = np.array(list(dot_dict.values()), dtype=np.float64) * scl
+    return dict(zip(dot_dict.keys(), apply_rotation(points, get_rotation_matrix(rot))))
 
 
 def get_raw_direction(parts):
@@ -260,29 +162,108 @@ def get_raw_direction(parts):
 
 class NAPartNode:
     id_map = {}
-    all_dots = []  # 不储存对象，储存所有点的坐标列表
+    node_index = {}  # 量化后的整数坐标 -> 节点，用于按坐标查找已有的节点
+    KEY_SCALE = KEY_SCALE  # 节点坐标保留三位小数，乘以KEY_SCALE取整后作为node_index的键
+    OCTANTS = (  # 八个卦限
+        CONST.FRONT_UP_LEFT, CONST.FRONT_UP_RIGHT, CONST.FRONT_DOWN_LEFT, CONST.FRONT_DOWN_RIGHT,
+        CONST.BACK_UP_LEFT, CONST.BACK_UP_RIGHT, CONST.BACK_DOWN_LEFT, CONST.BACK_DOWN_RIGHT)
+    __slots__ = ("pos", "glWin", "_near_parts",
+                 "genList", "updateList", "selected_genList", "update_selectedList")
 
     def __init__(self, pos: list):
         self.pos = pos
         self.glWin = None
-        self.near_parts = {  # 八个卦限
-            CONST.FRONT_UP_LEFT: [],
-            CONST.FRONT_UP_RIGHT: [],
-            CONST.FRONT_DOWN_LEFT: [],
-            CONST.FRONT_DOWN_RIGHT: [],
-            CONST.BACK_UP_LEFT: [],
-            CONST.BACK_UP_RIGHT: [],
-            CONST.BACK_DOWN_LEFT: [],
-            CONST.BACK_DOWN_RIGHT: [],
-        }
+        self._near_parts = None  # 卦限 -> 零件列表，只保存有零件的卦限，第一次添加零件时才创建
         NAPartNode.id_map[id(self) % 4294967296] = self
-        NAPartNode.all_dots.append(self.pos)
+        NAPartNode.node_index[NAPartNode.get_key(pos)] = self
         # 绘图指令集初始化
         self.genList = None
         self.updateList = False
         self.selected_genList = None
         self.update_selectedList = False
 
+    @staticmethod
+    def get_key(pos):
+        """
+        :param pos: 节点坐标
+        :return: 量化后的整数坐标
+        """
+        return pos_key(pos)
+
+    @staticmethod
+    def get_or_create(pos, key=None):
+        """
+        :param pos: 节点坐标
+        :param key: 已经量化的整数坐标，默认由pos量化
+        :return: 该坐标上已有的节点，没有则新建
+        """
+        if key is None:
+            key = pos_key(pos)
+        node = NAPartNode.node_index.get(key)
+        if node is None:
+            node = NAPartNode([key_coord(key[0]), key_coord(key[1]), key_coord(key[2])])
+        return node
+
+    @staticmethod
+    def add_parts(parts: list, positions: np.ndarray, dots: np.ndarray, dot_parts: np.ndarray):
+        """
+        批量把零件加入其所有节点，结果与对每个节点坐标逐个 get_or_create 和 add_near_part 相同：
+        按（量化坐标，卦限）lexsort后，每个节点只查找或新建一次，每个卦限的零件一次性加入
+        :param parts: 零件
+        :param positions: 零件位置的整数坐标，shape为(len(parts), 3)
+        :param dots: 节点的整数坐标，shape为(n, 3)
+        :param dot_parts: 每个节点坐标所属零件在parts中的索引，shape为(n,)
+        """
+        if len(dots) == 0:
+            return
+        # 与add_part中相同的卦限判断：零件坐标大于节点坐标则为后，下，左
+        octant_names = [f"{x_str}_{y_str}_{z_str}" for x_str in (CONST.FRONT, CONST.BACK)
+                        for y_str in (CONST.UP, CONST.DOWN) for z_str in (CONST.RIGHT, CONST.LEFT)]
+        greater = positions[dot_parts] > dots
+        octants = greater[:, 0] * 4 + greater[:, 1] * 2 + greater[:, 2]
+        order = np.lexsort((octants, dots[:, 2], dots[:, 1], dots[:, 0]))
+        sorted_keys, sorted_octants = dots[order], octants[order]
+        new_node = np.r_[True, np.any(sorted_keys[1:] != sorted_keys[:-1], axis=1)]
+        new_group = new_node | np.r_[True, sorted_octants[1:] != sorted_octants[:-1]]
+        starts = np.flatnonzero(new_group)
+        node_keys = sorted_keys[starts].tolist()
+        node_dots = key_coord(sorted_keys[starts]).tolist()
+        group_octants = sorted_octants[starts].tolist()
+        new_node = new_node[starts].tolist()
+        starts = starts.tolist() + [len(order)]
+        order, dot_parts = order.tolist(), dot_parts.tolist()
+        node_index = NAPartNode.node_index
+        node = None
+        for i, (s, e) in enumerate(zip(starts[:-1], starts[1:])):
+            if new_node[i]:
+                node = node_index.get(tuple(node_keys[i]))
+                if node is None:
+                    node = NAPartNode(node_dots[i])
+                if node._near_parts is None:
+                    node._near_parts = {}
+            node._near_parts.setdefault(octant_names[group_octants[i]], []).extend(
+                [parts[dot_parts[j]] for j in order[s:e]])
+
+    @property
+    def near_parts(self):
+        """
+        :return: 八个卦限的零件列表
+        """
+        if self._near_parts is None:
+            self._near_parts = {}
+        for octant in NAPartNode.OCTANTS:
+            self._near_parts.setdefault(octant, [])
+        return self._near_parts
+
+    def add_near_part(self, octant, part):
+        """
+        :param octant: 零件所在的卦限
+        :param part: 零件
+        """
+        if self._near_parts is None:
+            self._near_parts = {}
+        self._near_parts.setdefault(octant, []).append(part)
+
     def draw(self, gl, material="节点", theme_color=None, point_size=5):
         if self.genList and not self.updateList:
             gl.glCallList(self.genList)
@@ -299,26 +280,41 @@ class NAPartNode:
 
 
 class XZLayerNode(NAPartNode):
-    ...
+    __slots__ = ()
 
 
 class NAPart:
-    ShipsAllParts = []
-    id_map = {}  # 储存零件ID与零件实例的映射
+    # 零件由所属的ReadNA（Parts, AdjustableHulls, Weapons, ColorPartsMap）持有，全局的id_map只保存弱引用，
+    # 设计被关闭后，其零件和绘图数据随ReadNA一起被回收
+    id_map = weakref.WeakValueDictionary()  # 储存零件ID与零件实例的映射
     hull_design_tab_id_map = {}  # 在na_hull中清空和初始化
+    shape_columns = False  # 是否使用零件表中的外形参数列
+    # 位置，旋转，缩放和装甲是零件表（PartTable）中对应列的视图
+    Pos = vec_column_property("Pos")
+    Rot = vec_column_property("Rot")
+    Scl = vec_column_property("Scl")
+    __slots__ = ("glWin", "read_na_obj", "allParts_relationMap", "_table", "_row",
+                 "_Pos", "_Rot", "_Scl", "_generation", "Id", "Col",
+                 "pre_genList", "genList", "updateList", "transparent_genList", "update_transparentList",
+                 "selected_genList", "update_selectedList", "__weakref__")
 
     def __init__(self, read_na, Id, pos, rot, scale, color, armor):
         self.glWin = None  # 用于绘制的窗口
         self.read_na_obj = read_na
         if read_na:
             self.allParts_relationMap = read_na.partRelationMap
+            self._table = read_na.partTable
+        else:
+            self._table = PartTable.get_default()
+        self._row = self._table.add(self)
+        self._Pos = self._Rot = self._Scl = None
+        self._generation = self._table.generation
         self.Id = Id
         self.Pos = pos
         self.Rot = rot
         self.Scl = scale
         self.Col = color  # "#975740"
         self.Amr = armor
-        NAPart.ShipsAllParts.append(self)
         NAPart.id_map[id(self) % 4294967296] = self
         # 绘图指令集初始化
         self.pre_genList = None
@@ -329,6 +325,14 @@ class NAPart:
         self.selected_genList = None
         self.update_selectedList = False
 
+    @property
+    def Amr(self):
+        return int(self._table.amr[self._row])
+
+    @Amr.setter
+    def Amr(self, value):
+        self._table.amr[self._row] = value
+
     def __deepcopy__(self, memo):
         return self
 
@@ -336,7 +340,8 @@ class NAPart:
         self.Amr = armor
 
     def delete(self):
-        del NAPart.id_map[id(self) % 4294967296]
+        NAPart.id_map.pop(id(self) % 4294967296, None)
+        self._table.remove(self._row)
 
     def scale(self, ratio: list):
         self.Scl = [self.Scl[0] * ratio[0], self.Scl[1] * ratio[1], self.Scl[2] * ratio[2]]
@@ -369,9 +374,30 @@ class NAPart:
             "Amr": self.Amr,
         }
 
+    def extra_dict(self):
+        """
+        to_dict中除了基本属性以外的部分，供PartTable.to_dicts使用
+        :return: 字典
+        """
+        return {}
+
 
 class AdjustableHull(NAPart):
-    All = []
+    shape_columns = True
+    # 外形参数是零件表中对应列的视图
+    Len = shape_column_property("Len")
+    Hei = shape_column_property("Hei")
+    FWid = shape_column_property("FWid")
+    BWid = shape_column_property("BWid")
+    FSpr = shape_column_property("FSpr")
+    BSpr = shape_column_property("BSpr")
+    UCur = shape_column_property("UCur")
+    DCur = shape_column_property("DCur")
+    HScl = shape_column_property("HScl")
+    HOff = shape_column_property("HOff")
+    __slots__ = ("_packed_geometry", "_vertex_coordinates", "_plot_lines", "_plot_faces", "_plot_normals",
+                 "_operation_dot_nodes", "_plot_all_dots")
+    changed_parts = weakref.WeakSet()  # 绘图数据被清除的零件，绘制时据此更新顶点缓冲区（GL_plot.hull_batch）
 
     def __init__(
             self, read_na, Id, pos, rot, scale, color, armor,
@@ -379,7 +405,7 @@ class AdjustableHull(NAPart):
             heightScale, heightOffset,
             _from_temp_data=False, _back_down_y=None, _back_up_y=None, _front_down_y=None, _front_up_y=None,
             _operation_dot_nodes=None, _plot_all_dots=None, _vertex_coordinates=None, _plot_lines=None,
-            _plot_faces=None,
+            _plot_faces=None, _plot_normals=None, _packed_geometry=None,
     ):
         """
         :param Id: 字符串，零件ID
@@ -398,6 +424,7 @@ class AdjustableHull(NAPart):
         :param downCurve: 浮点型，下曲率
         :param heightScale: 浮点型，前端高度缩放
         :param heightOffset: 浮点型，前端高度偏移
+        :param _packed_geometry: 元组（PackedGeometry, 可调节船体的序号），绘图数据在第一次使用时从中读取
         """
         NAPart.__init__(self, read_na, Id, pos, rot, scale, color, armor)
         self.Len = length
@@ -410,189 +437,217 @@ class AdjustableHull(NAPart):
         self.DCur = downCurve
         self.HScl = heightScale  # 高度缩放
         self.HOff = heightOffset  # 高度偏移
-        AdjustableHull.All.append(self)
-        self._y_limit = [-self.Hei / 2, self.Hei / 2]
-        # ==============================================================================初始化零件的各个坐标
-        self.front_z = self.Len / 2  # 零件前端的z坐标
-        self.back_z = -self.Len / 2  # 零件后端的z坐标
-        self.half_height_scale = self.Hei * self.HScl / 2  # 高度缩放的一半
-        self.center_height_offset = self.HOff * self.Hei  # 高度偏移
-        self.front_down_y = self.center_height_offset - self.half_height_scale  # 零件前端下端的y坐标
-        self.front_up_y = self.center_height_offset + self.half_height_scale  # 零件前端上端的y坐标
-        if self.front_down_y < self._y_limit[0]:
-            self.front_down_y = self._y_limit[0]
-        elif self.front_down_y > self._y_limit[1]:
-            self.front_down_y = self._y_limit[1]
-        if self.front_up_y > self._y_limit[1]:
-            self.front_up_y = self._y_limit[1]
-        elif self.front_up_y < self._y_limit[0]:
-            self.front_up_y = self._y_limit[0]
-        self.back_down_y = - self.Hei / 2
-        self.back_up_y = self.Hei / 2
-        self.front_down_x = self.FWid / 2
-        self.back_down_x = self.BWid / 2
-        self.front_up_x = self.front_down_x + self.FSpr / 2  # 扩散也要除以二分之一
-        self.back_up_x = self.back_down_x + self.BSpr / 2  # 扩散也要除以二分之一
-        # ==============================================================================计算绘图所需的数据
-        self.operation_dot_nodes = []  # 位置变换后，曲面变换前的所有点
-        self.plot_all_dots = []  # 曲面变换，位置变换后的所有点
-        self.vertex_coordinates = self.get_initial_vertex_coordinates()
-        self.plot_lines = self.get_plot_lines()
-        self.plot_faces = self.get_plot_faces()
+        # 零件各个坐标（front_z, front_up_y等）由外形参数按需计算，见下方的属性
+        # ==============================================================================绘图所需的数据
+        # 绘图数据在第一次被访问（绘制，拾取，或零件关系图使用）时才计算，之后缓存，直到零件属性改变
+        self._clear_plot_data()
+        if _from_temp_data and _plot_faces is not None:
+            # 直接使用已经计算好的绘图数据（来自TempAdjustableHull）
+            self._operation_dot_nodes = _operation_dot_nodes  # 位置变换后，曲面变换前的所有点
+            self._plot_all_dots = _plot_all_dots  # 曲面变换，位置变换后的所有点
+            self._vertex_coordinates = _vertex_coordinates
+            self._plot_lines = _plot_lines
+            self._plot_faces = _plot_faces
+            self._plot_normals = _plot_normals
+        elif _packed_geometry is not None:
+            self._packed_geometry = _packed_geometry
 
     def __deepcopy__(self, memo):
         return self
 
+    # ==============================================================================零件的各个坐标，由外形参数按需计算
+    @property
+    def _y_limit(self):
+        return [-self.Hei / 2, self.Hei / 2]
+
+    @property
+    def front_z(self):  # 零件前端的z坐标
+        return self.Len / 2
+
+    @property
+    def back_z(self):  # 零件后端的z坐标
+        return -self.Len / 2
+
+    @property
+    def half_height_scale(self):  # 高度缩放的一半
+        return self.Hei * self.HScl / 2
+
+    @property
+    def center_height_offset(self):  # 高度偏移
+        return self.HOff * self.Hei
+
+    @property
+    def front_down_y(self):  # 零件前端下端的y坐标
+        y_limit = self._y_limit
+        front_down_y = self.center_height_offset - self.half_height_scale
+        if front_down_y < y_limit[0]:
+            return y_limit[0]
+        elif front_down_y > y_limit[1]:
+            return y_limit[1]
+        return front_down_y
+
+    @property
+    def front_up_y(self):  # 零件前端上端的y坐标
+        y_limit = self._y_limit
+        front_up_y = self.center_height_offset + self.half_height_scale
+        if front_up_y > y_limit[1]:
+            return y_limit[1]
+        elif front_up_y < y_limit[0]:
+            return y_limit[0]
+        return front_up_y
+
+    @property
+    def back_down_y(self):
+        return - self.Hei / 2
+
+    @property
+    def back_up_y(self):
+        return self.Hei / 2
+
+    @property
+    def front_down_x(self):
+        return self.FWid / 2
+
+    @property
+    def back_down_x(self):
+        return self.BWid / 2
+
+    @property
+    def front_up_x(self):
+        return self.front_down_x + self.FSpr / 2  # 扩散也要除以二分之一
+
+    @property
+    def back_up_x(self):
+        return self.back_down_x + self.BSpr / 2  # 扩散也要除以二分之一
+
+    def reset_plot_data(self):
+        """
+        零件属性改变后，清除缓存的绘图数据，下一次访问时重新计算，并记录到changed_parts中
+        """
+        self._clear_plot_data()
+        AdjustableHull.changed_parts.add(self)
+
+    def _clear_plot_data(self):
+        self._packed_geometry = None
+        self._vertex_coordinates = None
+        self._plot_lines = None
+        self._plot_faces = None
+        self._plot_normals = None
+        self._operation_dot_nodes = None
+        self._plot_all_dots = None
+
+    @staticmethod
+    def prepare_plot_data(parts):
+        """
+        对还没有绘图数据的可调节船体，按零件表批量计算绘图数据（hull_geometry.get_hulls_geometry），
+        各个零件在第一次访问时再解包
+        :param parts: 零件列表，其中的非可调节船体会被忽略
+        """
+        tables = {}
+        for part in parts:
+            if isinstance(part, AdjustableHull) and part._plot_faces is None and part._packed_geometry is None:
+                tables.setdefault(id(part._table), []).append(part)
+        for hulls in tables.values():
+            table = hulls[0]._table
+            rows = table.get_rows(hulls)
+            no_rotate = np.fromiter((hull.Rot == [0, 0, 0] for hull in hulls), dtype=bool, count=len(hulls))
+            packed = PackedGeometry(get_hulls_geometry(
+                table.shape[rows], table.pos[rows], table.rot[rows], table.scl[rows], no_rotate))
+            for hull_i, hull in enumerate(hulls):
+                hull._packed_geometry = (packed, hull_i)
+
+    def _unpack_plot_data(self):
+        """
+        从打包的数组（设计缓存或并行读取的结果）中读取绘图数据
+        :return: 是否读取成功
+        """
+        if self._packed_geometry is None:
+            return False
+        packed, hull_i = self._packed_geometry
+        self._packed_geometry = None
+        (self._vertex_coordinates, self._plot_lines, self._plot_faces, self._plot_normals,
+         self._operation_dot_nodes, self._plot_all_dots) = packed.unpack(hull_i)
+        return True
+
+    @property
+    def vertex_coordinates(self):
+        if self._vertex_coordinates is None and not self._unpack_plot_data():
+            self._vertex_coordinates = self.get_initial_vertex_coordinates()
+        return self._vertex_coordinates
+
+    @vertex_coordinates.setter
+    def vertex_coordinates(self, value):
+        self._vertex_coordinates = value
+
+    @property
+    def plot_lines(self):
+        if self._plot_lines is None and not self._unpack_plot_data():
+            self._plot_lines = self.get_plot_lines()
+        return self._plot_lines
+
+    @plot_lines.setter
+    def plot_lines(self, value):
+        self._plot_lines = value
+
+    @property
+    def plot_faces(self):
+        if self._plot_faces is None and not self._unpack_plot_data():
+            self._plot_faces = self.get_plot_faces()  # 同时计算operation_dot_nodes和plot_all_dots
+        return self._plot_faces
+
+    @plot_faces.setter
+    def plot_faces(self, value):
+        if value is not self._plot_faces:
+            self._plot_normals = None
+        self._plot_faces = value
+
+    @property
+    def plot_normals(self):
+        """
+        与plot_faces对应的面法向量，{绘制方法: (面数, 3) 数组}；批量计算或解包时与面一起得到，否则在第一次访问时向量化计算，
+        之后缓存，直到零件属性改变
+        """
+        if self._plot_normals is None:
+            plot_faces = self.plot_faces  # 从打包的数组中解包时同时得到法向量
+            if self._plot_normals is None:
+                self._plot_normals = get_plot_normals(plot_faces)
+        return self._plot_normals
+
+    @property
+    def operation_dot_nodes(self):
+        if self._operation_dot_nodes is None and not self._unpack_plot_data():
+            self._plot_faces = self.get_plot_faces()
+        return self._operation_dot_nodes
+
+    @operation_dot_nodes.setter
+    def operation_dot_nodes(self, value):
+        self._operation_dot_nodes = value
+
+    @property
+    def plot_all_dots(self):
+        if self._plot_all_dots is None and not self._unpack_plot_data():
+            self._plot_faces = self.get_plot_faces()
+        return self._plot_all_dots
+
+    @plot_all_dots.setter
+    def plot_all_dots(self, value):
+        self._plot_all_dots = value
+
     def get_plot_faces(self):
         """
         :return: 绘制零件的方法，绘制零件需的三角形集
         """
-        result = {
-            "GL_QUADS": [],
-            "GL_TRIANGLES": [],
-            "GL_QUAD_STRIP": [],
-            "GL_POLYGON": [],
-        }
-        # 缩放并旋转
-        dots = rotate_quaternion1(self.vertex_coordinates, self.Scl, self.Rot)
-        for key in dots.keys():
-            dots[key] = dots[key].copy() + self.Pos  # 平移
-        faces = [
-            [dots["front_up_left"], dots["front_up_right"], dots["front_down_right"], dots["front_down_left"]],
-            [dots["back_up_left"], dots["back_down_left"], dots["back_down_right"], dots["back_up_right"]],
-            [dots["front_up_left"], dots["back_up_left"], dots["back_up_right"], dots["front_up_right"]],
-            [dots["front_down_left"], dots["front_down_right"], dots["back_down_right"], dots["back_down_left"]],
-            [dots["front_up_left"], dots["front_down_left"], dots["back_down_left"], dots["back_up_left"]],
-            [dots["front_up_right"], dots["back_up_right"], dots["back_down_right"], dots["front_down_right"]],
-        ]
-        self.operation_dot_nodes = [
-            dots["front_up_left"], dots["front_up_right"], dots["front_down_right"], dots["front_down_left"],
-            dots["back_up_left"], dots["back_down_left"], dots["back_down_right"], dots["back_up_right"]]
-        if self.UCur < 0.005 and self.DCur <= 0.005:
-            self.plot_all_dots = self.operation_dot_nodes
-            # 检查同一个面内的点是否重合，重合则添加到三角绘制方法中，否则添加到四边形绘制方法中
-            for face in faces:
-                use_triangles = False
-                added_face = None
-                for i in range(3):
-                    if np.array_equal(face[i], face[i + 1]):
-                        # 去除重复点
-                        added_face = face[:i] + face[i + 1:]
-                        use_triangles = True
-                        break
-                if use_triangles:
-                    result["GL_TRIANGLES"].append(added_face)
-                else:
-                    result["GL_QUADS"].append(face)
-        else:  # TODO: 有曲率的零件的绘制方法
-            front_part_curved_circle_dots, back_part_curved_circle_dots = self.get_initial_Curve_face_dots()
-            # 翻转顺序
-            reversed_b_up = back_part_curved_circle_dots["up"][::-1]
-            reversed_b_down = back_part_curved_circle_dots["down"][::-1]
-            # x值取反并存回原来的位置
-            symmetry_f_up = [dot * np.array([-1, 1, 1]) for dot in front_part_curved_circle_dots["up"]]
-            symmetry_f_down = [dot * np.array([-1, 1, 1]) for dot in front_part_curved_circle_dots["down"]]
-            symmetry_b_up = [dot * np.array([-1, 1, 1]) for dot in reversed_b_up]
-            symmetry_b_down = [dot * np.array([-1, 1, 1]) for dot in reversed_b_down]
-
-            # 绘制图形集合，截面（前后）用polygon，侧面用quad_strip
-            # 拼合点集
-            front_set = []
-            back_set = []
-            # 注意front和back的点集的顺序是相反的，为了渲染的时候能够正确显示
-            front_set.extend(symmetry_f_up[:-1])
-            front_set.extend(symmetry_f_down[:-1])
-            front_set.extend(front_part_curved_circle_dots["down"][::-1][:-1])
-            front_set.extend(front_part_curved_circle_dots["up"][::-1][:-1])
-            back_set.extend(back_part_curved_circle_dots["up"][:-1])
-            back_set.extend(back_part_curved_circle_dots["down"][:-1])
-            back_set.extend(symmetry_b_down[:-1])
-            back_set.extend(symmetry_b_up[:-1])
-            #   两个截面
-            result["GL_POLYGON"] = [front_set, back_set]
-            #   侧面
-            result["GL_QUADS"] = []
-            back_set = back_set[::-1]  # 翻转顺序
-            back_set = [back_set[(i - 1) % len(back_set)] for i in range(len(back_set))]  # 轮转一个单位
-            for i in range(23):
-                result["GL_QUADS"].append([front_set[i], back_set[i], back_set[i + 1], front_set[i + 1]])
-            result["GL_QUADS"].append([front_set[-1], back_set[-1], back_set[0], front_set[0]])
-            # 旋转
-            for method, face_set in result.items():
-                result[method] = rotate_quaternion0(face_set, self.Scl, self.Rot)
-                # 缩放和平移
-                for face in result[method]:
-                    for i in range(len(face)):
-                        face[i] = face[i].copy() + self.Pos
-            self.plot_all_dots = result["GL_POLYGON"][0] + result["GL_POLYGON"][1]
-        return result
+        plot_faces, self.operation_dot_nodes, self.plot_all_dots = get_part_plot_faces(
+            self.get_local_geometry(), self.Pos, self.Rot, self.Rot == [0, 0, 0])
+        return plot_faces
 
     def get_initial_Curve_face_dots(self):
         """
         获取扭曲后的零件圆形弧面的基础点集，从圆形（r=1）开始，然后进行高度缩放，底部缩放，顶部缩放，
-        底部到顶部的缩放变换是线性的，也就是梯形内接变形圆
-        :return:
+        底部到顶部的缩放变换是线性的，也就是梯形内接变形圆（由 hull_geometry 中预先计算的模板向量化得到）
+        :return: 前截面和后截面的点集
         """
-        # 单位圆的点集，12个左侧点，先忽略右侧点
-        # 当Curve为0时，就是square_dots，其与circle_dots做差，令circle_dots加上差值乘以Curve就是最终的点集
-        square_dots = {"up": [
-            np.array([0, 1]),
-            np.array([np.tan(np.deg2rad(15)), 1]),
-            np.array([np.tan(np.deg2rad(30)), 1]),
-            np.array([1, 1]),
-            np.array([1, np.tan(np.deg2rad(30))]),
-            np.array([1, np.tan(np.deg2rad(15))]),
-            np.array([1, 0]),
-        ], "down": [
-            np.array([1, 0]),
-            np.array([1, -np.tan(np.deg2rad(15))]),
-            np.array([1, -np.tan(np.deg2rad(30))]),
-            np.array([1, -1]),
-            np.array([np.tan(np.deg2rad(30)), -1]),
-            np.array([np.tan(np.deg2rad(15)), -1]),
-            np.array([0, -1]),
-        ]}
-        Front_part_curved_circle_dots = {"up": [], "down": []}
-        Back_part_curved_circle_dots = {"up": [], "down": []}
-        for i in range(7):  # 从上到下，一共7个点，也就是从(0, 1, self.front_z)到(1, 0, self.front_z)
-            angle = np.deg2rad(15 * i)
-            circle_up = np.array([np.sin(angle), np.cos(angle)])
-            circle_down = np.array([np.cos(angle), - np.sin(angle)])
-            Front_part_curved_circle_dots["up"].append(
-                np.append(circle_up + (square_dots["up"][i] - circle_up) * (1 - self.UCur), self.front_z))
-            Front_part_curved_circle_dots["down"].append(
-                np.append(circle_down + (square_dots["down"][i] - circle_down) * (1 - self.DCur), self.front_z))
-            Back_part_curved_circle_dots["up"].append(
-                np.append(circle_up + (square_dots["up"][i] - circle_up) * (1 - self.UCur), self.back_z))
-            Back_part_curved_circle_dots["down"].append(
-                np.append(circle_down + (square_dots["down"][i] - circle_down) * (1 - self.DCur), self.back_z))
-            # 进行横向缩放
-            Front_part_curved_circle_dots["up"][i][0] *= self.get_horizontal_scale(
-                Front_part_curved_circle_dots["up"][i][1], True)
-            Front_part_curved_circle_dots["down"][i][0] *= self.get_horizontal_scale(
-                Front_part_curved_circle_dots["down"][i][1], True)
-            Back_part_curved_circle_dots["up"][i][0] *= self.get_horizontal_scale(
-                Back_part_curved_circle_dots["up"][i][1], False)
-            Back_part_curved_circle_dots["down"][i][0] *= self.get_horizontal_scale(
-                Back_part_curved_circle_dots["down"][i][1], False)
-            # 进行y高度缩放
-            Front_part_curved_circle_dots["up"][i][1] *= self.half_height_scale
-            Front_part_curved_circle_dots["down"][i][1] *= self.half_height_scale
-            Back_part_curved_circle_dots["up"][i][1] *= self.Hei / 2
-            Back_part_curved_circle_dots["down"][i][1] *= self.Hei / 2
-            # 进行y高度偏移
-            Front_part_curved_circle_dots["up"][i][1] += self.center_height_offset
-            Front_part_curved_circle_dots["down"][i][1] += self.center_height_offset
-            # 进行y值限制
-            if Front_part_curved_circle_dots["up"][i][1] > self._y_limit[1]:
-                Front_part_curved_circle_dots["up"][i][1] = self._y_limit[1]
-            elif Front_part_curved_circle_dots["up"][i][1] < self._y_limit[0]:
-                Front_part_curved_circle_dots["up"][i][1] = self._y_limit[0]
-            if Front_part_curved_circle_dots["down"][i][1] > self._y_limit[1]:
-                Front_part_curved_circle_dots["down"][i][1] = self._y_limit[1]
-            elif Front_part_curved_circle_dots["down"][i][1] < self._y_limit[0]:
-                Front_part_curved_circle_dots["down"][i][1] = self._y_limit[0]
-        return Front_part_curved_circle_dots, Back_part_curved_circle_dots
+        return get_curve_face_dots(self._table.shape[self._row])
 
     def get_horizontal_scale(self, y, front=True):
         if front:
@@ -600,164 +655,68 @@ class AdjustableHull(NAPart):
         else:
             return ((self.back_up_x - self.back_down_x) * y + (self.back_up_x + self.back_down_x)) / 2
 
-    def get_plot_lines(self):
-        result = {
-            "1": [self.vertex_coordinates["front_up_left"].copy(), self.vertex_coordinates["front_up_right"].copy(),
-                  self.vertex_coordinates["front_down_right"].copy(), self.vertex_coordinates["front_down_left"].copy(),
-                  self.vertex_coordinates["front_up_left"].copy(), self.vertex_coordinates["back_up_left"].copy(),
-                  self.vertex_coordinates["back_up_right"].copy(), self.vertex_coordinates["front_up_right"].copy()],
-            "2": [self.vertex_coordinates["front_down_left"].copy(), self.vertex_coordinates["back_down_left"].copy(),
-                  self.vertex_coordinates["back_down_right"].copy(),
-                  self.vertex_coordinates["front_down_right"].copy()],
-            "3": [self.vertex_coordinates["back_up_left"].copy(), self.vertex_coordinates["back_down_left"].copy()],
-            "4": [self.vertex_coordinates["back_up_right"].copy(), self.vertex_coordinates["back_down_right"].copy()]
-        }
-        # 进行旋转，平移，缩放
-        result = rotate_quaternion2(result, self.Scl, self.Rot)
-        for key in result.keys():
-            for i in range(len(result[key])):
-                result[key][i] += self.Pos
+    def get_local_geometry(self):
+        """
+        :return: 缩放后、旋转平移前的局部坐标（只读，与外形和缩放相同的零件共用，见 hull_geometry.LocalGeometryCache）
+        """
+        return get_local_geometry(self._table.shape[self._row], self.Scl, self.Rot == [0, 0, 0])
 
-        return result
+    def get_plot_lines(self):
+        return get_part_plot_lines(self.get_local_geometry(), self.Pos, self.Rot, self.Rot == [0, 0, 0])
 
     def get_initial_vertex_coordinates(self):
-        return {
-            "front_up_left": np.array([self.front_up_x, self.front_up_y, self.front_z]),
-            "front_up_right": np.array([-self.front_up_x, self.front_up_y, self.front_z]),
-            "front_down_left": np.array([self.front_down_x, self.front_down_y, self.front_z]),
-            "front_down_right": np.array([-self.front_down_x, self.front_down_y, self.front_z]),
-            "back_up_left": np.array([self.back_up_x, self.back_up_y, self.back_z]),
-            "back_up_right": np.array([-self.back_up_x, self.back_up_y, self.back_z]),
-            "back_down_left": np.array([self.back_down_x, self.back_down_y, self.back_z]),
-            "back_down_right": np.array([-self.back_down_x, self.back_down_y, self.back_z]),
-        }
+        return dict(zip(ReadNA.VERTEX_KEYS, self.get_local_geometry().vertex))
 
     def change_attrs(self, position=None, armor=None,
                      length=None, height=None, frontWidth=None, backWidth=None, frontSpread=None, backSpread=None,
                      upCurve=None, downCurve=None, heightScale=None, heightOffset=None,
                      update=False):
-        # ==============================================================================更新零件的各个属性
-        position = self.Pos if position is None else position
-        armor = self.Amr if armor is None else armor
-        length = self.Len if length is None else length
-        height = self.Hei if height is None else height
-        frontWidth = self.FWid if frontWidth is None else frontWidth
-        backWidth = self.BWid if backWidth is None else backWidth
-        frontSpread = self.FSpr if frontSpread is None else frontSpread
-        backSpread = self.BSpr if backSpread is None else backSpread
-        upCurve = self.UCur if upCurve is None else upCurve
-        downCurve = self.DCur if downCurve is None else downCurve
-        heightScale = self.HScl if heightScale is None else heightScale
-        heightOffset = self.HOff if heightOffset is None else heightOffset
-
-        try:
-            self.Pos = [round(float(i), 3) for i in position]
-            self.Amr = int(armor)
-            self.Len = float(length)
-            self.Hei = float(height)
-            self.FWid = float(frontWidth)
-            self.BWid = float(backWidth)
-            self.FSpr = float(frontSpread)
-            self.BSpr = float(backSpread)
-            self.UCur = float(upCurve)
-            self.DCur = float(downCurve)
-            self.HScl = float(heightScale)  # 高度缩放
-            self.HOff = float(heightOffset)  # 高度偏移
-            self._y_limit = [-self.Hei / 2, self.Hei / 2]
-        except ValueError:
-            return False
-        # ==============================================================================初始化零件的各个坐标
-        self.front_z = self.Len / 2  # 零件前端的z坐标
-        self.back_z = -self.Len / 2  # 零件后端的z坐标
-        self.half_height_scale = self.Hei * self.HScl / 2  # 高度缩放的一半
-        self.center_height_offset = self.HOff * self.Hei  # 高度偏移
-        self.front_down_y = self.center_height_offset - self.half_height_scale  # 零件前端下端的y坐标
-        self.front_up_y = self.center_height_offset + self.half_height_scale  # 零件前端上端的y坐标
-        if self.front_down_y < self._y_limit[0]:
-            self.front_down_y = self._y_limit[0]
-        elif self.front_down_y > self._y_limit[1]:
-            self.front_down_y = self._y_limit[1]
-        if self.front_up_y > self._y_limit[1]:
-            self.front_up_y = self._y_limit[1]
-        elif self.front_up_y < self._y_limit[0]:
-            self.front_up_y = self._y_limit[0]
-        self.back_down_y = - self.Hei / 2
-        self.back_up_y = self.Hei / 2
-        self.front_down_x = self.FWid / 2
-        self.back_down_x = self.BWid / 2
-        self.front_up_x = self.front_down_x + self.FSpr / 2  # 扩散也要除以二分之一
-        self.back_up_x = self.back_down_x + self.BSpr / 2  # 扩散也要除以二分之一
-        # ==============================================================================计算绘图所需的数据
-        self.plot_all_dots = []  # 曲面变换前，位置变换后的所有点
-        self.vertex_coordinates = self.get_initial_vertex_coordinates()
-        self.plot_lines = self.get_plot_lines()
-        self.plot_faces = self.get_plot_faces()
-        if update:
-            self.redrawGL()
-        return True
+        return self._change_attrs(position, None, armor,
+                                  (length, height, frontWidth, backWidth, frontSpread, backSpread,
+                                   upCurve, downCurve, heightScale, heightOffset), update)
 
     def change_attrs_with_rot(self, position=None, rotation=None, armor=None, length=None, height=None,
                               frontWidth=None, backWidth=None, frontSpread=None, backSpread=None,
                               upCurve=None, downCurve=None, heightScale=None, heightOffset=None,
                               update=False):
-        # ==============================================================================更新零件的各个属性
-        position = self.Pos if position is None else position
-        rotation = self.Rot if rotation is None else rotation
-        armor = self.Amr if armor is None else armor
-        length = self.Len if length is None else length
-        height = self.Hei if height is None else height
-        frontWidth = self.FWid if frontWidth is None else frontWidth
-        backWidth = self.BWid if backWidth is None else backWidth
-        frontSpread = self.FSpr if frontSpread is None else frontSpread
-        backSpread = self.BSpr if backSpread is None else backSpread
-        upCurve = self.UCur if upCurve is None else upCurve
-        downCurve = self.DCur if downCurve is None else downCurve
-        heightScale = self.HScl if heightScale is None else heightScale
-        heightOffset = self.HOff if heightOffset is None else heightOffset
+        return self._change_attrs(position, self.Rot if rotation is None else rotation, armor,
+                                  (length, height, frontWidth, backWidth, frontSpread, backSpread,
+                                   upCurve, downCurve, heightScale, heightOffset), update)
 
+    def _change_attrs(self, position, rotation, armor, shape, update):
+        """
+        先转换并检查所有的值，全部有效后再一起写入，避免写入一部分后失败，使零件和零件关系图不一致
+        :param position: 位置，None表示不变
+        :param rotation: 旋转，None表示不变（也不取整）
+        :param armor: 装甲，None表示不变
+        :param shape: 按 PartTable.SHAPE_COLUMNS 顺序的十个外形参数，其中的None表示不变
+        :param update: 是否重绘
+        :return: 是否修改成功
+        """
+        # ==============================================================================转换并检查各个属性
         try:
-            self.Pos = [round(float(i), 3) for i in position]
-            self.Rot = [round(float(i), 3) for i in rotation]
-            self.Amr = int(armor)
-            self.Len = float(length)
-            self.Hei = float(height)
-            self.FWid = float(frontWidth)
-            self.BWid = float(backWidth)
-            self.FSpr = float(frontSpread)
-            self.BSpr = float(backSpread)
-            self.UCur = float(upCurve)
-            self.DCur = float(downCurve)
-            self.HScl = float(heightScale)  # 高度缩放
-            self.HOff = float(heightOffset)  # 高度偏移
-            self._y_limit = [-self.Hei / 2, self.Hei / 2]
+            position = [round(float(i), 3) for i in (self.Pos if position is None else position)]
+            rotation = None if rotation is None else [round(float(i), 3) for i in rotation]
+            if len(position) != 3 or (rotation is not None and len(rotation) != 3):
+                raise ValueError
+            armor = int(self.Amr if armor is None else armor)
+            shape = [float(getattr(self, name) if value is None else value)
+                     for name, value in zip(PartTable.SHAPE_COLUMNS, shape)]
         except ValueError:
             return False
-        # ==============================================================================初始化零件的各个坐标
-        self.front_z = self.Len / 2  # 零件前端的z坐标
-        self.back_z = -self.Len / 2  # 零件后端的z坐标
-        self.half_height_scale = self.Hei * self.HScl / 2  # 高度缩放的一半
-        self.center_height_offset = self.HOff * self.Hei  # 高度偏移
-        self.front_down_y = self.center_height_offset - self.half_height_scale  # 零件前端下端的y坐标
-        self.front_up_y = self.center_height_offset + self.half_height_scale  # 零件前端上端的y坐标
-        if self.front_down_y < self._y_limit[0]:
-            self.front_down_y = self._y_limit[0]
-        elif self.front_down_y > self._y_limit[1]:
-            self.front_down_y = self._y_limit[1]
-        if self.front_up_y > self._y_limit[1]:
-            self.front_up_y = self._y_limit[1]
-        elif self.front_up_y < self._y_limit[0]:
-            self.front_up_y = self._y_limit[0]
-        self.back_down_y = - self.Hei / 2
-        self.back_up_y = self.Hei / 2
-        self.front_down_x = self.FWid / 2
-        self.back_down_x = self.BWid / 2
-        self.front_up_x = self.front_down_x + self.FSpr / 2  # 扩散也要除以二分之一
-        self.back_up_x = self.back_down_x + self.BSpr / 2  # 扩散也要除以二分之一
-        # ==============================================================================计算绘图所需的数据
-        self.plot_all_dots = []  # 曲面变换前，位置变换后的所有点
-        self.vertex_coordinates = self.get_initial_vertex_coordinates()
-        self.plot_lines = self.get_plot_lines()
-        self.plot_faces = self.get_plot_faces()
+        relation_map = self.allParts_relationMap if self.read_na_obj else None
+        relation_state = relation_map.get_part_state(self) if relation_map else None
+        # ==============================================================================更新零件的各个属性
+        self.Pos = position
+        if rotation is not None:
+            self.Rot = rotation
+        self.Amr = armor
+        self._table.shape[self._row] = shape
+        # ==============================================================================清除绘图数据，使用时重新计算
+        self.reset_plot_data()
+        # ==============================================================================增量更新零件关系图
+        if relation_map:
+            relation_map.update_part(self, relation_state)
         if update:
             self.redrawGL()
         return True
@@ -787,6 +746,8 @@ class AdjustableHull(NAPart):
         down_curve_diff = float(downCurve) - original_down_curve
         height_scale_diff = float(heightScale) - original_height_scale
         height_offset_diff = float(heightOffset) - original_height_offset
+        # 修改前的零件关系（修改属性后零件关系图会立即更新）
+        relation_map = {direction: dict(parts) for direction, parts in self.allParts_relationMap.basicMap[self].items()}
         # 更新零件的属性
         self.change_attrs(position, armor,
                           length, height, frontWidth, backWidth, frontSpread, backSpread,
@@ -794,7 +755,6 @@ class AdjustableHull(NAPart):
         front_part, back_part, left_part, right_part, up_part, down_part = None, None, None, None, None, None
         front_parts, back_parts, left_parts, right_parts, up_parts, down_parts = [], [], [], [], [], []
         # 对前后左右的可能需要修改的对象进行同步修改
-        relation_map = self.allParts_relationMap.basicMap[self]
         # 对方向关系映射进行遍历
         for direction in [CONST.FRONT, CONST.BACK, CONST.LEFT, CONST.RIGHT, CONST.UP, CONST.DOWN]:
             if relation_map[direction] == {}:  # 该方向没有零件，跳过
@@ -1330,10 +1290,7 @@ class AdjustableHull(NAPart):
 
     def scale(self, ratio: list, update=False):
         super().scale(ratio)
-        self.plot_all_dots = []  # 曲面变换前，位置变换后的所有点
-        self.vertex_coordinates = self.get_initial_vertex_coordinates()
-        self.plot_lines = self.get_plot_lines()
-        self.plot_faces = self.get_plot_faces()
+        self.reset_plot_data()
         if update:
             self.redrawGL()
         return True
@@ -1398,20 +1355,7 @@ class AdjustableHull(NAPart):
             self.plot_faces = self.plot_faces
         except AttributeError:
             return
-        for draw_method, faces_dots in self.plot_faces.items():
-            # draw_method是字符串，需要转换为OpenGL的常量
-            for face in faces_dots:
-                gl.glBegin(eval(f"gl.{draw_method}"))
-                if len(face) == 3 or len(face) == 4:
-                    normal = get_normal(face[0], face[1], face[2])
-                elif len(face) > 12:
-                    normal = get_normal(face[0], face[6], face[12])
-                else:
-                    continue
-                gl.glNormal3f(normal.x(), normal.y(), normal.z())
-                for dot in face:
-                    gl.glVertex3f(dot[0], dot[1], dot[2])
-                gl.glEnd()
+        self.draw_faces(gl)
         gl.glEndList()
 
     def draw(self, gl, transparent=False):
@@ -1431,21 +1375,24 @@ class AdjustableHull(NAPart):
             self.plot_faces = self.plot_faces
         except AttributeError:
             return
+        self.draw_faces(gl)
+        gl.glEndList()
+
+    def draw_faces(self, gl):
+        """
+        逐面绘制零件（编译显示列表时使用），法向量取自预先计算的plot_normals
+        """
         for draw_method, faces_dots in self.plot_faces.items():
             # draw_method是字符串，需要转换为OpenGL的常量
-            for face in faces_dots:
-                gl.glBegin(eval(f"gl.{draw_method}"))
-                if len(face) == 3 or len(face) == 4:
-                    normal = get_normal(face[0], face[1], face[2])
-                elif len(face) > 12:
-                    normal = get_normal(face[0], face[6], face[12])
-                else:
+            method = getattr(gl, draw_method)
+            for face, normal in zip(faces_dots, self.plot_normals[draw_method].tolist()):
+                if len(face) < 3 or 4 < len(face) <= 12:  # 无法确定法向量的面不绘制
                     continue
-                gl.glNormal3f(normal.x(), normal.y(), normal.z())
+                gl.glBegin(method)
+                gl.glNormal3f(*normal)
                 for dot in face:
                     gl.glVertex3f(dot[0], dot[1], dot[2])
                 gl.glEnd()
-        gl.glEndList()
 
     def redrawGL(self):
         # 修改零件本身的genList状态
@@ -1467,20 +1414,7 @@ class AdjustableHull(NAPart):
             return
         self.selected_genList = gl.glGenLists(1)
         gl.glNewList(self.selected_genList, gl.GL_COMPILE_AND_EXECUTE)
-        for draw_method, faces_dots in self.plot_faces.items():
-            # draw_method是字符串，需要转换为OpenGL的常量
-            for face in faces_dots:
-                gl.glBegin(eval(f"gl.{draw_method}"))
-                if len(face) == 3 or len(face) == 4:
-                    normal = get_normal(face[0], face[1], face[2])
-                elif len(face) > 12:
-                    normal = get_normal(face[0], face[6], face[12])
-                else:
-                    continue
-                gl.glNormal3f(normal.x(), normal.y(), normal.z())
-                for dot in face:
-                    gl.glVertex3f(dot[0], dot[1], dot[2])
-                gl.glEnd()
+        self.draw_faces(gl)
         gl.glColor4f(*theme_color["橙色"][0])
         gl.glLineWidth(3)
         for _line_name, line in self.plot_lines.items():
@@ -1493,13 +1427,12 @@ class AdjustableHull(NAPart):
 
 
 class MainWeapon(NAPart):
-    All = []
+    __slots__ = ("ManualControl", "ElevatorH")
 
     def __init__(self, read_na, Id, pos, rot, scale, color, armor, manual_control, elevator):
         super().__init__(read_na, Id, pos, rot, scale, color, armor)
         self.ManualControl = manual_control
         self.ElevatorH = elevator
-        MainWeapon.All.append(self)
 
     # 定义被存为json文件的格式
     def to_dict(self):
@@ -1515,19 +1448,34 @@ class MainWeapon(NAPart):
             "ElevatorH": self.ElevatorH,
         }
 
+    def extra_dict(self):
+        return {"ManualControl": self.ManualControl, "ElevatorH": self.ElevatorH}
+
 
 class ReadNA:
     is_reading = False
     NaPathMode = "folder_path"
     NaDataMode = "data"
+    design_cache = None  # DesignCache对象，由主程序设置，为None时不使用缓存
+    load_workers = 1  # 读取na文件时使用的进程数，大于1时并行实例化零件
+    load_chunk_size = 512  # 并行读取时每个任务包含的零件数
+    load_parallel_min_size = 2 * 1024 * 1024  # 文件小于该大小（字节）时，启动进程池的开销大于收益，仍然串行读取
+    # 设计缓存中零件类型的编号
+    PART_TYPE_CODES = {"NAPart": 0, "AdjustableHull": 1, "MainWeapon": 2}
+    VERTEX_KEYS = ("front_up_left", "front_up_right", "front_down_left", "front_down_right",
+                   "back_up_left", "back_up_right", "back_down_left", "back_down_right")
+    PLOT_LINE_SIZES = PLOT_LINE_SIZES
+    DRAW_METHODS = ("GL_QUADS", "GL_TRIANGLES", "GL_QUAD_STRIP", "GL_POLYGON")
 
     def __init__(self, filepath: Union[str, bool] = False, data=None, show_statu_func=None, glWin=None,
-                 design_tab=False):
+                 design_tab=False, relation_index=None):
         """
 
         :param filepath:
         :param data: 字典，键是颜色的十六进制表示，值是零件的列表，但是尚未实例化，是字典形式的数据
         :param show_statu_func:
+        :param relation_index: 与data一起保存在工程文件中的零件关系索引（PartRelationMap.dump_index），
+                               与零件一致时直接加载，否则重新建立零件关系图
         """
         self.glWin = glWin  # 用于绘制的窗口
         self.filename: str  # 文件名
@@ -1543,14 +1491,17 @@ class ReadNA:
         self.ColorPartsMap: Dict[str, List[NAPart]]  # 用于绘制的颜色-零件映射表
         self.show_statu_func: Callable  # 用于显示状态的函数
         self.partRelationMap: PartRelationMap  # 零件关系图，包含零件的上下左右前后关系
+        self.partTable: PartTable  # 零件属性的列式存储表
+        self.unsaved_cache_path: Optional[str]  # 已解析但还没有保存到设计缓存的na文件路径，见save_design_cache
         # 赋值
         self.show_statu_func = show_statu_func
         self.Parts = []
+        self.Weapons = []
+        self.AdjustableHulls = []
+        self.partTable = PartTable()  # 零件属性的列式存储表
         self.partRelationMap = PartRelationMap(self, self.show_statu_func)  # 零件关系图，包含零件的上下左右前后关系
+        self.unsaved_cache_path = None
         if filepath is False:
-            total_layer_time = 0
-            total_relation_time = 0
-            total_dot_time = 0
             self.Mode = ReadNA.NaDataMode
             # ===================================================================== 实例化data中的零件
             self.ColorPartsMap = {}
@@ -1602,120 +1553,383 @@ class ReadNA:
                         )
                     else:
                         raise ValueError(f"未知的零件类型：{part['Typ']}")
-                    # 添加颜色
-                    _color = f"#{part['Col']}"
-                    if _color not in self.ColorPartsMap.keys():
-                        self.ColorPartsMap[_color] = []
-                    self.ColorPartsMap[_color].append(obj)
-                    self.Parts.append(obj)
-                    if design_tab:
-                        NAPart.hull_design_tab_id_map[id(obj) % 4294967296] = obj
-                    # 初始化零件关系图
-                    layer_t, relation_t, dot_t = self.partRelationMap.add_part(obj)
-                    total_layer_time += layer_t
-                    total_relation_time += relation_t
-                    total_dot_time += dot_t
-                    average_layer_time = round(total_layer_time / (i + 1), 4)
-                    average_relation_time = round(total_relation_time / (i + 1), 4)
-                    average_dot_time = round(total_dot_time / (i + 1), 4)
-                    # 标准化（填补0）
-                    layer_t = str(layer_t).ljust(6, '0')
-                    relation_t = str(relation_t).ljust(6, '0')
-                    dot_t = str(dot_t).ljust(6, '0')
-                    average_layer_time = str(average_layer_time).ljust(6, '0')
-                    average_relation_time = str(average_relation_time).ljust(6, '0')
-                    average_dot_time = str(average_dot_time).ljust(6, '0')
+                    self.add_read_part(obj, design_tab)
                     if i % 13 == 0:
                         process = round(i / total_parts_num * 100, 2)
-                        self.show_statu_func(
-                            f"正在实例化第 {i} / {total_parts_num} 个零件： {process} %"
-                            f"\t\t\t\t单件耗时：     截面对象  {layer_t} s     零件关系  {relation_t} s     节点集合  {dot_t} s"
-                            f"\t\t平均耗时：     截面对象  {average_layer_time} s     零件关系  {average_relation_time} s     节点集合  {average_dot_time} s",
-                            "process")
+                        self.show_statu_func(f"正在实例化第 {i} / {total_parts_num} 个零件： {process} %", "process")
                     if self.glWin and self.glWin.initialized and i % (total_parts_num / 400) == 0:
                         self.glWin.paintGL()
                     i += 1
             self.show_statu_func(f"零件实例化完成，耗时：{round(time.time() - st, 2)} s", "success")
-            self.partRelationMap.sort()
+            # ===================================================================== 初始化零件关系图
+            st = time.time()
+            if self.partRelationMap.load_index(self.Parts, relation_index):
+                self.show_statu_func(f"已从工程文件加载零件关系图，耗时：{round(time.time() - st, 2)} s", "success")
+            else:
+                self.partRelationMap.build(self.Parts)
+                self.show_statu_func(f"零件关系图建立完成，耗时：{round(time.time() - st, 2)} s", "success")
             # 上方已经初始化了drawMap，不init了
         else:  # =========================================================================== 读取na文件
             self.Mode = ReadNA.NaPathMode
             self.filename = filepath.split('\\')[-1]
             self.filepath = filepath
-            try:
-                self.root = ET.parse(filepath).getroot()
-            except ET.ParseError:
-                print("警告：该文件已损坏")
             self.ShipName = self.filename[:-3]
-            self.Author = self.root.find('ship').attrib['author']
-            self.HornType = self.root.find('ship').attrib['hornType']
-            self.HornPitch = self.root.find('ship').attrib['hornPitch']
-            try:
-                self.TracerCol = self.root.find('ship').attrib['tracerCol']
-            except KeyError:
-                self.TracerCol = None
-            self._xml_all_parts = self.root.findall('ship/part')
-            # print(self._xml_all_parts)
-            self.Weapons = MainWeapon.All
-            self.AdjustableHulls = AdjustableHull.All
+            self.Author = None
+            self.HornType = None
+            self.HornPitch = None
+            self.TracerCol = None
             self.ColorPartsMap = {}
-            part_num = len(self._xml_all_parts)
-            for i, part in enumerate(self._xml_all_parts):
-                if i % 13 == 0:
-                    process = round(i / part_num * 100, 2)
-                    self.show_statu_func(f"正在读取第{i}个零件，进度：{process} %", "process")
-                _id = str(part.attrib['id'])
-                _pos = part.find('position').attrib
-                _rot = part.find('rotation').attrib
-                _scl = part.find('scale').attrib
-                _pos = (float(_pos['x']), float(_pos['y']), float(_pos['z']))
-                _rot = (round(float(_rot['x']), 3), round(float(_rot['y']), 3), round(float(_rot['z']), 3))
-                _scl = (float(_scl['x']), float(_scl['y']), float(_scl['z']))
-                _scl = tuple(abs(i) for i in _scl)
-                _col = str(part.find('color').attrib['hex'])
-                _amr = int(part.find('armor').attrib['value'])
-                # 如果ID为0，就添加到可调节船体
-                if _id == '0':
-                    _data = part.find('data').attrib
-                    obj = AdjustableHull(
-                        self, _id, _pos, _rot, _scl, _col, _amr,
-                        float(_data['length']), float(_data['height']),
-                        float(_data['frontWidth']), float(_data['backWidth']),
-                        float(_data['frontSpread']), float(_data['backSpread']),
-                        float(_data['upCurve']), float(_data['downCurve']),
-                        float(_data['heightScale']), float(_data['heightOffset'])
-                    )
-                # 如果有turret，就添加到主武器
-                elif part.find('turret') is not None:
-                    try:
-                        manual_control = part.find('turret').attrib['manualControl']
-                    except KeyError:
-                        manual_control = None
-                    try:
-                        elevatorH = part.find('turret').attrib['evevator']
-                    except KeyError:
-                        elevatorH = None
-                    obj = MainWeapon(self, _id, _pos, _rot, _scl, _col, _amr,
-                                     manual_control, elevatorH)
-                # 最后添加到普通零件
-                else:
-                    obj = NAPart(self, _id, _pos, _rot, _scl, _col, _amr)
-                # 添加颜色
-                _color = f"#{part.find('color').attrib['hex']}"
-                if _color not in self.ColorPartsMap.keys():
-                    self.ColorPartsMap[_color] = []
-                self.ColorPartsMap[_color].append(obj)
-                # print("正在读取文件：", self.filename)
-                # print(self.ColorPartsMap)
-                self.Parts.append(obj)
-                if design_tab:
-                    NAPart.hull_design_tab_id_map[id(obj) % 4294967296] = obj
-                # 注意，这里没有对partRelationMap进行初始化，因为这里只是读取零件，还没有选颜色，所以要等到用户选颜色之后才能初始化
-        self.show_statu_func("零件读取完成!", "success")
+            cache_data = ReadNA.design_cache.load(filepath) if ReadNA.design_cache else None
+            if cache_data is not None:
+                self.show_statu_func("设计缓存命中，正在从缓存中读取零件", "process")
+                self.load_cache_data(*cache_data, design_tab=design_tab)
+            else:
+                self.read_na_file(filepath, design_tab)
+        if ReadNA.design_cache and self.Mode == ReadNA.NaPathMode:
+            self.show_statu_func(f"零件读取完成!    {ReadNA.design_cache.get_statu_text()}", "success")
+        else:
+            self.show_statu_func("零件读取完成!", "success")
+
+    def read_na_file(self, filepath, design_tab):
+        """
+        解析na文件，实例化所有零件，解析成功后记录为待保存到设计缓存（见save_design_cache）
+        :param filepath: na文件路径
+        :param design_tab: 是否为设计标签页
+        """
+        file_size = max(os.path.getsize(filepath), 1)
+        i = 0
+        try:
+            if ReadNA.load_workers > 1 and file_size >= ReadNA.load_parallel_min_size:
+                self.read_na_file_parallel(filepath, design_tab, file_size)
+            else:
+                for record, read_bytes in self.iter_part_records(filepath):
+                    if i % 13 == 0:
+                        process = round(read_bytes / file_size * 100, 2)
+                        self.show_statu_func(
+                            f"正在读取第{i}个零件，已读取 {round(read_bytes / 1048576, 2)} MB，进度：{process} %",
+                            "process")
+                    self.add_read_part(self.create_part_from_record(record, self), design_tab)
+                    i += 1
+                    # 注意，这里没有对partRelationMap进行初始化，因为这里只是读取零件，还没有选颜色，所以要等到用户选颜色之后才能初始化
+        except ET.ParseError:
+            # 流式读取时已经实例化了损坏位置之前的零件，全部撤销，不保留读取了一半的设计
+            self.remove_read_parts()
+            self.Author = self.HornType = self.HornPitch = self.TracerCol = None
+            print("警告：该文件已损坏")
+            return
+        if ReadNA.design_cache:
+            self.unsaved_cache_path = filepath
+
+    def save_design_cache(self):
+        """
+        将解析结果保存到设计缓存。打包时需要所有可调节船体的绘图数据，而读取时不计算绘图数据，
+        所以不在读取时保存，由NAHull在第一次绘制完成后调用（局部坐标已在局部坐标缓存中）
+        """
+        if self.unsaved_cache_path is None or not ReadNA.design_cache:
+            return
+        filepath, self.unsaved_cache_path = self.unsaved_cache_path, None
+        ReadNA.design_cache.save(filepath, *self.get_cache_data())
+
+    def read_na_file_parallel(self, filepath, design_tab, file_size):
+        """
+        将零件流按load_chunk_size分块，交给进程池实例化零件并计算绘图数据，
+        子进程以打包数组的形式返回结果，再按分块的顺序合并，零件顺序和颜色分组与串行读取相同
+        :param filepath: na文件路径
+        :param design_tab: 是否为设计标签页
+        :param file_size: 文件大小
+        """
+        futures = []
+        with ProcessPoolExecutor(max_workers=ReadNA.load_workers) as executor:
+            chunk = []
+            for record, read_bytes in self.iter_part_records(filepath):
+                chunk.append(record)
+                if len(chunk) == ReadNA.load_chunk_size:
+                    futures.append(executor.submit(build_packed_parts, chunk))
+                    chunk = []
+                    process = round(read_bytes / file_size * 100, 2)
+                    self.show_statu_func(
+                        f"已分配{len(futures)}块零件，已读取 {round(read_bytes / 1048576, 2)} MB，进度：{process} %",
+                        "process")
+            if chunk:
+                futures.append(executor.submit(build_packed_parts, chunk))
+            for i, future in enumerate(futures):
+                self.load_packed_arrays(future.result(), design_tab)
+                self.show_statu_func(f"正在合并第 {i + 1} / {len(futures)} 块零件", "process")
+
+    def iter_part_records(self, filepath):
+        """
+        以流的方式逐个读取na文件中的零件，每读完一个<part>就将其转换为零件记录，并清除该元素，
+        避免整个xml树常驻内存。读取到<ship>时顺便读取船的属性。
+        :param filepath: na文件路径
+        :return: 生成器，每次返回（零件记录，已读取的字节数）
+        """
+        with open(filepath, 'rb') as f:
+            ship = None
+            for event, elem in ET.iterparse(f, events=('start', 'end')):
+                if event == 'start':
+                    if elem.tag == 'ship' and ship is None:
+                        ship = elem
+                        self.Author = elem.attrib.get('author')
+                        self.HornType = elem.attrib.get('hornType')
+                        self.HornPitch = elem.attrib.get('hornPitch')
+                        self.TracerCol = elem.attrib.get('tracerCol')
+                    continue
+                if elem.tag != 'part' or ship is None:
+                    continue
+                record = self.get_part_record(elem)
+                # 清除已读取的元素
+                elem.clear()
+                ship.clear()
+                yield record, f.tell()
+
+    @staticmethod
+    def get_part_record(part):
+        """
+        将<part>元素转换为零件记录
+        :param part: xml元素
+        :return: 字典，包含零件的id，位置，旋转，缩放，颜色，装甲，以及可调节船体数据和炮塔数据（没有则为None）
+        """
+        _pos = part.find('position').attrib
+        _rot = part.find('rotation').attrib
+        _scl = part.find('scale').attrib
+        _data = part.find('data')
+        _turret = part.find('turret')
+        return {
+            "id": str(part.attrib['id']),
+            "pos": (float(_pos['x']), float(_pos['y']), float(_pos['z'])),
+            "rot": (round(float(_rot['x']), 3), round(float(_rot['y']), 3), round(float(_rot['z']), 3)),
+            "scl": (abs(float(_scl['x'])), abs(float(_scl['y'])), abs(float(_scl['z']))),
+            "col": str(part.find('color').attrib['hex']),
+            "amr": int(part.find('armor').attrib['value']),
+            "data": dict(_data.attrib) if _data is not None else None,
+            "turret": dict(_turret.attrib) if _turret is not None else None,
+        }
+
+    @staticmethod
+    def create_part_from_record(record, read_na):
+        """
+        根据零件记录实例化零件
+        :param record: get_part_record返回的零件记录
+        :param read_na: 零件所属的ReadNA（或提供partTable和partRelationMap的对象，见PartChunk）
+        :return: NAPart, AdjustableHull 或 MainWeapon
+        """
+        _id, _pos, _rot, _scl = record["id"], record["pos"], record["rot"], record["scl"]
+        _col, _amr = record["col"], record["amr"]
+        # 如果ID为0，就添加到可调节船体
+        if _id == '0':
+            _data = record["data"]
+            return AdjustableHull(
+                read_na, _id, _pos, _rot, _scl, _col, _amr,
+                float(_data['length']), float(_data['height']),
+                float(_data['frontWidth']), float(_data['backWidth']),
+                float(_data['frontSpread']), float(_data['backSpread']),
+                float(_data['upCurve']), float(_data['downCurve']),
+                float(_data['heightScale']), float(_data['heightOffset'])
+            )
+        # 如果有turret，就添加到主武器
+        if record["turret"] is not None:
+            manual_control = record["turret"].get('manualControl')
+            elevatorH = record["turret"].get('evevator')
+            return MainWeapon(read_na, _id, _pos, _rot, _scl, _col, _amr, manual_control, elevatorH)
+        # 最后添加到普通零件
+        return NAPart(read_na, _id, _pos, _rot, _scl, _col, _amr)
+
+    def add_read_part(self, obj, design_tab):
+        """
+        将读取到的零件添加到颜色-零件映射表和零件列表
+        """
+        _color = f"#{obj.Col}"
+        if _color not in self.ColorPartsMap.keys():
+            self.ColorPartsMap[_color] = []
+        self.ColorPartsMap[_color].append(obj)
+        self.Parts.append(obj)
+        if isinstance(obj, AdjustableHull):
+            self.AdjustableHulls.append(obj)
+        elif isinstance(obj, MainWeapon):
+            self.Weapons.append(obj)
+        if design_tab:
+            NAPart.hull_design_tab_id_map[id(obj) % 4294967296] = obj
+
+    def remove_read_parts(self):
+        """
+        撤销add_read_part添加的所有零件，并释放它们在零件表中的行（读取失败时使用）
+        """
+        for part in self.Parts:
+            self.partTable.remove(part._row)
+            key = id(part) % 4294967296
+            if NAPart.id_map.get(key) is part:
+                del NAPart.id_map[key]
+            if NAPart.hull_design_tab_id_map.get(key) is part:
+                del NAPart.hull_design_tab_id_map[key]
+        self.Parts.clear()
+        self.AdjustableHulls.clear()
+        self.Weapons.clear()
+        self.ColorPartsMap.clear()
+
+    def get_cache_data(self):
+        """
+        将解析结果打包为设计缓存的格式
+        :return: （元数据，数组字典）
+        """
+        meta = {
+            "ShipName": self.ShipName, "Author": self.Author, "HornType": self.HornType,
+            "HornPitch": self.HornPitch, "TracerCol": self.TracerCol,
+        }
+        return meta, self.get_packed_arrays()
+
+    def get_packed_arrays(self):
+        """
+        将所有零件打包为数组，见 pack_parts
+        :return: 数组字典
+        """
+        return pack_parts(self.Parts, self.partTable)
+
+    def load_cache_data(self, meta, arrays, design_tab=False):
+        """
+        从设计缓存中实例化零件，不解析xml，也不重新计算绘图数据
+        :param meta: 元数据
+        :param arrays: 数组字典（内存映射）
+        :param design_tab: 是否为设计标签页
+        """
+        self.Author = meta["Author"]
+        self.HornType = meta["HornType"]
+        self.HornPitch = meta["HornPitch"]
+        self.TracerCol = meta["TracerCol"]
+        self.load_packed_arrays(arrays, design_tab)
+
+    def load_packed_arrays(self, arrays, design_tab=False):
+        """
+        根据get_packed_arrays打包的数组实例化零件，按原来的顺序添加到零件列表和颜色-零件映射表
+        :param arrays: 数组字典
+        :param design_tab: 是否为设计标签页
+        """
+        ids, colors = arrays["ids"].tolist(), arrays["colors"].tolist()
+        pos, rot, scl = arrays["pos"].tolist(), arrays["rot"].tolist(), arrays["scl"].tolist()
+        amr, shape = arrays["amr"].tolist(), arrays["shape"].tolist()
+        manual_control = [None if is_none else value for value, is_none in
+                          zip(arrays["manual_control"].tolist(), arrays["manual_control_none"].tolist())]
+        elevator = [None if is_none else value for value, is_none in
+                    zip(arrays["elevator"].tolist(), arrays["elevator_none"].tolist())]
+        packed_geometry = PackedGeometry(arrays)  # 可调节船体的绘图数据在第一次使用时才解包
+        hull_i = weapon_i = 0
+        for i, type_code in enumerate(arrays["types"].tolist()):
+            _pos, _rot, _scl = tuple(pos[i]), tuple(rot[i]), tuple(scl[i])
+            if type_code == ReadNA.PART_TYPE_CODES["AdjustableHull"]:
+                obj = AdjustableHull(
+                    self, ids[i], _pos, _rot, _scl, colors[i], amr[i], *shape[i],
+                    _packed_geometry=(packed_geometry, hull_i))
+                hull_i += 1
+            elif type_code == ReadNA.PART_TYPE_CODES["MainWeapon"]:
+                obj = MainWeapon(self, ids[i], _pos, _rot, _scl, colors[i], amr[i],
+                                 manual_control[weapon_i], elevator[weapon_i])
+                weapon_i += 1
+            else:
+                obj = NAPart(self, ids[i], _pos, _rot, _scl, colors[i], amr[i])
+            self.add_read_part(obj, design_tab)
+
+
+class PackedGeometry:
+    def __init__(self, arrays):
+        """
+        ReadNA.get_packed_arrays打包的可调节船体绘图数据，由各个零件在第一次使用时解包
+        :param arrays: 数组字典
+        """
+        # 绘图数据复制到普通内存中，避免零件持有只读的内存映射
+        self.vertex, self.lines, self.nodes = np.array(arrays["vertex"]), np.array(arrays["lines"]), np.array(arrays["nodes"])
+        self.face_points = np.array(arrays["face_points"])
+        self.face_sizes, self.face_methods = arrays["face_sizes"].tolist(), arrays["face_methods"].tolist()
+        self.face_normals = np.array(arrays["face_normals"])
+        hull_face_nums = np.asarray(arrays["hull_face_nums"], dtype=np.int64)
+        # 每个可调节船体的第一个面在face_sizes中的序号，以及每个面的第一个点在face_points中的序号
+        self.hull_face_starts = np.concatenate(([0], np.cumsum(hull_face_nums))).tolist()
+        self.face_point_starts = np.concatenate(([0], np.cumsum(self.face_sizes, dtype=np.int64))).tolist()
+
+    def unpack(self, hull_i):
+        """
+        :param hull_i: 可调节船体的序号
+        :return: vertex_coordinates, plot_lines, plot_faces, plot_normals, operation_dot_nodes, plot_all_dots
+        """
+        vertex_coordinates = dict(zip(ReadNA.VERTEX_KEYS, self.vertex[hull_i]))
+        _lines = list(self.lines[hull_i])
+        plot_lines, start = {}, 0
+        for key, size in ReadNA.PLOT_LINE_SIZES:
+            plot_lines[key] = _lines[start:start + size]
+            start += size
+        plot_faces = {method: [] for method in ReadNA.DRAW_METHODS}
+        normal_index = {method: [] for method in ReadNA.DRAW_METHODS}
+        for face_i in range(self.hull_face_starts[hull_i], self.hull_face_starts[hull_i + 1]):
+            point_i = self.face_point_starts[face_i]
+            method = ReadNA.DRAW_METHODS[self.face_methods[face_i]]
+            plot_faces[method].append(list(self.face_points[point_i:point_i + self.face_sizes[face_i]]))
+            normal_index[method].append(face_i)
+        plot_normals = {method: self.face_normals[index] for method, index in normal_index.items()}
+        operation_dot_nodes = list(self.nodes[hull_i])
+        if plot_faces["GL_POLYGON"]:
+            plot_all_dots = plot_faces["GL_POLYGON"][0] + plot_faces["GL_POLYGON"][1]
+        else:
+            plot_all_dots = operation_dot_nodes
+        return vertex_coordinates, plot_lines, plot_faces, plot_normals, operation_dot_nodes, plot_all_dots
+
+
+def pack_parts(parts, table):
+    """
+    将零件打包为数组：零件表的各列，以及按零件表批量计算的可调节船体的绘图数据
+    （顶点，线框，节点为定长数组；面为所有点拼接成的数组，加上每个面的点数和绘制方法）
+    :param parts: 零件列表
+    :param table: 零件所在的零件表
+    :return: 数组字典
+    """
+    rows = table.get_rows(parts)
+    hulls = [part for part in parts if isinstance(part, AdjustableHull)]
+    weapons = [part for part in parts if isinstance(part, MainWeapon)]
+    hull_rows = table.get_rows(hulls)
+    no_rotate = np.fromiter((hull.Rot == [0, 0, 0] for hull in hulls), dtype=bool, count=len(hulls))
+    geometry = get_hulls_geometry(table.shape[hull_rows], table.pos[hull_rows],
+                                  table.rot[hull_rows], table.scl[hull_rows], no_rotate)
+    return {
+        "types": np.array([ReadNA.PART_TYPE_CODES[part.__class__.__name__] for part in parts], dtype=np.uint8),
+        "ids": np.array([part.Id for part in parts], dtype=str),
+        "colors": np.array([part.Col for part in parts], dtype=str),
+        "pos": table.pos[rows],
+        "rot": table.rot[rows],
+        "scl": table.scl[rows],
+        "amr": table.amr[rows],
+        "shape": table.shape[rows],
+        "manual_control": np.array([str(w.ManualControl) for w in weapons], dtype=str),
+        "manual_control_none": np.array([w.ManualControl is None for w in weapons], dtype=bool),
+        "elevator": np.array([str(w.ElevatorH) for w in weapons], dtype=str),
+        "elevator_none": np.array([w.ElevatorH is None for w in weapons], dtype=bool),
+        **geometry,
+    }
+
+
+class PartChunk:
+    __slots__ = ("partTable", "partRelationMap")
+
+    def __init__(self):
+        """
+        子进程中实例化一块零件时代替ReadNA作为零件的所属对象：只提供零件表，不建立零件关系图
+        """
+        self.partTable = PartTable()
+        self.partRelationMap = None
+
+
+def build_packed_parts(records):
+    """
+    在子进程中实例化一块零件并计算绘图数据
+    :param records: ReadNA.get_part_record返回的零件记录列表
+    :return: 打包后的数组字典（见pack_parts）
+    """
+    chunk = PartChunk()
+    parts = [ReadNA.create_part_from_record(record, chunk) for record in records]
+    return pack_parts(parts, chunk.partTable)
 
 
 class PartRelationMap:
     last_map = None
+    INDEX_VERSION = 1  # 保存在工程文件中的零件关系索引（dump_index）的格式版本
+    LAYER_MAP_NAMES = ("xzDotsLayerMap", "xyDotsLayerMap", "yzDotsLayerMap",
+                       "xzPartsLayerMap", "xyPartsLayerMap", "yzPartsLayerMap")
 
     def __init__(self, read_na, show_statu_func):
         """
@@ -1727,70 +1941,38 @@ class PartRelationMap:
         self.Parts = read_na.Parts
         self.na_hull = read_na  # na船体对象
         """点平面集"""
-        self.xzDotsLayerMap = {  # y: [Part0, Part1, ...]
-        }  # 每一水平截面层的点，根据basicMap的前后左右关系，将点分为同一层
-        self.xyDotsLayerMap = {  # z: [Part0, Part1, ...]
-        }  # 每一前后截面层的点，根据basicMap的上下左右关系，将点分为同一层
-        self.yzDotsLayerMap = {  # x: [Part0, Part1, ...]
-        }  # 每一左右截面层的点，根据basicMap的上下前后关系，将点分为同一层
+        self.xzDotsLayerMap = LayerIndex()  # y: [Part0, Part1, ...]，每一水平截面层的点，根据basicMap的前后左右关系，将点分为同一层
+        self.xyDotsLayerMap = LayerIndex()  # z: [Part0, Part1, ...]，每一前后截面层的点，根据basicMap的上下左右关系，将点分为同一层
+        self.yzDotsLayerMap = LayerIndex()  # x: [Part0, Part1, ...]，每一左右截面层的点，根据basicMap的上下前后关系，将点分为同一层
         """零件平面集"""
-        self.xzPartsLayerMap = {  # y: [Part0, Part1, ...]
-        }  # 每一水平截面层的零件，根据basicMap的前后左右关系，将零件分为同一层，优化basicMap添加零件的速度
-        self.xyPartsLayerMap = {  # z: [Part0, Part1, ...]
-        }  # 每一前后截面层的零件，根据basicMap的上下左右关系，将零件分为同一层，优化basicMap添加零件的速度
-        self.yzPartsLayerMap = {  # x: [Part0, Part1, ...]
-        }  # 每一左右截面层的零件，根据basicMap的上下前后关系，将零件分为同一层，优化basicMap添加零件的速度
+        self.xzPartsLayerMap = LayerIndex()  # y: [Part0, Part1, ...]，每一水平截面层的零件，根据basicMap的前后左右关系，将零件分为同一层，优化basicMap添加零件的速度
+        self.xyPartsLayerMap = LayerIndex()  # z: [Part0, Part1, ...]，每一前后截面层的零件，根据basicMap的上下左右关系，将零件分为同一层，优化basicMap添加零件的速度
+        self.yzPartsLayerMap = LayerIndex()  # x: [Part0, Part1, ...]，每一左右截面层的零件，根据basicMap的上下前后关系，将零件分为同一层，优化basicMap添加零件的速度
         """零件关系"""
-        self.basicMap = {  # 以零件为基础的关系图，包含零件的上下左右前后和距离关系
-            # 零件对象： {方向0：{对象0：距离0, 对象1：距离1, ...}, 方向1：{对象0：距离0, 对象1：距离1, ...}, ...}
-            # NAPart: {PartRelationMap.FRONT: {FrontPart0: FrontValue0, ...},
-            #        PartRelationMap.BACK: {BackPart0: BackValue0, ...},
-            #        PartRelationMap.UP: {UpPart0: UpValue0, ...},
-            #        PartRelationMap.DOWN: {DownPart0: DownValue0, ...},
-            #        PartRelationMap.LEFT: {LeftPart0: LeftValue0, ...},
-            #        PartRelationMap.RIGHT: {RightPart0: RightValue0, ...}}
-            #        PartRelationMap.SAME: {SamePart0: 0, ...}}
-        }  # 注意！生成完之后，会在OpenGL_objs.NaHull.getDrawMap()进行添加零件和排序，因为那个时候DrawMap才生成出来
+        self.basicMap = BasicMapView()  # 以零件为基础的关系图，包含零件的上下左右前后和距离关系
+        # 只读视图，接口与原来的字典相同：
+        # 零件对象： {方向0：{对象0：距离0, 对象1：距离1, ...}, 方向1：{对象0：距离0, 对象1：距离1, ...}, ...}
+        # NAPart: {PartRelationMap.FRONT: {FrontPart0: FrontValue0, ...},
+        #        PartRelationMap.BACK: {BackPart0: BackValue0, ...},
+        #        PartRelationMap.UP: {UpPart0: UpValue0, ...},
+        #        PartRelationMap.DOWN: {DownPart0: DownValue0, ...},
+        #        PartRelationMap.LEFT: {LeftPart0: LeftValue0, ...},
+        #        PartRelationMap.RIGHT: {RightPart0: RightValue0, ...}}
+        #        PartRelationMap.SAME: {SamePart0: 0, ...}}
+        # 每个方向的零件都按距离从小到大排列，由 AxisLineIndex 中按坐标排序的同一直线上的零件按需生成；
+        # 修改关系只能通过 add_part, del_part, replace, add_layer 等方法（修改 self.basicMap.index）
         self.__temp_data = {  # 在初始化过程中用于优化的数据
             "": []
         }
         PartRelationMap.last_map = self
 
     @staticmethod
-    def _add_basicMap_relation(part, other_part, part_relation, other_part_relation, raw_dir):
-        """
-        添加零件的关系
-        :param part: 添加的零件
-        :param other_part: 与之关系的零件
-        :param part_relation: 新增零件的关系映射
-        :param other_part_relation: 与之关系的零件的关系映射
-        :param raw_dir: 毛方向，前后，上下，左右
-        """
-        if raw_dir == CONST.SAME:
-            other_part_relation[CONST.SAME][part] = 0
-            for _dir in (CONST.FRONT, CONST.BACK, CONST.UP, CONST.DOWN, CONST.LEFT, CONST.RIGHT):
-                part_relation[_dir] = other_part_relation[_dir].copy()
-            part_relation[CONST.SAME][other_part] = 0
-            return
-        pos_i = CONST.DIR_INDEX_MAP[raw_dir]
-        sub_dirs = CONST.SUBDIR_MAP[raw_dir]
-        larger_dir = sub_dirs[0]
-        smaller_dir = sub_dirs[1]
-        value = abs(other_part.Pos[pos_i] - part.Pos[pos_i])
-        if other_part.Pos[pos_i] > part.Pos[pos_i]:  # other在part的前面
-            part_relation[larger_dir][other_part] = value
-            other_part_relation[smaller_dir][part] = value
-        elif other_part.Pos[pos_i] < part.Pos[pos_i]:  # other在part的后面
-            part_relation[smaller_dir][other_part] = value
-            other_part_relation[larger_dir][part] = value
-        # 将other_part的相应的方向的零件也添加到new_part的该方向零件中
-        for sub_dir in sub_dirs:
-            for other_part_direction, _other_part_direction_value in other_part_relation[sub_dir].items():
-                value2 = abs(other_part_direction.Pos[pos_i] - part.Pos[pos_i])
-                if other_part_direction.Pos[pos_i] > part.Pos[pos_i]:
-                    part_relation[larger_dir][other_part_direction] = value2
-                elif other_part_direction.Pos[pos_i] < part.Pos[pos_i]:
-                    part_relation[smaller_dir][other_part_direction] = value2
+    def _is_mapped(part) -> bool:
+        """
+        :return: 零件是否参与零件关系图（旋转角度都是90度整数倍的可调节船体）
+        """
+        return (isinstance(part, AdjustableHull) and
+                int(part.Rot[0]) % 90 == 0 and int(part.Rot[1]) % 90 == 0 and int(part.Rot[2]) % 90 == 0)
 
     def add_part(self, newPart, all_parts: list = Union[list, None]):
         """
@@ -1800,27 +1982,22 @@ class PartRelationMap:
         :return: 耗时（截面对象，零件关系，节点集合）
         """
         # 000000000000000000000000000000000000000000000000000000000000000000000 筛选
-        if not isinstance(newPart, AdjustableHull):
-            return 0., 0., 0.
-        if int(newPart.Rot[0]) % 90 != 0 or int(newPart.Rot[1]) % 90 != 0 or int(newPart.Rot[2]) % 90 != 0:
+        if not self._is_mapped(newPart):
             return 0., 0., 0.
         # 000000000000000000000000000000000000000000000000000000000000000000000 点集
         st = time.time()
+        operation_dot_nodes = newPart.operation_dot_nodes  # 节点按取整前的位置计算
+        pos = x, y, z = pos_key(newPart.Pos)  # 截面对象，节点和零件关系都以量化后的整数坐标为键
+        newPart.Pos = [key_coord(x), key_coord(y), key_coord(z)]
         if isinstance(newPart, AdjustableHull):
-            newPart.Pos = [round(newPart.Pos[0], 3), round(newPart.Pos[1], 3), round(newPart.Pos[2], 3)]
-            for dot in newPart.operation_dot_nodes:
-                # dot是np.ndarray类型
-                _x = round(float(dot[0]), 3)
-                _y = round(float(dot[1]), 3)
-                _z = round(float(dot[2]), 3)
-                if [_x, _y, _z] not in NAPartNode.all_dots:
-                    node = NAPartNode([_x, _y, _z])
-                    # 判断零件在节点的哪一个卦限
-                    x, y, z = newPart.Pos
-                    x_str = CONST.BACK if x > _x else CONST.FRONT
-                    y_str = CONST.DOWN if y > _y else CONST.UP
-                    z_str = CONST.LEFT if z > _z else CONST.RIGHT
-                    node.near_parts[f"{x_str}_{y_str}_{z_str}"].append(newPart)
+            for dot in operation_dot_nodes:
+                key = _x, _y, _z = pos_key(dot)
+                node = NAPartNode.get_or_create(dot, key)
+                # 判断零件在节点的哪一个卦限
+                x_str = CONST.BACK if x > _x else CONST.FRONT
+                y_str = CONST.DOWN if y > _y else CONST.UP
+                z_str = CONST.LEFT if z > _z else CONST.RIGHT
+                node.add_near_part(f"{x_str}_{y_str}_{z_str}", newPart)
                 # DotsLayerMap
                 if _x not in self.yzDotsLayerMap.keys():
                     self.yzDotsLayerMap[_x] = [newPart]
@@ -1837,63 +2014,153 @@ class PartRelationMap:
         dot_t = round(time.time() - st, 4)
         # 000000000000000000000000000000000000000000000000000000000000000000000 层集
         st = time.time()
-        # 初始化零件的上下左右前后零件
-        newPart_relation = {CONST.FRONT: {}, CONST.BACK: {}, CONST.UP: {}, CONST.DOWN: {},
-                            CONST.LEFT: {}, CONST.RIGHT: {}, CONST.SAME: {}}
-        x_exist = set()  # 和新零件x相同的零件
-        y_exist = set()  # 和新零件y相同的零件
-        z_exist = set()  # 和新零件z相同的零件
-        n_x, n_y, n_z = newPart.Pos
-        if n_x not in self.yzPartsLayerMap.keys():
-            self.yzPartsLayerMap[n_x] = [newPart]
+        if x not in self.yzPartsLayerMap.keys():
+            self.yzPartsLayerMap[x] = [newPart]
         else:
-            x_exist = set(self.yzPartsLayerMap[n_x])
-            self.yzPartsLayerMap[n_x].append(newPart)
-        if n_y not in self.xzPartsLayerMap.keys():
-            self.xzPartsLayerMap[n_y] = [newPart]
+            self.yzPartsLayerMap[x].append(newPart)
+        if y not in self.xzPartsLayerMap.keys():
+            self.xzPartsLayerMap[y] = [newPart]
         else:
-            y_exist = set(self.xzPartsLayerMap[n_y])
-            self.xzPartsLayerMap[n_y].append(newPart)
-        if n_z not in self.xyPartsLayerMap.keys():
-            self.xyPartsLayerMap[n_z] = [newPart]
+            self.xzPartsLayerMap[y].append(newPart)
+        if z not in self.xyPartsLayerMap.keys():
+            self.xyPartsLayerMap[z] = [newPart]
         else:
-            z_exist = set(self.xyPartsLayerMap[n_z])
-            self.xyPartsLayerMap[n_z].append(newPart)
+            self.xyPartsLayerMap[z].append(newPart)
         layer_t = round(time.time() - st, 4)
         # 000000000000000000000000000000000000000000000000000000000000000000000 零件关系
         st = time.time()
-        # 先检查是否有有位置关系的other_part，如果有，就添加到new_part的上下左右前后零件中
-        # 然后新零件new_part根据other_part的关系扩充自己的关系
-        if len(self.basicMap) == 0:  # 如果basicMap为空，就直接添加
-            self.basicMap[newPart] = newPart_relation
-            return layer_t, 0, 0
-        xy_exist = x_exist & y_exist  # z轴向
-        xz_exist = x_exist & z_exist  # y轴向
-        yz_exist = y_exist & z_exist  # x轴向
-        # xyz_exist = xy_exist | yz_exist | xz_exist
-        for otherPart in xy_exist:
-            others_direction_relation = self.basicMap[otherPart]
-            if otherPart.Pos != newPart.Pos:
-                self._add_basicMap_relation(
-                    newPart, otherPart, newPart_relation, others_direction_relation, CONST.FRONT_BACK)
-        for otherPart in yz_exist:
-            others_direction_relation = self.basicMap[otherPart]
-            if otherPart.Pos != newPart.Pos:
-                self._add_basicMap_relation(
-                    newPart, otherPart, newPart_relation, others_direction_relation, CONST.LEFT_RIGHT)
-        for otherPart in xz_exist:
-            others_direction_relation = self.basicMap[otherPart]
-            if otherPart.Pos != newPart.Pos:  # 同一位置
-                self._add_basicMap_relation(
-                    newPart, otherPart, newPart_relation, others_direction_relation, CONST.UP_DOWN)
-            else:
-                self._add_basicMap_relation(
-                    newPart, otherPart, newPart_relation, others_direction_relation, CONST.SAME)
-        # 将new_part的关系添加到basicMap中
-        self.basicMap[newPart] = newPart_relation
+        # 插入到三条轴向直线上，与同一直线上的零件自动建立前后，上下，左右（或相同位置）的关系
+        self.basicMap.index.add(newPart, pos)
         relation_t = round(time.time() - st, 4)
         return layer_t, relation_t, dot_t
 
+    def build(self, parts):
+        """
+        批量建立零件关系图（读取或重新绑定整个船体时使用），代替逐个add_part后再sort，结果相同：
+        所有位置和节点坐标放在数组中，节点集合由 NAPartNode.add_parts，截面对象由 group_by_coord，
+        零件关系由 AxisLineIndex.build 分别一次性建立，结果都已排序
+        :param parts: 所有零件，原有的截面对象和零件关系会被替换
+        :return: 耗时（截面对象，零件关系，节点集合）
+        """
+        PartRelationMap.last_map = self
+        hulls = [part for part in dict.fromkeys(parts) if self._is_mapped(part)]
+        AdjustableHull.prepare_plot_data(hulls)
+        self.show_statu_func(f"正在建立 {len(hulls)} 个零件的节点集合", "process")
+        st = time.time()
+        dots, dot_hull_index = self._get_node_dots(hulls)
+        return self._build_arrays(hulls, dots, dot_hull_index, time.time() - st)
+
+    @staticmethod
+    def _get_node_dots(hulls):
+        """
+        :param hulls: 参与零件关系图的可调节船体
+        :return: 所有节点的整数坐标和每个节点所属零件在hulls中的索引
+        """
+        node_dots = [hull.operation_dot_nodes for hull in hulls]  # 节点按取整前的位置计算
+        dots = coord_keys(np.concatenate([np.asarray(d, dtype=float).reshape(-1, 3) for d in node_dots])
+                          if hulls else np.empty((0, 3)))
+        return dots, np.repeat(np.arange(len(hulls)), [len(d) for d in node_dots])
+
+    def _build_arrays(self, hulls, dots, dot_hull_index, dot_t=0.):
+        """
+        由节点坐标数组建立节点集合，截面对象和零件关系（build和load_index共用）
+        :param hulls: 参与零件关系图的可调节船体
+        :param dots: 所有节点的整数坐标
+        :param dot_hull_index: 每个节点所属零件在hulls中的索引
+        :param dot_t: 已经用于计算节点坐标的时间
+        :return: 耗时（截面对象，零件关系，节点集合）
+        """
+        # 000000000000000000000000000000000000000000000000000000000000000000000 点集
+        st = time.time()
+        positions = coord_keys(np.array([hull.Pos for hull in hulls], dtype=float).reshape(-1, 3))
+        for hull, pos in zip(hulls, key_coord(positions).tolist()):
+            hull.Pos = pos
+        NAPartNode.add_parts(hulls, positions, dots, dot_hull_index)
+        dot_parts = [hulls[i] for i in dot_hull_index.tolist()]
+        dot_t += time.time() - st
+        # 000000000000000000000000000000000000000000000000000000000000000000000 层集
+        self.show_statu_func("正在建立截面对象", "process")
+        st = time.time()
+        self.yzDotsLayerMap = LayerIndex(group_by_coord(dots[:, 0], dot_parts))
+        self.xzDotsLayerMap = LayerIndex(group_by_coord(dots[:, 1], dot_parts))
+        self.xyDotsLayerMap = LayerIndex(group_by_coord(dots[:, 2], dot_parts))
+        self.yzPartsLayerMap = LayerIndex(group_by_coord(positions[:, 0], hulls))
+        self.xzPartsLayerMap = LayerIndex(group_by_coord(positions[:, 1], hulls))
+        self.xyPartsLayerMap = LayerIndex(group_by_coord(positions[:, 2], hulls))
+        layer_t = time.time() - st
+        # 000000000000000000000000000000000000000000000000000000000000000000000 零件关系
+        self.show_statu_func("正在建立零件关系", "process")
+        st = time.time()
+        self.basicMap.index.build(hulls, positions)
+        relation_t = time.time() - st
+        return layer_t, relation_t, dot_t
+
+    @staticmethod
+    def get_parts_hash(parts) -> str:
+        """
+        :param parts: 按顺序排列的所有零件
+        :return: 零件类型，位置，旋转，缩放和外形参数的哈希，用于验证工程文件中保存的零件关系索引是否与零件一致
+        """
+        from hashlib import sha1
+        hash_obj = sha1(f"{PartRelationMap.INDEX_VERSION},{NAPartNode.KEY_SCALE}".encode('utf-8'))
+        hash_obj.update(",".join(type(part).__name__ for part in parts).encode('utf-8'))
+        tables = {id(part._table): part._table for part in parts}
+        if len(tables) == 1:
+            table = tables.popitem()[1]
+            rows = table.get_rows(parts)
+            columns = (table.pos[rows], table.rot[rows], table.scl[rows], table.shape[rows])
+        else:
+            columns = tuple(np.array([getattr(part._table, name)[part._row] for part in parts], dtype=np.float64)
+                            for name in ("pos", "rot", "scl", "shape"))
+        for column in columns:
+            hash_obj.update(np.ascontiguousarray(column).tobytes())
+        return hash_obj.hexdigest()
+
+    def dump_index(self, parts) -> dict:
+        """
+        将零件关系索引（参与关系图的零件和它们的节点表）序列化，保存在工程文件中；
+        打开工程时由load_index直接加载，不必重新计算所有零件的绘图数据和节点坐标
+        :param parts: 按顺序排列的所有零件（与工程文件中零件数据的顺序相同）
+        :return: json格式的字典
+        """
+        hull_indices = [i for i, part in enumerate(parts) if self._is_mapped(part)]
+        hulls = [parts[i] for i in hull_indices]
+        AdjustableHull.prepare_plot_data(hulls)
+        dots, dot_hull_index = self._get_node_dots(hulls)
+        node_keys, dot_nodes = np.unique(dots, axis=0, return_inverse=True)
+        return {
+            "Version": PartRelationMap.INDEX_VERSION,
+            "Hash": self.get_parts_hash(parts),
+            "Hulls": hull_indices,  # 参与关系图的零件在parts中的索引
+            "DotCounts": np.bincount(dot_hull_index, minlength=len(hulls)).tolist(),  # 每个零件的节点数
+            "Nodes": node_keys.ravel().tolist(),  # 节点表：量化后的整数坐标
+            "DotNodes": dot_nodes.ravel().tolist(),  # 每个零件的节点在节点表中的索引
+        }
+
+    def load_index(self, parts, data) -> bool:
+        """
+        从工程文件中保存的零件关系索引建立零件关系图，结果与build相同
+        :param parts: 按顺序排列的所有零件
+        :param data: dump_index的返回值
+        :return: 索引的版本和哈希与零件一致并加载成功时返回True，否则返回False（需要重新build）
+        """
+        if not data or data.get("Version") != PartRelationMap.INDEX_VERSION:
+            return False
+        if data.get("Hash") != self.get_parts_hash(parts):
+            return False
+        PartRelationMap.last_map = self
+        try:
+            hulls = [parts[i] for i in data["Hulls"]]
+            node_keys = np.array(data["Nodes"], dtype=np.int64).reshape(-1, 3)
+            dots = node_keys[np.array(data["DotNodes"], dtype=np.intp)]
+            dot_hull_index = np.repeat(np.arange(len(hulls)), data["DotCounts"])
+        except (KeyError, IndexError, ValueError, TypeError):
+            return False
+        if len(dot_hull_index) != len(dots):
+            return False
+        self._build_arrays(hulls, dots.reshape(-1, 3), dot_hull_index)
+        return True
+
     def replace(self, parts: List[AdjustableHull], replaced_part):
         """
         替换零件集合，新的零件集合都有相同的某个坐标值
@@ -1906,68 +2173,12 @@ class PartRelationMap:
         if replaced_part not in self.basicMap.keys():
             return
         # 判断方向（哪一个坐标值相同）
-        direction = get_raw_direction(parts)
-        if not direction:
+        if not get_raw_direction(parts):
             return  # 如果仍然没有判断出方向，就不替换
-        # 定义一个方向映射，以便根据不同的方向进行操作
-        direction_map = {
-            CONST.FRONT_BACK: (CONST.FRONT, CONST.BACK),
-            CONST.UP_DOWN: (CONST.UP, CONST.DOWN),
-            CONST.LEFT_RIGHT: (CONST.LEFT, CONST.RIGHT)
-        }
-        larger_dir = direction_map[direction][0]
-        smaller_dir = direction_map[direction][1]
-        # 获取方向对应的坐标索引
-        pos_i = CONST.DIR_INDEX_MAP[direction]
-        # 按照方向值从小到大排序
-        parts.sort(key=lambda _part: _part.Pos[pos_i])
-        # 获取被替换零件的关系图
-        replaced_relation_map = self.basicMap[replaced_part]
-        # 初始化新零件的关系
-        new_part_relation_maps = {}
-        for i in range(len(parts)):
-            new_part = parts[i]
-            new_part_relation_maps[new_part] = {CONST.FRONT: {}, CONST.BACK: {},
-                                                CONST.UP: {}, CONST.DOWN: {},
-                                                CONST.LEFT: {}, CONST.RIGHT: {},
-                                                CONST.SAME: {}}
-            # 先添加新零件到各自的关系图中
-            for larger_dir_p in parts[i + 1:]:
-                new_part_relation_maps[new_part][larger_dir][larger_dir_p] = abs(
-                    larger_dir_p.Pos[pos_i] - new_part.Pos[pos_i])
-            for smaller_dir_p in parts[:i]:
-                new_part_relation_maps[new_part][smaller_dir][smaller_dir_p] = abs(
-                    smaller_dir_p.Pos[pos_i] - new_part.Pos[pos_i])
-            # 遍历被替换零件的关系，将其关系添加到新零件的关系图中
-            for l_part in replaced_relation_map[larger_dir].keys():
-                new_part_relation_maps[new_part][larger_dir][l_part] = abs(
-                    l_part.Pos[pos_i] - new_part.Pos[pos_i])
-            for s_part in replaced_relation_map[smaller_dir].keys():
-                new_part_relation_maps[new_part][smaller_dir][s_part] = abs(
-                    s_part.Pos[pos_i] - new_part.Pos[pos_i])
-            # 给关系零件添加关系
-            # 先找到被替换零件的位置，然后在该位置插入新键值对
-            for part in replaced_relation_map[smaller_dir].keys():
-                # 给原零件添加关系
-                self.basicMap[part][larger_dir][new_part] = abs(
-                    part.Pos[pos_i] - new_part.Pos[pos_i])
-            for part in replaced_relation_map[larger_dir].keys():
-                # 给原零件添加关系
-                self.basicMap[part][smaller_dir][new_part] = abs(
-                    part.Pos[pos_i] - new_part.Pos[pos_i])
-        # 删除原零件，按value排序原零件关系零件的关系
-        for _dir in [CONST.FRONT, CONST.BACK, CONST.UP, CONST.DOWN, CONST.LEFT, CONST.RIGHT]:
-            for part in replaced_relation_map[_dir].keys():
-                op_dir = CONST.DIR_OPPOSITE_MAP[_dir]
-                del self.basicMap[part][op_dir][replaced_part]
-                if _dir in [larger_dir, smaller_dir]:
-                    self.basicMap[part][op_dir] = dict(sorted(
-                        self.basicMap[part][op_dir].items(),
-                        key=lambda x: x[1]))
-        # 将新零件的关系添加到basicMap中
-        for new_part, new_part_relation_map in new_part_relation_maps.items():
-            self.basicMap[new_part] = new_part_relation_map
-        # 不删除原零件，因为可能还有其他零件与其有关系
+        # 原零件从直线上移除（仍保留在关系图中，用于撤回），新零件插入到各自的直线上
+        self.basicMap.index.remove(replaced_part)
+        for new_part in parts:
+            self.basicMap.index.add(new_part)
 
     def undo_replace(self, parts: List[AdjustableHull], replaced_part):
         """
@@ -1981,39 +2192,12 @@ class PartRelationMap:
         if replaced_part not in self.basicMap.keys():
             self.show_statu_func(f"被替换零件不在basicMap中", "warning")
         # 判断方向（哪一个坐标值相同）
-        direction = get_raw_direction(parts)
-        if not direction:
+        if not get_raw_direction(parts):
             return  # 如果仍然没有判断出方向，就不替换
-        # 定义一个方向映射，以便根据不同的方向进行操作
-        direction_map = {
-            CONST.FRONT_BACK: (CONST.FRONT, CONST.BACK),
-            CONST.UP_DOWN: (CONST.UP, CONST.DOWN),
-            CONST.LEFT_RIGHT: (CONST.LEFT, CONST.RIGHT)
-        }
-        larger_dir = direction_map[direction][0]
-        smaller_dir = direction_map[direction][1]
-        # 获取方向对应的坐标索引
-        pos_i = CONST.DIR_INDEX_MAP[direction]
-        # 按照方向值从小到大排序
-        parts.sort(key=lambda _part: _part.Pos[pos_i])
-        # 获取被替换零件的关系图
-        replaced_relation_map = self.basicMap[replaced_part]
-        # 删除新零件在其关系零件中的关系
+        # 删除新零件，恢复原零件
         for added_p in parts:
-            for part in replaced_relation_map[larger_dir].keys():
-                del self.basicMap[part][smaller_dir][added_p]
-            for part in replaced_relation_map[smaller_dir].keys():
-                del self.basicMap[part][larger_dir][added_p]
-            # 删除新零件
-            del self.basicMap[added_p]
-        # 恢复原零件在其关系零件中的关系
-        for direction, part_dict in self.basicMap[replaced_part].items():
-            for part, value in part_dict.items():
-                self.basicMap[part][CONST.DIR_OPPOSITE_MAP[direction]][replaced_part] = value
-                # 按value排序
-                self.basicMap[part][CONST.DIR_OPPOSITE_MAP[direction]] = dict(sorted(
-                    self.basicMap[part][CONST.DIR_OPPOSITE_MAP[direction]].items(),
-                    key=lambda x: x[1]))
+            self.basicMap.index.remove(added_p)
+        self.basicMap.index.add(replaced_part)
 
     def add_layer(self, part_map, direction):
         """
@@ -2022,51 +2206,9 @@ class PartRelationMap:
         :param direction: 方向
         :return:
         """
-        opposite_dir = CONST.DIR_OPPOSITE_MAP[direction]
-        for org_p, new_p in part_map.items():
-            pos_i = CONST.DIR_INDEX_MAP[CONST.DIR_TO_RAWDIR_MAP[direction]]
-            self.basicMap[new_p] = {CONST.FRONT: {}, CONST.BACK: {}, CONST.UP: {}, CONST.DOWN: {},
-                                    CONST.LEFT: {}, CONST.RIGHT: {}, CONST.SAME: {}}
-            # 往原零件的该方向添加新零件
-            self.basicMap[org_p][direction][new_p] = abs(
-                org_p.Pos[pos_i] - new_p.Pos[pos_i])
-            if len(self.basicMap[org_p][direction]) > 1:  # 如果该方向的零件数量大于1，就按照value排序
-                self.basicMap[org_p][direction] = dict(sorted(
-                    self.basicMap[org_p][direction].items(),
-                    key=lambda x: x[1]))
-            # 往新零件的相反方向添加原零件
-            self.basicMap[new_p][opposite_dir][org_p] = abs(
-                org_p.Pos[pos_i] - new_p.Pos[pos_i])
-            # 将原零件的反方向关系表添加到新零件
-            for other_p, value in self.basicMap[org_p][opposite_dir].items():
-                self.basicMap[new_p][opposite_dir][other_p] = value
-        # 给新零件之间添加垂直方向的关系
+        # 新零件与原零件在direction方向的同一直线上，与新零件之间在垂直方向的直线上，插入后关系自动建立
         for new_p in part_map.values():
-            for v_dir in CONST.VERTICAL_DIR_MAP[direction]:
-                raw_dir = CONST.DIR_TO_RAWDIR_MAP[v_dir]
-                pos_i = CONST.DIR_INDEX_MAP[raw_dir]
-                other_pos_i = [i for i in range(3) if i != pos_i]
-                op0 = other_pos_i[0]
-                op1 = other_pos_i[1]
-                if v_dir in [CONST.FRONT, CONST.UP, CONST.LEFT]:
-                    _exist = set([part for part in part_map.values() if (
-                            part.Pos[pos_i] > new_p.Pos[pos_i] and
-                            part.Pos[op0] == new_p.Pos[op0] and
-                            part.Pos[op1] == new_p.Pos[op1]
-                    )])
-                else:
-                    _exist = set([part for part in part_map.values() if (
-                            part.Pos[pos_i] < new_p.Pos[pos_i] and
-                            part.Pos[op0] == new_p.Pos[op0] and
-                            part.Pos[op1] == new_p.Pos[op1]
-                    )])
-                for other_p in _exist:
-                    self.basicMap[new_p][v_dir][other_p] = abs(
-                        other_p.Pos[pos_i] - new_p.Pos[pos_i])
-                # 按value排序
-                self.basicMap[new_p][v_dir] = dict(sorted(
-                    self.basicMap[new_p][v_dir].items(),
-                    key=lambda x: x[1]))
+            self.basicMap.index.add(new_p)
 
     def undo_add_layer(self, part_map, direction):
         """
@@ -2075,13 +2217,8 @@ class PartRelationMap:
         :param direction: 方向
         :return:
         """
-        # 往原零件中删除新零件
-        for org_p, new_p in part_map.items():
-            del self.basicMap[org_p][direction][new_p]
-        # 给新零件间删除所有的关系
         for new_p in part_map.values():
-            self.basicMap[new_p] = {CONST.FRONT: {}, CONST.BACK: {}, CONST.UP: {}, CONST.DOWN: {},
-                                    CONST.LEFT: {}, CONST.RIGHT: {}, CONST.SAME: {}}  # 清空关系
+            self.basicMap.index.remove(new_p)  # 清空关系
 
     def del_part(self, part):
         """
@@ -2090,48 +2227,86 @@ class PartRelationMap:
         :return:
         """
         PartRelationMap.last_map = self
-        # 遍历自身的相关零件，将自身从其关系中删除
-        for direction, other_parts in self.basicMap[part].items():
-            for other_part in other_parts.keys():
-                del self.basicMap[other_part][CONST.DIR_OPPOSITE_MAP[direction]][part]
-        # 删除自身
-        self.basicMap[part] = {CONST.FRONT: {}, CONST.BACK: {}, CONST.UP: {}, CONST.DOWN: {},
-                               CONST.LEFT: {}, CONST.RIGHT: {}, CONST.SAME: {}}
+        # 从直线上移除，自身仍保留在关系图中，关系为空
+        self.basicMap.index.remove(part)
+
+    def get_part_state(self, part):
+        """
+        在修改零件属性之前调用，记录零件在关系图中的位置和节点，之后传给update_part
+        :param part: 零件
+        :return: (位置, 节点坐标)，都是量化后的整数坐标，零件不在关系图的直线上时为None
+        """
+        pos = self.basicMap.index.positions.get(part)
+        if pos is None:
+            return None
+        return pos, [pos_key(dot) for dot in part.operation_dot_nodes]
+
+    def update_part(self, part, old_state):
+        """
+        零件的位置，尺寸或旋转改变后，增量更新零件关系图（代替remap）：
+        将零件从原来的节点，截面对象和三条轴向直线上移除，再按新的属性加入，只涉及零件所在的节点，截面层和直线
+        :param part: 已修改属性的零件
+        :param old_state: 修改属性之前 get_part_state 的返回值
+        """
+        PartRelationMap.last_map = self
+        if old_state is None:
+            if part in self.basicMap:
+                return  # 已删除的零件，保持关系为空
+        else:
+            self._remove_part(part, *old_state)
+        if not self._is_mapped(part):
+            return
+        self.add_part(part)  # 截面层按坐标有序存储，新出现的截面层直接插入到对应位置
+
+    def _remove_part(self, part, pos, dots):
+        """
+        将零件从节点，截面对象和轴向直线上移除
+        :param part: 零件
+        :param pos: 零件加入时位置的整数坐标
+        :param dots: 零件加入时节点的整数坐标
+        """
+        x, y, z = pos
+        for key in dots:
+            _x, _y, _z = key
+            node = NAPartNode.node_index.get(key)
+            if node is not None and node._near_parts:
+                octant = f"{CONST.BACK if x > _x else CONST.FRONT}_{CONST.DOWN if y > _y else CONST.UP}_" \
+                         f"{CONST.LEFT if z > _z else CONST.RIGHT}"
+                if part in node._near_parts.get(octant, ()):
+                    node._near_parts[octant].remove(part)
+                if not any(node._near_parts.values()):  # 没有零件的节点不再保留
+                    del NAPartNode.node_index[key]
+                    NAPartNode.id_map.pop(id(node) % 4294967296, None)
+            self._remove_from_layer(self.yzDotsLayerMap, _x, part)
+            self._remove_from_layer(self.xzDotsLayerMap, _y, part)
+            self._remove_from_layer(self.xyDotsLayerMap, _z, part)
+        self._remove_from_layer(self.yzPartsLayerMap, x, part)
+        self._remove_from_layer(self.xzPartsLayerMap, y, part)
+        self._remove_from_layer(self.xyPartsLayerMap, z, part)
+        self.basicMap.index.remove(part)
+
+    @staticmethod
+    def _remove_from_layer(layer_map, key, part):
+        layer = layer_map.get(key)
+        if layer is None:
+            return
+        try:
+            layer.remove(part)
+        except ValueError:
+            return
+        if not layer:
+            del layer_map[key]
 
     def remap(self):
         PartRelationMap.last_map = self
-        # 清空所有数据
-        NAPartNode.all_dots.clear()
+        # 清空节点集合，截面对象和零件关系由build整体替换
+        NAPartNode.node_index.clear()
         NAPartNode.id_map.clear()
-        self.basicMap.clear()
-        self.xzDotsLayerMap.clear()
-        self.xyDotsLayerMap.clear()
-        self.yzDotsLayerMap.clear()
-        self.xzPartsLayerMap.clear()
-        self.xyPartsLayerMap.clear()
-        self.yzPartsLayerMap.clear()
-
         st = time.time()
-        total_parts_num = len(NAPart.hull_design_tab_id_map)
-        all_parts = [part for part in NAPart.hull_design_tab_id_map.values()]
-        i = 1
-        for part in NAPart.hull_design_tab_id_map.values():
-            layer_t, relation_t, dot_t = self.add_part(part, all_parts)
-            # 标准化（填补0）
-            layer_t = str(layer_t).ljust(6, '0')
-            relation_t = str(relation_t).ljust(6, '0')
-            dot_t = str(dot_t).ljust(6, '0')
-            if i % 3 == 0:
-                process = round(i / total_parts_num * 100, 2)
-                self.show_statu_func(
-                    f"正在实例化第 {i} / {total_parts_num} 个零件： {process} %"
-                    f"\t\t\t\t单件耗时：     截面对象  {layer_t} s     零件关系  {relation_t} s     节点集合  {dot_t} s",
-                    "process")
-            i += 1
-        self.show_statu_func(f"零件关系图初始化完成! 耗时：{time.time() - st}s", "success")
-        self.sort()
+        layer_t, relation_t, dot_t = self.build(NAPart.hull_design_tab_id_map.values())
         ttt = time.time() - st
-        self.show_statu_func(f"零件关系重新绑定完成! 耗时：{ttt}s", "success")
+        self.show_statu_func(f"零件关系重新绑定完成! 耗时：{ttt:.3f}s（截面对象 {layer_t:.3f} s，"
+                             f"零件关系 {relation_t:.3f} s，节点集合 {dot_t:.3f} s）", "success")
         return ttt
 
     def init(self, na_hull, init=True):
@@ -2145,47 +2320,21 @@ class PartRelationMap:
             return
         self.na_hull = na_hull
         st = time.time()
-        total_parts_num = sum([len(parts) for parts in self.na_hull.DrawMap.values()])
-        all_parts = [part for parts in self.na_hull.DrawMap.values() for part in parts]
-        i = 1
-        for _color, parts in self.na_hull.DrawMap.items():
-            for part in parts:
-                layer_t, relation_t, dot_t = self.add_part(part, all_parts)
-                # 标准化（填补0）
-                layer_t = str(layer_t).ljust(6, '0')
-                relation_t = str(relation_t).ljust(6, '0')
-                dot_t = str(dot_t).ljust(6, '0')
-                if i % 3 == 0:
-                    process = round(i / total_parts_num * 100, 2)
-                    self.show_statu_func(
-                        f"正在实例化第 {i} / {total_parts_num} 个零件： {process} %"
-                        f"\t\t\t\t单件耗时：     截面对象  {layer_t} s     零件关系  {relation_t} s     节点集合  {dot_t} s",
-                        "process")
-                i += 1
-        self.show_statu_func(f"零件关系图初始化完成! 耗时：{time.time() - st}s", "success")
-        st = time.time()
-        self.sort()
-        self.show_statu_func(f"零件关系图排序完成! 耗时：{time.time() - st}s", "success")
+        layer_t, relation_t, dot_t = self.build([part for parts in self.na_hull.DrawMap.values() for part in parts])
+        self.show_statu_func(f"零件关系图初始化完成! 耗时：{time.time() - st:.3f}s（截面对象 {layer_t:.3f} s，"
+                             f"零件关系 {relation_t:.3f} s，节点集合 {dot_t:.3f} s）", "success")
 
     def sort(self):
+        """
+        截面对象由LayerIndex按坐标有序存储，插入新的截面层不会破坏顺序，这里只需要把外部赋值的普通字典（如撤回时恢复的旧版本）转换为LayerIndex
+        """
         PartRelationMap.last_map = self
         self.show_statu_func("正在加载LayerMaps", "process")
-        self.xzDotsLayerMap = dict(sorted(self.xzDotsLayerMap.items(), key=lambda item: item[0]))
-        self.xyDotsLayerMap = dict(sorted(self.xyDotsLayerMap.items(), key=lambda item: item[0]))
-        self.yzDotsLayerMap = dict(sorted(self.yzDotsLayerMap.items(), key=lambda item: item[0]))
-        self.xzPartsLayerMap = dict(sorted(self.xzPartsLayerMap.items(), key=lambda item: item[0]))
-        self.xyPartsLayerMap = dict(sorted(self.xyPartsLayerMap.items(), key=lambda item: item[0]))
-        self.yzPartsLayerMap = dict(sorted(self.yzPartsLayerMap.items(), key=lambda item: item[0]))
-        total_parts_num = sum([len(parts) for parts in self.basicMap.values()])
-        i = 1
-        for part, part_relation in self.basicMap.items():
-            # 按照value（relation的值）对relation字典从小到大排序：
-            for direction, others_direction_relation in part_relation.items():
-                if i % 123 == 0:
-                    process = round(i / total_parts_num * 100, 2)
-                    self.show_statu_func(f"正在排序第{i}个零件，进度：{process} %", "process")
-                i += 1
-                part_relation[direction] = dict(sorted(others_direction_relation.items(), key=lambda item: item[1]))
+        for name in PartRelationMap.LAYER_MAP_NAMES:
+            layer_map = getattr(self, name)
+            if not isinstance(layer_map, LayerIndex):
+                setattr(self, name, LayerIndex(layer_map))
+        # basicMap中每个方向的零件在读取时已按距离排序
 
     def get_DotsLayerMap(self):
         """
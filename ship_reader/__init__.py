@@ -1,8 +1,9 @@
 from .NA_design_reader import ReadNA, NAPart, AdjustableHull, MainWeapon, NAPartNode
 from .NA_design_reader import PartRelationMap as PRM
+from .design_cache import DesignCache
 from .PTB_design_reader import ReadPTB, AdvancedHull, SplitAdHull, PTBPart
 
 __all__ = [
-    "ReadNA", "PRM", "NAPart", "AdjustableHull", "MainWeapon", "NAPartNode",
+    "ReadNA", "PRM", "NAPart", "AdjustableHull", "MainWeapon", "NAPartNode", "DesignCache",
     "ReadPTB", "AdvancedHull", "SplitAdHull", "PTBPart"
 ]
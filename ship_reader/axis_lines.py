@@ -0,0 +1,210 @@
+"""
+零件关系图（PartRelationMap.basicMap）的紧凑存储。
+对每个坐标轴，以另外两个坐标为键，保存位于同一条轴向直线上的零件，按该轴坐标排序（坐标和零件各一个列表）；
+“零件X前方的所有零件，按距离排序”只是该直线上X之后的一段，在读取时按需生成。
+存储量与零件数成正比，而不是像原来的字典那样为每个零件保存整条直线上的所有零件（传递闭包）。
+BasicMapView 和 PartRelationView 提供与原来的 {零件: {方向: {零件: 距离}}} 相同的只读字典接口。
+位置和直线的键都是量化后的整数坐标（coord_keys），距离在读取时换算回坐标单位。
+"""
+from bisect import bisect_left, bisect_right
+from collections.abc import Mapping
+
+import numpy as np
+
+from util_funcs import CONST
+from .coord_keys import KEY_SCALE, pos_key
+
+# 坐标轴 -> （坐标较大的方向，坐标较小的方向）
+AXIS_DIRS = {CONST.DIR_INDEX_MAP[raw_dir]: sub_dirs for raw_dir, sub_dirs in CONST.SUBDIR_MAP.items()}
+# 方向 -> （坐标轴，是否为坐标较大的方向）
+DIR_AXIS = {sub_dir: (axis, i == 0) for axis, sub_dirs in AXIS_DIRS.items() for i, sub_dir in enumerate(sub_dirs)}
+DIRECTIONS = (CONST.FRONT, CONST.BACK, CONST.UP, CONST.DOWN, CONST.LEFT, CONST.RIGHT, CONST.SAME)
+
+
+def group_by_coord(coords: np.ndarray, items: list) -> dict:
+    """
+    按坐标将对象分组（稳定排序，同一坐标的对象保持原来的顺序）
+    :param coords: 每个对象的坐标（量化后的整数键）
+    :param items: 对象
+    :return: {坐标: [对象0, 对象1, ...]}，按坐标从小到大排列
+    """
+    if len(items) == 0:
+        return {}
+    order = np.argsort(coords, kind="stable")
+    sorted_coords = coords[order]
+    starts = np.flatnonzero(np.r_[True, sorted_coords[1:] != sorted_coords[:-1]])
+    keys = sorted_coords[starts].tolist()
+    starts = starts.tolist() + [len(items)]
+    order = order.tolist()
+    return {key: [items[j] for j in order[s:e]] for key, s, e in zip(keys, starts[:-1], starts[1:])}
+
+
+class AxisLine:
+    __slots__ = ("coords", "parts")
+
+    def __init__(self):
+        self.coords = []  # 升序排列的坐标（整数键）
+        self.parts = []  # 与coords一一对应的零件
+
+    def insert(self, coord, part):
+        i = bisect_right(self.coords, coord)
+        self.coords.insert(i, coord)
+        self.parts.insert(i, part)
+
+    def remove(self, coord, part):
+        for i in range(bisect_left(self.coords, coord), bisect_right(self.coords, coord)):
+            if self.parts[i] is part:
+                del self.coords[i]
+                del self.parts[i]
+                return
+
+    def __len__(self):
+        return len(self.parts)
+
+
+class AxisLineIndex:
+    def __init__(self):
+        self.lines = ({}, {}, {})  # 坐标轴 -> {另外两个坐标: AxisLine}
+        self.positions = {}  # 在直线上的零件 -> 加入时的位置（整数坐标）
+        self.detached = set()  # 已从直线上移除（删除，撤回等），但仍在关系图中（关系为空）的零件
+
+    @staticmethod
+    def _line_key(pos, axis):
+        return (pos[1], pos[2]) if axis == 0 else (pos[0], pos[2]) if axis == 1 else (pos[0], pos[1])
+
+    def add(self, part, pos=None):
+        """
+        :param part: 零件
+        :param pos: 零件位置的整数坐标，默认由part.Pos量化
+        """
+        if part in self.positions:
+            self.remove(part)
+        pos = pos_key(part.Pos) if pos is None else tuple(pos)
+        self.positions[part] = pos
+        self.detached.discard(part)
+        for axis in range(3):
+            line = self.lines[axis].get(self._line_key(pos, axis))
+            if line is None:
+                line = self.lines[axis][self._line_key(pos, axis)] = AxisLine()
+            line.insert(pos[axis], part)
+
+    def build(self, parts: list, positions: np.ndarray):
+        """
+        批量建立所有直线（清空原有数据）：对每个坐标轴按（另外两个坐标，该轴坐标）lexsort，
+        每段另外两个坐标相同的连续零件即为一条直线，结果与按顺序逐个add相同
+        :param parts: 零件（不重复）
+        :param positions: 零件位置的整数坐标，shape为(len(parts), 3)
+        """
+        self.clear()
+        if not parts:
+            return
+        pos_list = [tuple(pos) for pos in positions.tolist()]
+        self.positions.update(zip(parts, pos_list))
+        for axis in range(3):
+            a, b = (i for i in range(3) if i != axis)
+            order = np.lexsort((positions[:, axis], positions[:, b], positions[:, a]))
+            sorted_pos = positions[order]
+            new_line = np.r_[True, (sorted_pos[1:, a] != sorted_pos[:-1, a]) |
+                             (sorted_pos[1:, b] != sorted_pos[:-1, b])]
+            starts = np.flatnonzero(new_line).tolist() + [len(parts)]
+            coords = sorted_pos[:, axis].tolist()
+            order = order.tolist()
+            lines = self.lines[axis]
+            for s, e in zip(starts[:-1], starts[1:]):
+                line = AxisLine()
+                line.coords = coords[s:e]
+                line.parts = [parts[j] for j in order[s:e]]
+                lines[self._line_key(pos_list[order[s]], axis)] = line
+
+    def remove(self, part):
+        """
+        将零件从直线上移除，零件仍然保留在关系图中，关系为空
+        """
+        pos = self.positions.pop(part, None)
+        if pos is None:
+            return
+        self.detached.add(part)
+        for axis in range(3):
+            key = self._line_key(pos, axis)
+            line = self.lines[axis][key]
+            line.remove(pos[axis], part)
+            if not line:
+                del self.lines[axis][key]
+
+    def clear(self):
+        for lines in self.lines:
+            lines.clear()
+        self.positions.clear()
+        self.detached.clear()
+
+    def __contains__(self, part):
+        return part in self.positions or part in self.detached
+
+    def get_relation(self, part, direction) -> dict:
+        """
+        :param part: 零件
+        :param direction: 方向（CONST.FRONT等）
+        :return: {该方向上的零件: 距离}，按距离从小到大排列
+        """
+        pos = self.positions.get(part)
+        if pos is None:
+            return {}
+        if direction == CONST.SAME:
+            line = self.lines[0][self._line_key(pos, 0)]
+            start, end = bisect_left(line.coords, pos[0]), bisect_right(line.coords, pos[0])
+            return {other: 0 for other in line.parts[start:end] if other is not part}
+        axis, larger = DIR_AXIS[direction]
+        coord = pos[axis]
+        line = self.lines[axis][self._line_key(pos, axis)]
+        if larger:
+            start = bisect_right(line.coords, coord)
+            return {other: (other_coord - coord) / KEY_SCALE
+                    for other_coord, other in zip(line.coords[start:], line.parts[start:])}
+        end = bisect_left(line.coords, coord)
+        return {other: (coord - other_coord) / KEY_SCALE
+                for other_coord, other in zip(reversed(line.coords[:end]), reversed(line.parts[:end]))}
+
+
+class PartRelationView(Mapping):
+    __slots__ = ("index", "part")
+
+    def __init__(self, index: AxisLineIndex, part):
+        self.index = index
+        self.part = part
+
+    def __getitem__(self, direction):
+        if direction not in DIRECTIONS:
+            raise KeyError(direction)
+        return self.index.get_relation(self.part, direction)
+
+    def __iter__(self):
+        return iter(DIRECTIONS)
+
+    def __len__(self):
+        return len(DIRECTIONS)
+
+
+class BasicMapView(Mapping):
+    def __init__(self, index: AxisLineIndex = None):
+        """
+        :param index: 零件关系的存储，默认新建
+        """
+        self.index = AxisLineIndex() if index is None else index
+
+    def __getitem__(self, part):
+        if part not in self.index:
+            raise KeyError(part)
+        return PartRelationView(self.index, part)
+
+    def __contains__(self, part):
+        return part in self.index
+
+    def __iter__(self):
+        yield from self.index.positions
+        yield from self.index.detached
+
+    def __len__(self):
+        return len(self.index.positions) + len(self.index.detached)
+
+    def clear(self):
+        self.index.clear()
@@ -0,0 +1,42 @@
+"""
+坐标量化：把世界坐标转换为定点整数键（单位为 1/KEY_SCALE，即0.001），
+节点集合（NAPartNode.node_index），截面对象（*LayerMap）和零件关系（AxisLineIndex）都以这些整数为键，
+每个零件只量化一次；整数的哈希和比较比浮点数元组快，并且相差不到半个单位的坐标总是得到同一个键，
+不会因为浮点误差（如 0.1 + 0.2 != 0.3）被分到不同的层或节点。
+单个值和数组使用同一种取整方式（四舍六入五成双），逐个add_part和批量build的结果相同。
+"""
+import numpy as np
+
+KEY_SCALE = 1000  # 坐标保留三位小数
+
+
+def coord_key(value) -> int:
+    """
+    :param value: 坐标值
+    :return: 量化后的整数键
+    """
+    return round(float(value) * KEY_SCALE)
+
+
+def coord_keys(values) -> np.ndarray:
+    """
+    :param values: 坐标数组（任意形状）
+    :return: 量化后的整数键数组（np.int64），形状不变
+    """
+    return np.rint(np.asarray(values, dtype=float) * KEY_SCALE).astype(np.int64)
+
+
+def pos_key(pos) -> tuple:
+    """
+    :param pos: 三维坐标
+    :return: 量化后的整数坐标
+    """
+    return round(float(pos[0]) * KEY_SCALE), round(float(pos[1]) * KEY_SCALE), round(float(pos[2]) * KEY_SCALE)
+
+
+def key_coord(key):
+    """
+    :param key: 整数键（或整数键数组）
+    :return: 对应的坐标值（保留三位小数）
+    """
+    return key / KEY_SCALE
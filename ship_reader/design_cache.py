@@ -0,0 +1,165 @@
+"""
+已解析的na设计文件的磁盘缓存。
+以na文件的内容哈希、大小和读取器版本作为键，把解码后的零件表和每个零件预先计算好的绘图数据
+以 .npy 格式（可用 np.load(mmap_mode='r') 直接内存映射）保存在缓存目录下，
+再次打开未修改过的设计时，可以跳过xml解析和绘图数据的生成。
+查找时先比较路径、大小和修改时间，都相同时不再读取整个文件计算哈希；没有大小相同的条目时直接视为未命中。
+缓存总大小超过上限时，按最近最少使用（LRU）的顺序淘汰。
+"""
+import hashlib
+import os
+import shutil
+import time
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import ujson
+
+
+class DesignCache:
+    READER_VERSION = 4  # 读取器或绘图数据的格式变化时加一，旧缓存自动失效
+    DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+    INDEX_FILE = "index.json"
+    META_FILE = "meta.json"
+
+    def __init__(self, folder: str, max_bytes: int = DEFAULT_MAX_BYTES):
+        """
+        :param folder: 缓存目录
+        :param max_bytes: 缓存总大小上限（字节）
+        """
+        self.folder = folder
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(self.folder, exist_ok=True)
+        # 键 -> {"bytes": 大小, "last_used": 最近使用时间, "path": na文件路径, "size": na文件大小, "mtime_ns": na文件修改时间}
+        self.index = self._read_index()
+
+    # ------------------------------------------------------------------------------------------------索引
+    def _read_index(self) -> Dict[str, dict]:
+        try:
+            with open(os.path.join(self.folder, DesignCache.INDEX_FILE), 'r', encoding='utf-8') as f:
+                index = ujson.load(f)
+        except (FileNotFoundError, ValueError):
+            return {}
+        # 去掉已经不存在的条目
+        return {key: entry for key, entry in index.items() if os.path.isdir(os.path.join(self.folder, key))}
+
+    def _write_index(self):
+        _path = os.path.join(self.folder, DesignCache.INDEX_FILE)
+        with open(_path + ".tmp", 'w', encoding='utf-8') as f:
+            ujson.dump(self.index, f, ensure_ascii=False)
+        os.replace(_path + ".tmp", _path)
+
+    @property
+    def total_bytes(self) -> int:
+        return sum(entry["bytes"] for entry in self.index.values())
+
+    def get_statu_text(self) -> str:
+        return f"设计缓存：命中 {self.hits} 次，未命中 {self.misses} 次"
+
+    # ------------------------------------------------------------------------------------------------键
+    @staticmethod
+    def get_key(filepath: str) -> str:
+        """
+        :param filepath: na文件路径
+        :return: 由文件内容哈希，大小和读取器版本组成的键
+        """
+        sha1 = hashlib.sha1()
+        with open(filepath, 'rb') as f:
+            for chunk in iter(lambda: f.read(1048576), b''):
+                sha1.update(chunk)
+        sha1.update(f"{os.path.getsize(filepath)}|{DesignCache.READER_VERSION}".encode())
+        return sha1.hexdigest()
+
+    def find_key(self, filepath: str) -> Optional[str]:
+        """
+        先按路径、大小和修改时间查找，找不到时再计算内容哈希（文件被复制或只修改了修改时间）
+        :param filepath: na文件路径
+        :return: 缓存中的键，没有时返回None
+        """
+        stat = os.stat(filepath)
+        for key, entry in self.index.items():
+            if entry["path"] == filepath and (entry.get("size"), entry.get("mtime_ns")) == (stat.st_size, stat.st_mtime_ns):
+                return key
+        if not any(entry.get("size") == stat.st_size for entry in self.index.values()):
+            return None
+        key = self.get_key(filepath)
+        return key if key in self.index else None
+
+    # ------------------------------------------------------------------------------------------------读写
+    def load(self, filepath: str) -> Optional[Tuple[dict, Dict[str, np.ndarray]]]:
+        """
+        :param filepath: na文件路径
+        :return: 命中时返回（元数据，以内存映射方式打开的数组字典），否则返回None
+        """
+        key = self.find_key(filepath)
+        entry_folder = os.path.join(self.folder, key) if key else None
+        if key is None or not os.path.isdir(entry_folder):
+            self.misses += 1
+            return None
+        try:
+            with open(os.path.join(entry_folder, DesignCache.META_FILE), 'r', encoding='utf-8') as f:
+                meta = ujson.load(f)
+            arrays = {name: np.load(os.path.join(entry_folder, f"{name}.npy"), mmap_mode='r')
+                      for name in meta["arrays"]}
+        except (OSError, ValueError, KeyError):  # 缓存损坏，删除该条目
+            self.remove(key)
+            self.misses += 1
+            return None
+        self.hits += 1
+        stat = os.stat(filepath)
+        self.index[key].update(last_used=time.time(), path=filepath, size=stat.st_size, mtime_ns=stat.st_mtime_ns)
+        self._write_index()
+        return meta, arrays
+
+    def save(self, filepath: str, meta: dict, arrays: Dict[str, np.ndarray]):
+        """
+        保存解析结果，然后按LRU淘汰超出大小上限的缓存
+        :param filepath: na文件路径
+        :param meta: 可以json序列化的元数据
+        :param arrays: 数组字典，每个数组保存为一个.npy文件
+        """
+        stat = os.stat(filepath)
+        key = self.get_key(filepath)
+        entry_folder = os.path.join(self.folder, key)
+        temp_folder = entry_folder + ".tmp"
+        shutil.rmtree(temp_folder, ignore_errors=True)
+        os.makedirs(temp_folder)
+        meta = dict(meta, arrays=list(arrays.keys()), reader_version=DesignCache.READER_VERSION)
+        for name, array in arrays.items():
+            np.save(os.path.join(temp_folder, f"{name}.npy"), np.ascontiguousarray(array), allow_pickle=False)
+        with open(os.path.join(temp_folder, DesignCache.META_FILE), 'w', encoding='utf-8') as f:
+            ujson.dump(meta, f, ensure_ascii=False)
+        shutil.rmtree(entry_folder, ignore_errors=True)
+        os.replace(temp_folder, entry_folder)
+        size = sum(os.path.getsize(os.path.join(entry_folder, name)) for name in os.listdir(entry_folder))
+        self.index[key] = {"bytes": size, "last_used": time.time(), "path": filepath,
+                           "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+        self.evict(keep=key)
+        self._write_index()
+
+    def remove(self, key: str):
+        shutil.rmtree(os.path.join(self.folder, key), ignore_errors=True)
+        if key in self.index:
+            del self.index[key]
+            self._write_index()
+
+    def evict(self, keep: str = None):
+        """
+        按最近最少使用的顺序删除缓存，直到总大小不超过上限
+        :param keep: 优先保留的键（刚写入的条目），只有它本身超过上限时才会被删除
+        """
+        total = self.total_bytes
+        for key in sorted(self.index, key=lambda k: (k == keep, self.index[k]["last_used"])):
+            if total <= self.max_bytes:
+                break
+            total -= self.index[key]["bytes"]
+            shutil.rmtree(os.path.join(self.folder, key), ignore_errors=True)
+            del self.index[key]
+
+    def clear(self):
+        for key in list(self.index.keys()):
+            shutil.rmtree(os.path.join(self.folder, key), ignore_errors=True)
+        self.index = {}
+        self._write_index()
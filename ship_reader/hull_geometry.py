@@ -0,0 +1,488 @@
+"""
+可调节船体绘图数据的批量计算。
+以N个可调节船体的外形参数和位置、旋转、缩放（零件表中的各列）为输入，用几次整批的NumPy运算得到所有零件的
+局部顶点、线框、节点和面，结果与 AdjustableHull.get_initial_vertex_coordinates / get_plot_lines / get_plot_faces
+逐个零件计算的结果逐位相同（运算的种类和顺序与逐个计算时完全一致，旋转矩阵来自同一个缓存），
+输出格式与 ReadNA.get_packed_arrays 中绘图数据的部分相同，可以直接交给 PackedGeometry 解包。
+外形参数和缩放相同的零件共用同一份局部坐标（进程内共享的 LocalGeometryCache），每个零件只需再做自己的旋转和平移。
+"""
+from collections import OrderedDict, namedtuple
+
+import numpy as np
+
+from util_funcs import get_rotation_matrix, apply_rotation
+from .part_table import PartTable
+
+_S = PartTable.SHAPE_INDEX
+
+# 顶点序号，顺序与 ReadNA.VERTEX_KEYS 相同
+FUL, FUR, FDL, FDR, BUL, BUR, BDL, BDR = range(8)
+# 线框（依次为 plot_lines 的 "1", "2", "3", "4"）
+PLOT_LINE_SIZES = (("1", 8), ("2", 4), ("3", 2), ("4", 2))
+LINE_INDEX = np.array([FUL, FUR, FDR, FDL, FUL, BUL, BUR, FUR,
+                       FDL, BDL, BDR, FDR,
+                       BUL, BDL,
+                       BUR, BDR])
+# operation_dot_nodes
+NODE_INDEX = np.array([FUL, FUR, FDR, FDL, BUL, BDL, BDR, BUR])
+# 无曲率零件的六个面
+FLAT_FACE_INDEX = np.array([
+    [FUL, FUR, FDR, FDL],
+    [BUL, BDL, BDR, BUR],
+    [FUL, BUL, BUR, FUR],
+    [FDL, FDR, BDR, BDL],
+    [FUL, FDL, BDL, BUL],
+    [FUR, BUR, BDR, FDR],
+])
+# 面内有重合点时，去掉第i个点后剩下的点（最后一位用于补齐四边形，不会被使用）
+_TRIANGLE_KEEP = np.array([[1, 2, 3, 3], [0, 2, 3, 3], [0, 1, 3, 3]])
+# 绘制方法在 ReadNA.DRAW_METHODS 中的序号
+QUADS, TRIANGLES, POLYGON = 0, 1, 3
+
+# 有曲率零件的截面模板：单位圆上的点，以及曲率为0时对应的正方形上的点，只在导入时计算一次
+_SQUARE_UP = np.array([
+    [0, 1], [np.tan(np.deg2rad(15)), 1], [np.tan(np.deg2rad(30)), 1], [1, 1],
+    [1, np.tan(np.deg2rad(30))], [1, np.tan(np.deg2rad(15))], [1, 0]])
+_SQUARE_DOWN = np.array([
+    [1, 0], [1, -np.tan(np.deg2rad(15))], [1, -np.tan(np.deg2rad(30))], [1, -1],
+    [np.tan(np.deg2rad(30)), -1], [np.tan(np.deg2rad(15)), -1], [0, -1]])
+_CIRCLE_UP = np.array([[np.sin(np.deg2rad(15 * i)), np.cos(np.deg2rad(15 * i))] for i in range(7)])
+_CIRCLE_DOWN = np.array([[np.cos(np.deg2rad(15 * i)), - np.sin(np.deg2rad(15 * i))] for i in range(7)])
+# 四条截面曲线（前上，前下，后上，后下）共28个点的模板，前14个点属于前截面，后14个点属于后截面
+_SECTION_CIRCLE = np.concatenate([_CIRCLE_UP, _CIRCLE_DOWN] * 2)  # (28, 2)
+_SECTION_SQUARE = np.concatenate([_SQUARE_UP, _SQUARE_DOWN] * 2)
+CURVE_SECTION_SIZE = 24  # 每个截面的点数
+# 前后截面的48个点在28个点中的序号（每条曲线去掉最后一个点），以及x的符号（镜像的一侧为-1）
+_FU, _FD, _BU, _BD = (np.arange(7) + 7 * i for i in range(4))
+_SECTION_DOT_INDEX = np.concatenate([_FU[:-1], _FD[:-1], _FD[::-1][:-1], _FU[::-1][:-1],
+                                     _BU[:-1], _BD[:-1], _BD[::-1][:-1], _BU[::-1][:-1]])
+_SECTION_DOT_SIGN = np.repeat([-1., -1., 1., 1., 1., 1., -1., -1.], 6)
+# 侧面：前截面的第i个点与后截面翻转并轮转一个单位后的第i个点相连
+_CURVE_BACK_INDEX = np.array([CURVE_SECTION_SIZE - 1 - (i - 1) % CURVE_SECTION_SIZE
+                              for i in range(CURVE_SECTION_SIZE)]) + CURVE_SECTION_SIZE
+_CURVE_QUAD_INDEX = np.array([
+    [i, _CURVE_BACK_INDEX[i], _CURVE_BACK_INDEX[(i + 1) % CURVE_SECTION_SIZE], (i + 1) % CURVE_SECTION_SIZE]
+    for i in range(CURVE_SECTION_SIZE)])
+CURVE_FACE_SIZES = np.array([4] * CURVE_SECTION_SIZE + [CURVE_SECTION_SIZE] * 2)
+CURVE_FACE_METHODS = np.array([QUADS] * CURVE_SECTION_SIZE + [POLYGON] * 2)
+CURVE_POINT_NUM = int(CURVE_FACE_SIZES.sum())
+
+
+def get_rotation_matrices(rot):
+    """
+    :param rot: (N, 3) 数组，三个轴的旋转角度，单位为度
+    :return: (N, 3, 3) 数组，每个零件的旋转矩阵（每种旋转角度只从缓存中取一次）
+    """
+    unique_rot, inverse = np.unique(rot, axis=0, return_inverse=True)
+    matrices = np.array([get_rotation_matrix(_rot) for _rot in unique_rot.tolist()]).reshape(-1, 3, 3)
+    return matrices[inverse.reshape(-1)]
+
+
+def transform_points(points, pos, rot, no_rotate):
+    """
+    对每个零件已经缩放的局部坐标（LocalGeometry）进行旋转，平移
+    :param points: (N, M, 3) 数组，零件缩放后的局部坐标
+    :param pos: (N, 3) 数组
+    :param rot: (N, 3) 数组
+    :param no_rotate: (N,) 布尔数组，为True的零件（Rot为列表[0, 0, 0]）只平移，与rotate_quaternion0/1/2相同
+        （这样的零件也不缩放，其局部坐标按缩放为1取自缓存）
+    :return: (N, M, 3) 数组，世界坐标
+    """
+    result = np.array(points, dtype=np.float64)
+    rotate = ~np.asarray(no_rotate, dtype=bool)
+    if rotate.any():
+        matrices = get_rotation_matrices(rot[rotate])[:, None, :, :]
+        result[rotate] = apply_rotation(result[rotate], matrices)
+    return result + pos[:, None, :]
+
+
+def _transform_part_points(points, pos, rot, no_rotate):
+    """
+    单个零件的 transform_points
+    """
+    if not no_rotate:
+        points = apply_rotation(points, get_rotation_matrix(rot))
+    return points + np.asarray(pos, dtype=np.float64)
+
+
+def get_vertex_coordinates(shape):
+    """
+    :param shape: (N, 10) 数组，零件表的外形参数列
+    :return: (N, 8, 3) 数组，局部坐标下的八个顶点，顺序与 ReadNA.VERTEX_KEYS 相同
+    """
+    length, height = shape[:, _S["Len"]], shape[:, _S["Hei"]]
+    y_min, y_max = -height / 2, height / 2
+    front_z, back_z = length / 2, -length / 2
+    half_height_scale = height * shape[:, _S["HScl"]] / 2
+    center_height_offset = shape[:, _S["HOff"]] * height
+    front_down_y = center_height_offset - half_height_scale
+    front_down_y = np.where(front_down_y < y_min, y_min, np.where(front_down_y > y_max, y_max, front_down_y))
+    front_up_y = center_height_offset + half_height_scale
+    front_up_y = np.where(front_up_y > y_max, y_max, np.where(front_up_y < y_min, y_min, front_up_y))
+    front_down_x = shape[:, _S["FWid"]] / 2
+    back_down_x = shape[:, _S["BWid"]] / 2
+    front_up_x = front_down_x + shape[:, _S["FSpr"]] / 2
+    back_up_x = back_down_x + shape[:, _S["BSpr"]] / 2
+    return np.stack([
+        np.stack([front_up_x, front_up_y, front_z], axis=-1),
+        np.stack([-front_up_x, front_up_y, front_z], axis=-1),
+        np.stack([front_down_x, front_down_y, front_z], axis=-1),
+        np.stack([-front_down_x, front_down_y, front_z], axis=-1),
+        np.stack([back_up_x, y_max, back_z], axis=-1),
+        np.stack([-back_up_x, y_max, back_z], axis=-1),
+        np.stack([back_down_x, - height / 2, back_z], axis=-1),
+        np.stack([-back_down_x, - height / 2, back_z], axis=-1),
+    ], axis=1)
+
+
+def get_curve_sections(shape):
+    """
+    有曲率零件的四条截面曲线（局部坐标）：预先计算好的单位圆和正方形模板按UCur, DCur混合，
+    再按宽度和扩散做横向缩放，按HScl, HOff做高度缩放和偏移，与 get_initial_Curve_face_dots 的结果相同
+    :param shape: (N, 10) 数组，零件表的外形参数列
+    :return: (N, 28, 3) 数组，依次为前上，前下，后上，后下四条曲线，每条7个点，从上到下排列
+    """
+    length, height = shape[:, _S["Len"], None], shape[:, _S["Hei"], None]
+    front_down_x = shape[:, _S["FWid"], None] / 2
+    back_down_x = shape[:, _S["BWid"], None] / 2
+    front_up_x = front_down_x + shape[:, _S["FSpr"], None] / 2
+    back_up_x = back_down_x + shape[:, _S["BSpr"], None] / 2
+    half_height_scale = height * shape[:, _S["HScl"], None] / 2
+    center_height_offset = shape[:, _S["HOff"], None] * height
+    y_min, y_max = -height / 2, height / 2
+    # 模板混合：前上，前下，后上，后下依次使用UCur, DCur, UCur, DCur
+    blend = np.tile(np.repeat(1 - shape[:, [_S["UCur"], _S["DCur"]]], 7, axis=1), 2)
+    dots = _SECTION_CIRCLE + (_SECTION_SQUARE - _SECTION_CIRCLE) * blend[..., None]  # (N, 28, 2)
+    front_x, front_y = dots[:, :14, 0], dots[:, :14, 1]
+    back_x, back_y = dots[:, 14:, 0], dots[:, 14:, 1]
+    result = np.empty(dots.shape[:2] + (3,))
+    # 横向缩放
+    result[:, :14, 0] = front_x * (((front_up_x - front_down_x) * front_y + (front_up_x + front_down_x)) / 2)
+    result[:, 14:, 0] = back_x * (((back_up_x - back_down_x) * back_y + (back_up_x + back_down_x)) / 2)
+    # 高度缩放，偏移和限制（只有前截面有高度缩放和偏移）
+    front_y = front_y * half_height_scale + center_height_offset
+    result[:, :14, 1] = np.where(front_y > y_max, y_max, np.where(front_y < y_min, y_min, front_y))
+    result[:, 14:, 1] = back_y * (height / 2)
+    result[:, :14, 2] = length / 2
+    result[:, 14:, 2] = -length / 2
+    return result
+
+
+def get_curve_section_dots(shape):
+    """
+    有曲率零件的前后截面的点集（局部坐标），与 get_plot_faces 中的拼合顺序相同
+    :param shape: (N, 10) 数组
+    :return: (N, 48, 3) 数组，前24个点为前截面，后24个点为后截面
+    """
+    dots = get_curve_sections(shape)[:, _SECTION_DOT_INDEX]
+    dots[..., 0] *= _SECTION_DOT_SIGN
+    return dots
+
+
+def get_curve_face_dots(shape):
+    """
+    单个有曲率零件的截面曲线，格式与 get_initial_Curve_face_dots 的返回值相同
+    :param shape: (10,) 外形参数，顺序与 PartTable.SHAPE_COLUMNS 相同
+    :return: 前截面和后截面的点集，{"up": [7个点], "down": [7个点]}
+    """
+    dots = list(get_curve_sections(np.asarray(shape, dtype=np.float64)[None])[0])
+    return {"up": dots[0:7], "down": dots[7:14]}, {"up": dots[14:21], "down": dots[21:28]}
+
+
+LOCAL_GEOMETRY_CACHE_SIZE = 16384  # 局部坐标缓存的容量（不同外形和缩放的数量），每项约2KB
+# 缩放后、旋转平移前的局部坐标（只读数组）：
+# vertex 未缩放的八个顶点（vertex_coordinates），dots 缩放后的八个顶点，curve_dots 缩放后的曲面截面点（无曲率的零件为None）
+LocalGeometry = namedtuple("LocalGeometry", ("vertex", "dots", "curve_dots"))
+
+
+class LocalGeometryCache:
+    def __init__(self, max_size: int = LOCAL_GEOMETRY_CACHE_SIZE):
+        """
+        进程内共享的局部坐标缓存，按外形参数和缩放的浮点数值为键（不量化，局部坐标由零件的参数本身计算，
+        与逐个零件计算的结果逐位相同）；最近最少使用的先被淘汰
+        :param max_size: 容量
+        """
+        self.max_size = max_size
+        self.entries = OrderedDict()  # 键: LocalGeometry
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.
+
+    def cache_info(self):
+        """
+        :return: 命中次数，未命中次数，容量，当前大小
+        """
+        return self.hits, self.misses, self.max_size, len(self.entries)
+
+    def clear(self):
+        self.entries.clear()
+        self.hits = self.misses = 0
+
+    @staticmethod
+    def get_keys(shape, scl, no_rotate) -> np.ndarray:
+        """
+        :param shape: (N, 10) 数组，外形参数
+        :param scl: (N, 3) 数组
+        :param no_rotate: (N,) 布尔数组，这些零件不缩放（见 transform_points），缩放部分的键按1计算
+        :return: (N, 13) 浮点数键数组
+        """
+        scl = np.where(np.asarray(no_rotate, dtype=bool)[:, None], 1., scl)
+        return np.concatenate([shape, scl], axis=1) + 0.  # -0.0 与 0.0 为同一个键
+
+    def get(self, shape, scl, no_rotate) -> LocalGeometry:
+        """
+        单个零件的局部坐标
+        :param shape: (10,) 外形参数，顺序与 PartTable.SHAPE_COLUMNS 相同
+        :param scl: 缩放
+        :param no_rotate: 是否只平移
+        """
+        key = tuple(self.get_keys(np.asarray(shape, dtype=np.float64)[None], np.asarray(scl, dtype=np.float64)[None],
+                                  [no_rotate])[0].tolist())
+        geometry = self.entries.get(key)
+        if geometry is None:
+            self.misses += 1
+            return self._add([key])[0]
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return geometry
+
+    def lookup(self, shape, scl, no_rotate):
+        """
+        批量查询，缓存中没有的外形一次向量化计算；同一批中重复的外形只计算一次（计为命中）
+        :param shape: (N, 10) 数组
+        :param scl: (N, 3) 数组
+        :param no_rotate: (N,) 布尔数组
+        :return: 不同外形的局部坐标列表，(N,) 每个零件在列表中的序号
+        """
+        if not len(shape):
+            return [], np.zeros(0, dtype=np.intp)
+        unique, inverse = np.unique(self.get_keys(shape, scl, no_rotate), axis=0, return_inverse=True)
+        keys = [tuple(key) for key in unique.tolist()]
+        result = [self.entries.get(key) for key in keys]
+        missing = [i for i, geometry in enumerate(result) if geometry is None]
+        for key, geometry in zip(keys, result):
+            if geometry is not None:
+                self.entries.move_to_end(key)
+        if missing:
+            for i, geometry in zip(missing, self._add([keys[i] for i in missing])):
+                result[i] = geometry
+        self.misses += len(missing)
+        self.hits += len(shape) - len(missing)
+        return result, inverse.reshape(-1)
+
+    def _add(self, keys):
+        """
+        计算并加入缓存
+        :param keys: 键列表（外形参数和缩放）
+        :return: 对应的局部坐标列表
+        """
+        values = np.array(keys, dtype=np.float64).reshape(-1, len(PartTable.SHAPE_COLUMNS) + 3)
+        shape, scl = values[:, :len(PartTable.SHAPE_COLUMNS)], values[:, len(PartTable.SHAPE_COLUMNS):]
+        vertex = get_vertex_coordinates(shape)
+        dots = vertex * scl[:, None, :]
+        curved = (shape[:, _S["UCur"]] >= 0.005) | (shape[:, _S["DCur"]] > 0.005)
+        curve_dots = iter(get_curve_section_dots(shape[curved]) * scl[curved][:, None, :])
+        result = []
+        for i, key in enumerate(keys):
+            geometry = LocalGeometry(vertex[i], dots[i], next(curve_dots) if curved[i] else None)
+            for array in geometry:
+                if array is not None:
+                    array.flags.writeable = False
+            self.entries[key] = geometry
+            result.append(geometry)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+        return result
+
+
+local_geometry_cache = LocalGeometryCache()
+
+
+def get_local_geometry(shape, scl, no_rotate) -> LocalGeometry:
+    """
+    从共享的缓存中取单个零件的局部坐标，见 LocalGeometryCache.get
+    """
+    return local_geometry_cache.get(shape, scl, no_rotate)
+
+
+def get_part_plot_lines(geometry, pos, rot, no_rotate):
+    """
+    单个零件的线框，格式与 get_plot_lines 的返回值相同，AdjustableHull 和 TempAdjustableHull 共用
+    :param geometry: get_local_geometry 的返回值
+    :param pos: 位置
+    :param rot: 旋转
+    :param no_rotate: 是否只平移，见 transform_points
+    :return: {"1": [8个点], "2": [4个点], "3": [2个点], "4": [2个点]}
+    """
+    lines = list(_transform_part_points(geometry.dots[LINE_INDEX], pos, rot, no_rotate))
+    result, start = {}, 0
+    for key, size in PLOT_LINE_SIZES:
+        result[key] = lines[start:start + size]
+        start += size
+    return result
+
+
+def get_part_plot_faces(geometry, pos, rot, no_rotate):
+    """
+    单个零件的面，格式与 get_plot_faces 的返回值相同，AdjustableHull 和 TempAdjustableHull 共用
+    :param geometry: get_local_geometry 的返回值
+    :param pos: 位置
+    :param rot: 旋转
+    :param no_rotate: 是否只平移，见 transform_points
+    :return: 绘制方法 -> 面的列表（每个面是点的列表），operation_dot_nodes，plot_all_dots
+    """
+    dots = list(_transform_part_points(geometry.dots, pos, rot, no_rotate))
+    operation_dot_nodes = [dots[i] for i in NODE_INDEX.tolist()]
+    if geometry.curve_dots is None:
+        result = {"GL_QUADS": [], "GL_TRIANGLES": [], "GL_QUAD_STRIP": [], "GL_POLYGON": []}
+        # 检查同一个面内的点是否重合，重合则去除重复点，添加到三角绘制方法中，否则添加到四边形绘制方法中
+        for face_index in FLAT_FACE_INDEX.tolist():
+            face = [dots[i] for i in face_index]
+            for i in range(3):
+                if np.array_equal(face[i], face[i + 1]):
+                    result["GL_TRIANGLES"].append(face[:i] + face[i + 1:])
+                    break
+            else:
+                result["GL_QUADS"].append(face)
+        return result, operation_dot_nodes, operation_dot_nodes
+    dots = _transform_part_points(geometry.curve_dots, pos, rot, no_rotate)
+    result = {
+        "GL_QUADS": [list(face) for face in dots[_CURVE_QUAD_INDEX]],
+        "GL_TRIANGLES": [],
+        "GL_QUAD_STRIP": [],
+        "GL_POLYGON": [list(dots[:CURVE_SECTION_SIZE]), list(dots[CURVE_SECTION_SIZE:])],
+    }
+    return result, operation_dot_nodes, result["GL_POLYGON"][0] + result["GL_POLYGON"][1]
+
+
+_CROSS_A, _CROSS_B = [1, 2, 0], [2, 0, 1]
+
+
+def get_face_normals(dots):
+    """
+    面的单位法向量，与 GL_plot.basic.get_normal 相同：不超过4个点的面取第0，1，2个点，曲面截面（超过12个点）取第0，6，12个点，
+    其余的面无法确定法向量，为零向量（不绘制）
+    :param dots: (F, n, 3) 数组，点数相同的F个面
+    :return: (F, 3) float32 数组
+    """
+    dots = np.asarray(dots, dtype=np.float64)
+    n = dots.shape[1]
+    if 4 < n <= 12:
+        return np.zeros((len(dots), 3), dtype=np.float32)
+    i1, i2, i3 = (0, 1, 2) if n <= 4 else (0, 6, 12)
+    v1, v2 = dots[:, i2] - dots[:, i1], dots[:, i3] - dots[:, i1]
+    # 直接按分量计算叉乘，单个零件只有几个面，np.cross和np.linalg.norm的调用开销比计算本身大得多
+    normals = v1[:, _CROSS_A] * v2[:, _CROSS_B] - v1[:, _CROSS_B] * v2[:, _CROSS_A]
+    length = np.sqrt((normals * normals).sum(axis=1))[:, None]
+    return np.divide(normals, length, out=np.zeros_like(normals), where=length > 0).astype(np.float32)
+
+
+def get_plot_normals(plot_faces):
+    """
+    单个零件的面法向量
+    :param plot_faces: 绘制方法 -> 面的列表（get_plot_faces 的返回值）
+    :return: 绘制方法 -> (面数, 3) 法向量数组，与 plot_faces 中的面一一对应
+    """
+    result = {}
+    for method, faces in plot_faces.items():
+        normals = np.zeros((len(faces), 3), dtype=np.float32)
+        sizes = [len(face) for face in faces]
+        for n in set(sizes):
+            index = [i for i, size in enumerate(sizes) if size == n]
+            normals[index] = get_face_normals([faces[i] for i in index])
+        result[method] = normals
+    return result
+
+
+def _scatter_by_hull(total, counts, hull_mask, values):
+    """
+    将一部分零件的数据（按零件顺序拼接）放回所有零件按顺序拼接后的数组中
+    :param total: 所有零件拼接后的数组
+    :param counts: (N,) 每个零件的数据长度
+    :param hull_mask: (N,) 属于这一部分的零件
+    :param values: 这一部分零件按顺序拼接的数据
+    """
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))[hull_mask]
+    part_counts = counts[hull_mask]
+    part_starts = np.concatenate(([0], np.cumsum(part_counts)[:-1]))
+    total[np.repeat(starts - part_starts, part_counts) + np.arange(len(values))] = values
+
+
+def get_hulls_geometry(shape, pos, rot, scl, no_rotate):
+    """
+    批量计算可调节船体的绘图数据
+    :param shape: (N, 10) 数组，零件表的外形参数列
+    :param pos: (N, 3) 数组
+    :param rot: (N, 3) 数组
+    :param scl: (N, 3) 数组
+    :param no_rotate: (N,) 布尔数组，见 transform_points
+    :return: 数组字典：vertex, lines, nodes, face_points, face_sizes, face_methods, face_normals, hull_face_nums
+    """
+    shape, pos = np.asarray(shape, dtype=np.float64), np.asarray(pos, dtype=np.float64)
+    rot, scl = np.asarray(rot, dtype=np.float64), np.asarray(scl, dtype=np.float64)
+    no_rotate = np.asarray(no_rotate, dtype=bool)
+    hull_num = len(shape)
+    # 外形和缩放相同的零件共用缓存中的局部坐标，只做各自的旋转和平移
+    geometries, inverse = local_geometry_cache.lookup(shape, scl, no_rotate)
+    vertex = np.array([geometry.vertex for geometry in geometries]).reshape(-1, 8, 3)[inverse]
+    scaled = np.array([geometry.dots for geometry in geometries]).reshape(-1, 8, 3)[inverse]
+    lines = transform_points(scaled[:, LINE_INDEX], pos, rot, no_rotate)
+    dots = transform_points(scaled, pos, rot, no_rotate)
+    nodes = dots[:, NODE_INDEX]
+    curved = np.array([geometry.curve_dots is not None for geometry in geometries], dtype=bool)[inverse]
+    flat = ~curved
+    # 无曲率：六个面，面内相邻两点重合的用三角形绘制，四边形在前，三角形在后
+    faces = dots[flat][:, FLAT_FACE_INDEX]  # (Nf, 6, 4, 3)
+    same = (faces[:, :, :3] == faces[:, :, 1:]).all(axis=-1)  # (Nf, 6, 3)
+    triangle = same.any(axis=-1)
+    keep = np.where(triangle[..., None], _TRIANGLE_KEEP[same.argmax(axis=-1)], np.arange(4))
+    faces = np.take_along_axis(faces, keep[..., None], axis=2)
+    order = np.argsort(triangle, axis=1, kind="stable")
+    faces = np.take_along_axis(faces, order[:, :, None, None], axis=1)
+    triangle = np.take_along_axis(triangle, order, axis=1)
+    flat_sizes = np.where(triangle, 3, 4)
+    flat_points = faces[np.arange(4) < flat_sizes[..., None]]
+    flat_normals = get_face_normals(faces.reshape(-1, 4, 3))  # 三角形去除重复点后，前三个点即为三角形的三个点
+    # 有曲率：24个侧面四边形，两个截面多边形
+    curve_geometries = [geometry.curve_dots for geometry in geometries if geometry.curve_dots is not None]
+    curve_rows = np.cumsum([geometry.curve_dots is not None for geometry in geometries], dtype=np.intp) - 1  # 在curve_geometries中的序号
+    curve_dots = transform_points(
+        np.array(curve_geometries).reshape(-1, 2 * CURVE_SECTION_SIZE, 3)[curve_rows[inverse[curved]]],
+        pos[curved], rot[curved], no_rotate[curved])
+    curve_quads = curve_dots[:, _CURVE_QUAD_INDEX]  # (Nc, 24, 4, 3)
+    curve_points = np.concatenate([curve_quads.reshape(-1, 4 * CURVE_SECTION_SIZE, 3),
+                                   curve_dots], axis=1).reshape(-1, 3)
+    curve_normals = np.concatenate([
+        get_face_normals(curve_quads.reshape(-1, 4, 3)).reshape(-1, CURVE_SECTION_SIZE, 3),
+        get_face_normals(curve_dots.reshape(-1, CURVE_SECTION_SIZE, 3)).reshape(-1, 2, 3)], axis=1).reshape(-1, 3)
+    # 按零件顺序合并
+    hull_face_nums = np.where(flat, len(FLAT_FACE_INDEX), len(CURVE_FACE_SIZES))
+    hull_point_nums = np.zeros(hull_num, dtype=np.int64)
+    hull_point_nums[flat] = flat_sizes.sum(axis=1)
+    hull_point_nums[curved] = CURVE_POINT_NUM
+    face_points = np.empty((int(hull_point_nums.sum()), 3))
+    _scatter_by_hull(face_points, hull_point_nums, flat, flat_points)
+    _scatter_by_hull(face_points, hull_point_nums, curved, curve_points)
+    face_sizes = np.empty(int(hull_face_nums.sum()), dtype=np.int16)
+    _scatter_by_hull(face_sizes, hull_face_nums, flat, flat_sizes.ravel())
+    _scatter_by_hull(face_sizes, hull_face_nums, curved, np.tile(CURVE_FACE_SIZES, int(curved.sum())))
+    face_methods = np.empty(len(face_sizes), dtype=np.uint8)
+    _scatter_by_hull(face_methods, hull_face_nums, flat, np.where(triangle, TRIANGLES, QUADS).ravel())
+    _scatter_by_hull(face_methods, hull_face_nums, curved, np.tile(CURVE_FACE_METHODS, int(curved.sum())))
+    face_normals = np.empty((len(face_sizes), 3), dtype=np.float32)
+    _scatter_by_hull(face_normals, hull_face_nums, flat, flat_normals)
+    _scatter_by_hull(face_normals, hull_face_nums, curved, curve_normals)
+    return {
+        "vertex": vertex,
+        "lines": lines,
+        "nodes": nodes,
+        "face_points": face_points,
+        "face_sizes": face_sizes,
+        "face_methods": face_methods,
+        "face_normals": face_normals,
+        "hull_face_nums": hull_face_nums.astype(np.int32),
+    }
@@ -0,0 +1,72 @@
+"""
+截面层索引：PartRelationMap 中 xz/xy/yz 六个 *LayerMap 的存储。
+接口与原来的 {坐标: [零件0, 零件1, ...]} 字典相同（坐标为 coord_keys 量化后的整数键），另外用一个有序的坐标列表（bisect）保持坐标从小到大的顺序，
+插入新层后不必重新排序整个字典，并支持范围查询（某个坐标区间内的所有层）和相邻层查询（上一层/下一层）。
+"""
+from bisect import bisect_left, bisect_right, insort
+from collections.abc import MutableMapping
+
+
+class LayerIndex(MutableMapping):
+    def __init__(self, layers=None):
+        """
+        :param layers: 初始的 {坐标: [零件0, 零件1, ...]}，顺序任意
+        """
+        self._layers = dict(layers) if layers else {}
+        self._keys = sorted(self._layers)  # 升序排列的坐标
+
+    def __getitem__(self, key):
+        return self._layers[key]
+
+    def __setitem__(self, key, parts):
+        if key not in self._layers:
+            insort(self._keys, key)
+        self._layers[key] = parts
+
+    def __delitem__(self, key):
+        del self._layers[key]
+        del self._keys[bisect_left(self._keys, key)]
+
+    def __contains__(self, key):
+        return key in self._layers
+
+    def __iter__(self):
+        return iter(self._keys)
+
+    def __reversed__(self):
+        return reversed(self._keys)
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __repr__(self):
+        return f"LayerIndex({dict(self.items())})"
+
+    def clear(self):
+        self._layers.clear()
+        self._keys.clear()
+
+    def irange(self, low=None, high=None, inclusive=(True, True)):
+        """
+        :param low: 坐标下限，None表示不限
+        :param high: 坐标上限，None表示不限
+        :param inclusive: 是否包含下限和上限
+        :return: 坐标在区间内的所有层的坐标，从小到大
+        """
+        start = 0 if low is None else (bisect_left if inclusive[0] else bisect_right)(self._keys, low)
+        end = len(self._keys) if high is None else (bisect_right if inclusive[1] else bisect_left)(self._keys, high)
+        return self._keys[start:end]
+
+    def higher_key(self, key):
+        """
+        :return: 坐标大于key的第一层的坐标，没有则为None
+        """
+        i = bisect_right(self._keys, key)
+        return self._keys[i] if i < len(self._keys) else None
+
+    def lower_key(self, key):
+        """
+        :return: 坐标小于key的最后一层的坐标，没有则为None
+        """
+        i = bisect_left(self._keys, key)
+        return self._keys[i - 1] if i > 0 else None
@@ -0,0 +1,225 @@
+"""
+零件属性的列式存储表（structure of arrays）。
+每个属性占一列 NumPy 数组，按零件的稠密索引（行号）存取；NAPart 等零件对象只保存自己的行号，
+其 Pos, Rot, Scl, Amr 以及可调节船体的十个外形参数都是该表的视图。
+整船的查询和变换（缩放、导出json等）可以直接对整列做一次向量化运算，而不必在 Python 中逐个遍历零件。
+"""
+import weakref
+from operator import attrgetter
+from typing import List
+
+import numpy as np
+
+_get_row = attrgetter("_row")
+
+
+class _PartRef(weakref.ref):
+    __slots__ = ("row",)
+
+
+class PartTable:
+    VEC_COLUMNS = ("Pos", "Rot", "Scl")
+    SHAPE_COLUMNS = ("Len", "Hei", "FWid", "BWid", "FSpr", "BSpr", "UCur", "DCur", "HScl", "HOff")
+    SHAPE_INDEX = {name: i for i, name in enumerate(SHAPE_COLUMNS)}
+    default = None  # 没有所属船体的零件（如单元测试中直接实例化的零件或预览用的临时零件）使用的公共表，打开新设计时重置
+
+    def __init__(self, capacity: int = 1024):
+        """
+        :param capacity: 初始容量，不足时按两倍扩容
+        """
+        self.size = 0  # 已分配的行数（包括已删除的行）
+        self.capacity = max(int(capacity), 1)
+        self.pos = np.zeros((self.capacity, 3), dtype=np.float64)
+        self.rot = np.zeros((self.capacity, 3), dtype=np.float64)
+        self.scl = np.zeros((self.capacity, 3), dtype=np.float64)
+        self.shape = np.zeros((self.capacity, len(PartTable.SHAPE_COLUMNS)), dtype=np.float64)
+        self.amr = np.zeros(self.capacity, dtype=np.int32)
+        self.alive = np.zeros(self.capacity, dtype=bool)
+        self.parts = []  # 行号 -> 零件对象的弱引用，零件被回收后该行标记为已删除
+        self.generation = 0  # 每次整列修改后加一，零件对象据此判断缓存的Pos, Rot, Scl是否过期
+        self._on_part_freed = self._remove_ref  # 所有弱引用共用同一个回调
+
+    @staticmethod
+    def get_default():
+        if PartTable.default is None:
+            PartTable.default = PartTable()
+        return PartTable.default
+
+    @staticmethod
+    def reset_default():
+        """
+        丢弃公共表，之后没有所属船体的零件使用新的表；已有的零件仍然使用原来的表
+        """
+        PartTable.default = None
+
+    def _grow(self):
+        new_capacity = self.capacity * 2
+        for name in ("pos", "rot", "scl", "shape", "amr", "alive"):
+            old = getattr(self, name)
+            new = np.zeros((new_capacity,) + old.shape[1:], dtype=old.dtype)
+            new[:self.size] = old[:self.size]
+            setattr(self, name, new)
+        self.capacity = new_capacity
+
+    def add(self, part) -> int:
+        """
+        为零件分配一行
+        :param part: 零件对象
+        :return: 行号
+        """
+        if self.size == self.capacity:
+            self._grow()
+        row = self.size
+        self.size += 1
+        self.alive[row] = True
+        ref = _PartRef(part, self._on_part_freed)
+        ref.row = row
+        self.parts.append(ref)
+        return row
+
+    def _remove_ref(self, ref: _PartRef):
+        if self.parts[ref.row] is ref:
+            self.remove(ref.row)
+
+    def remove(self, row: int):
+        self.alive[row] = False
+        self.parts[row] = None
+
+    def __len__(self):
+        return int(np.count_nonzero(self.alive[:self.size]))
+
+    def get_rows(self, parts) -> np.ndarray:
+        """
+        :param parts: 属于该表的零件
+        :return: 零件对应的行号数组
+        """
+        return np.fromiter(map(_get_row, parts), dtype=np.intp, count=len(parts))
+
+    def get_shape_column(self, name: str, rows=None) -> np.ndarray:
+        col = self.shape[:, PartTable.SHAPE_INDEX[name]]
+        return col[:self.size] if rows is None else col[rows]
+
+    def nbytes(self) -> int:
+        """
+        :return: 已使用的行所占用的字节数
+        """
+        per_row = sum(getattr(self, name).itemsize * int(np.prod(getattr(self, name).shape[1:]))
+                      for name in ("pos", "rot", "scl", "shape", "amr", "alive"))
+        return per_row * self.size
+
+    def invalidate(self):
+        """
+        整列修改后，使零件对象中缓存的Pos, Rot, Scl全部过期，下一次读取时从表中重新读取
+        """
+        self.generation += 1
+
+    def get_alive_rows(self) -> np.ndarray:
+        return np.flatnonzero(self.alive[:self.size])
+
+    def scale(self, parts: List = None, ratio=(1, 1, 1)):
+        """
+        向量化地缩放零件的位置和缩放比例
+        :param parts: 零件列表，为None时缩放表中所有未删除的零件
+        :param ratio: 三个方向的缩放比例
+        :return: 行号数组
+        """
+        rows = self.get_alive_rows() if parts is None else self.get_rows(parts)
+        ratio = np.asarray(ratio, dtype=np.float64)
+        self.pos[rows] *= ratio
+        self.scl[rows] *= ratio
+        self.invalidate()
+        return rows
+
+    def to_dicts(self, parts: List) -> List[dict]:
+        """
+        向量化地将零件转换为json格式的字典，结果与逐个调用part.to_dict()相同
+        :param parts: 零件列表
+        :return: 字典列表
+        """
+        if not parts:
+            return []
+        rows = self.get_rows(parts)
+        pos = self.pos[rows].tolist()
+        rot = self.rot[rows].tolist()
+        scl = self.scl[rows].tolist()
+        amr = self.amr[rows].tolist()
+        shape = self.shape[rows].tolist()
+        shape_names = PartTable.SHAPE_COLUMNS
+        result = []
+        for part, _pos, _rot, _scl, _amr, _shape in zip(parts, pos, rot, scl, amr, shape):
+            _dict = {
+                "Typ": part.__class__.__name__,
+                "Id": part.Id,
+                "Pos": _pos,
+                "Rot": _rot,
+                "Scl": _scl,
+                "Col": str(part.Col),
+                "Amr": _amr,
+            }
+            if part.shape_columns:
+                _dict.update(zip(shape_names, _shape))
+            else:
+                _dict.update(part.extra_dict())
+            result.append(_dict)
+        return result
+
+
+def _same_type(old_value, new_list):
+    """
+    保持缓存值原来的类型（tuple, list 或 np.ndarray），避免如 rot == [0, 0, 0] 这类比较的结果因类型改变而改变
+    """
+    if isinstance(old_value, tuple):
+        return tuple(new_list)
+    if isinstance(old_value, np.ndarray):
+        return np.array(new_list)
+    return new_list
+
+
+def sync_vec_columns(part):
+    """
+    从表中重新读取零件的Pos, Rot, Scl缓存
+    """
+    table, row = part._table, part._row
+    part._Pos = _same_type(part._Pos, table.pos[row].tolist())
+    part._Rot = _same_type(part._Rot, table.rot[row].tolist())
+    part._Scl = _same_type(part._Scl, table.scl[row].tolist())
+    part._generation = table.generation
+
+
+def vec_column_property(name: str):
+    """
+    生成Pos, Rot, Scl属性：写入时同时写入表，读取时返回缓存（与写入时的值相同），
+    表被整列修改后缓存过期，再从表中重新读取
+    :param name: "Pos", "Rot" 或 "Scl"
+    """
+    cache_name = f"_{name}"
+    column = name.lower()
+
+    def getter(self):
+        if self._generation != self._table.generation:
+            sync_vec_columns(self)
+        return getattr(self, cache_name)
+
+    def setter(self, value):
+        if self._generation != self._table.generation:
+            sync_vec_columns(self)
+        getattr(self._table, column)[self._row] = value
+        setattr(self, cache_name, value)
+
+    return property(getter, setter)
+
+
+def shape_column_property(name: str):
+    """
+    生成可调节船体的外形参数属性，直接读写表
+    :param name: PartTable.SHAPE_COLUMNS 中的名称
+    """
+    index = PartTable.SHAPE_INDEX[name]
+
+    def getter(self):
+        return float(self._table.shape[self._row, index])
+
+    def setter(self, value):
+        self._table.shape[self._row, index] = value
+
+    return property(getter, setter)
@@ -2,48 +2,323 @@
 """
 定义命令历史类
 """
-import copy
-from typing import List, Union
+import io
+import pickle
+import sys
+import tempfile
+import time
+import zlib
+from typing import Union
 
-from GL_plot.na_hull import (
-    NAHull, NaHullXYLayer, NaHullXZLayer, NaHullLeftView,
-    NAPart, NAPartNode, NAXYLayerNode, NAXZLayerNode, NALeftViewNode
-)
+from PyQt5.QtCore import QCoreApplication, QTimer
+from GL_plot.na_hull import NAHull, NAPart, NAPartNode, NAXYLayerNode, NAXZLayerNode, NALeftViewNode
 
 from ship_reader import PRM, ReadNA
+from ship_reader.axis_lines import AxisLine
 
 
+_MISSING = object()  # 快照表中不存在的键
+
+
+def get_live_tables():
+    """
+    将需要保存的各类状态展开为快照表
+    :return: {快照表名: 当前状态中的 {键: 值}}
+    """
+    relation_map = PRM.last_map
+    hull = NAHull.current_in_design_tab
+    index = relation_map.basicMap.index
+    tables = {f"basicMap_lines{axis}": index.lines[axis] for axis in range(3)}
+    tables["basicMap_positions"] = index.positions
+    tables["basicMap_detached"] = dict.fromkeys(index.detached, True)
+    for name in PRM.LAYER_MAP_NAMES:
+        tables[name] = getattr(relation_map, name)
+    tables["DrawMap"] = hull.DrawMap
+    tables["layers"] = {"xzLayers": hull.xzLayers, "xyLayers": hull.xyLayers, "leftViews": hull.leftViews}
+    tables["naParts"] = NAPart.hull_design_tab_id_map
+    tables["naPartNodes"] = NAPartNode.id_map
+    tables["naXYLayerNodes"] = NAXYLayerNode.id_map
+    tables["naXZLayerNodes"] = NAXZLayerNode.id_map
+    tables["naLeftViewNodes"] = NALeftViewNode.id_map
+    return tables
+
 
 class Memento:
-    def __init__(self, part=True, xzLayer=True, xyLayer=True, leftView=True):
-        """
-        保存自己初始化时各类的状态
-        """
-        self.attributes_to_copy = [
-            ("partRelationMap_basicMap", PRM.last_map.basicMap, True),
-            ("partRelationMap_DotsLayerMap", PRM.last_map.get_DotsLayerMap(), True),
-            ("partRelationMap_PartsLayerMap", PRM.last_map.get_PartsLayerMap(), True),
-            ("DrawMap", NAHull.current_in_design_tab.DrawMap, True),
-            ("xzLayers", NAHull.current_in_design_tab.xzLayers, True),
-            ("xyLayers", NAHull.current_in_design_tab.xyLayers, True),
-            ("leftViews", NAHull.current_in_design_tab.leftViews, True),
-            ("naHullXYLayer_id_map", NaHullXYLayer.id_map, False),
-            ("naHullXZLayer_id_map", NaHullXZLayer.id_map, False),
-            ("naHullLeftView_id_map", NaHullLeftView.id_map, False),
-            ("naParts", [part for part in NAPart.hull_design_tab_id_map.values()], True),
-            ("naPartNodes", [node for node in NAPartNode.id_map.values()], True),
-            ("naXYLayerNodes", [node for node in NAXYLayerNode.id_map.values()], True),
-            ("naXZLayerNodes", [node for node in NAXZLayerNode.id_map.values()], True),
-            ("naLeftViewNodes", [node for node in NALeftViewNode.id_map.values()], True)
-        ]
-        try:
-            for attr_name, source, use_deepcopy in self.attributes_to_copy:
-                if use_deepcopy:
-                    setattr(self, attr_name, copy.deepcopy(source))
+    # 快照表中值的保存方式：
+    # "line"：轴向直线，保存坐标和零件列表的副本；"list"：零件列表的副本；"node"：节点和各卦限零件列表的副本；
+    # "value"：不可变的值或共享的对象（零件，截面，位置元组等），直接引用
+    TABLE_KINDS = {
+        "basicMap_lines0": "line", "basicMap_lines1": "line", "basicMap_lines2": "line",
+        "basicMap_positions": "value", "basicMap_detached": "value",
+        **{name: "list" for name in PRM.LAYER_MAP_NAMES},
+        "DrawMap": "list", "layers": "list", "naParts": "value", "naPartNodes": "node",
+        "naXYLayerNodes": "value", "naXZLayerNodes": "value", "naLeftViewNodes": "value",
+    }
+
+    def __init__(self, snapshot: dict):
+        """
+        保存自己初始化时各类的状态：
+        与上一个状态的快照逐项比较，只记录变化的项（原值，新值），未变化的值与之前的状态共享，不再深拷贝整个零件关系图，节点和绘图数据；
+        撤回和重做时在快照上回退或应用这些变化
+        :param snapshot: 上一个状态的快照 {快照表名: {键: 值}}，会被更新为当前状态
+        """
+        st = time.perf_counter()
+        self.spill_file = None  # 超出内存上限后变化被写入的临时文件
+        self.spilled = None  # 变化在临时文件中的位置和长度
+        self.changes = {}  # 快照表名: {键: (原值, 新值)}，不存在的值为_MISSING
+        for name, live in get_live_tables().items():
+            kind = Memento.TABLE_KINDS[name]
+            stored = snapshot.setdefault(name, {})
+            changes = {}
+            for key, value in live.items():
+                old = stored.get(key, _MISSING)
+                if old is _MISSING or not self._same(kind, value, old):
+                    changes[key] = (old, self._freeze(kind, value))
+            if changes or len(stored) != len(live):  # 没有新的键且键的数量相同时，不会有被删除的键
+                for key in stored.keys() - live.keys():
+                    changes[key] = (stored[key], _MISSING)
+            if changes:
+                self.changes[name] = changes
+        self.apply(snapshot)
+        self.changed_num = sum(len(changes) for changes in self.changes.values())
+        self.nbytes = self._get_nbytes()
+        self.time = time.perf_counter() - st
+
+    @staticmethod
+    def _freeze(kind, value):
+        if kind == "list":
+            return list(value)
+        if kind == "line":
+            return list(value.coords), list(value.parts)
+        if kind == "node":
+            return value, {octant: list(parts) for octant, parts in (value._near_parts or {}).items()}
+        return value
+
+    @staticmethod
+    def _same(kind, value, stored):
+        if kind == "list":
+            return value == stored
+        if kind == "line":
+            return value.coords == stored[0] and value.parts == stored[1]
+        if kind == "node":
+            return value is stored[0] and (value._near_parts or {}) == stored[1]
+        return value is stored or value == stored
+
+    def _get_nbytes(self):
+        """
+        :return: 估计的增量占用的字节数（不含共享的零件等对象）
+        """
+        nbytes = sys.getsizeof(self.changes)
+        for name, changes in self.changes.items():
+            kind = Memento.TABLE_KINDS[name]
+            nbytes += sys.getsizeof(changes) + len(changes) * sys.getsizeof((None, None))
+            if kind == "value":
+                continue
+            for _old, new in changes.values():
+                if new is _MISSING:
+                    continue
+                if kind == "list":
+                    nbytes += sys.getsizeof(new)
+                elif kind == "line":
+                    nbytes += sys.getsizeof(new) + sys.getsizeof(new[0]) + sys.getsizeof(new[1])
                 else:
-                    setattr(self, attr_name, source)
-        except Exception as e:
-            print(e)
+                    nbytes += sys.getsizeof(new) + sys.getsizeof(new[1]) + sum(map(sys.getsizeof, new[1].values()))
+        return nbytes
+
+    def spill(self, spill_file: "SpillFile"):
+        """
+        将变化写入临时文件，释放内存中的副本
+        """
+        self.spilled = spill_file.dump(self.changes)
+        self.spill_file = spill_file
+        self.changes = None
+
+    def get_changes(self) -> dict:
+        """
+        :return: 变化（已写入临时文件时从文件中读取）
+        """
+        return self.changes if self.changes is not None else self.spill_file.load(*self.spilled)
+
+    def apply(self, snapshot: dict) -> dict:
+        """
+        在快照上应用这一状态的变化（从上一个状态到这一状态）
+        :return: 变化
+        """
+        return self._set(snapshot, 1)
+
+    def revert(self, snapshot: dict) -> dict:
+        """
+        在快照上回退这一状态的变化（从这一状态回到上一个状态）
+        :return: 变化
+        """
+        return self._set(snapshot, 0)
+
+    def _set(self, snapshot, i):
+        all_changes = self.get_changes()
+        for name, changes in all_changes.items():
+            stored = snapshot.setdefault(name, {})
+            for key, values in changes.items():
+                if values[i] is _MISSING:
+                    stored.pop(key, None)
+                else:
+                    stored[key] = values[i]
+        return all_changes
+
+
+class SpillFile:
+    PLAIN_TYPES = (list, tuple, dict, set, int, float, str, bool, type(None))
+
+    def __init__(self):
+        """
+        超出内存上限时，较早的Memento的变化经过压缩后写入这个临时文件；
+        变化中引用的零件，节点等对象不写入文件，以对象表中的序号代替（对象本身仍然由当前状态或对象表持有）
+        """
+        self.file = tempfile.TemporaryFile(prefix="NavalArtHistory_")
+        self.objects = []  # 序号 -> 对象
+        self.object_ids = {}  # id(对象) -> 序号
+
+    def _persistent_id(self, obj):
+        if type(obj) in SpillFile.PLAIN_TYPES:
+            return None
+        i = self.object_ids.get(id(obj))
+        if i is None:
+            i = self.object_ids[id(obj)] = len(self.objects)
+            self.objects.append(obj)
+        return i
+
+    def dump(self, data) -> tuple:
+        """
+        :return: 数据在文件中的位置和长度
+        """
+        buffer = io.BytesIO()
+        pickler = pickle.Pickler(buffer, protocol=pickle.HIGHEST_PROTOCOL)
+        pickler.persistent_id = self._persistent_id
+        pickler.dump(data)
+        compressed = zlib.compress(buffer.getvalue(), 1)
+        self.file.seek(0, 2)
+        offset = self.file.tell()
+        self.file.write(compressed)
+        return offset, len(compressed)
+
+    def load(self, offset, length):
+        self.file.seek(offset)
+        unpickler = pickle.Unpickler(io.BytesIO(zlib.decompress(self.file.read(length))))
+        unpickler.persistent_load = self.objects.__getitem__
+        return unpickler.load()
+
+    def close(self):
+        self.file.close()
+
+
+class StateRing:
+    def __init__(self, capacity):
+        """
+        定长的环形缓冲区，按逻辑索引访问（0为最早的一项）；
+        在末尾添加，删除最早的一项和截断末尾都不移动其他项
+        :param capacity: 容量
+        """
+        self.slots = [None] * capacity
+        self.sizes = [0] * capacity  # 每一项在内存中占用的字节数（估计）
+        self.start = 0  # 最早的一项在slots中的位置
+        self.length = 0
+
+    def __len__(self):
+        return self.length
+
+    def __getitem__(self, i):
+        """
+        :return: 第i项，不存在时为None
+        """
+        if 0 <= i < self.length:
+            return self.slots[(self.start + i) % len(self.slots)]
+        return None
+
+    def append(self, item, nbytes):
+        i = (self.start + self.length) % len(self.slots)
+        self.slots[i], self.sizes[i] = item, nbytes
+        self.length += 1
+
+    def popleft(self):
+        """
+        :return: 被删除的最早的一项和它的字节数
+        """
+        item, nbytes = self.slots[self.start], self.sizes[self.start]
+        self.slots[self.start] = None
+        self.start = (self.start + 1) % len(self.slots)
+        self.length -= 1
+        return item, nbytes
+
+    def truncate(self, length) -> int:
+        """
+        只保留前length项
+        :return: 被删除的项的字节数之和
+        """
+        nbytes = 0
+        for i in range(length, self.length):
+            j = (self.start + i) % len(self.slots)
+            nbytes += self.sizes[j]
+            self.slots[j] = None
+        self.length = min(self.length, length)
+        return nbytes
+
+    def set_size(self, i, nbytes) -> int:
+        """
+        :return: 第i项原来的字节数
+        """
+        j = (self.start + i) % len(self.slots)
+        old, self.sizes[j] = self.sizes[j], nbytes
+        return old
+
+
+def get_nbytes(obj) -> int:
+    """
+    估计操作对象占用的字节数：对象本身和它直接持有的容器（不含容器中共享的零件等对象）
+    """
+    nbytes = sys.getsizeof(obj)
+    attrs = getattr(obj, "__dict__", None)
+    if attrs:
+        nbytes += sys.getsizeof(attrs)
+        nbytes += sum(sys.getsizeof(value) for value in attrs.values() if isinstance(value, (list, tuple, dict, set)))
+    return nbytes
+
+
+def restore_tables(snapshot: dict, keys: dict):
+    """
+    将快照表中的指定项写回到各类中（列表写回副本，快照中的值保持不变）
+    :param snapshot: {快照表名: {键: 值}}
+    :param keys: {快照表名: {键}}
+    """
+    relation_map = PRM.last_map
+    hull = NAHull.current_in_design_tab
+    index = relation_map.basicMap.index
+    live_tables = get_live_tables()
+    for name, table_keys in keys.items():
+        stored = snapshot.get(name, {})
+        kind = Memento.TABLE_KINDS[name]
+        live = live_tables[name]
+        for key in table_keys:
+            value = stored.get(key, _MISSING)
+            if name == "basicMap_detached":
+                index.detached.discard(key) if value is _MISSING else index.detached.add(key)
+            elif name == "layers":
+                setattr(hull, key, list(value))
+            elif name == "naPartNodes":
+                node = live.pop(key, None)
+                if node is not None and NAPartNode.node_index.get(NAPartNode.get_key(node.pos)) is node:
+                    del NAPartNode.node_index[NAPartNode.get_key(node.pos)]
+                if value is not _MISSING:
+                    node, near_parts = value
+                    node._near_parts = {octant: list(parts) for octant, parts in near_parts.items()}
+                    live[key] = NAPartNode.node_index[NAPartNode.get_key(node.pos)] = node
+            elif value is _MISSING:
+                live.pop(key, None)
+            elif kind == "line":
+                line = live[key] = AxisLine()
+                line.coords, line.parts = list(value[0]), list(value[1])
+            elif kind == "list":
+                live[key] = list(value)
+            else:
+                live[key] = value
 
 
 def operating_control(func):
@@ -65,13 +340,31 @@ def operating_control(func):
 class StateHistory:
     current: Union["StateHistory", None] = None
 
-    def __init__(self, show_statu_func):
-        # 初始化一个定长的状态栈
-        self.max_length = 10000
-        self.stateStack: List[Union[Memento, "Operation", None]] = [None] * self.max_length
+    def __init__(self, show_statu_func, max_length=10000, max_bytes=256 * 1048576, merge_window=0.5):
+        """
+        :param show_statu_func:
+        :param max_length: 状态栈的最大长度，超出后删除最早的状态
+        :param max_bytes: 内存中的状态和操作占用的字节数上限（估计），
+            超出后较早的Memento被压缩写入临时文件，仍然超出时删除最早的状态
+        :param merge_window: 合并连续操作的时间窗口（秒），与上一个操作间隔小于它的同类操作合并为一项，绘制推迟到连续操作结束后
+        """
+        self.max_length = max_length
+        self.max_bytes = max_bytes
+        self.stateStack = StateRing(max_length)  # 状态栈
+        self.nbytes = 0  # 状态栈在内存中占用的字节数
+        self.spill_file = None
+        self.spill_index = 0  # 在此之前的Memento都已写入临时文件
         self.current_index = None
         self.show_statu_func = show_statu_func
         self.operating = False
+        self.snapshot = {}  # 快照：状态栈中snapshot_index处的状态，Memento只记录与它相比的变化
+        self.snapshot_index = None
+        self.dirty_keys = {}  # 快照表名: {键}，快照中已变化但还没有写回到各类中的项
+        self.merge_window = merge_window
+        self.last_operation_time = 0.  # 上一个操作的执行时间，用于判断是否为连续操作
+        self.merged_num = 0  # 当前栈顶操作合并的操作数
+        self.pending_refresh = None  # 合并后推迟刷新绘制的操作
+        self.refresh_timer = None  # 连续操作结束（超出时间窗口）后刷新绘制
         StateHistory.current = self
 
     def init_stack(self):
@@ -79,24 +372,77 @@ class StateHistory:
         初始化状态
         :return:
         """
-        self.stateStack[0] = Memento()
-        self.current_index = 0  # 当前状态的索引
+        self.stateStack = StateRing(self.max_length)
+        self.nbytes = 0
+        if self.spill_file is not None:
+            self.spill_file.close()
+            self.spill_file = None
+        self.spill_index = 0
+        self.snapshot = {}
+        self.dirty_keys = {}
+        self.flush_refresh()
+        self.current_index = self.snapshot_index = -1
+        memento_ = Memento(self.snapshot)
+        self.push(memento_)  # 当前状态的索引为0
+        self.show_memento_info(memento_)
 
     @operating_control
     def execute_operation(self, operation_obj):
         """
-        执行命令后，保存状态
+        执行命令后，保存状态；
+        时间窗口内的连续同类操作合并到栈顶的操作中，不增加状态，合并的操作执行时不刷新绘制，连续操作结束后只刷新一次
         :param operation_obj:
         :return:
         """
-        operation_obj.execute()
-        if self.current_index == self.max_length - 1:
-            self.stateStack = self.stateStack[1:] + [operation_obj]
-            self.show_statu_func("操作栈已满", "warning")
+        now = time.perf_counter()
+        if now - self.last_operation_time < self.merge_window and self.merge_operation(operation_obj):
+            operation_obj.execute(update=False)
+            self.merged_num += 1
+            self.defer_refresh(self.stateStack[self.current_index])
+            self.show_statu_func(f"{operation_obj.name}\t{self.current_index + 1}（合并 {self.merged_num + 1} 次操作）",
+                                 "process")
         else:
-            self.current_index += 1
-            self.stateStack[self.current_index] = operation_obj
+            self.flush_refresh()
+            operation_obj.execute()
+            self.push(operation_obj)
+            self.merged_num = 0
             self.show_statu_func(f"{operation_obj.name}\t{self.current_index + 1}", "process")
+        self.last_operation_time = now
+
+    def merge_operation(self, operation_obj) -> bool:
+        """
+        尝试把操作合并到栈顶的操作中（栈顶不能是Memento，也不能有可以重做的状态）
+        :param operation_obj:
+        :return: 是否已合并
+        """
+        last = self.stateStack[self.current_index]
+        if last is None or isinstance(last, Memento) or self.stateStack[self.current_index + 1] is not None:
+            return False
+        return last.merge(operation_obj)
+
+    def defer_refresh(self, operation_obj):
+        """
+        推迟刷新绘制，直到时间窗口内没有新的操作
+        :param operation_obj: 需要刷新的操作
+        """
+        self.pending_refresh = operation_obj
+        if self.refresh_timer is None and QCoreApplication.instance() is not None:
+            self.refresh_timer = QTimer()
+            self.refresh_timer.setSingleShot(True)
+            self.refresh_timer.timeout.connect(self.flush_refresh)
+        if self.refresh_timer is not None:
+            self.refresh_timer.start(int(self.merge_window * 1000))
+
+    def flush_refresh(self):
+        """
+        结束连续操作：执行推迟的刷新，之后的操作不再合并
+        """
+        if self.refresh_timer is not None:
+            self.refresh_timer.stop()
+        self.last_operation_time = 0.
+        if self.pending_refresh is not None:
+            operation_obj, self.pending_refresh = self.pending_refresh, None
+            operation_obj.refresh()
 
     @operating_control
     def execute(self):
@@ -104,31 +450,108 @@ class StateHistory:
         执行命令后，保存状态
         :return:
         """
-        if self.current_index == self.max_length - 1:
-            self.stateStack = self.stateStack[1:] + [Memento()]
-            self.show_statu_func("满栈", "warning")
-        else:
-            # 如果当前状态不是最后一个状态，说明是撤回后执行的命令，需要删除当前状态之后的所有状态
-            if self.stateStack[self.current_index + 1] is not None:
-                self.stateStack = self.stateStack[:self.current_index + 1] + [None] * (
-                        self.max_length - self.current_index - 1)
-            self.current_index += 1
-            self.stateStack[self.current_index] = Memento()
+        self.flush_refresh()
+        self.move_snapshot()
+        # 如果当前状态不是最后一个状态，说明是撤回后执行的命令，需要删除当前状态之后的所有状态
+        self.truncate()
+        memento_ = Memento(self.snapshot)
+        self.push(memento_)
+        self.dirty_keys = {}  # 新的快照与各类的当前状态相同
+        self.show_memento_info(memento_)
+
+    def push(self, entry):
+        """
+        在当前状态之后添加状态或操作，超出长度或内存上限时删除或写出较早的状态
+        :param entry: Memento（由当前的快照生成）或操作对象
+        """
+        # 撤回后执行的命令，删除当前状态之后的所有状态（之后的Memento记录的变化不再与快照连续）
+        self.truncate()
+        if len(self.stateStack) == self.max_length:
+            self.pop_oldest()
+            self.show_statu_func("操作栈已满", "warning")
+        nbytes = entry.nbytes if isinstance(entry, Memento) else get_nbytes(entry)
+        self.stateStack.append(entry, nbytes)
+        self.nbytes += nbytes
+        self.current_index = len(self.stateStack) - 1
+        if isinstance(entry, Memento):
+            self.snapshot_index = self.current_index  # 生成Memento时快照已经更新为这一状态
+        self.limit_memory()
+
+    def truncate(self):
+        """
+        删除当前状态之后的所有状态
+        """
+        if self.stateStack[self.current_index + 1] is not None:
+            self.move_snapshot()
+            self.nbytes -= self.stateStack.truncate(self.current_index + 1)
+            self.spill_index = min(self.spill_index, self.current_index + 1)
+
+    def pop_oldest(self):
+        """
+        删除最早的状态
+        """
+        if self.snapshot_index <= 0:
+            self.move_snapshot()  # 快照不能停留在被删除的状态之前
+        _entry, nbytes = self.stateStack.popleft()
+        self.nbytes -= nbytes
+        self.current_index -= 1
+        self.snapshot_index -= 1
+        self.spill_index = max(self.spill_index - 1, 0)
+
+    def limit_memory(self):
+        """
+        超出内存上限时，先把较早的Memento写入临时文件，仍然超出（如操作过多）时删除最早的状态
+        """
+        while self.nbytes > self.max_bytes and self.spill_index < self.current_index:
+            entry = self.stateStack[self.spill_index]
+            if isinstance(entry, Memento) and entry.changes is not None:
+                if self.spill_file is None:
+                    self.spill_file = SpillFile()
+                entry.spill(self.spill_file)
+                self.nbytes -= self.stateStack.set_size(self.spill_index, 0)
+            self.spill_index += 1
+        if self.nbytes > self.max_bytes and self.current_index > 0:
+            while self.nbytes > self.max_bytes and self.current_index > 0:
+                self.pop_oldest()
+            self.show_statu_func("历史记录超出内存上限，已删除最早的状态", "warning")
+
+    def move_snapshot(self):
+        """
+        将快照移动到当前状态：回退或应用快照和当前状态之间的Memento记录的变化
+        """
+        crossed = []
+        while self.snapshot_index > self.current_index:
+            if isinstance(self.stateStack[self.snapshot_index], Memento):
+                crossed.append(self.stateStack[self.snapshot_index].revert(self.snapshot))
+            self.snapshot_index -= 1
+        while self.snapshot_index < self.current_index:
+            self.snapshot_index += 1
+            if isinstance(self.stateStack[self.snapshot_index], Memento):
+                crossed.append(self.stateStack[self.snapshot_index].apply(self.snapshot))
+        for all_changes in crossed:  # 记录快照中变化的项，重置信息时只需要写回这些项
+            for name, changes in all_changes.items():
+                self.dirty_keys.setdefault(name, set()).update(changes)
+
+    def show_memento_info(self, memento_):
+        self.show_statu_func(f"保存状态\t{self.current_index + 1}：{memento_.changed_num} 项变化，"
+                             f"{memento_.nbytes / 1024:.1f} KB，耗时 {memento_.time * 1000:.1f} ms", "process")
 
     @operating_control
     def undo(self):
         """
         撤回到上一个状态
         """
+        self.flush_refresh()
         if self.current_index > 0:
             if not isinstance(self.stateStack[self.current_index], Memento):
                 self.stateStack[self.current_index].undo()
                 self.show_statu_func(f"Ctrl+Z 撤回 {self.stateStack[self.current_index].name}\t{self.current_index}", "process")
                 self.current_index -= 1
             else:
-                self.show_statu_func(f"Ctrl+Z 撤回 {self.current_index}", "process")
                 self.current_index -= 1
-                self.reset_information()
+                restore_time = self.reset_information()
+                self.show_statu_func(f"Ctrl+Z 撤回 {self.current_index + 1}，耗时 {restore_time * 1000:.1f} ms",
+                                     "process")
         else:
             self.show_statu_func("Ctrl+Z 没有更多的历史记录", "warning")
 
@@ -137,41 +560,31 @@ class StateHistory:
         """
         重做命令
         """
+        self.flush_refresh()
         if self.current_index is not None and self.stateStack[self.current_index + 1] is not None:
             self.current_index += 1
             if isinstance(self.stateStack[self.current_index], Memento):
-                self.reset_information()
-                self.show_statu_func(f"Ctrl+Shift+Z 重做 {self.current_index + 1}", "process")
+                restore_time = self.reset_information()
+                self.show_statu_func(f"Ctrl+Shift+Z 重做 {self.current_index + 1}，耗时 {restore_time * 1000:.1f} ms",
+                                     "process")
             else:
                 self.stateStack[self.current_index].redo()
                 self.show_statu_func(f"Ctrl+Shift+Z 重做 {self.stateStack[self.current_index].name}\t{self.current_index + 1}", "process")
         else:
             self.show_statu_func("Ctrl+Shift+Z 没有更多的历史记录", "warning")
 
-    # 由于是动态绑定的，所以pycharm无法识别，但是实际上是存在的
-    # noinspection PyUnresolvedReferences
     def reset_information(self):
         """
-        重置所有类的信息
-        :return:
+        将快照移动到当前状态，如果当前状态是Memento，把快照中变化的项写回到各类中
+        :return: 耗时
         """
-        memento_ = self.stateStack[self.current_index]
-        if not isinstance(memento_, Memento):
-            return
-        PRM.last_map.basicMap = memento_.partRelationMap_basicMap
-        PRM.last_map.xyDotsLayerMap, PRM.last_map.xzDotsLayerMap, PRM.last_map.yzDotsLayerMap = \
-            memento_.partRelationMap_DotsLayerMap
-        PRM.last_map.xyPartsLayerMap, PRM.last_map.xzPartsLayerMap, PRM.last_map.yzPartsLayerMap = \
-            memento_.partRelationMap_PartsLayerMap
-        NAHull.current_in_design_tab.DrawMap = memento_.DrawMap
-        NAHull.current_in_design_tab.xzLayers = memento_.xzLayers
-        NAHull.current_in_design_tab.xyLayers = memento_.xyLayers
-        NAHull.current_in_design_tab.leftViews = memento_.leftViews
-        NAPart.hull_design_tab_id_map = {id(part) % 4294967296: part for part in memento_.naParts}
-        NAPartNode.id_map = {id(node) % 4294967296: node for node in memento_.naPartNodes}
-        NAXYLayerNode.id_map = {id(node) % 4294967296: node for node in memento_.naXYLayerNodes}
-        NAXZLayerNode.id_map = {id(node) % 4294967296: node for node in memento_.naXZLayerNodes}
-        NALeftViewNode.id_map = {id(node) % 4294967296: node for node in memento_.naLeftViewNodes}
+        st = time.perf_counter()
+        self.move_snapshot()
+        if not isinstance(self.stateStack[self.current_index], Memento):
+            return time.perf_counter() - st
+        restore_tables(self.snapshot, self.dirty_keys)
+        self.dirty_keys = {}
+        return time.perf_counter() - st
 
 
 def push_global_statu(func):
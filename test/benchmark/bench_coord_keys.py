@@ -0,0 +1,60 @@
+"""
+坐标量化的性能测试：比较以保留三位小数的浮点数坐标和以量化后的整数坐标（coord_keys）为键的字典查找，
+并统计xz截面按浮点数相等（dot[1] == y）判断时漏掉的点数
+运行：python -m test.benchmark.bench_coord_keys [零件数量...]
+"""
+import sys
+import time
+
+from ship_reader import ReadNA
+from ship_reader.NA_design_reader import AdjustableHull
+from ship_reader.coord_keys import coord_keys, pos_key
+from test.helpers import make_na_file, silent
+
+
+def lookup_float_keys(dots):
+    st = time.perf_counter()
+    keys = [(round(float(dot[0]), 3), round(float(dot[1]), 3), round(float(dot[2]), 3)) for dot in dots]
+    index = dict.fromkeys(keys)
+    found = sum(key in index for key in keys)
+    return time.perf_counter() - st, found
+
+
+def lookup_int_keys(dots):
+    st = time.perf_counter()
+    keys = [pos_key(dot) for dot in dots]
+    index = dict.fromkeys(keys)
+    found = sum(key in index for key in keys)
+    return time.perf_counter() - st, found
+
+
+def count_layer_misses(hulls):
+    """
+    截面层的坐标是保留三位小数的值，点的坐标与之不完全相等时，按浮点数相等判断就会漏掉
+    :return: 点的总数，按浮点数相等判断时漏掉的点数
+    """
+    total = missed = 0
+    for hull in hulls:
+        ys = [float(dot[1]) for dot in hull.plot_all_dots]
+        total += len(ys)
+        missed += sum(y != y_key / 1000 for y, y_key in zip(ys, coord_keys(ys).tolist()))
+    return total, missed
+
+
+def main(part_nums=(10000, 50000)):
+    ReadNA.design_cache = None
+    for part_num in part_nums:
+        reader = ReadNA(make_na_file(part_num), show_statu_func=silent)
+        hulls = [part for part in reader.Parts if isinstance(part, AdjustableHull)]
+        AdjustableHull.prepare_plot_data(hulls)
+        dots = [dot for hull in hulls for dot in hull.operation_dot_nodes]
+        float_time, float_found = lookup_float_keys(dots)
+        int_time, int_found = lookup_int_keys(dots)
+        assert float_found == int_found == len(dots)
+        total, missed = count_layer_misses(hulls)
+        print(f"parts: {part_num:6d}   dots: {len(dots):7d}   float keys {float_time:6.3f} s   "
+              f"int keys {int_time:6.3f} s   xz layer dots missed by float equality {missed}/{total}")
+
+
+if __name__ == '__main__':
+    main([int(i) for i in sys.argv[1:]] or (10000, 50000))
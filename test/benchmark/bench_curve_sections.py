@@ -0,0 +1,39 @@
+"""
+有曲率的可调节船体逐个计算绘图数据的性能测试（修改零件属性和预览临时零件时使用的路径）
+运行：python -m test.benchmark.bench_curve_sections [零件数量]
+"""
+import random
+import sys
+from types import SimpleNamespace
+
+from GL_plot.na_hull import TempAdjustableHull
+from ship_reader.NA_design_reader import AdjustableHull
+from test.benchmark.bench_utils import timeit
+
+
+def make_shapes(part_num, seed=0):
+    rand = random.Random(seed)
+    return [(rand.choice(([0, 0, 0], (0, 0, 0), (0, 90, 0), (90, 0, 0))),
+             4, 1 + rand.random(), 1 + rand.random(), 2, 0.1, 0.2,
+             rand.choice((0.5, 1)), rand.random(), 0.5 + rand.random(), rand.random() - 0.5)
+            for _ in range(part_num)]
+
+
+def main(part_num=5000):
+    shapes = make_shapes(part_num)
+    hulls = [AdjustableHull(None, "0", (0, 0, 0), rot, (1, 1, 1), "#888888", 5, *shape)
+             for rot, *shape in shapes]
+    win = SimpleNamespace(paintGL=lambda: None, update=lambda: None)
+    temp_hulls = [TempAdjustableHull(None, win, "0", [0, 0, 0], list(rot), [1, 1, 1], "#888888", 5, *shape, None)
+                  for rot, *shape in shapes[:part_num // 10]]
+    print(f"curved hulls: {part_num}")
+    t, _ = timeit(lambda: [hull.get_initial_Curve_face_dots() for hull in hulls], repeat=3)
+    print(f"{'curve section dots':24s} {t:8.3f} s   {part_num / t:10.0f} parts/s")
+    t, _ = timeit(lambda: [hull.get_plot_faces() for hull in hulls], repeat=3)
+    print(f"{'AdjustableHull faces':24s} {t:8.3f} s   {part_num / t:10.0f} parts/s")
+    t, _ = timeit(lambda: [hull.get_plot_faces() for hull in temp_hulls], repeat=3)
+    print(f"{'TempAdjustableHull faces':24s} {t:8.3f} s   {len(temp_hulls) / t:10.0f} parts/s")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5000)
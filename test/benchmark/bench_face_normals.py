@@ -0,0 +1,81 @@
+"""
+面法向量的性能测试：比较编译显示列表时逐面调用get_normal（三个QVector3D和一次叉乘）和使用预先计算的plot_normals的耗时，
+以及批量计算绘图数据（get_hulls_geometry）时向量化计算所有面法向量的耗时。
+在无显示器的环境中通过EGL创建上下文（如Mesa的软件渲染llvmpipe）
+运行：python -m test.benchmark.bench_face_normals [零件数量...]
+"""
+import os
+
+os.environ.setdefault("PYOPENGL_PLATFORM", "egl")
+os.environ.setdefault("EGL_PLATFORM", "surfaceless")
+
+import sys
+import time
+
+import numpy as np
+from OpenGL import GL
+
+from GL_plot.basic import get_normal
+from ship_reader import ReadNA
+from ship_reader.NA_design_reader import AdjustableHull
+from ship_reader.hull_geometry import get_face_normals
+from test.helpers import make_gl_context, make_na_file, silent
+
+
+def compile_get_normal(hull):
+    """
+    原来的显示列表：逐面计算法向量
+    """
+    for draw_method, faces_dots in hull.plot_faces.items():
+        for face in faces_dots:
+            GL.glBegin(getattr(GL, draw_method))
+            if len(face) == 3 or len(face) == 4:
+                normal = get_normal(face[0], face[1], face[2])
+            elif len(face) > 12:
+                normal = get_normal(face[0], face[6], face[12])
+            else:
+                continue
+            GL.glNormal3f(normal.x(), normal.y(), normal.z())
+            for dot in face:
+                GL.glVertex3f(dot[0], dot[1], dot[2])
+            GL.glEnd()
+
+
+def compile_lists(hulls, draw):
+    st = time.perf_counter()
+    for hull in hulls:
+        gen_list = GL.glGenLists(1)
+        GL.glNewList(gen_list, GL.GL_COMPILE)
+        draw(hull)
+        GL.glEndList()
+        GL.glDeleteLists(gen_list, 1)
+    return time.perf_counter() - st
+
+
+def main(part_nums=(10000, 50000)):
+    make_gl_context()
+    ReadNA.design_cache = None
+    for part_num in part_nums:
+        reader = ReadNA(make_na_file(part_num), show_statu_func=silent)
+        hulls = [part for part in reader.Parts if isinstance(part, AdjustableHull)]
+        AdjustableHull.prepare_plot_data(hulls)
+        for hull in hulls:  # 两种方法都从已经解包的绘图数据开始
+            hull.plot_normals
+        old_time = compile_lists(hulls, compile_get_normal)
+        new_time = compile_lists(hulls, lambda hull: hull.draw_faces(GL))
+        # 向量化计算所有面的法向量（按点数分组，与get_hulls_geometry中相同）
+        groups = {}
+        for hull in hulls:
+            for faces in hull.plot_faces.values():
+                for face in faces:
+                    groups.setdefault(len(face), []).append(face)
+        groups = {n: np.asarray(faces) for n, faces in groups.items()}
+        st = time.perf_counter()
+        face_num = sum(len(get_face_normals(faces)) for faces in groups.values())
+        normal_time = time.perf_counter() - st
+        print(f"parts: {part_num:6d}   display lists with get_normal {old_time:6.2f} s   "
+              f"with plot_normals {new_time:6.2f} s   vectorized normals for {face_num} faces {normal_time * 1000:6.1f} ms")
+
+
+if __name__ == '__main__':
+    main([int(i) for i in sys.argv[1:]] or (10000, 50000))
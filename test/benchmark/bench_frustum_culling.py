@@ -0,0 +1,118 @@
+"""
+视锥剔除的性能测试：与OpenGLWin相同的透视投影（gluPerspective, gluLookAt），分别在看到整船和拉近到船首一小段的视角下，
+比较剔除前后每帧的耗时，可见和被剔除的零件数，每帧查询层次包围盒的耗时，并比较两种方法绘制的图像；
+然后比较修改一个零件后下一帧的耗时（重新拟合包围盒）和重新建立层次包围盒的耗时，以及剔除前后拾取（GL_SELECT）的耗时和结果。
+在无显示器的环境中通过EGL创建上下文（如Mesa的软件渲染llvmpipe）
+运行：python -m test.benchmark.bench_frustum_culling [零件数量...]
+"""
+import os
+
+os.environ.setdefault("PYOPENGL_PLATFORM", "egl")
+os.environ.setdefault("EGL_PLATFORM", "surfaceless")
+
+import sys
+import time
+
+import numpy as np
+from OpenGL import GL, GLU
+
+from GL_plot.hull_bvh import PartBVH, get_frustum_planes
+from GL_plot.na_hull import NAHull
+from ship_reader import NAPartNode
+from test.benchmark.bench_hull_batch import BenchWin, FRAME_NUM, frame
+from test.benchmark.bench_hull_instancing import load_hull
+from test.benchmark.bench_utils import timeit
+from test.helpers import make_gl_context
+
+WIDTH, HEIGHT = 400, 300
+
+
+def read_image():
+    return np.frombuffer(GL.glReadPixels(0, 0, WIDTH, HEIGHT, GL.GL_RGBA, GL.GL_UNSIGNED_BYTE),
+                         dtype=np.uint8).reshape(HEIGHT, WIDTH, 4).astype(np.int16)
+
+
+def set_view(pos, tar, pick=None):
+    GL.glMatrixMode(GL.GL_PROJECTION)
+    GL.glLoadIdentity()
+    if pick:
+        GLU.gluPickMatrix(*pick, 3, 3, [0, 0, WIDTH, HEIGHT])
+    GLU.gluPerspective(45, WIDTH / HEIGHT, 0.1, 2000.0)
+    GL.glMatrixMode(GL.GL_MODELVIEW)
+    GL.glLoadIdentity()
+    GLU.gluLookAt(*pos, *tar, 0, 1, 0)
+
+
+def get_view_planes():
+    return get_frustum_planes(GL.glGetFloatv(GL.GL_PROJECTION_MATRIX), GL.glGetFloatv(GL.GL_MODELVIEW_MATRIX))
+
+
+def pick(hull, pos, tar):
+    """
+    与OpenGLWin.add_selected_objects_when_click相同：拾取窗口中心的零件
+    :return: 耗时，命中的名称集合
+    """
+    GL.glSelectBuffer(2 ** 20)
+    GL.glRenderMode(GL.GL_SELECT)
+    GL.glInitNames()
+    GL.glPushName(0)
+    set_view(pos, tar, pick=(WIDTH / 2, HEIGHT / 2))
+    st = time.perf_counter()
+    hull.draw(GL)
+    hits = GL.glRenderMode(GL.GL_RENDER)
+    pick_time = time.perf_counter() - st
+    set_view(pos, tar)
+    return pick_time, {hit.names[-1] for hit in hits}
+
+
+def main(part_nums=(10000, 50000)):
+    make_gl_context(WIDTH, HEIGHT)
+    GL.glEnable(GL.GL_DEPTH_TEST)
+    for part_num in part_nums:
+        hull, hulls = load_hull(part_num)
+        hull.glWin = BenchWin()
+        side = max(int(round(part_num ** (1 / 3))), 1)  # 与test.helpers.make_na_text中零件的排列相同
+        bow = 4 * ((part_num - 1) // (side * side))
+        views = {"whole ship": ((side * 6, side * 3, bow / 2), (0, side / 2, bow / 2)),
+                 "bow close-up": ((side + 6, side / 2, bow), (0, side / 2, bow))}  # 从侧面拉近到船首
+        print(f"parts: {part_num:6d}")
+        for name, (pos, tar) in views.items():
+            set_view(pos, tar)
+            results, images = {}, {}
+            for culling in (False, True):
+                NAHull.frustum_culling = culling
+                frame(lambda: hull.draw(GL))
+                results[culling] = min(frame(lambda: hull.draw(GL)) for _ in range(FRAME_NUM))
+                images[culling] = read_image()
+            planes = get_view_planes()
+            query_time = sum(timeit(lambda: batch.bvh.query(planes), repeat=FRAME_NUM)[0]
+                             for batch in hull.color_batches.values())
+            diff = np.abs(images[False] - images[True]).max(axis=-1)
+            print(f"    {name:12s}  visible {hull.visible_num:6d}  culled {hull.culled_num:6d}   "
+                  f"frame {results[False] * 1000:7.1f} ms -> {results[True] * 1000:7.1f} ms   "
+                  f"BVH query {query_time * 1000:5.2f} ms   pixels differing {np.count_nonzero(diff > 2)}")
+        # 修改船首的一个零件：只重新拟合它所在的叶节点和祖先节点
+        part = max(hulls, key=lambda part_: part_.Pos[2])
+        part.change_attrs(position=[part.Pos[0], part.Pos[1] + 0.5, part.Pos[2]])
+        edit_time = frame(lambda: hull.draw(GL))
+        batch = next(batch for batch in hull.color_batches.values() if part in batch.part_index)
+        refit_time, _ = timeit(lambda: batch.bvh.update([batch.part_index[part]], batch.bvh.mins[:1], batch.bvh.maxs[:1]))
+        build_time, _ = timeit(lambda: PartBVH(batch.bvh.mins[:batch.bvh.part_num], batch.bvh.maxs[:batch.bvh.part_num]))
+        print(f"    after edit frame {edit_time * 1000:7.1f} ms   refit one part {refit_time * 1e6:6.1f} us   "
+              f"rebuild BVH of {batch.bvh.part_num} parts {build_time * 1000:6.2f} ms")
+        pos, tar = views["bow close-up"]
+        picks = {}
+        for culling in (False, True):
+            NAHull.frustum_culling = culling
+            picks[culling] = pick(hull, pos, tar)
+        print(f"    picking {picks[False][0] * 1000:7.1f} ms -> {picks[True][0] * 1000:7.1f} ms   "
+              f"hits {len(picks[False][1])} / {len(picks[True][1])}   same: {picks[False][1] == picks[True][1]}")
+        NAHull.frustum_culling = True
+        for batch in hull.color_batches.values():
+            batch.release()
+        NAPartNode.id_map.clear()
+        NAPartNode.node_index.clear()
+
+
+if __name__ == '__main__':
+    main([int(i) for i in sys.argv[1:]] or (10000, 50000))
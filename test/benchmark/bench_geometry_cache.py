@@ -0,0 +1,59 @@
+"""
+局部坐标缓存的性能测试：比较缓存为空和缓存中已有外形时批量计算绘图数据（prepare_plot_data）的耗时和命中率，
+以及逐个零件计算绘图数据（修改零件属性和AddLayerOperation预览临时零件时使用的路径）的耗时
+运行：python -m test.benchmark.bench_geometry_cache [零件数量...]
+"""
+import sys
+from types import SimpleNamespace
+
+from GL_plot.na_hull import TempAdjustableHull
+from ship_reader import ReadNA
+from ship_reader.NA_design_reader import AdjustableHull
+from ship_reader.hull_geometry import local_geometry_cache
+from test.benchmark.bench_utils import timeit
+from test.helpers import make_na_file, silent
+
+
+def prepare(hulls, clear):
+    if clear:
+        local_geometry_cache.clear()
+    for hull in hulls:
+        hull.reset_plot_data()
+    AdjustableHull.prepare_plot_data(hulls)
+
+
+def per_part(hulls, clear):
+    for hull in hulls:
+        if clear:
+            local_geometry_cache.clear()
+        hull.get_plot_faces()
+        hull.get_plot_lines()
+
+
+def main(part_nums=(10000, 50000)):
+    ReadNA.design_cache = None
+    win = SimpleNamespace(paintGL=lambda: None, update=lambda: None)
+    for part_num in part_nums:
+        reader = ReadNA(make_na_file(part_num), show_statu_func=silent)
+        hulls = [part for part in reader.Parts if isinstance(part, AdjustableHull)]
+        cold, _ = timeit(lambda: prepare(hulls, True), repeat=3)
+        local_geometry_cache.clear()
+        prepare(hulls, False)
+        hits, misses, _, size = local_geometry_cache.cache_info()
+        warm, _ = timeit(lambda: prepare(hulls, False), repeat=3)
+        print(f"parts: {part_num:6d}   distinct shapes {size}   first load hit rate {hits / (hits + misses):7.2%}   "
+              f"prepare_plot_data cold {cold:6.2f} s   warm {warm:6.2f} s")
+        # 预览图层时逐个构造临时零件
+        temp_hulls = [TempAdjustableHull(None, win, "0", list(hull.Pos), list(hull.Rot), list(hull.Scl), hull.Col,
+                                         hull.Amr, hull.Len, hull.Hei, hull.FWid, hull.BWid, hull.FSpr, hull.BSpr,
+                                         hull.UCur, hull.DCur, hull.HScl, hull.HOff, None)
+                      for hull in hulls[:1000]]
+        for name, parts in (("AdjustableHull", hulls[:1000]), ("TempAdjustableHull", temp_hulls)):
+            cold, _ = timeit(lambda: per_part(parts, True), repeat=3)
+            warm, _ = timeit(lambda: per_part(parts, False), repeat=3)
+            print(f"    {name:20s} per part cold {cold / len(parts) * 1e6:7.1f} us   warm {warm / len(parts) * 1e6:7.1f} us")
+        local_geometry_cache.clear()
+
+
+if __name__ == '__main__':
+    main([int(i) for i in sys.argv[1:]] or (10000, 50000))
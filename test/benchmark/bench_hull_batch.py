@@ -0,0 +1,113 @@
+"""
+船体绘制的性能测试：比较原来每个零件一个显示列表（glBegin/glVertex逐面编译，每帧每个零件一次glCallList）
+和按颜色打包的顶点缓冲区（每帧每种颜色一次glDrawElements）的首帧（生成显示列表/打包上传）耗时，
+之后每帧的耗时，以及修改一个零件后下一帧的耗时。
+在无显示器的环境中通过EGL创建上下文（如Mesa的软件渲染llvmpipe）
+运行：python -m test.benchmark.bench_hull_batch [零件数量...]
+"""
+import os
+
+os.environ.setdefault("PYOPENGL_PLATFORM", "egl")
+os.environ.setdefault("EGL_PLATFORM", "surfaceless")
+
+import sys
+import time
+
+from OpenGL import GL
+from PyQt5.QtGui import QVector3D
+
+from GL_plot.basic import get_normal
+from GL_plot.na_hull import NAHull
+from ship_reader import NAPartNode
+from ship_reader.NA_design_reader import AdjustableHull
+from test.helpers import make_gl_context, make_na_file, silent
+
+FRAME_NUM = 10
+
+
+class BenchWin:
+    light_pos = QVector3D(1000, 700, 1000)
+
+    class camera:
+        pos = QVector3D(100, 20, 40)
+
+
+def draw_display_lists(hull):
+    """
+    原来的NAHull.draw_color：每个零件一个显示列表
+    """
+    for color, part_set in hull.DrawMap.items():
+        _rate = 255
+        GL.glColor4f(int(color[1:3], 16) / _rate, int(color[3:5], 16) / _rate, int(color[5:7], 16) / _rate, 1)
+        for part in part_set:
+            if not isinstance(part, AdjustableHull):
+                continue
+            if part.genList:
+                GL.glCallList(part.genList)
+                continue
+            part.genList = GL.glGenLists(1)
+            GL.glNewList(part.genList, GL.GL_COMPILE_AND_EXECUTE)
+            for draw_method, faces_dots in part.plot_faces.items():
+                for face in faces_dots:
+                    GL.glBegin(getattr(GL, draw_method))
+                    if len(face) == 3 or len(face) == 4:
+                        normal = get_normal(face[0], face[1], face[2])
+                    elif len(face) > 12:
+                        normal = get_normal(face[0], face[6], face[12])
+                    else:
+                        continue
+                    GL.glNormal3f(normal.x(), normal.y(), normal.z())
+                    for dot in face:
+                        GL.glVertex3f(dot[0], dot[1], dot[2])
+                    GL.glEnd()
+            GL.glEndList()
+
+
+def frame(draw):
+    st = time.perf_counter()
+    GL.glClear(GL.GL_COLOR_BUFFER_BIT | GL.GL_DEPTH_BUFFER_BIT)
+    draw()
+    GL.glFinish()
+    return time.perf_counter() - st
+
+
+def bench(draw, hull, part):
+    first = frame(draw)
+    steady = min(frame(draw) for _ in range(FRAME_NUM))
+    part.change_attrs(position=[part.Pos[0], part.Pos[1] + 0.5, part.Pos[2]])
+    part.genList = None  # 原来的redrawGL：只重新生成这个零件的显示列表
+    edit = frame(draw)
+    return first, steady, edit
+
+
+def main(part_nums=(10000, 50000)):
+    make_gl_context()
+    GL.glEnable(GL.GL_DEPTH_TEST)
+    GL.glMatrixMode(GL.GL_PROJECTION)
+    GL.glOrtho(-200, 200, -150, 150, -1000, 1000)
+    GL.glMatrixMode(GL.GL_MODELVIEW)
+    for part_num in part_nums:
+        results = {}
+        for name in ("display lists", "color batches"):
+            hull = NAHull(make_na_file(part_num), show_statu_func=silent, glWin=BenchWin())
+            hull.DrawMap = hull.ColorPartsMap
+            hull.glWin = BenchWin()
+            hulls = [part for part in hull.Parts if isinstance(part, AdjustableHull)]
+            for part in hulls:  # 两种方法都从已经计算好的绘图数据开始
+                part.plot_faces
+            if name == "display lists":
+                results[name] = bench(lambda: draw_display_lists(hull), hull, hulls[0])
+                GL.glDeleteLists(1, max(part.genList for part in hulls))
+            else:
+                results[name] = bench(lambda: hull.draw(GL, theme_color=None), hull, hulls[0])
+                for batch in hull.color_batches.values():
+                    batch.release()
+            NAPartNode.id_map.clear()
+            NAPartNode.node_index.clear()
+        print(f"parts: {part_num:6d}   " + "   ".join(
+            f"{name}: first {first:6.2f} s  frame {steady * 1000:7.1f} ms  after edit {edit * 1000:7.1f} ms"
+            for name, (first, steady, edit) in results.items()))
+
+
+if __name__ == '__main__':
+    main([int(i) for i in sys.argv[1:]] or (10000, 50000))
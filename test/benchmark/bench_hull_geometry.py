@@ -0,0 +1,49 @@
+"""
+可调节船体绘图数据批量计算的性能测试：比较逐个零件计算（get_plot_lines, get_plot_faces）与批量计算的吞吐量
+运行：python -m test.benchmark.bench_hull_geometry [零件数量]
+"""
+import sys
+
+import numpy as np
+
+from ship_reader import ReadNA
+from ship_reader.NA_design_reader import AdjustableHull
+from ship_reader.hull_geometry import get_hulls_geometry
+from test.benchmark.bench_utils import timeit
+from test.helpers import make_na_file, silent
+
+
+def per_part(hulls):
+    for hull in hulls:
+        hull.reset_plot_data()
+        _ = hull.plot_faces, hull.plot_lines
+
+
+def batch(hulls):
+    table = hulls[0]._table
+    rows = table.get_rows(hulls)
+    no_rotate = np.fromiter((hull.Rot == [0, 0, 0] for hull in hulls), dtype=bool, count=len(hulls))
+    return get_hulls_geometry(table.shape[rows], table.pos[rows], table.rot[rows], table.scl[rows], no_rotate)
+
+
+def batch_and_unpack(hulls):
+    for hull in hulls:
+        hull.reset_plot_data()
+    AdjustableHull.prepare_plot_data(hulls)
+    for hull in hulls:
+        _ = hull.plot_faces, hull.plot_lines
+
+
+def main(part_num=20000):
+    ReadNA.design_cache = None
+    reader = ReadNA(make_na_file(part_num), show_statu_func=silent)
+    hulls = [part for part in reader.Parts if isinstance(part, AdjustableHull)]
+    print(f"hulls: {len(hulls)}")
+    for name, func, repeat in (("per part", per_part, 1), ("batch", batch, 5),
+                               ("batch + unpack", batch_and_unpack, 3)):
+        t, _ = timeit(lambda: func(hulls), repeat=repeat)
+        print(f"{name:16s} {t:8.3f} s   {len(hulls) / t:12.0f} parts/s")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
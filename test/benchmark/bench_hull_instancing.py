@@ -0,0 +1,135 @@
+"""
+实例化绘制的性能测试：比较按颜色打包的顶点缓冲区（hull_batch）和按外形参数实例化绘制（hull_instancing）的
+首帧（打包/分组上传）耗时，之后每帧的耗时，修改一个零件后下一帧的耗时，显存占用和每帧的绘制调用数，
+并比较两种方法绘制的图像；最后在OpenGL 3.3核心模式的上下文中（没有固定管线）再实例化绘制一次，检查图像相同。
+在无显示器的环境中通过EGL创建上下文（如Mesa的软件渲染llvmpipe）
+运行：python -m test.benchmark.bench_hull_instancing [零件数量...]
+"""
+import os
+
+os.environ.setdefault("PYOPENGL_PLATFORM", "egl")
+os.environ.setdefault("EGL_PLATFORM", "surfaceless")
+
+import sys
+
+import numpy as np
+from OpenGL import GL
+
+from GL_plot.hull_batch import bind_hull_program
+from GL_plot.hull_instancing import HullInstances, get_instanced_program
+from GL_plot.na_hull import NAHull
+from ship_reader import NAPartNode
+from ship_reader.NA_design_reader import AdjustableHull
+from test.benchmark.bench_hull_batch import BenchWin, bench, frame
+from test.helpers import make_gl_context, make_na_file, silent
+
+WIDTH, HEIGHT = 400, 300
+ORTHO = (-200, 200, -150, 150, -1000, 1000)
+
+
+def ortho_matrix(left, right, bottom, top, near, far):
+    """
+    与glOrtho相同的投影矩阵，按列存放
+    """
+    matrix = np.identity(4, dtype=np.float32)
+    matrix[0, 0], matrix[1, 1], matrix[2, 2] = 2 / (right - left), 2 / (top - bottom), -2 / (far - near)
+    matrix[:3, 3] = -(right + left) / (right - left), -(top + bottom) / (top - bottom), -(far + near) / (far - near)
+    return matrix.T.copy()
+
+
+def read_image():
+    return np.frombuffer(GL.glReadPixels(0, 0, WIDTH, HEIGHT, GL.GL_RGBA, GL.GL_UNSIGNED_BYTE),
+                         dtype=np.uint8).reshape(HEIGHT, WIDTH, 4).astype(np.int16)
+
+
+def buffer_bytes(buffers):
+    total = 0
+    for buffer in buffers:
+        GL.glBindBuffer(GL.GL_ARRAY_BUFFER, buffer)
+        total += GL.glGetBufferParameteriv(GL.GL_ARRAY_BUFFER, GL.GL_BUFFER_SIZE)
+    GL.glBindBuffer(GL.GL_ARRAY_BUFFER, 0)
+    return total
+
+
+def load_hull(part_num):
+    hull = NAHull(make_na_file(part_num), show_statu_func=silent, glWin=BenchWin())
+    hull.DrawMap = hull.ColorPartsMap
+    hull.glWin = BenchWin()
+    return hull, [part for part in hull.Parts if isinstance(part, AdjustableHull)]
+
+
+def make_gl_context_current(context):
+    from OpenGL import EGL
+    display, surface, context_ = context
+    EGL.eglMakeCurrent(display, surface, surface, context_)
+
+
+def draw_core(hull):
+    """
+    核心模式下直接使用HullInstances，投影矩阵和视图矩阵由参数传入
+    """
+    GL.glBindVertexArray(GL.glGenVertexArrays(1))  # 核心模式下清屏以外的操作都需要绑定顶点数组对象
+    GL.glEnable(GL.GL_DEPTH_TEST)
+    program = get_instanced_program()
+    instances = HullInstances()
+    instances.sync(hull.DrawMap, hull.glWin)
+
+    def draw():
+        bind_hull_program(program, hull.glWin.light_pos, hull.glWin.camera.pos,
+                          projection=ortho_matrix(*ORTHO), view=np.identity(4, dtype=np.float32))
+        instances.draw(program)
+
+    frame(draw)
+    draw_time = frame(draw)
+    error = GL.glGetError()
+    image = read_image()
+    instances.release()
+    return draw_time, error, image
+
+
+def main(part_nums=(10000, 50000)):
+    compat = make_gl_context(WIDTH, HEIGHT)
+    core = make_gl_context(WIDTH, HEIGHT, core_profile=True)
+    for part_num in part_nums:
+        results, images, memory, calls = {}, {}, {}, {}
+        for name in ("color batches", "instancing"):
+            make_gl_context_current(compat)
+            GL.glEnable(GL.GL_DEPTH_TEST)
+            GL.glMatrixMode(GL.GL_PROJECTION)
+            GL.glLoadIdentity()
+            GL.glOrtho(*ORTHO)
+            GL.glMatrixMode(GL.GL_MODELVIEW)
+            NAHull.instancing = name == "instancing"
+            hull, hulls = load_hull(part_num)
+            results[name] = bench(lambda: hull.draw(GL, theme_color=None), hull, hulls[0])
+            frame(lambda: hull.draw(GL, theme_color=None))
+            images[name] = read_image()
+            if NAHull.instancing:
+                memory[name] = hull.hull_instances.nbytes
+                calls[name] = len(hull.hull_instances.groups)
+                hull.hull_instances.release()
+            else:
+                batches = hull.color_batches.values()
+                memory[name] = buffer_bytes([buffer for batch in batches for buffer in (batch.vbo, batch.ibo)])
+                calls[name] = len(batches)
+                for batch in batches:
+                    batch.release()
+            if NAHull.instancing:  # 核心模式的上下文中使用修改后的零件
+                make_gl_context_current(core)
+                core_time, core_error, core_image = draw_core(hull)
+            NAPartNode.id_map.clear()
+            NAPartNode.node_index.clear()
+        NAHull.instancing = False
+        diff = np.abs(images["color batches"] - images["instancing"]).max(axis=-1)
+        core_diff = np.abs(images["instancing"] - core_image).max(axis=-1)
+        print(f"parts: {part_num:6d}   " + "   ".join(
+            f"{name}: first {first:6.2f} s  frame {steady * 1000:7.1f} ms  after edit {edit * 1000:7.1f} ms  "
+            f"{memory[name] / 1048576:7.2f} MB  {calls[name]} draw calls"
+            for name, (first, steady, edit) in results.items()))
+        print(f"    pixels differing from color batches (> 2/255): {np.count_nonzero(diff > 2)} / {diff.size}   "
+              f"core profile: frame {core_time * 1000:7.1f} ms  GL error {core_error}  "
+              f"pixels differing {np.count_nonzero(core_diff > 2)}")
+
+
+if __name__ == '__main__':
+    main([int(i) for i in sys.argv[1:]] or (10000, 50000))
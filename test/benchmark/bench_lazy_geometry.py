@@ -0,0 +1,38 @@
+"""
+可调节船体绘图数据延迟计算的性能测试：比较只读取零件，和读取后访问全部绘图数据的耗时与内存
+运行：python -m test.benchmark.bench_lazy_geometry [零件数量]
+"""
+import sys
+import tracemalloc
+
+from ship_reader import ReadNA
+from ship_reader.NA_design_reader import AdjustableHull
+from test.benchmark.bench_utils import timeit
+from test.helpers import make_na_file, silent
+
+
+def access_all(reader):
+    for part in reader.Parts:
+        if isinstance(part, AdjustableHull):
+            _ = part.plot_faces, part.plot_lines
+    return reader
+
+
+def main(part_num=20000):
+    path = make_na_file(part_num)
+    ReadNA.design_cache = None
+    ReadNA.load_workers = 1
+    print(f"parts: {part_num}")
+    for name, func in (("load only", lambda: ReadNA(path, show_statu_func=silent)),
+                       ("load + all geometry", lambda: access_all(ReadNA(path, show_statu_func=silent)))):
+        t, _ = timeit(func, repeat=3)
+        tracemalloc.start()
+        reader = func()
+        current, _peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"{name:20s} {t:8.3f} s   {current / len(reader.Parts):10.0f} B/part")
+        del reader
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
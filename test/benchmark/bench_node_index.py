@@ -0,0 +1,66 @@
+"""
+零件关系图节点集合的性能测试：比较按坐标哈希索引查找节点（NAPartNode.get_or_create）和原来的列表线性查找，
+以及 PartRelationMap.init 的总耗时
+运行：python -m test.benchmark.bench_node_index [零件数量...]
+"""
+import sys
+import time
+
+from ship_reader import ReadNA
+from ship_reader.NA_design_reader import AdjustableHull, NAPartNode
+from test.helpers import make_na_file, silent
+
+LIST_SCAN_MAX_PARTS = 5000  # 列表线性查找是平方复杂度，零件更多时跳过
+
+
+def get_node_positions(reader):
+    hulls = [part for part in reader.Parts if isinstance(part, AdjustableHull)]
+    AdjustableHull.prepare_plot_data(hulls)
+    return [[round(float(dot[0]), 3), round(float(dot[1]), 3), round(float(dot[2]), 3)]
+            for hull in hulls for dot in hull.operation_dot_nodes]
+
+
+def build_with_list_scan(positions):
+    all_dots = []
+    for pos in positions:
+        if pos not in all_dots:
+            all_dots.append(pos)
+    return len(all_dots)
+
+
+def build_with_index(positions):
+    NAPartNode.node_index.clear()
+    NAPartNode.id_map.clear()
+    for pos in positions:
+        NAPartNode.get_or_create(pos)
+    return len(NAPartNode.node_index)
+
+
+def main(part_nums=(5000, 20000, 80000)):
+    ReadNA.design_cache = None
+    for part_num in part_nums:
+        reader = ReadNA(make_na_file(part_num), show_statu_func=silent)
+        positions = get_node_positions(reader)
+        st = time.perf_counter()
+        node_num = build_with_index(positions)
+        index_time = time.perf_counter() - st
+        if part_num <= LIST_SCAN_MAX_PARTS:
+            st = time.perf_counter()
+            assert build_with_list_scan(positions) == node_num
+            scan_text = f"{time.perf_counter() - st:8.3f} s"
+        else:
+            scan_text = "  (skip)  "
+        NAPartNode.node_index.clear()
+        NAPartNode.id_map.clear()
+        reader.DrawMap = reader.ColorPartsMap
+        st = time.perf_counter()
+        reader.partRelationMap.init(reader)
+        init_time = time.perf_counter() - st
+        print(f"parts: {part_num:6d}   nodes: {node_num:6d}   node index {index_time:8.3f} s   "
+              f"list scan {scan_text}   PartRelationMap.init {init_time:8.2f} s")
+        NAPartNode.node_index.clear()
+        NAPartNode.id_map.clear()
+
+
+if __name__ == '__main__':
+    main([int(i) for i in sys.argv[1:]] or (5000, 20000, 80000))
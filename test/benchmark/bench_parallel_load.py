@@ -0,0 +1,28 @@
+"""
+并行读取na文件的性能测试：比较1/2/4/8个进程实例化零件的耗时
+运行：python -m test.benchmark.bench_parallel_load [零件数量]
+"""
+import os
+import sys
+
+from ship_reader import ReadNA
+from test.benchmark.bench_utils import timeit
+from test.helpers import make_na_file, silent
+
+
+def main(part_num=20000):
+    path = make_na_file(part_num)
+    print(f"parts: {part_num}   cpu count: {os.cpu_count()}")
+    serial_time = None
+    ReadNA.load_parallel_min_size = 0
+    for workers in (1, 2, 4, 8):
+        ReadNA.load_workers = workers
+        t, reader = timeit(lambda: ReadNA(path, show_statu_func=silent), repeat=1)
+        serial_time = serial_time or t
+        print(f"workers: {workers}   {t:8.2f} s   {len(reader.Parts) / t:10.0f} parts/s   "
+              f"speedup x{serial_time / t:.2f}")
+    ReadNA.load_workers = 1
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
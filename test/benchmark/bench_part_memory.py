@@ -0,0 +1,33 @@
+"""
+零件内存的性能测试：读取大型设计，用tracemalloc统计每个零件和每个零件节点占用的内存
+运行：python -m test.benchmark.bench_part_memory [零件数量]
+"""
+import os
+import sys
+import tracemalloc
+
+from ship_reader import ReadNA
+from ship_reader.NA_design_reader import NAPartNode
+from test.helpers import make_na_file, silent
+
+
+def main(part_num=50000):
+    ReadNA.design_cache = None
+    ReadNA.load_workers = 1
+    path = make_na_file(part_num)
+    tracemalloc.start()
+    reader = ReadNA(path, show_statu_func=silent)
+    part_bytes = tracemalloc.get_traced_memory()[0] / len(reader.Parts)
+    tracemalloc.stop()
+    tracemalloc.start()
+    nodes = [NAPartNode([float(i), 0., 0.]) for i in range(part_num)]
+    for node in nodes:
+        node.add_near_part(node.OCTANTS[0], reader.Parts[0])
+    node_bytes = tracemalloc.get_traced_memory()[0] / len(nodes)
+    tracemalloc.stop()
+    print(f"{len(reader.Parts)} parts: {part_bytes:.0f} B/part, {node_bytes:.0f} B/node")
+    os.remove(path)
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 50000)
@@ -0,0 +1,77 @@
+"""
+零件表（PartTable）性能测试：比较逐个对象保存属性和列式存储在内存与整船操作上的差异
+运行：python -m test.benchmark.bench_part_table [零件数量]
+"""
+import sys
+import tracemalloc
+
+from ship_reader import ReadNA, AdjustableHull
+from ship_reader.part_table import PartTable
+from test.benchmark.bench_utils import timeit
+from test.helpers import make_na_file, silent
+
+
+class LegacyPart:
+    """
+    零件表之前的存储方式：每个属性都是对象上的Python属性
+    """
+
+    def __init__(self, part):
+        self.Pos = tuple(part.Pos)
+        self.Rot = tuple(part.Rot)
+        self.Scl = tuple(part.Scl)
+        self.Amr = part.Amr
+        self.Id = part.Id
+        self.Col = part.Col
+        for name in PartTable.SHAPE_COLUMNS:
+            setattr(self, name, getattr(part, name))
+
+    def scale(self, ratio):
+        self.Scl = [self.Scl[0] * ratio[0], self.Scl[1] * ratio[1], self.Scl[2] * ratio[2]]
+        self.Pos = [self.Pos[0] * ratio[0], self.Pos[1] * ratio[1], self.Pos[2] * ratio[2]]
+
+    def to_dict(self):
+        _dict = {"Typ": 'AdjustableHull', "Id": self.Id, "Pos": list(self.Pos), "Rot": list(self.Rot),
+                 "Scl": list(self.Scl), "Col": str(self.Col), "Amr": self.Amr}
+        for name in PartTable.SHAPE_COLUMNS:
+            _dict[name] = getattr(self, name)
+        return _dict
+
+
+def main(part_num=20000):
+    path = make_na_file(part_num)
+    reader = ReadNA(path, show_statu_func=silent)
+    parts = [part for part in reader.Parts if isinstance(part, AdjustableHull)]
+    table = reader.partTable
+    n = len(parts)
+    # 内存
+    tracemalloc.start()
+    legacy = [LegacyPart(part) for part in parts]
+    legacy_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    print(f"parts: {n}")
+    print(f"memory  object attributes: {legacy_bytes / n:8.1f} B/part   "
+          f"part table: {table.nbytes() / table.size:8.1f} B/part")
+    # 缩放
+    ratio = [1.0001, 1.0, 0.9999]
+    t_legacy, _ = timeit(lambda: [p.scale(ratio) for p in legacy])
+    t_table, _ = timeit(lambda: table.scale(None, ratio))
+    print(f"scale   per-object loop: {t_legacy * 1000:8.2f} ms   vectorized: {t_table * 1000:8.2f} ms   "
+          f"x{t_legacy / t_table:.1f}")
+    # 导出json
+    t_legacy, _ = timeit(lambda: [p.to_dict() for p in legacy])
+    t_table, _ = timeit(lambda: table.to_dicts(parts))
+    t_view, _ = timeit(lambda: [p.to_dict() for p in parts])
+    print(f"toJson  per-object loop: {t_legacy * 1000:8.2f} ms   vectorized: {t_table * 1000:8.2f} ms   "
+          f"x{t_legacy / t_table:.1f}   (to_dict through table views: {t_view * 1000:.2f} ms)")
+    # 整船查询：所有曲面零件
+    t_legacy, _ = timeit(lambda: [p for p in legacy if p.UCur >= 0.005 or p.DCur > 0.005])
+    rows = table.get_rows(parts)
+    t_table, _ = timeit(lambda: rows[(table.get_shape_column("UCur", rows) >= 0.005) |
+                                     (table.get_shape_column("DCur", rows) > 0.005)])
+    print(f"query   per-object loop: {t_legacy * 1000:8.2f} ms   vectorized: {t_table * 1000:8.2f} ms   "
+          f"x{t_legacy / t_table:.1f}")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
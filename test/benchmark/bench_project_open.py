@@ -0,0 +1,53 @@
+"""
+打开工程（ReadNA按工程文件中的零件数据实例化零件）的性能测试：
+比较重新建立零件关系图（PartRelationMap.build）和加载工程文件中保存的零件关系索引（PartRelationMap.load_index）
+运行：python -m test.benchmark.bench_project_open [零件数量...]
+"""
+import sys
+import time
+
+import ujson
+
+from ship_reader import ReadNA
+from ship_reader.NA_design_reader import NAPartNode
+from test.helpers import make_na_file, silent
+
+
+def make_project_data(part_num):
+    """
+    :return: 工程文件中的零件数据和零件关系索引（经过json序列化）
+    """
+    reader = ReadNA(make_na_file(part_num), show_statu_func=silent)
+    reader.partRelationMap.build(reader.Parts)
+    data = {color: reader.partTable.to_dicts(parts) for color, parts in reader.ColorPartsMap.items()}
+    parts = [part for parts in reader.ColorPartsMap.values() for part in parts]
+    index_text = ujson.dumps(reader.partRelationMap.dump_index(parts))
+    return ujson.loads(ujson.dumps(data)), index_text
+
+
+def open_project(data, relation_index=None):
+    NAPartNode.node_index.clear()
+    NAPartNode.id_map.clear()
+    st = time.perf_counter()
+    ReadNA(data=data, show_statu_func=silent, relation_index=relation_index)
+    return time.perf_counter() - st
+
+
+def main(part_nums=(10000, 50000)):
+    ReadNA.design_cache = None
+    for part_num in part_nums:
+        data, index_text = make_project_data(part_num)
+        st = time.perf_counter()
+        relation_index = ujson.loads(index_text)
+        parse_time = time.perf_counter() - st
+        build_time = open_project(data)
+        load_time = open_project(data, relation_index)
+        print(f"parts: {part_num:6d}   open with build {build_time:6.2f} s   "
+              f"open with saved index {load_time:6.2f} s (+ json {parse_time:5.2f} s)   "
+              f"index size {len(index_text) / 1048576:6.2f} MB")
+    NAPartNode.node_index.clear()
+    NAPartNode.id_map.clear()
+
+
+if __name__ == '__main__':
+    main([int(i) for i in sys.argv[1:]] or (10000, 50000))
@@ -0,0 +1,55 @@
+"""
+零件关系图建立的性能测试：比较批量建立（PartRelationMap.build，读取设计和重新绑定零件关系时使用）
+和逐个 add_part 后再 sort 的耗时
+运行：python -m test.benchmark.bench_relation_build [零件数量...]
+"""
+import sys
+import time
+
+from ship_reader import ReadNA
+from ship_reader.NA_design_reader import AdjustableHull, NAPartNode
+from test.helpers import make_na_file, silent
+
+INCREMENTAL_MAX_PARTS = 50000  # 逐个添加太慢，零件更多时跳过
+
+
+def clear_nodes():
+    NAPartNode.node_index.clear()
+    NAPartNode.id_map.clear()
+
+
+def build_incremental(relation_map, parts):
+    for part in parts:
+        relation_map.add_part(part)
+    relation_map.sort()
+
+
+def main(part_nums=(10000, 20000, 50000, 100000)):
+    ReadNA.design_cache = None
+    for part_num in part_nums:
+        reader = ReadNA(make_na_file(part_num), show_statu_func=silent)
+        relation_map = reader.partRelationMap
+        AdjustableHull.prepare_plot_data(reader.Parts)
+        _ = [hull.operation_dot_nodes for hull in reader.AdjustableHulls]  # 不计入解包绘图数据的时间
+        clear_nodes()
+        st = time.perf_counter()
+        layer_t, relation_t, dot_t = relation_map.build(reader.Parts)
+        build_time = time.perf_counter() - st
+        if part_num <= INCREMENTAL_MAX_PARTS:
+            clear_nodes()
+            relation_map.basicMap.clear()
+            for name in ("xzDotsLayerMap", "xyDotsLayerMap", "yzDotsLayerMap",
+                         "xzPartsLayerMap", "xyPartsLayerMap", "yzPartsLayerMap"):
+                setattr(relation_map, name, {})
+            st = time.perf_counter()
+            build_incremental(relation_map, reader.Parts)
+            incremental_text = f"{time.perf_counter() - st:8.2f} s"
+        else:
+            incremental_text = "  (skip)  "
+        print(f"parts: {part_num:6d}   build {build_time:8.2f} s (layers {layer_t:6.2f} s, "
+              f"relations {relation_t:6.2f} s, nodes {dot_t:6.2f} s)   add_part + sort {incremental_text}")
+        clear_nodes()
+
+
+if __name__ == '__main__':
+    main([int(i) for i in sys.argv[1:]] or (10000, 20000, 50000, 100000))
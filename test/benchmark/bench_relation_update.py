@@ -0,0 +1,42 @@
+"""
+修改零件属性时零件关系图增量更新的性能测试（PartRelationMap.update_part，由change_attrs调用），
+与重新绑定整个零件关系图（PartRelationMap.build，即原来唯一可靠的remap）比较
+运行：python -m test.benchmark.bench_relation_update [零件数量] [修改次数]
+"""
+import random
+import sys
+import time
+
+from ship_reader import ReadNA
+from ship_reader.NA_design_reader import AdjustableHull, NAPartNode
+from test.helpers import make_na_file, silent
+
+
+def main(part_num=50000, edit_num=500):
+    ReadNA.design_cache = None
+    reader = ReadNA(make_na_file(part_num), show_statu_func=silent)
+    relation_map = reader.partRelationMap
+    st = time.perf_counter()
+    relation_map.build(reader.Parts)
+    build_time = time.perf_counter() - st
+    rand = random.Random(0)
+    hulls = [part for part in reader.Parts if isinstance(part, AdjustableHull) and tuple(part.Rot) == (0, 0, 0)]
+    edited = [rand.choice(hulls) for _ in range(edit_num)]
+    st = time.perf_counter()
+    for hull in edited:  # 模拟鼠标滚轮拖动零件：沿z轴移动一步
+        x, y, z = hull.Pos
+        hull.change_attrs(position=(x, y, z + 0.1))
+    edit_time = (time.perf_counter() - st) / edit_num
+    st = time.perf_counter()
+    for hull in edited:  # 不更新关系图时修改属性本身的耗时（重新计算绘图数据）
+        hull.reset_plot_data()
+        _ = hull.operation_dot_nodes
+    geometry_time = (time.perf_counter() - st) / edit_num
+    print(f"parts: {part_num}   build {build_time:.2f} s   change_attrs with update_part {edit_time * 1000:.3f} ms "
+          f"(of which plot data {geometry_time * 1000:.3f} ms)")
+    NAPartNode.node_index.clear()
+    NAPartNode.id_map.clear()
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 50000, int(sys.argv[2]) if len(sys.argv) > 2 else 500)
@@ -0,0 +1,49 @@
+"""
+旋转矩阵缓存的性能测试：比较逐点四元数旋转（rotate_quaternion1之前的实现）与缓存的旋转矩阵
+运行：python -m test.benchmark.bench_rotation [零件数量]
+"""
+import sys
+
+import numpy as np
+from quaternion import quaternion
+
+from ship_reader import ReadNA, AdjustableHull
+from ship_reader.NA_design_reader import rotate_quaternion1
+from util_funcs import get_rotation_cache_info, get_part_world_dirs
+from test.benchmark.bench_utils import timeit
+from test.helpers import make_na_file, silent
+
+
+def legacy_rotate_quaternion1(dot_dict, scl, rot):
+    """
+    旋转矩阵缓存之前的实现：每次调用重新计算四元数，再逐点旋转（旋转顺序为YXZ）
+    """
+    rot = np.radians(rot)
+    q_x = np.array([np.cos(rot[0] / 2), np.sin(rot[0] / 2), 0, 0])
+    q_y = np.array([np.cos(rot[1] / 2), 0, np.sin(rot[1] / 2), 0])
+    q_z = np.array([np.cos(rot[2] / 2), 0, 0, np.sin(rot[2] / 2)])
+    q = quaternion(1, 0, 0, 0) * quaternion(*q_y) * quaternion(*q_x) * quaternion(*q_z)
+    rotated_dot_dict = {}
+    for key, point in dot_dict.items():
+        point = np.array(point) * scl
+        rotated_point_quat = q * np.quaternion(0, *point) * np.conj(q)
+        rotated_dot_dict[key] = np.array([rotated_point_quat.x, rotated_point_quat.y, rotated_point_quat.z])
+    return rotated_dot_dict
+
+
+def main(part_num=20000):
+    ReadNA.design_cache = None
+    reader = ReadNA(make_na_file(part_num), show_statu_func=silent)
+    hulls = [part for part in reader.Parts if isinstance(part, AdjustableHull)]
+    vertex = [hull.vertex_coordinates for hull in hulls]
+    print(f"hulls: {len(hulls)}   distinct rotations: {len({tuple(hull.Rot) for hull in hulls})}")
+    for name, func in (("quaternion", legacy_rotate_quaternion1), ("matrix cache", rotate_quaternion1)):
+        t, _ = timeit(lambda: [func(v, hull.Scl, hull.Rot) for v, hull in zip(vertex, hulls)], repeat=3)
+        print(f"{name:14s} {t:8.3f} s   {len(hulls) / t:10.0f} parts/s")
+    t, _ = timeit(lambda: [get_part_world_dirs(hull.Rot) for hull in hulls], repeat=3)
+    print(f"{'world dirs':14s} {t:8.3f} s   {len(hulls) / t:10.0f} parts/s")
+    print(get_rotation_cache_info())
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
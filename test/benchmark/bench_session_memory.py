@@ -0,0 +1,64 @@
+"""
+会话内存的性能测试：连续打开并关闭20个大型设计（读取零件并计算全部绘图数据），
+每次关闭后记录仍被Python分配的内存和进程常驻内存（RSS），两者应保持平稳而不随打开次数增长
+运行：python -m test.benchmark.bench_session_memory [零件数量] [打开次数]
+"""
+import gc
+import os
+import sys
+import tracemalloc
+
+from ship_reader import ReadNA
+from ship_reader.NA_design_reader import AdjustableHull, NAPart
+from test.helpers import make_na_file, silent
+
+
+def get_rss() -> int:
+    """
+    :return: 进程常驻内存（字节），不支持的平台返回0
+    """
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return 0
+
+
+def open_design(path):
+    reader = ReadNA(path, show_statu_func=silent)
+    AdjustableHull.prepare_plot_data(reader.AdjustableHulls)
+    for hull in reader.AdjustableHulls:
+        _ = hull.plot_faces, hull.plot_lines
+    return reader
+
+
+def open_and_close(path):
+    reader = open_design(path)
+    part_num = len(reader.Parts)
+    del reader
+    gc.collect()
+    return part_num
+
+
+def main(part_num=20000, times=20):
+    ReadNA.design_cache = None
+    ReadNA.load_workers = 1
+    paths = [make_na_file(part_num, seed=seed) for seed in range(times)]
+    tracemalloc.start()
+    first_traced = first_rss = None
+    for i, path in enumerate(paths):
+        loaded = open_and_close(path)
+        traced, _peak = tracemalloc.get_traced_memory()
+        rss = get_rss()
+        first_traced = first_traced or traced
+        first_rss = first_rss or rss
+        print(f"design {i + 1:2d}: {loaded} parts   live parts {len(NAPart.id_map):6d}   "
+              f"traced {traced / 1048576:8.2f} MB ({(traced - first_traced) / 1048576:+6.2f})   "
+              f"rss {rss / 1048576:8.1f} MB ({(rss - first_rss) / 1048576:+6.1f})")
+    tracemalloc.stop()
+    for path in paths:
+        os.remove(path)
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000, int(sys.argv[2]) if len(sys.argv) > 2 else 20)
@@ -0,0 +1,107 @@
+"""
+命令历史的性能测试：比较原来深拷贝全部状态的快照和只记录变化的Memento（保存一个修改了少量零件的状态），
+撤回和重做的耗时，以及状态栈已满时添加操作的耗时（原来的列表平移和环形缓冲区）
+运行：python -m test.benchmark.bench_state_history [零件数量...]
+"""
+import copy
+import sys
+import time
+import tracemalloc
+
+from GL_plot.na_hull import NAHull, NAXYLayerNode, NAXZLayerNode, NALeftViewNode
+from ship_reader import PRM, NAPart, NAPartNode
+from state_history import StateHistory, StateRing
+from test.helpers import make_na_file, silent
+
+EDIT_NUM = 10  # 每个状态修改的零件数
+FULL_PUSH_NUM = 1000  # 状态栈已满时添加的操作数
+
+
+class EmptyOperation:
+    name = "空操作"
+
+    def execute(self):
+        pass
+
+    def undo(self):
+        pass
+
+    def redo(self):
+        pass
+
+
+def bench_full_stack(max_length=10000):
+    operations = [EmptyOperation() for _ in range(FULL_PUSH_NUM)]
+    stack = [EmptyOperation() for _ in range(max_length)]
+    st = time.perf_counter()
+    for operation in operations:
+        stack = stack[1:] + [operation]
+    shift_time = time.perf_counter() - st
+    history = StateHistory(silent, max_length=max_length)
+    history.stateStack = StateRing(max_length)
+    history.current_index = history.snapshot_index = -1
+    for operation in stack:
+        history.push(operation)
+    st = time.perf_counter()
+    for operation in operations:
+        history.push(operation)
+    ring_time = time.perf_counter() - st
+    StateHistory.current = None
+    print(f"full stack ({max_length} entries), {FULL_PUSH_NUM} pushes:   "
+          f"list shift {shift_time * 1000:7.1f} ms   ring buffer {ring_time * 1000:7.1f} ms")
+
+
+def deepcopy_snapshot():
+    """
+    原来的Memento：深拷贝零件关系图，截面对象，DrawMap，截面和所有节点
+    """
+    relation_map = PRM.last_map
+    hull = NAHull.current_in_design_tab
+    return [copy.deepcopy(source) for source in (
+        relation_map.basicMap, relation_map.get_DotsLayerMap(), relation_map.get_PartsLayerMap(), hull.DrawMap,
+        hull.xzLayers, hull.xyLayers, hull.leftViews, list(NAPart.hull_design_tab_id_map.values()),
+        list(NAPartNode.id_map.values()), list(NAXYLayerNode.id_map.values()),
+        list(NAXZLayerNode.id_map.values()), list(NALeftViewNode.id_map.values()))]
+
+
+def measure(func):
+    tracemalloc.start()
+    st = time.perf_counter()
+    result = func()
+    cost = time.perf_counter() - st
+    nbytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, cost, nbytes
+
+
+def main(part_nums=(10000, 50000)):
+    bench_full_stack()
+    for part_num in part_nums:
+        hull = NAHull(make_na_file(part_num), show_statu_func=silent, design_tab=True)
+        hull.DrawMap = hull.ColorPartsMap
+        hull.partRelationMap.init(hull)
+        history = StateHistory(silent)
+        history.init_stack()
+        _snapshot, deepcopy_time, deepcopy_bytes = measure(deepcopy_snapshot)
+        del _snapshot
+        hulls = [part for part in hull.Parts if PRM._is_mapped(part)]
+        for part in hulls[:EDIT_NUM]:
+            part.change_attrs(position=[part.Pos[0], part.Pos[1] + 0.5, part.Pos[2]])
+        history.execute()
+        memento_ = history.stateStack[history.current_index]
+        st = time.perf_counter()
+        history.undo()
+        undo_time = time.perf_counter() - st
+        st = time.perf_counter()
+        history.redo()
+        redo_time = time.perf_counter() - st
+        print(f"parts: {part_num:6d}   deepcopy snapshot {deepcopy_time:6.2f} s {deepcopy_bytes / 1048576:7.1f} MB   "
+              f"delta memento {memento_.time * 1000:7.1f} ms {memento_.nbytes / 1024:7.1f} KB "
+              f"({memento_.changed_num} changes)   undo {undo_time * 1000:7.1f} ms   redo {redo_time * 1000:7.1f} ms")
+        StateHistory.current = None
+        NAPartNode.id_map.clear()
+        NAPartNode.node_index.clear()
+
+
+if __name__ == '__main__':
+    main([int(i) for i in sys.argv[1:]] or (10000, 50000))
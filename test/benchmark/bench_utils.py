@@ -0,0 +1,17 @@
+"""
+性能测试的公共工具：计时。生成na文件和无窗口OpenGL上下文的函数与单元测试共用，直接从test.helpers导入
+"""
+import time
+
+
+def timeit(func, repeat: int = 7):
+    """
+    :return: 多次运行中的最短耗时（秒）和最后一次的返回值
+    """
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        st = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - st)
+    return best, result
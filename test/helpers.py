@@ -0,0 +1,168 @@
+"""
+单元测试和性能测试的公共工具：生成na文件，可调节船体的零件数据，读取设计的测试基类，零件关系图的快照，无窗口的OpenGL上下文
+"""
+import os
+import random
+import shutil
+import tempfile
+import unittest
+from collections import Counter
+
+from ship_reader.NA_design_reader import ReadNA, NAPartNode
+
+SAMPLE_PATH = os.path.join(os.path.dirname(__file__), "KMS Hindenburg.xml")
+BENCH_COLORS = ("975740", "323232", "6F6E6E", "827461")
+# 长2，高1，宽1的无曲率可调节船体（ReadNA的data格式），Pos由hull_data给出
+HULL_DATA = {"Typ": "AdjustableHull", "Id": "0", "Rot": [0, 0, 0], "Scl": [1, 1, 1], "Col": "888888", "Amr": 5,
+             "Len": 2, "Hei": 1, "FWid": 1, "BWid": 1, "FSpr": 0, "BSpr": 0, "UCur": 0, "DCur": 0,
+             "HScl": 1, "HOff": 0}
+
+
+def silent(*args):
+    pass
+
+
+def hull_data(pos, **attrs) -> dict:
+    """
+    :param pos: 零件位置
+    :param attrs: 覆盖HULL_DATA中的属性
+    :return: ReadNA的data格式的可调节船体
+    """
+    return dict(HULL_DATA, Pos=list(pos), **attrs)
+
+
+def read_hulls(*positions) -> ReadNA:
+    """
+    :param positions: 每个零件的位置
+    :return: 读取了这些可调节船体（颜色都为#888888）的ReadNA
+    """
+    return ReadNA(data={"#888888": [hull_data(pos) for pos in positions]}, show_statu_func=silent)
+
+
+def clear_part_nodes():
+    """
+    清空全局的节点注册表（NAPartNode.id_map和NAPartNode.node_index）
+    """
+    NAPartNode.id_map.clear()
+    NAPartNode.node_index.clear()
+
+
+def relation_snapshot(relation_map, part_key=None, ordered=True):
+    """
+    零件关系图、截面层和节点中零件的快照，用于比较两个关系图是否相同
+    :param relation_map: PartRelationMap
+    :param part_key: 将零件转换为可比较的值的函数，默认为零件本身（比较不同ReadNA中的零件时可以用零件的序号）
+    :param ordered: 是否比较零件的顺序（增量更新后同一方向、截面层或节点中零件的顺序可能不同）
+    :return: (relations, layers, nodes)
+    """
+    key = part_key or (lambda part: part)
+
+    def values(parts):
+        return [key(part) for part in parts] if ordered else Counter(map(key, parts))
+
+    relations = {key(part): {direction: [(key(other), distance) for other, distance in rel.items()] if ordered
+                             else {key(other): distance for other, distance in rel.items()}
+                             for direction, rel in relation_map.basicMap[part].items()}
+                 for part in relation_map.basicMap}
+    layers = [[(layer_key, values(parts)) for layer_key, parts in getattr(relation_map, name).items()]
+              for name in relation_map.LAYER_MAP_NAMES]
+    nodes = {node_key: {octant: values(parts) for octant, parts in (node._near_parts or {}).items() if parts}
+             for node_key, node in NAPartNode.node_index.items()}
+    return relations, layers, nodes
+
+
+class DesignTestCase(unittest.TestCase):
+    """
+    读取设计的测试：不使用设计缓存，self.folder为临时目录，结束后清空全局的节点注册表
+    """
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.design_cache, ReadNA.design_cache = ReadNA.design_cache, None
+
+    def tearDown(self):
+        ReadNA.design_cache = self.design_cache
+        clear_part_nodes()
+        shutil.rmtree(self.folder, ignore_errors=True)
+
+    def make_na_file(self, part_num: int, seed: int = 0) -> str:
+        return make_na_file(part_num, seed, self.folder)
+
+
+def make_na_text(part_num: int, seed: int = 0) -> str:
+    """
+    生成包含part_num个零件的na文件内容，其中大部分为可调节船体（部分带曲面或旋转），其余为普通零件
+    :param part_num: 零件数量
+    :param seed: 随机种子
+    :return: xml字符串
+    """
+    rand = random.Random(seed)
+    lines = ['<root>',
+             '  <ship author="bench" description="" hornType="1" hornPitch="0.9475011" tracerCol="E53D4FFF">']
+    side = max(int(round(part_num ** (1 / 3))), 1)
+    for i in range(part_num):
+        x, y, z = i % side, (i // side) % side, i // (side * side)
+        pos = f'<position x="{x * 2 - side}" y="{y}" z="{z * 4}" />'
+        rot = rand.choice(('x="0" y="0" z="0"', 'x="0" y="0" z="0"', 'x="0" y="180" z="0"', 'x="90" y="0" z="0"'))
+        col = rand.choice(BENCH_COLORS)
+        lines.append('    <part id="0">' if i % 10 else '    <part id="1">')
+        if i % 10:
+            ucur = rand.choice(("0", "0", "0.5"))
+            lines.append(
+                f'      <data length="4" height="1" frontWidth="{rand.choice(("1", "2"))}" backWidth="2" '
+                f'frontSpread="0.1" backSpread="0.2" upCurve="{ucur}" downCurve="0" heightScale="1" heightOffset="0" />')
+        lines.append(f'      {pos}')
+        lines.append(f'      <rotation {rot} />')
+        lines.append('      <scale x="1" y="1" z="1" />')
+        lines.append(f'      <color hex="{col}" />')
+        lines.append('      <armor value="5" />')
+        lines.append('    </part>')
+    lines.append('  </ship>')
+    lines.append('</root>')
+    return "\n".join(lines)
+
+
+def make_na_file(part_num: int, seed: int = 0, folder: str = None) -> str:
+    """
+    :return: 生成的na文件路径
+    """
+    folder = folder or tempfile.gettempdir()
+    path = os.path.join(folder, f"bench_{part_num}_{seed}.na")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(make_na_text(part_num, seed))
+    return path
+
+
+def make_gl_context(width: int = 800, height: int = 600, core_profile: bool = False):
+    """
+    创建无窗口的OpenGL上下文（EGL pbuffer，如Mesa的软件渲染），用于没有显示器的环境中测试绘制；
+    需要在导入OpenGL之前设置环境变量 PYOPENGL_PLATFORM=egl（无显示器时还需要 EGL_PLATFORM=surfaceless）
+    :param core_profile: 是否创建OpenGL 3.3核心模式的上下文（没有固定管线），否则为兼容模式
+    :return: (display, surface, context)
+    """
+    import ctypes
+    from OpenGL import EGL
+    display = EGL.eglGetDisplay(EGL.EGL_DEFAULT_DISPLAY)
+    major, minor = EGL.EGLint(), EGL.EGLint()
+    if not EGL.eglInitialize(display, ctypes.pointer(major), ctypes.pointer(minor)):
+        raise RuntimeError("EGL初始化失败")
+    attributes = (EGL.EGLint * 9)(EGL.EGL_SURFACE_TYPE, EGL.EGL_PBUFFER_BIT, EGL.EGL_RENDERABLE_TYPE,
+                                  EGL.EGL_OPENGL_BIT, EGL.EGL_DEPTH_SIZE, 24, EGL.EGL_ALPHA_SIZE, 8, EGL.EGL_NONE)
+    config, config_num = EGL.EGLConfig(), EGL.EGLint()
+    EGL.eglChooseConfig(display, attributes, ctypes.pointer(config), 1, ctypes.pointer(config_num))
+    if config_num.value == 0:
+        raise RuntimeError("没有可用的EGL配置")
+    surface = EGL.eglCreatePbufferSurface(
+        display, config, (EGL.EGLint * 5)(EGL.EGL_WIDTH, width, EGL.EGL_HEIGHT, height, EGL.EGL_NONE))
+    EGL.eglBindAPI(EGL.EGL_OPENGL_API)
+    context_attributes = None
+    if core_profile:
+        context_attributes = (EGL.EGLint * 7)(
+            EGL.EGL_CONTEXT_MAJOR_VERSION, 3, EGL.EGL_CONTEXT_MINOR_VERSION, 3,
+            EGL.EGL_CONTEXT_OPENGL_PROFILE_MASK, EGL.EGL_CONTEXT_OPENGL_CORE_PROFILE_BIT, EGL.EGL_NONE)
+    context = EGL.eglCreateContext(display, config, EGL.EGL_NO_CONTEXT, context_attributes)
+    if not context:
+        raise RuntimeError("无法创建EGL上下文")
+    if not EGL.eglMakeCurrent(display, surface, surface, context):
+        raise RuntimeError("无法启用EGL上下文")
+    return display, surface, context
@@ -1,9 +1,30 @@
 """
 测试NA设计读取器
 """
+import copy
+import gc
+import os
+import shutil
+import tempfile
+import weakref
+import xml.etree.ElementTree as ET
+
+import numpy as np
+
 from ship_reader.NA_design_reader import get_rot_relation as grr
+from ship_reader.NA_design_reader import ReadNA as Reader
+from ship_reader.design_cache import DesignCache
 from ship_reader.NA_design_reader import AdjustableHull as AH
+from ship_reader.NA_design_reader import NAPart, NAPartNode, PackedGeometry
+from ship_reader.coord_keys import coord_key, coord_keys
+from ship_reader.hull_geometry import (
+    LocalGeometryCache, get_hulls_geometry, get_vertex_coordinates, local_geometry_cache)
+from ship_reader.layer_index import LayerIndex
+from ship_reader.part_table import PartTable
+from test.helpers import (
+    SAMPLE_PATH, DesignTestCase, clear_part_nodes, hull_data, make_gl_context, read_hulls, relation_snapshot, silent)
 import unittest
+from unittest import mock
 
 
 class TestNaDesignReaderFuncs(unittest.TestCase):
@@ -54,3 +75,467 @@ class TestNaDesignReaderFuncs(unittest.TestCase):
         for rot in rots:
             self.H0.Rot = rot
             print(f"{rot}: {self.H0.get_data_in_coordinate()}")
+
+
+class TestReadNAStream(unittest.TestCase):
+    path = SAMPLE_PATH
+
+    def test_stream_read(self):
+        reader = Reader(self.path, show_statu_func=silent)
+        xml_parts = ET.parse(self.path).getroot().findall('ship/part')
+        self.assertEqual(len(reader.Parts), len(xml_parts))
+        self.assertEqual(sum(len(parts) for parts in reader.ColorPartsMap.values()), len(xml_parts))
+        self.assertEqual(reader.Author, "2593292614")
+        for part, xml_part in zip(reader.Parts, xml_parts):
+            self.assertEqual(f"#{part.Col}", f"#{xml_part.find('color').attrib['hex']}")
+
+    def test_corrupted_file(self):
+        folder = tempfile.mkdtemp()
+        path = os.path.join(folder, "corrupted.na")
+        with open(self.path, 'rb') as f:
+            data = f.read()
+        with open(path, 'wb') as f:
+            f.write(data[:len(data) // 2])  # 截断在中间，前一半的零件可以读取
+        try:
+            reader = Reader(path, show_statu_func=silent)
+        finally:
+            shutil.rmtree(folder, ignore_errors=True)
+        self.assertEqual((reader.Parts, reader.AdjustableHulls, reader.ColorPartsMap), ([], [], {}))
+        self.assertIsNone(reader.Author)
+        self.assertEqual(len(reader.partTable), 0)
+
+
+class TestDesignCache(unittest.TestCase):
+    path = SAMPLE_PATH
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        Reader.design_cache = DesignCache(self.folder)
+
+    def tearDown(self):
+        Reader.design_cache = None
+        shutil.rmtree(self.folder, ignore_errors=True)
+
+    def test_cache_hit(self):
+        reader = Reader(self.path, show_statu_func=silent)
+        # 读取时不计算绘图数据，也不保存，第一次绘制后才保存
+        self.assertEqual(Reader.design_cache.index, {})
+        self.assertTrue(all(part._plot_faces is None and part._packed_geometry is None for part in reader.AdjustableHulls))
+        reader.save_design_cache()
+        cached_reader = Reader(self.path, show_statu_func=silent)
+        self.assertEqual((Reader.design_cache.hits, Reader.design_cache.misses), (1, 1))
+        self.assertEqual([part.to_dict() for part in reader.Parts], [part.to_dict() for part in cached_reader.Parts])
+        for part, cached_part in zip(reader.Parts, cached_reader.Parts):
+            if isinstance(part, AH):
+                for method, faces in part.plot_faces.items():
+                    self.assertTrue(np.array_equal(np.array(faces), np.array(cached_part.plot_faces[method])))
+
+    def test_stat_key(self):
+        Reader(self.path, show_statu_func=silent).save_design_cache()
+        # 路径、大小和修改时间都相同时不计算内容哈希
+        with mock.patch.object(DesignCache, "get_key", side_effect=AssertionError):
+            self.assertIsNotNone(Reader.design_cache.load(self.path))
+        # 复制的文件：路径和修改时间不同，计算内容哈希后仍然命中
+        copy_path = os.path.join(self.folder, "copy.na")
+        shutil.copyfile(self.path, copy_path)
+        self.assertIsNotNone(Reader.design_cache.load(copy_path))
+
+    def test_evict(self):
+        Reader(self.path, show_statu_func=silent).save_design_cache()
+        Reader.design_cache.max_bytes = 0
+        Reader.design_cache.evict()
+        self.assertEqual(Reader.design_cache.index, {})
+        self.assertIsNone(Reader.design_cache.load(self.path))
+
+
+class TestParallelRead(unittest.TestCase):
+    path = SAMPLE_PATH
+
+    def tearDown(self):
+        Reader.load_workers = 1
+        Reader.load_chunk_size = 512
+        Reader.load_parallel_min_size = 2 * 1024 * 1024
+
+    def test_parallel_read(self):
+        reader = Reader(self.path, show_statu_func=silent)
+        Reader.load_workers = 2
+        Reader.load_chunk_size = 50
+        Reader.load_parallel_min_size = 0
+        parallel_reader = Reader(self.path, show_statu_func=silent)
+        self.assertEqual([part.to_dict() for part in reader.Parts],
+                         [part.to_dict() for part in parallel_reader.Parts])
+        self.assertEqual({color: [part.to_dict() for part in parts] for color, parts in reader.ColorPartsMap.items()},
+                         {color: [part.to_dict() for part in parts]
+                          for color, parts in parallel_reader.ColorPartsMap.items()})
+
+
+class TestLazyGeometry(unittest.TestCase):
+    def test_lazy_geometry(self):
+        part = AH(None, "0", [0, 0, 0], [0, 0, 0], [1, 1, 1], "#FFFFFF", 5,
+                  2, 2, 2, 2, 0, 0, 0, 0, 1, 0)
+        self.assertIsNone(part._plot_faces)
+        self.assertEqual(len(part.plot_faces["GL_QUADS"]), 6)
+        self.assertEqual(len(part.operation_dot_nodes), 8)
+        part.change_attrs(length=4)
+        self.assertIsNone(part._plot_faces)
+        self.assertEqual(max(dot[2] for dot in part.plot_all_dots), 2)
+
+
+class TestHullGeometry(unittest.TestCase):
+    path = SAMPLE_PATH
+
+    def test_batch_geometry(self):
+        reader = Reader(self.path, show_statu_func=silent)
+        hulls = [part for part in reader.Parts if isinstance(part, AH)]
+        hulls[0].Rot = [0, 0, 0]
+        hulls[0].reset_plot_data()
+        expected = [(hull.plot_faces, hull.plot_normals, hull.plot_lines, hull.plot_all_dots) for hull in hulls]
+        for hull in hulls:
+            hull.reset_plot_data()
+        AH.prepare_plot_data(reader.Parts)
+        for hull, (plot_faces, plot_normals, plot_lines, plot_all_dots) in zip(hulls, expected):
+            for method, faces in plot_faces.items():
+                self.assertTrue(np.array_equal(np.array(faces), np.array(hull.plot_faces[method])))
+                # 批量计算的法向量与逐个零件计算的相同，除退化的面（为零向量）外都是单位向量
+                self.assertTrue(np.allclose(plot_normals[method], hull.plot_normals[method], atol=1e-6))
+                lengths = np.linalg.norm(hull.plot_normals[method], axis=1)
+                self.assertTrue(np.allclose(lengths[lengths > 0], 1, atol=1e-5))
+            for key, line in plot_lines.items():
+                self.assertTrue(np.array_equal(np.array(line), np.array(hull.plot_lines[key])))
+            self.assertTrue(np.array_equal(np.array(plot_all_dots), np.array(hull.plot_all_dots)))
+
+
+class TestLocalGeometryCache(unittest.TestCase):
+    def setUp(self):
+        local_geometry_cache.clear()
+
+    def tearDown(self):
+        local_geometry_cache.clear()
+
+    def test_shared_geometry(self):
+        args = ([0, 0, 0], [1, 1, 1], "#FFFFFF", 5, 2, 2, 2, 2, 0, 0, 0, 0, 1, 0)
+        part0 = AH(None, "0", [0, 0, 0], *args)
+        part1 = AH(None, "0", [4, 0, 0], *args)
+        self.assertIs(part0.get_local_geometry(), part1.get_local_geometry())
+        self.assertEqual(local_geometry_cache.cache_info()[:2], (1, 1))
+        self.assertFalse(part0.get_local_geometry().vertex.flags.writeable)
+        self.assertEqual(max(dot[0] for dot in part1.plot_all_dots), 5)
+        # 批量计算时缓存中已有的外形不再计算
+        AH.prepare_plot_data([part0, part1])
+        self.assertEqual(local_geometry_cache.cache_info()[:2], (4, 1))
+
+    def test_exact_values(self):
+        # 不在0.001网格上的外形参数和缩放：局部坐标由零件自己的参数计算，与批量计算的结果逐位相同
+        shape = [1.23456, 1.0004, 2.0006, 1.9999, 0.1234, 0.2, 0, 0, 1, 0]
+        part0 = AH(None, "0", [0, 0, 0], [0, 90, 0], [1.0003, 1, 1], "#FFFFFF", 5, *shape)
+        part1 = AH(None, "0", [0, 0, 0], [0, 90, 0], [1.0003, 1, 1], "#FFFFFF", 5, 1.23457, *shape[1:])
+        self.assertIsNot(part0.get_local_geometry(), part1.get_local_geometry())
+        self.assertTrue(np.array_equal(part0.get_local_geometry().vertex, get_vertex_coordinates(np.array([shape]))[0]))
+        packed = PackedGeometry(get_hulls_geometry(
+            np.array([shape]), np.zeros((1, 3)), np.array([[0., 90, 0]]), np.array([[1.0003, 1, 1]]), np.zeros(1, bool)))
+        local_geometry_cache.clear()  # 逐个零件计算时重新计算局部坐标
+        _vertex, plot_lines, plot_faces, _normals, _nodes, plot_all_dots = packed.unpack(0)
+        self.assertTrue(np.array_equal(np.array(plot_all_dots), np.array(part0.plot_all_dots)))
+        for method, faces in plot_faces.items():
+            self.assertTrue(np.array_equal(np.array(faces), np.array(part0.plot_faces[method])))
+
+    def test_evict(self):
+        cache = LocalGeometryCache(max_size=2)
+        for length in (1, 2, 1, 3):
+            cache.get([length, 1, 1, 1, 0, 0, 0, 0, 1, 0], [1, 1, 1], False)
+        self.assertEqual(cache.cache_info(), (1, 3, 2, 2))
+        cache.get([2, 1, 1, 1, 0, 0, 0, 0, 1, 0], [1, 1, 1], False)  # 最近最少使用的已被淘汰
+        self.assertEqual(cache.misses, 4)
+
+
+class TestNodeIndex(DesignTestCase):
+    def test_shared_nodes(self):
+        reader = read_hulls([0, 0, 0], [0, 0, 2])
+        # 两个零件共享前后相接的四个节点
+        self.assertEqual(len(NAPartNode.node_index), 12)
+        node = NAPartNode.get_or_create([0.5, 0.5, 1.])
+        near_parts = [part for parts in node.near_parts.values() for part in parts]
+        self.assertEqual(near_parts, reader.Parts)
+
+
+class TestAxisLines(DesignTestCase):
+    def test_relation_view(self):
+        reader = read_hulls([0, 0, 4], [0, 0, 0], [0, 0, 2], [0, 1, 0])
+        reader.DrawMap = reader.ColorPartsMap
+        basic_map = reader.partRelationMap.basicMap
+        basic_map.clear()
+        reader.partRelationMap.init(reader)
+        p4, p0, p2, up = reader.Parts
+        self.assertEqual(list(basic_map[p0]["front"].items()), [(p2, 2), (p4, 4)])
+        self.assertEqual(list(basic_map[p4]["back"].items()), [(p2, 2), (p0, 4)])
+        self.assertEqual(basic_map[p0]["up"], {up: 1})
+        self.assertEqual(basic_map[up]["front"], {})
+        # 删除后零件保留在关系图中，但不再有任何关系
+        reader.partRelationMap.del_part(p2)
+        self.assertIn(p2, basic_map)
+        self.assertEqual(basic_map[p2]["back"], {})
+        self.assertEqual(basic_map[p0]["front"], {p4: 4})
+
+    def test_build_matches_add_part(self):
+        reader = Reader(self.make_na_file(500), show_statu_func=silent)
+        relation_map = reader.partRelationMap
+        relation_map.build(reader.Parts)
+        built = relation_snapshot(relation_map)
+        clear_part_nodes()
+        relation_map.basicMap.clear()
+        for name in relation_map.LAYER_MAP_NAMES:
+            setattr(relation_map, name, {})
+        for part in reader.Parts:
+            relation_map.add_part(part)
+        relation_map.sort()
+        self.assertEqual(built, relation_snapshot(relation_map))
+
+    def test_update_part_matches_build(self):
+        reader = Reader(self.make_na_file(500), show_statu_func=silent)
+        relation_map = reader.partRelationMap
+        relation_map.build(reader.Parts)
+        hulls = [part for part in reader.Parts if isinstance(part, AH) and tuple(part.Rot) == (0, 0, 0)]
+        hulls[0].change_attrs(position=[p + 0.5 for p in hulls[0].Pos])
+        hulls[1].change_attrs(position=hulls[2].Pos)
+        hulls[3].change_attrs(length=hulls[3].Len + 1)
+        hulls[4].change_attrs(position=[100, 100, 100])
+        # 有无效的值时不写入任何属性
+        before = hulls[5].to_dict()
+        self.assertFalse(hulls[5].change_attrs(position=[1, 2, 3], length=2, heightOffset="x"))
+        self.assertFalse(hulls[5].change_attrs_with_rot(position=[1, 2, 3], rotation=[0, "x", 0]))
+        self.assertEqual(before, hulls[5].to_dict())
+        # 增量更新后同一节点或截面层内零件的顺序可能不同，不比较顺序
+        updated = relation_snapshot(relation_map, ordered=False)
+        self.assertEqual(relation_map.basicMap[hulls[1]]["same"], {hulls[2]: 0})
+        clear_part_nodes()
+        relation_map.build(reader.Parts)
+        self.assertEqual(updated, relation_snapshot(relation_map, ordered=False))
+
+    def test_index_round_trip(self):
+        import ujson
+        path = self.make_na_file(500)
+        reader = Reader(path, show_statu_func=silent)
+        reader.partRelationMap.build(reader.Parts)
+        index = ujson.loads(ujson.dumps(reader.partRelationMap.dump_index(reader.Parts)))
+        # 两次读取的零件是不同的对象，按零件的序号比较
+        built = relation_snapshot(reader.partRelationMap, part_key=reader.Parts.index)
+        clear_part_nodes()
+        reader = Reader(path, show_statu_func=silent)
+        self.assertTrue(reader.partRelationMap.load_index(reader.Parts, index))
+        self.assertEqual(built, relation_snapshot(reader.partRelationMap, part_key=reader.Parts.index))
+        # 零件数据改变后索引失效
+        clear_part_nodes()
+        reader.Parts[1].Pos = [0.5, 0.5, 0.5]
+        self.assertFalse(reader.partRelationMap.load_index(reader.Parts, index))
+        self.assertFalse(reader.partRelationMap.load_index(reader.Parts, dict(index, Version=0)))
+
+
+class TestCoordKeys(DesignTestCase):
+    def test_near_equal_coords(self):
+        self.assertEqual(coord_key(0.1 + 0.2), coord_key(0.3))
+        self.assertEqual(coord_keys([0.1 + 0.2, -0.0004, 1.2345]).tolist(), [300, 0, 1234])
+        # 0.1 + 0.2 != 0.3，但两个零件仍在同一水平截面层和同一条前后方向的直线上
+        reader = read_hulls([0, 0.1 + 0.2, 0], [0, 0.3, 2])
+        p0, p2 = reader.Parts
+        relation_map = reader.partRelationMap
+        self.assertEqual(list(relation_map.xzPartsLayerMap.items()), [(300, [p0, p2])])
+        self.assertEqual(relation_map.basicMap[p0]["front"], {p2: 2})
+        self.assertEqual(len(NAPartNode.node_index), 12)
+
+
+class TestLayerIndex(unittest.TestCase):
+    def test_sorted_layers(self):
+        layers = LayerIndex({2.0: ["b"], -1.5: ["a"]})
+        layers[0.5] = ["c"]
+        layers[3.0] = ["d"]
+        del layers[2.0]
+        self.assertEqual(list(layers.items()), [(-1.5, ["a"]), (0.5, ["c"]), (3.0, ["d"])])
+        self.assertEqual(layers.irange(0, 3), [0.5, 3.0])
+        self.assertEqual(layers.irange(0.5, 3, inclusive=(False, True)), [3.0])
+        self.assertEqual(layers.higher_key(0.5), 3.0)
+        self.assertEqual(layers.lower_key(0.5), -1.5)
+        self.assertIsNone(layers.higher_key(3.0))
+        self.assertEqual(list(copy.deepcopy(layers)), [-1.5, 0.5, 3.0])
+
+
+class TestHullBatch(unittest.TestCase):
+    def test_build_mesh(self):
+        from GL_plot.hull_batch import build_mesh
+        path = SAMPLE_PATH
+        hulls = Reader(path, show_statu_func=silent).AdjustableHulls[:200]
+        vertices, indices, slices = build_mesh(hulls)
+        # 每个零件的顶点和索引连续存放，索引只引用自己的顶点
+        v_end = i_end = 0
+        for hull in hulls:
+            v_start, v_num, i_start, i_num, _signature = slices[hull]
+            self.assertEqual((v_start, i_start), (v_end, i_end))
+            v_end, i_end = v_start + v_num, i_start + i_num
+            part_indices = indices[i_start:i_end]
+            self.assertTrue(((part_indices >= v_start) & (part_indices < v_end)).all())
+            faces = hull.plot_faces
+            self.assertEqual(v_num, sum(len(face) for faces_ in faces.values() for face in faces_
+                                        if len(face) <= 4 or len(face) > 12))
+        self.assertEqual((v_end, i_end), (len(vertices), len(indices)))
+        self.assertEqual(len(indices) % 3, 0)
+        lengths = np.linalg.norm(vertices[:, 3:], axis=1)
+        self.assertTrue(np.allclose(lengths[lengths > 0], 1, atol=1e-5))
+
+    def test_frustum_culling(self):
+        from GL_plot.hull_batch import ColorBatch, build_mesh
+        from GL_plot.hull_bvh import PartBVH, classify_boxes, get_frustum_planes
+        path = SAMPLE_PATH
+        hulls = Reader(path, show_statu_func=silent).AdjustableHulls
+        batch = ColorBatch()
+        vertices, _indices, batch.slices = build_mesh(hulls)
+        batch.build_bvh(vertices)
+        # 与gluPerspective(45, 4 / 3, 0.1, 2000)和gluLookAt相同的矩阵，看向船首
+        f, near, far = 1 / np.tan(np.radians(22.5)), 0.1, 2000
+        projection = np.array([[f * 3 / 4, 0, 0, 0], [0, f, 0, 0],
+                               [0, 0, (far + near) / (near - far), 2 * far * near / (near - far)], [0, 0, -1, 0]])
+        view = np.identity(4)
+        view[:3, 3] = -40, 0, -10
+        view[:3, :3] = [[0, 0, -1], [0, 1, 0], [1, 0, 0]]  # 摄像机在 (10, 0, 40)，看向x轴负方向
+        planes = get_frustum_planes(projection.T, view.T)
+        outside, _inside = classify_boxes(planes, batch.bvh.mins[:len(hulls)], batch.bvh.maxs[:len(hulls)])
+        visible = batch.bvh.query(planes)
+        self.assertTrue(np.array_equal(visible, ~outside))
+        self.assertTrue(0 < visible.sum() < len(hulls))
+        # 可见零件的索引区间
+        starts, counts = batch.get_visible_ranges(planes)
+        parts = list(batch.slices)
+        drawn = {part for start, count in zip(starts, counts) for part in parts
+                 if start <= batch.slices[part][2] < start + count}
+        self.assertEqual(drawn, {part for part, visible_ in zip(parts, visible) if visible_})
+        self.assertEqual(batch.visible_num, len(drawn))
+        # 重新拟合后与重新建立的相同
+        batch.bvh.update([0], batch.bvh.mins[:1] + 100, batch.bvh.maxs[:1] + 100)
+        bvh = PartBVH(batch.bvh.mins[:len(hulls)], batch.bvh.maxs[:len(hulls)])
+        self.assertTrue(np.array_equal(batch.bvh.node_mins, bvh.node_mins))
+        self.assertTrue(np.array_equal(batch.bvh.node_maxs, bvh.node_maxs))
+
+    def test_instance_data(self):
+        from GL_plot.hull_batch import build_mesh
+        from GL_plot.hull_instancing import get_instance_data, get_local_meshes
+        path = SAMPLE_PATH
+        hulls = Reader(path, show_statu_func=silent).AdjustableHulls[:200]
+        vertices, _indices, slices = build_mesh(hulls)
+        shapes, instances = get_instance_data(hulls, np.zeros((len(hulls), 3)))
+        # 局部网格经过实例的模型矩阵和法向量矩阵变换后，与按零件打包的世界坐标网格相同
+        for hull, shape, instance, (local, _local_indices) in zip(hulls, shapes, instances, get_local_meshes(shapes)):
+            v_start, v_num = slices[hull][:2]
+            model = instance[:16].reshape(4, 4).T
+            normal_matrix = instance[16:25].reshape(3, 3).T
+            world = local[:, :3] @ model[:3, :3].T + model[:3, 3]
+            self.assertTrue(np.allclose(world, vertices[v_start:v_start + v_num, :3], atol=1e-3))
+            normals = local[:, 3:] @ normal_matrix.T
+            lengths = np.linalg.norm(normals, axis=1, keepdims=True)
+            normals = np.divide(normals, lengths, out=np.zeros_like(normals), where=lengths > 0)
+            self.assertTrue(np.allclose(normals, vertices[v_start:v_start + v_num, 3:], atol=1e-4))
+
+    @unittest.skipUnless(os.environ.get("PYOPENGL_PLATFORM") == "egl", "需要PYOPENGL_PLATFORM=egl（无窗口的EGL上下文）")
+    def test_instancing_core_profile(self):
+        from OpenGL import GL
+        from PyQt5.QtGui import QVector3D
+        from GL_plot.hull_batch import bind_hull_program
+        from GL_plot.hull_instancing import HullInstances, get_instanced_program
+        make_gl_context(64, 64, core_profile=True)
+        self.assertEqual(GL.glGetIntegerv(GL.GL_CONTEXT_PROFILE_MASK), GL.GL_CONTEXT_CORE_PROFILE_BIT)
+        path = SAMPLE_PATH
+        reader = Reader(path, show_statu_func=silent)
+        GL.glBindVertexArray(GL.glGenVertexArrays(1))
+        program = get_instanced_program()
+        self.assertIsNotNone(program)
+        instances = HullInstances()
+        instances.sync(reader.ColorPartsMap)
+        self.assertEqual(instances.instance_num, len(reader.AdjustableHulls))
+        # 修改一个零件的位置后原位更新实例属性，不重新分组
+        hull = reader.AdjustableHulls[0]
+        groups = dict(instances.groups)
+        hull.change_attrs(position=[hull.Pos[0], hull.Pos[1] + 1, hull.Pos[2]])
+        HullInstances.dispatch_changed_parts()
+        instances.sync(reader.ColorPartsMap)
+        self.assertEqual(instances.groups, groups)
+        key, instance_i = instances.slots[hull]
+        self.assertAlmostEqual(float(instances.groups[key].instances[instance_i, 13]), hull.Pos[1], places=4)
+        # 外形参数只相差0.0001的零件不共用网格，网格由零件自己的外形参数计算
+        other = reader.AdjustableHulls[1]
+        other.change_attrs(length=hull.Len + 0.0001, height=hull.Hei, frontWidth=hull.FWid, backWidth=hull.BWid,
+                           frontSpread=hull.FSpr, backSpread=hull.BSpr, upCurve=hull.UCur, downCurve=hull.DCur,
+                           heightScale=hull.HScl, heightOffset=hull.HOff)
+        HullInstances.dispatch_changed_parts()
+        instances.sync(reader.ColorPartsMap)
+        self.assertNotEqual(instances.slots[other][0], instances.slots[hull][0])
+        self.assertEqual(instances.slots[other][0][0], other.Len)
+        # 俯视整船，绘制后有被船体覆盖的像素
+        x, z = np.array([part.Pos for part in reader.AdjustableHulls])[:, [0, 2]].T
+        half = max(np.ptp(x), np.ptp(z)) / 2 + 10
+        projection = np.identity(4, dtype=np.float32)
+        projection[0, 0] = projection[1, 1] = 1 / half
+        projection[2, 2] = -1 / 1000
+        view = np.array([[1, 0, 0, -(x.max() + x.min()) / 2], [0, 0, -1, (z.max() + z.min()) / 2],
+                         [0, 1, 0, 0], [0, 0, 0, 1]], dtype=np.float32)
+        GL.glClearColor(0, 0, 0, 1)
+        GL.glClear(GL.GL_COLOR_BUFFER_BIT | GL.GL_DEPTH_BUFFER_BIT)
+        bind_hull_program(program, QVector3D(0, 1000, 0), QVector3D(0, 1000, 0),
+                          projection=projection.T.copy(), view=view.T.copy())
+        instances.draw(program)
+        GL.glFinish()
+        self.assertEqual(GL.glGetError(), GL.GL_NO_ERROR)
+        image = np.frombuffer(GL.glReadPixels(0, 0, 64, 64, GL.GL_RGBA, GL.GL_UNSIGNED_BYTE), dtype=np.uint8)
+        self.assertGreater(np.count_nonzero(image.reshape(-1, 4)[:, :3].any(axis=1)), 64 * 64 // 20)
+        instances.release()
+
+
+class TestPartMemory(DesignTestCase):
+    def test_parts_have_no_dict(self):
+        reader = Reader(data={"#888888": [hull_data([0, 0, 0])]}, show_statu_func=silent)
+        part = NAPart(None, "0", [1, 2, 3], [0, 0, 0], [1, 1, 1], "FFFFFF", 5)
+        self.assertFalse(hasattr(reader.AdjustableHulls[0], "__dict__"))
+        self.assertFalse(hasattr(part, "__dict__"))
+        self.assertFalse(hasattr(NAPartNode([0., 0., 0.]), "__dict__"))
+
+    def test_near_parts_allocated_lazily(self):
+        part = NAPart(None, "0", [1, 2, 3], [0, 0, 0], [1, 1, 1], "FFFFFF", 5)
+        node = NAPartNode([0., 0., 0.])
+        self.assertIsNone(node._near_parts)
+        node.add_near_part(node.OCTANTS[0], part)
+        # 只保存有零件的卦限，near_parts仍然返回全部八个卦限
+        self.assertEqual(list(node._near_parts), [node.OCTANTS[0]])
+        self.assertEqual(list(node.near_parts), list(node.OCTANTS))
+        self.assertEqual(node.near_parts[node.OCTANTS[0]], [part])
+
+    def test_derived_fields_follow_shape(self):
+        reader = Reader(data={"#888888": [hull_data([0, 0, 0], FWid=2, FSpr=1, HScl=0.5, HOff=0.5)]},
+                        show_statu_func=silent)
+        hull = reader.AdjustableHulls[0]
+        self.assertEqual((hull.front_z, hull.back_z), (1, -1))
+        self.assertEqual((hull.front_down_x, hull.front_up_x), (1, 1.5))
+        self.assertEqual((hull.front_down_y, hull.front_up_y), (0.25, 0.5))
+        self.assertTrue(hull.change_attrs(length=4, frontWidth=3, frontSpread=2, heightOffset=0))
+        self.assertEqual((hull.front_z, hull.back_z), (2, -2))
+        self.assertEqual((hull.front_down_x, hull.front_up_x), (1.5, 2.5))
+        self.assertEqual((hull.front_down_y, hull.front_up_y), (-0.25, 0.25))
+
+    def test_closed_design_is_freed(self):
+        path = SAMPLE_PATH
+        reader = Reader(path, show_statu_func=silent)
+        self.assertEqual(len(reader.AdjustableHulls), sum(isinstance(part, AH) for part in reader.Parts))
+        refs = [weakref.ref(part) for part in reader.Parts]
+        part_id = id(reader.Parts[0]) % 4294967296
+        self.assertIs(NAPart.id_map[part_id], reader.Parts[0])
+        # 打开另一个设计后，之前的设计不再被任何全局注册表引用
+        Reader(data={}, show_statu_func=silent)
+        del reader
+        gc.collect()
+        self.assertTrue(all(ref() is None for ref in refs))
+        self.assertNotIn(part_id, NAPart.id_map)
+
+    def test_default_table_parts_are_freed(self):
+        # 没有所属船体的零件使用公共表，公共表不应使它们常驻内存
+        part = NAPart(None, "0", [1, 2, 3], [0, 0, 0], [1, 1, 1], "FFFFFF", 5)
+        table, row, ref = part._table, part._row, weakref.ref(part)
+        self.assertIs(table, PartTable.get_default())
+        del part
+        gc.collect()
+        self.assertIsNone(ref())
+        self.assertFalse(table.alive[row])
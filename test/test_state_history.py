@@ -0,0 +1,129 @@
+"""
+测试命令历史
+"""
+import unittest
+
+from GL_plot.na_hull import NAHull
+from ship_reader import PRM
+from state_history import StateHistory
+from test.helpers import DesignTestCase, relation_snapshot, silent
+
+
+class TestStateHistory(DesignTestCase):
+    def tearDown(self):
+        StateHistory.current = None
+        NAHull.current_in_design_tab = None
+        super().tearDown()
+
+    def open_design(self, part_num: int = 300) -> NAHull:
+        """
+        :return: 设计标签页中打开的设计，零件关系图已初始化
+        """
+        hull = NAHull(self.make_na_file(part_num), show_statu_func=silent, design_tab=True)
+        hull.DrawMap = hull.ColorPartsMap
+        hull.partRelationMap.init(hull)
+        return hull
+
+    @staticmethod
+    def snapshot(hull):
+        """
+        :return: 当前零件关系图的快照（见relation_snapshot），以及DrawMap中的零件
+        """
+        return relation_snapshot(PRM.last_map) + ({color: list(parts) for color, parts in hull.DrawMap.items()},)
+
+    def test_delta_undo_redo(self):
+        hull = self.open_design()
+        history = StateHistory(silent)
+        history.init_stack()
+        before = self.snapshot(hull)
+        hulls = [part for part in hull.Parts if PRM._is_mapped(part)]
+        hulls[0].change_attrs(position=[100, 0, 0])
+        PRM.last_map.del_part(hulls[1])
+        hull.DrawMap[f"#{hulls[1].Col}"].remove(hulls[1])
+        history.execute()
+        after = self.snapshot(hull)
+        self.assertNotEqual(before, after)
+        # 第一个状态保存所有的项，之后的状态只保存变化的项
+        self.assertLess(history.stateStack[1].nbytes * 20, history.stateStack[0].nbytes)
+        history.undo()
+        self.assertEqual(self.snapshot(hull), before)
+        history.redo()
+        self.assertEqual(self.snapshot(hull), after)
+        history.undo()
+        history.execute()  # 撤回后保存新的状态，删除之后的状态
+        self.assertEqual(self.snapshot(hull), before)
+        self.assertEqual(history.stateStack[1].changed_num, 0)
+        self.assertIsNone(history.stateStack[2])
+
+    def test_ring_buffer_budget(self):
+        hull = self.open_design()
+        history = StateHistory(silent, max_length=4)
+        history.init_stack()
+        states = [self.snapshot(hull)]
+        for part in [part for part in hull.Parts if PRM._is_mapped(part)][:5]:
+            part.change_attrs(position=[part.Pos[0] + 100, part.Pos[1], part.Pos[2]])
+            history.execute()
+            states.append(self.snapshot(hull))
+        # 超出长度后删除最早的状态
+        self.assertEqual(len(history.stateStack), 4)
+        self.assertEqual(history.current_index, 3)
+        # 超出内存上限后，较早的状态写入临时文件，撤回时从文件中读取
+        history.max_bytes = history.stateStack[3].nbytes
+        history.limit_memory()
+        self.assertIsNotNone(history.spill_file)
+        self.assertTrue(all(history.stateStack[i].changes is None for i in range(3)))
+        self.assertEqual(history.nbytes, history.stateStack[3].nbytes)
+        for i in (4, 3, 2):
+            history.undo()
+            self.assertEqual(self.snapshot(hull), states[i])
+        history.undo()  # 最早的状态之前没有历史记录
+        self.assertEqual(history.current_index, 0)
+        history.redo()
+        self.assertEqual(self.snapshot(hull), states[3])
+
+    def test_merge_operations(self):
+        class WheelOperation:
+            name = "滚轮编辑"
+
+            def __init__(self, part, before, after):
+                self.part, self.before, self.after = part, before, after
+
+            def execute(self, update=True):
+                values[self.part] = self.after
+                refreshed.append(update)
+
+            def undo(self):
+                values[self.part] = self.before
+
+            def merge(self, other):
+                if other.part != self.part:
+                    return False
+                self.after = other.after
+                return True
+
+            def refresh(self):
+                refreshed.append(True)
+
+        values = {"a": 0, "b": 0}
+        refreshed = []
+        history = StateHistory(silent, merge_window=60)
+        history.current_index = history.snapshot_index = -1
+        for i in range(10):
+            history.execute_operation(WheelOperation("a", i, i + 1))
+        # 连续操作只保存一项，只有第一次执行时刷新，合并的操作推迟到连续操作结束后刷新
+        self.assertEqual(len(history.stateStack), 1)
+        self.assertEqual(refreshed.count(True), 1)
+        history.execute_operation(WheelOperation("b", 0, 1))  # 不同零件的操作不合并，并结束上一组连续操作
+        self.assertEqual(len(history.stateStack), 2)
+        self.assertEqual(refreshed.count(True), 3)
+        history.undo()
+        self.assertEqual(values, {"a": 10, "b": 0})
+        history.stateStack[0].undo()  # 合并后的操作保留第一个操作的原始状态
+        self.assertEqual(values, {"a": 0, "b": 0})
+        history.execute_operation(WheelOperation("a", 10, 11))  # 撤回后的操作不与之前的操作合并
+        self.assertEqual(len(history.stateStack), 2)
+        self.assertEqual(history.stateStack[1].before, 10)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -3,6 +3,7 @@
 """
 
 import ctypes
+from functools import lru_cache
 from typing import Literal
 
 import numpy as np
@@ -64,9 +65,68 @@ VECTOR_RELATION_MAP = {
 }
 
 
+ROTATION_CACHE_SIZE = 4096  # 旋转矩阵缓存的容量（不同旋转角度的数量）
+
+
+@lru_cache(maxsize=ROTATION_CACHE_SIZE)
+def _get_rotation_matrix(rot: tuple, rotate_order: str) -> np.ndarray:
+    # 转换为弧度
+    rot = np.radians(rot)
+    # 计算旋转的四元数
+    axis_quaternions = {
+        "X": quaternion(np.cos(rot[0] / 2), np.sin(rot[0] / 2), 0, 0),
+        "Y": quaternion(np.cos(rot[1] / 2), 0, np.sin(rot[1] / 2), 0),
+        "Z": quaternion(np.cos(rot[2] / 2), 0, 0, np.sin(rot[2] / 2)),
+    }
+    if sorted(rotate_order) != ["X", "Y", "Z"]:
+        raise ValueError("Invalid RotateOrder!")
+    # 按旋转顺序合并三个旋转四元数
+    q = quaternion(1, 0, 0, 0)
+    for axis in rotate_order:
+        q = q * axis_quaternions[axis]
+    # 旋转三个基向量，得到矩阵的三列
+    matrix = np.empty((3, 3))
+    for i, basis in enumerate(np.eye(3)):
+        rotated = q * np.quaternion(0, *basis) * np.conj(q)
+        matrix[:, i] = rotated.x, rotated.y, rotated.z
+    # 消除浮点误差，使90度倍数的旋转得到精确的0和±1
+    for value in (-1., 0., 1.):
+        matrix[np.abs(matrix - value) < 1e-12] = value
+    matrix.flags.writeable = False
+    return matrix
+
+
+def get_rotation_matrix(rot) -> np.ndarray:
+    """
+    获取旋转角度对应的旋转矩阵，按（旋转角度，旋转顺序）缓存，最近最少使用的先被淘汰
+    :param rot: 三个轴的旋转角度，单位为度
+    :return: 只读的3x3矩阵
+    """
+    return _get_rotation_matrix(tuple(float(i) for i in rot), CONST.ROTATE_ORDER)
+
+
+def get_rotation_cache_info():
+    """
+    :return: 旋转矩阵缓存的命中次数，未命中次数，容量，当前大小
+    """
+    return _get_rotation_matrix.cache_info()
+
+
+def apply_rotation(points, matrix):
+    """
+    用旋转矩阵旋转点集；逐分量计算，批量计算和逐个零件计算的结果逐位相同
+    :param points: (..., 3) 数组
+    :param matrix: (..., 3, 3) 数组，与points的前面的维度广播
+    :return: (..., 3) 数组
+    """
+    points = np.asarray(points, dtype=np.float64)
+    return (points[..., 0, None] * matrix[..., :, 0] + points[..., 1, None] * matrix[..., :, 1]
+            + points[..., 2, None] * matrix[..., :, 2])
+
+
 def rotate_quaternion(vec, rot: list):
     """
-    对np.array类型的向量进行四元数旋转
+    对np.array类型的向量进行旋转，并标准化为单位向量
     :param vec:
     :param rot: list
     :return:
@@ -74,60 +134,23 @@ def rotate_quaternion(vec, rot: list):
     if rot == [0, 0, 0]:
         # 标准化为单位向量
         return vec / np.linalg.norm(vec)
-    # 转换为弧度
-    rot = np.radians(rot)
-    # 计算旋转的四元数
-    q_x = np.array([np.cos(rot[0] / 2), np.sin(rot[0] / 2), 0, 0])
-    q_y = np.array([np.cos(rot[1] / 2), 0, np.sin(rot[1] / 2), 0])
-    q_z = np.array([np.cos(rot[2] / 2), 0, 0, np.sin(rot[2] / 2)])
-
-    # 合并三个旋转四元数
-    q = quaternion(1, 0, 0, 0)
-    if CONST.ROTATE_ORDER == "XYZ":
-        q = q * quaternion(*q_x) * quaternion(*q_y) * quaternion(*q_z)
-    elif CONST.ROTATE_ORDER == "XZY":
-        q = q * quaternion(*q_x) * quaternion(*q_z) * quaternion(*q_y)
-    elif CONST.ROTATE_ORDER == "YXZ":
-        q = q * quaternion(*q_y) * quaternion(*q_x) * quaternion(*q_z)
-    elif CONST.ROTATE_ORDER == "YZX":
-        q = q * quaternion(*q_y) * quaternion(*q_z) * quaternion(*q_x)
-    elif CONST.ROTATE_ORDER == "ZXY":
-        q = q * quaternion(*q_z) * quaternion(*q_x) * quaternion(*q_y)
-    elif CONST.ROTATE_ORDER == "ZYX":
-        q = q * quaternion(*q_z) * quaternion(*q_y) * quaternion(*q_x)
-    else:
-        raise ValueError("Invalid RotateOrder!")
-
-    # 进行四元数旋转
-    rotated_point_quat = q * np.quaternion(0, *vec) * np.conj(q)
-    # 提取旋转后的点坐标
-    rotated_point = np.array([rotated_point_quat.x, rotated_point_quat.y, rotated_point_quat.z])
+    rotated_point = apply_rotation(vec, get_rotation_matrix(rot))
     # 标准化为单位向量
     rotated_point = rotated_point / np.linalg.norm(rotated_point)
     return rotated_point
 
 
-def get_part_world_dirs(part_rot: list, excepted_dir: Literal["front_back", "up_down", "left_right"] = None):
-    """
-    获取零件本地坐标系方向在全局坐标系中的方向
-    :param part_rot: list
-    :param excepted_dir: 被排除的方向 Literal[CONST.FRONT_BACK, CONST.UP_DOWN, CONST.LEFT_RIGHT]
-    :return:
-    """
-    front_vec, left_vec, up_vec = None, None, None
-    if not excepted_dir:
-        front_vec = tuple(rotate_quaternion(np.array([0., 0., 1.]), part_rot))
-        left_vec = tuple(rotate_quaternion(np.array([1., 0., 0.]), part_rot))
-        up_vec = tuple(rotate_quaternion(np.array([0., 1., 0.]), part_rot))
-    elif excepted_dir == CONST.FRONT_BACK:
-        left_vec = tuple(rotate_quaternion(np.array([1., 0., 0.]), part_rot))
-        up_vec = tuple(rotate_quaternion(np.array([0., 1., 0.]), part_rot))
+@lru_cache(maxsize=ROTATION_CACHE_SIZE)
+def _get_part_world_dirs(part_rot: tuple, rotate_order: str, excepted_dir: str = None):
+    matrix = _get_rotation_matrix(part_rot, rotate_order)
+    # 本地坐标系的左，上，前方向旋转后即为矩阵的三列
+    left_vec, up_vec, front_vec = (tuple(matrix[:, i] / np.linalg.norm(matrix[:, i])) for i in range(3))
+    if excepted_dir == CONST.FRONT_BACK:
+        front_vec = None
     elif excepted_dir == CONST.UP_DOWN:
-        front_vec = tuple(rotate_quaternion(np.array([0., 0., 1.]), part_rot))
-        left_vec = tuple(rotate_quaternion(np.array([1., 0., 0.]), part_rot))
+        up_vec = None
     elif excepted_dir == CONST.LEFT_RIGHT:
-        front_vec = tuple(rotate_quaternion(np.array([0., 0., 1.]), part_rot))
-        up_vec = tuple(rotate_quaternion(np.array([0., 1., 0.]), part_rot))
+        left_vec = None
     front, back, left, right, up, down = None, None, None, None, None, None
     if front_vec in VECTOR_RELATION_MAP.keys():
         front = VECTOR_RELATION_MAP[front_vec]["Larger"]
@@ -142,6 +165,16 @@ def get_part_world_dirs(part_rot: list, excepted_dir: Literal["front_back", "up_
             CONST.RIGHT: right, CONST.UP: up, CONST.DOWN: down}
 
 
+def get_part_world_dirs(part_rot: list, excepted_dir: Literal["front_back", "up_down", "left_right"] = None):
+    """
+    获取零件本地坐标系方向在全局坐标系中的方向，结果与旋转矩阵一起缓存
+    :param part_rot: list
+    :param excepted_dir: 被排除的方向 Literal[CONST.FRONT_BACK, CONST.UP_DOWN, CONST.LEFT_RIGHT]
+    :return:
+    """
+    return dict(_get_part_world_dirs(tuple(float(i) for i in part_rot), CONST.ROTATE_ORDER, excepted_dir))
+
+
 def get_normal(dot1, dot2, dot3, center=None):
     """
     计算三角形的法向量，输入为元组